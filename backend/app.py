@@ -10,7 +10,9 @@ Dieses Modul initialisiert die Flask-Anwendung und konfiguriert:
 - API-Routen für alle Module
 """
 
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, abort, jsonify, request, send_file, send_from_directory
+from werkzeug.middleware.proxy_fix import ProxyFix
+from werkzeug.security import safe_join
 from flask_cors import CORS
 import os
 import sys
@@ -26,6 +28,17 @@ from routes.kategorie_routes import kategorie_bp
 from routes.favorit_routes import favorit_bp
 from routes.kommentar_routes import kommentar_bp
 from routes.bewertung_routes import bewertung_bp
+from db import init_app as db_init_app, pool_statistiken
+from suche import suchdienst
+from models.rezept import rezept_cache_statistiken, rezept_bild_abschliessen
+from utils.abfragecache import abfrage_cache
+from utils.cachebackend import cache_backend
+from utils.security import PasswortDienstUeberlastet, PASSWORT_RETRY_AFTER, passwort_statistiken
+from utils.ratenbegrenzung import ratenbegrenzung_statistiken
+from utils.mailwarteschlange import init_app as mail_init_app
+from utils.bildverarbeitung import init_app as bilder_init_app
+from utils.bildvarianten import init_app as varianten_init_app, UngueltigeVariante, MIME_TYPEN
+from utils.bilder import UngueltigesBild, inhalt_aus_name
 from dotenv import load_dotenv
 
 # SSL-Konfiguration importieren mit Fallback
@@ -56,11 +69,21 @@ def create_app(config=None):
     # Configuração da chave secreta para JWT (mesma que utils/token.py usa)
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua-chave-secreta-muito-segura-aqui-2024')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB maximale Dateigröße
+    # Laufzeitkennzahlen (/api/metriken) nur im Debug-Modus oder ausdrücklich freigeschaltet
+    app.config['METRIKEN_AKTIV'] = os.getenv('METRIKEN_AKTIV', 'false').lower() in ('1', 'true', 'ja')
+    # Anzahl vorgeschalteter Reverse-Proxys, deren X-Forwarded-For/-Proto vertraut wird (0 = direkt erreichbar)
+    app.config['PROXY_ANZAHL'] = int(os.getenv('PROXY_ANZAHL', 0))
     
     # Test-Konfiguration überschreiben falls vorhanden
     if config:
         app.config.update(config)
     
+    # Hinter einem Reverse-Proxy die Client-Adresse aus X-Forwarded-For übernehmen
+    # (Ratenbegrenzung je IP); ohne Proxy würden gefälschte Header sonst übernommen
+    if app.config['PROXY_ANZAHL']:
+        anzahl = app.config['PROXY_ANZAHL']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=anzahl, x_proto=anzahl)
+    
     # Configuração CORS mais permissiva para desenvolvimento
     CORS(app, resources={
         r"/api/*": {
@@ -78,6 +101,15 @@ def create_app(config=None):
         }
     })
     
+    # Anfragegebundene Datenbankverbindung am Ende jeder Anfrage freigeben
+    db_init_app(app)
+    
+    # Invalidierungen anderer Worker-Prozesse empfangen (Empfänger startet im Worker, nicht beim Import)
+    cache_backend.init_app(app)
+    
+    # Ausgehende E-Mails über Spool und Hintergrund-Versand; liegengebliebene Nachrichten werden zugestellt
+    mailwarteschlange = mail_init_app(app)
+    
     # Configuração das pastas de uploads
     app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'static', 'uploads')
     app.config['PROFILE_FOLDER'] = os.path.join(app.root_path, 'static', 'profile_images')
@@ -85,14 +117,49 @@ def create_app(config=None):
     # Criar diretórios se não existirem
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(app.config['PROFILE_FOLDER'], exist_ok=True)
+    
+    # Hochgeladene Rezeptbilder im Prozess-Pool rendern; offene Aufträge werden wieder aufgenommen
+    bildverarbeitung = bilder_init_app(app, rezept_bild_abschliessen)
+    
+    # Größenvarianten der Uploads auf Abruf (?w=&h=&fmt=), zwischengespeichert auf der Platte
+    bildvarianten = varianten_init_app(app)
+    
+    def bild_antwort(antwort, filename):
+        """
+        Inhaltsadressierte Bilder ändern sich nie (neuer Inhalt = neue URL) und dürfen
+        unbegrenzt zwischengespeichert werden; ältere Uploads mit festen Namen nicht
+        """
+        if inhalt_aus_name(os.path.basename(filename)):
+            antwort.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return antwort
 
     # Rota para servir arquivos estáticos da pasta uploads
     @app.route('/static/uploads/<path:filename>')
     def serve_upload(filename):
         """
         Serve arquivos estáticos da pasta uploads
+        
+        Mit w (und optional h, fmt) wird eine erlaubte Größenvariante ausgeliefert,
+        z.B. /static/uploads/abc.jpg?w=640&fmt=webp
         """
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        if not any(name in request.args for name in ('w', 'h', 'fmt')):
+            return bild_antwort(send_from_directory(app.config['UPLOAD_FOLDER'], filename), filename)
+        
+        try:
+            breite, hoehe, format_name = bildvarianten.parameter_lesen(request.args)
+        except UngueltigeVariante as fehler:
+            return jsonify({"error": str(fehler)}), 400
+        
+        quelle = safe_join(app.config['UPLOAD_FOLDER'], filename)
+        if quelle is None or not os.path.isfile(quelle):
+            abort(404)
+        try:
+            pfad = bildvarianten.variante(quelle, breite, hoehe, format_name)
+        except FileNotFoundError:
+            abort(404)
+        except UngueltigesBild:
+            return jsonify({"error": "Datei ist kein unterstütztes Bild"}), 400
+        return bild_antwort(send_file(pfad, mimetype=MIME_TYPEN[format_name], conditional=True), filename)
 
     # Rota para servir arquivos estáticos da pasta profile_images
     @app.route('/static/profile_images/<path:filename>')
@@ -100,7 +167,7 @@ def create_app(config=None):
         """
         Serve arquivos estáticos da pasta profile_images
         """
-        return send_from_directory(app.config['PROFILE_FOLDER'], filename)
+        return bild_antwort(send_from_directory(app.config['PROFILE_FOLDER'], filename), filename)
 
     # Blueprints registrieren
     app.register_blueprint(benutzer_bp, url_prefix='/api/benutzer')
@@ -141,6 +208,30 @@ def create_app(config=None):
             "ssl_enabled": app.config.get('SSL_ENABLED', False)
         })
 
+    def metriken():
+        """
+        Laufzeitkennzahlen für Monitoring (ohne Anmeldung, daher nur auf Freigabe registriert)
+        
+        @return {dict} Kennzahlen der Backend-Komponenten
+        """
+        return jsonify({
+            "datenbank": pool_statistiken(),
+            "suche": suchdienst.statistiken(),
+            "passwoerter": passwort_statistiken(),
+            "ratenbegrenzung": ratenbegrenzung_statistiken(),
+            "mail": mailwarteschlange.statistiken(),
+            "bilder": bildverarbeitung.statistiken(),
+            "bildvarianten": bildvarianten.statistiken(),
+            "zwischenspeicher": {
+                "rezepte": rezept_cache_statistiken(),
+                "abfragen": abfrage_cache.statistiken(),
+                "backend": cache_backend.statistiken()
+            }
+        })
+
+    if app.debug or app.config['METRIKEN_AKTIV']:
+        app.add_url_rule('/api/metriken', view_func=metriken)
+
     @app.errorhandler(404)
     def not_found(error):
         """
@@ -154,6 +245,21 @@ def create_app(config=None):
             "message": "Die angeforderte Route existiert nicht"
         }), 404
 
+    @app.errorhandler(PasswortDienstUeberlastet)
+    def passwort_dienst_ueberlastet(error):
+        """
+        Behandelt Überlast bei Passwortberechnungen (Anmeldung, Registrierung).
+        
+        @param {Object} error - Fehlerobjekt
+        @return {Object} JSON-Antwort mit Status 503 und Retry-After-Header
+        """
+        antwort = jsonify({
+            "error": "Dienst ausgelastet",
+            "message": "Zu viele gleichzeitige Anmeldungen. Bitte versuchen Sie es gleich erneut."
+        })
+        antwort.headers['Retry-After'] = str(PASSWORT_RETRY_AFTER)
+        return antwort, 503
+
     @app.errorhandler(500)
     def internal_error(error):
         """
@@ -4,55 +4,686 @@
 
 Dieses Modul stellt Funktionen für die Verwaltung der Datenbankverbindung bereit.
 Es verwendet Umgebungsvariablen aus der .env-Datei für die Verbindungsdetails.
+
+Verbindungen werden aus einem Pool ausgeliehen, statt für jede Abfrage neu
+aufgebaut zu werden. Der Pool wird über folgende Umgebungsvariablen konfiguriert:
+- DB_POOL_GROESSE: Anzahl der dauerhaft offen gehaltenen Verbindungen (Standard: 5)
+- DB_POOL_UEBERLAUF: Zusätzliche Verbindungen bei Lastspitzen (Standard: 10)
+- DB_POOL_TIMEOUT: Maximale Wartezeit in Sekunden beim Ausleihen (Standard: 10)
+- DB_POOL_PRE_PING: Verbindung vor der Ausgabe prüfen (Standard: true)
+
+Innerhalb einer HTTP-Anfrage teilen sich alle Modellfunktionen eine Verbindung,
+die auf Flask `g` liegt und im Teardown-Handler an den Pool zurückgeht.
+Mit `arbeitseinheit()` werden mehrere Schreibvorgänge gemeinsam committet;
+mit `nach_commit()` vorgemerkte Aufrufe (z.B. Cache-Invalidierungen) laufen
+erst nach dem tatsächlichen Commit und entfallen bei einem Rollback.
+
+Modellfunktionen verwenden `verbindung_verwalten()`, das Cursor und Verbindung
+garantiert freigibt. Im Debug-Modus (oder mit DB_LECK_ERKENNUNG=true) merkt sich
+der Leck-Detektor den Aufrufstapel jeder Ausleihe und warnt, wenn eine
+Verbindung nicht zurückgegeben wird oder ihre Anfrage überlebt.
 """
 
 import os
+import threading
+import time
+import traceback
+import warnings
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 import mysql.connector
 from dotenv import load_dotenv
+from flask import g, has_request_context, request
 
 # Carregar variáveis do arquivo .env
 load_dotenv()
 
-def get_db():
+
+class PoolErschoepft(Exception):
+    """Wird ausgelöst, wenn innerhalb des Timeouts keine Verbindung frei wurde."""
+
+
+class DatenbankNichtVerfuegbar(Exception):
+    """Wird von verbindung_verwalten() ausgelöst, wenn keine Verbindung zustande kommt."""
+
+
+# Leck-Detektor: ausgeliehene, noch nicht freigegebene Verbindungen
+_leck_erkennung = os.getenv("DB_LECK_ERKENNUNG", "false").lower() in ("1", "true", "ja")
+_offene_ausleihen = {}
+_gemeldete_lecks = []
+_leck_sperre = threading.Lock()
+
+
+def _leck_melden(info, grund):
+    # Jede Ausleihe wird höchstens einmal gemeldet (Teardown kann mehrfach laufen)
+    if info.get('gemeldet'):
+        return
+    info['gemeldet'] = True
+    meldung = (
+        f"Datenbankverbindungs-Leck: {grund}\n"
+        f"Ausgeliehen bei:\n{''.join(info['stapel'])}"
+    )
+    with _leck_sperre:
+        _gemeldete_lecks.append(meldung)
+    print(f"⚠️  {meldung}")
+    warnings.warn(meldung, ResourceWarning, stacklevel=2)
+
+
+class GepoolteVerbindung:
     """
-    Stellt eine Verbindung zur MySQL-Datenbank her.
-    
+    Hülle um eine physische MySQL-Verbindung aus dem Pool.
+
+    Alle Attribute werden an die echte Verbindung durchgereicht. `close()`
+    schließt die Verbindung nicht, sondern gibt sie an den Pool zurück.
+    Geteilte (anfragegebundene) Verbindungen werden erst beim Ende der
+    Anfrage freigegeben; innerhalb einer Arbeitseinheit wird `commit()`
+    bis zum Ende der Einheit aufgeschoben, ebenso die per `nach_commit()`
+    vorgemerkten Aufrufe.
+    """
+
+    _EIGENE_ATTRIBUTE = (
+        '_pool', '_roh', '_freigegeben', '_geteilt',
+        '_tiefe', '_ausstehend', '_abgebrochen', '_cursor', '_nach_commit'
+    )
+
+    def __init__(self, pool, roh):
+        self._pool = pool
+        self._roh = roh
+        self._freigegeben = False
+        self._geteilt = False
+        self._tiefe = 0
+        self._ausstehend = False
+        self._abgebrochen = False
+        self._cursor = []
+        self._nach_commit = []
+        if _leck_erkennung:
+            with _leck_sperre:
+                _offene_ausleihen[id(self)] = {
+                    'stapel': traceback.format_stack()[:-2],
+                    'anfrage': _anfrage_kennung(),
+                    'seit': time.monotonic()
+                }
+
+    def __getattr__(self, name):
+        if name in self._EIGENE_ATTRIBUTE:
+            raise AttributeError(name)
+        return getattr(self._roh, name)
+
+    def __setattr__(self, name, wert):
+        # Eigenschaften wie `autocommit` müssen auf der echten Verbindung landen
+        if name in self._EIGENE_ATTRIBUTE:
+            object.__setattr__(self, name, wert)
+        else:
+            setattr(self._roh, name, wert)
+
+    def cursor(self, *args, **kwargs):
+        """
+        Erzeugt einen Cursor, der bei der Freigabe automatisch geschlossen wird.
+        """
+        cursor = self._roh.cursor(*args, **kwargs)
+        self._cursor.append(cursor)
+        return cursor
+
+    def cursor_schliessen(self, ab=0):
+        """
+        Schließt alle seit Position `ab` erzeugten Cursor.
+
+        @param {int} [ab=0] - Anzahl der Cursor, die offen bleiben sollen
+        """
+        offen, self._cursor = self._cursor[ab:], self._cursor[:ab]
+        for cursor in offen:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    def commit(self):
+        """
+        Committet sofort oder merkt den Commit für das Ende der Arbeitseinheit vor.
+        """
+        if self._tiefe:
+            self._ausstehend = True
+        else:
+            self._roh.commit()
+
+    def rollback(self):
+        """
+        Rollt zurück; innerhalb einer Arbeitseinheit wird diese damit verworfen.
+        """
+        if self._tiefe:
+            self._abgebrochen = True
+        self._roh.rollback()
+
+    def freigeben(self, endgueltig=False):
+        """
+        Gibt die Verbindung an den Pool zurück. Mehrfache Aufrufe sind harmlos.
+
+        @param {boolean} [endgueltig=False] - Auch geteilte Verbindungen freigeben
+        """
+        if self._freigegeben or (self._geteilt and not endgueltig):
+            return
+        self._freigegeben = True
+        if _offene_ausleihen:
+            with _leck_sperre:
+                _offene_ausleihen.pop(id(self), None)
+        self.cursor_schliessen()
+        self._pool.zurueckgeben(self._roh)
+
+    close = freigeben
+
+    def __del__(self):
+        # Sicherheitsnetz für Aufrufer, die die Verbindung nie zurückgeben
+        try:
+            if not self._freigegeben:
+                info = _offene_ausleihen.get(id(self))
+                if info:
+                    _leck_melden(info, "Verbindung wurde ohne Freigabe verworfen")
+                self.freigeben(endgueltig=True)
+        except Exception:
+            pass
+
+
+class VerbindungsPool:
+    """
+    Thread-sicherer Verbindungspool mit Überlauf, Timeout und Pre-Ping.
+
+    @param {callable} fabrik - Erzeugt eine neue physische Verbindung
+    @param {int} [groesse=5] - Anzahl der im Leerlauf gehaltenen Verbindungen
+    @param {int} [max_ueberlauf=10] - Zusätzliche temporäre Verbindungen
+    @param {float} [timeout=10] - Maximale Wartezeit beim Ausleihen in Sekunden
+    @param {boolean} [pre_ping=True] - Leerlaufverbindungen vor der Ausgabe prüfen
+    """
+
+    def __init__(self, fabrik, groesse=5, max_ueberlauf=10, timeout=10, pre_ping=True):
+        self.fabrik = fabrik
+        self.groesse = groesse
+        self.max_ueberlauf = max_ueberlauf
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.pid = os.getpid()
+
+        self._bedingung = threading.Condition()
+        self._frei = deque()
+        self._offen = 0
+        self._ausgeliehen = 0
+
+        self._ausleihen_gesamt = 0
+        self._fehlgeschlagen = 0
+        self._verworfen = 0
+        self._wartezeit_gesamt = 0.0
+        self._wartezeit_max = 0.0
+
+    def ausleihen(self):
+        """
+        Leiht eine Verbindung aus dem Pool aus.
+
+        @return {GepoolteVerbindung} Verbindung, die per `freigeben()` zurückgegeben wird
+
+        @throws {PoolErschoepft} Wenn innerhalb des Timeouts keine Verbindung frei wird
+        @throws {mysql.connector.Error} Wenn keine neue Verbindung aufgebaut werden kann
+        """
+        start = time.monotonic()
+        roh = None
+
+        with self._bedingung:
+            while True:
+                if self._frei:
+                    roh = self._frei.pop()
+                    break
+                if self._offen < self.groesse + self.max_ueberlauf:
+                    # Platz für eine neue Verbindung reservieren
+                    self._offen += 1
+                    break
+                rest = self.timeout - (time.monotonic() - start)
+                if rest <= 0:
+                    self._fehlgeschlagen += 1
+                    raise PoolErschoepft(
+                        f"Keine freie Datenbankverbindung nach {self.timeout}s "
+                        f"({self._ausgeliehen} ausgeliehen)"
+                    )
+                self._bedingung.wait(rest)
+
+        if roh is not None and self.pre_ping and not self._lebt(roh):
+            self._physisch_schliessen(roh)
+            roh = None
+            with self._bedingung:
+                self._verworfen += 1
+
+        if roh is None:
+            try:
+                roh = self.fabrik()
+            except Exception:
+                with self._bedingung:
+                    self._offen -= 1
+                    self._fehlgeschlagen += 1
+                    self._bedingung.notify()
+                raise
+
+        wartezeit = time.monotonic() - start
+        with self._bedingung:
+            self._ausgeliehen += 1
+            self._ausleihen_gesamt += 1
+            self._wartezeit_gesamt += wartezeit
+            self._wartezeit_max = max(self._wartezeit_max, wartezeit)
+
+        return GepoolteVerbindung(self, roh)
+
+    def zurueckgeben(self, roh):
+        """
+        Nimmt eine physische Verbindung zurück in den Pool.
+
+        Offene Transaktionen werden zurückgerollt, damit der nächste Nutzer
+        keinen veralteten Snapshot erbt. Überlaufverbindungen werden geschlossen.
+
+        @param {MySQLConnection} roh - Die zurückzugebende physische Verbindung
+        """
+        intakt = True
+        try:
+            if getattr(roh, 'in_transaction', False):
+                roh.rollback()
+        except Exception:
+            intakt = False
+
+        with self._bedingung:
+            self._ausgeliehen -= 1
+            behalten = intakt and len(self._frei) < self.groesse
+            if behalten:
+                self._frei.append(roh)
+            else:
+                self._offen -= 1
+            self._bedingung.notify()
+
+        if not behalten:
+            self._physisch_schliessen(roh)
+
+    def schliessen(self):
+        """
+        Schließt alle Leerlaufverbindungen des Pools.
+        """
+        with self._bedingung:
+            leerlauf = list(self._frei)
+            self._frei.clear()
+            self._offen -= len(leerlauf)
+        for roh in leerlauf:
+            self._physisch_schliessen(roh)
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zur Poolauslastung.
+
+        @return {dict} Kennzahlen
+        @return {int} return.ausgeliehen - Aktuell ausgeliehene Verbindungen
+        @return {int} return.frei - Verbindungen im Leerlauf
+        @return {int} return.offen - Physisch geöffnete Verbindungen
+        @return {int} return.fehlgeschlagen - Fehlgeschlagene Ausleihvorgänge
+        @return {float} return.wartezeit_durchschnitt_ms - Mittlere Wartezeit
+        """
+        with self._bedingung:
+            durchschnitt = (
+                self._wartezeit_gesamt / self._ausleihen_gesamt
+                if self._ausleihen_gesamt else 0.0
+            )
+            return {
+                'groesse': self.groesse,
+                'max_ueberlauf': self.max_ueberlauf,
+                'offen': self._offen,
+                'frei': len(self._frei),
+                'ausgeliehen': self._ausgeliehen,
+                'ausleihen_gesamt': self._ausleihen_gesamt,
+                'fehlgeschlagen': self._fehlgeschlagen,
+                'verworfen': self._verworfen,
+                'wartezeit_durchschnitt_ms': round(durchschnitt * 1000, 3),
+                'wartezeit_max_ms': round(self._wartezeit_max * 1000, 3)
+            }
+
+    @staticmethod
+    def _lebt(roh):
+        try:
+            return roh.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _physisch_schliessen(roh):
+        try:
+            roh.close()
+        except Exception:
+            pass
+
+
+def _verbindung_aufbauen():
+    """
+    Baut eine neue physische Verbindung zur MySQL-Datenbank auf.
+
     Die Verbindungsdetails werden aus den Umgebungsvariablen gelesen:
     - DB_HOST: Hostname des Datenbankservers
     - DB_USER: Datenbankbenutzer
     - DB_PASSWORD: Datenbankpasswort
     - DB_NAME: Name der Datenbank
-    
-    @return {mysql.connector.connection.MySQLConnection|None} Datenbankverbindung oder None bei Fehler
+
+    @return {mysql.connector.connection.MySQLConnection} Neue Datenbankverbindung
+    """
+    verbindung = mysql.connector.connect(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        connection_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+    )
+    return verbindung
+
+
+_pool = None
+_pool_sperre = threading.Lock()
+
+
+def pool_abrufen():
     """
+    Liefert den prozessweiten Verbindungspool und legt ihn bei Bedarf an.
+
+    Nach einem fork() (z. B. durch einen Prefork-Server) erhält jeder
+    Prozess einen eigenen Pool, da Sockets nicht geteilt werden dürfen.
+
+    @return {VerbindungsPool} Der Verbindungspool
+    """
+    global _pool
+    if _pool is not None and _pool.pid == os.getpid():
+        return _pool
+    with _pool_sperre:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = VerbindungsPool(
+                _verbindung_aufbauen,
+                groesse=int(os.getenv("DB_POOL_GROESSE", 5)),
+                max_ueberlauf=int(os.getenv("DB_POOL_UEBERLAUF", 10)),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "ja")
+            )
+            print(
+                f"Datenbank-Pool initialisiert (Größe {_pool.groesse}, "
+                f"Überlauf {_pool.max_ueberlauf}, PID {_pool.pid})."
+            )
+        return _pool
+
+
+def _anfrage_kennung():
+    if has_request_context():
+        return id(request._get_current_object())
+    return None
+
+
+# Geteilte Verbindung einer Arbeitseinheit außerhalb von Flask-Anfragen
+_kontext_verbindung = ContextVar('kontext_verbindung', default=None)
+
+
+def _geteilte_verbindung():
+    if has_request_context():
+        return g.get('_db_verbindung')
+    return _kontext_verbindung.get()
+
+
+def _ausleihen():
     try:
-        verbindung = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME")
-        )
-        print("Verbindung zur Datenbank erfolgreich hergestellt.")
-        return verbindung
-    except mysql.connector.Error as fehler:
+        return pool_abrufen().ausleihen()
+    except (mysql.connector.Error, PoolErschoepft) as fehler:
         print(f"Fehler bei der Verbindung zur Datenbank: {fehler}")
         return None
 
+
+def get_db():
+    """
+    Liefert eine Verbindung zur MySQL-Datenbank.
+
+    Innerhalb einer Flask-Anfrage wird pro Anfrage nur eine Verbindung aus
+    dem Pool ausgeliehen und von allen Modellfunktionen gemeinsam genutzt.
+    Außerhalb einer Anfrage wird für jeden Aufruf eine Verbindung ausgeliehen,
+    sofern keine Arbeitseinheit aktiv ist.
+
+    @return {GepoolteVerbindung|None} Datenbankverbindung oder None bei Fehler
+    """
+    verbindung = _geteilte_verbindung()
+    if verbindung is not None:
+        return verbindung
+
+    verbindung = _ausleihen()
+    if verbindung is not None and has_request_context():
+        verbindung._geteilt = True
+        g._db_verbindung = verbindung
+    return verbindung
+
 # Alias für Kompatibilität
 verbinden = get_db
 
 def verbindung_schliessen(verbindung):
     """
-    Schließt die Datenbankverbindung sicher.
-    
-    @param {mysql.connector.connection.MySQLConnection} verbindung - Die zu schließende Datenbankverbindung
+    Gibt die Datenbankverbindung an den Pool zurück.
+
+    @param {GepoolteVerbindung} verbindung - Die freizugebende Datenbankverbindung
     """
-    if verbindung and verbindung.is_connected():
+    if verbindung is None:
+        return
+    if isinstance(verbindung, GepoolteVerbindung):
+        # Geteilte Verbindungen bleiben bis zum Ende der Anfrage bestehen
+        verbindung.freigeben()
+    elif verbindung.is_connected():
         verbindung.close()
-        print("Datenbankverbindung sicher geschlossen.")
+
+def pool_statistiken():
+    """
+    Liefert die Kennzahlen des Verbindungspools.
+
+    @return {dict} Siehe VerbindungsPool.statistiken()
+    """
+    return pool_abrufen().statistiken()
+
+@contextmanager
+def verbindung_verwalten():
+    """
+    Verwaltete Verbindung für Modellfunktionen.
+
+    Cursor, die im Block erzeugt werden, werden am Ende geschlossen und die
+    Verbindung wird freigegeben (bzw. bleibt bei anfragegebundenen
+    Verbindungen bis zum Teardown bestehen). Bei einer Ausnahme wird vorher
+    zurückgerollt.
+
+    Beispiel:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+            cursor.execute(sql, werte)
+
+    @yield {GepoolteVerbindung} Die Datenbankverbindung
+
+    @throws {DatenbankNichtVerfuegbar} Wenn keine Verbindung hergestellt werden kann
+    """
+    verbindung = get_db()
+    if verbindung is None:
+        raise DatenbankNichtVerfuegbar("Keine Datenbankverbindung verfügbar")
+
+    marke = len(verbindung._cursor)
+    try:
+        yield verbindung
+    except BaseException:
+        try:
+            verbindung.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        verbindung.cursor_schliessen(marke)
+        verbindung_schliessen(verbindung)
+
+@contextmanager
+def arbeitseinheit():
+    """
+    Fasst mehrere Modellaufrufe zu einer Transaktion zusammen.
+
+    Alle Modellfunktionen innerhalb des Blocks nutzen dieselbe Verbindung;
+    ihre `commit()`-Aufrufe werden gesammelt und am Ende einmal ausgeführt.
+    Bei einer Ausnahme oder einem `rollback()` im Block wird alles verworfen.
+    Verschachtelte Einheiten schließen sich der äußeren an.
+
+    @yield {GepoolteVerbindung|None} Die gemeinsame Verbindung oder None bei Fehler
+    """
+    eigene = False
+    kontext_token = None
+    verbindung = _geteilte_verbindung()
+    if verbindung is None:
+        verbindung = get_db()
+        if verbindung is None:
+            yield None
+            return
+        if not verbindung._geteilt:
+            # Außerhalb einer Anfrage: Verbindung für die Dauer des Blocks teilen
+            verbindung._geteilt = True
+            kontext_token = _kontext_verbindung.set(verbindung)
+            eigene = True
+
+    verbindung._tiefe += 1
+    try:
+        yield verbindung
+    except BaseException:
+        verbindung._tiefe -= 1
+        if verbindung._tiefe == 0:
+            verbindung._ausstehend = verbindung._abgebrochen = False
+            verbindung._nach_commit = []
+            verbindung._roh.rollback()
+        raise
+    else:
+        verbindung._tiefe -= 1
+        if verbindung._tiefe == 0:
+            aufrufe, verbindung._nach_commit = verbindung._nach_commit, []
+            try:
+                if verbindung._abgebrochen:
+                    verbindung._roh.rollback()
+                elif verbindung._ausstehend:
+                    verbindung._roh.commit()
+                    _aufrufe_ausfuehren(aufrufe)
+            finally:
+                verbindung._ausstehend = verbindung._abgebrochen = False
+    finally:
+        if eigene:
+            _kontext_verbindung.reset(kontext_token)
+            verbindung.freigeben(endgueltig=True)
+
+def _aufrufe_ausfuehren(aufrufe):
+    # Der Commit ist bereits erfolgt: ein fehlerhafter Aufruf darf die übrigen nicht verhindern
+    for aufruf in aufrufe:
+        try:
+            aufruf()
+        except Exception as fehler:
+            print(f"⚠️  Fehler in einem Aufruf nach dem Commit: {fehler}")
+
+def nach_commit(aufruf):
+    """
+    Führt einen Aufruf aus, sobald die bisherigen Änderungen committet sind.
+
+    Innerhalb einer Arbeitseinheit wird er bis zum Commit am Ende der Einheit
+    zurückgestellt und bei einem Rollback verworfen; sonst läuft er sofort.
+    Modellfunktionen melden darüber Invalidierungen von Zwischenspeichern und
+    Suchindex, damit andere Leser nie einen unbestätigten Stand übernehmen.
+
+    @param {Function} aufruf - Funktion ohne Parameter
+    """
+    verbindung = _geteilte_verbindung()
+    if verbindung is not None and verbindung._tiefe:
+        verbindung._nach_commit.append(aufruf)
+    else:
+        aufruf()
+
+def arbeitseinheit_offen():
+    """
+    Prüft, ob die aktuelle Anfrage bzw. der aktuelle Kontext in einer Arbeitseinheit läuft.
+
+    Zwischenspeicher umgehen sich in diesem Fall: die Verbindung sieht
+    unbestätigte Änderungen der Einheit, deren Invalidierung noch aussteht.
+
+    @return {boolean} True innerhalb von arbeitseinheit()
+    """
+    verbindung = _geteilte_verbindung()
+    return verbindung is not None and verbindung._tiefe > 0
+
+def verbindung_vorzeitig_freigeben():
+    """
+    Gibt die anfragegebundene Verbindung vor dem Ende der Anfrage an den Pool zurück.
+
+    Für längere Wartezeiten ohne Datenbankzugriff (z.B. Passwort-Hashing); der
+    nächste Zugriff der Anfrage leiht eine neue Verbindung aus. Innerhalb einer
+    Arbeitseinheit bleibt die Verbindung bestehen. Außerhalb einer Anfrage gibt
+    verbindung_verwalten() die Verbindung ohnehin am Blockende zurück.
+    """
+    if not has_request_context():
+        return
+    verbindung = g.get('_db_verbindung')
+    if verbindung is None or verbindung._tiefe > 0:
+        return
+    g.pop('_db_verbindung')
+    verbindung.freigeben(endgueltig=True)
+
+def anfrageverbindung_freigeben(fehler=None):
+    """
+    Teardown-Handler: gibt die anfragegebundene Verbindung an den Pool zurück.
+
+    Bei aktivem Leck-Detektor wird zusätzlich gewarnt, wenn eine während
+    der Anfrage ausgeliehene Verbindung noch nicht zurückgegeben wurde.
+
+    @param {Exception} [fehler] - Unbehandelte Ausnahme der Anfrage
+    """
+    verbindung = g.pop('_db_verbindung', None)
+    if verbindung is not None:
+        verbindung.freigeben(endgueltig=True)
+
+    if _offene_ausleihen:
+        kennung = _anfrage_kennung()
+        with _leck_sperre:
+            verwaist = [
+                info for info in _offene_ausleihen.values()
+                if info['anfrage'] == kennung
+            ]
+        for info in verwaist:
+            _leck_melden(info, "Verbindung überlebt ihre Anfrage")
+
+def leck_erkennung_aktivieren(aktiv=True):
+    """
+    Schaltet den Leck-Detektor ein oder aus.
+
+    @param {boolean} [aktiv=True] - Neuer Zustand
+    """
+    global _leck_erkennung
+    _leck_erkennung = aktiv
+
+def offene_ausleihen():
+    """
+    Liefert die Aufrufstapel aller noch nicht freigegebenen Verbindungen.
+
+    @return {Array<string>} Ein formatierter Aufrufstapel je offener Ausleihe
+    """
+    with _leck_sperre:
+        return [''.join(info['stapel']) for info in _offene_ausleihen.values()]
+
+def gemeldete_lecks():
+    """
+    Liefert alle bisher gemeldeten Lecks (für Tests und Diagnose).
+
+    @return {Array<string>} Leckmeldungen inklusive Aufrufstapel
+    """
+    with _leck_sperre:
+        return list(_gemeldete_lecks)
+
+def init_app(app):
+    """
+    Registriert die Freigabe der anfragegebundenen Verbindung an der App.
+
+    Im Debug-Modus wird außerdem der Leck-Detektor eingeschaltet.
+
+    @param {Flask} app - Die Flask-Anwendung
+    """
+    if app.debug:
+        leck_erkennung_aktivieren()
+    app.teardown_request(anfrageverbindung_freigeben)
 
 if __name__ == "__main__":
     conn = get_db()
     if conn:
         verbindung_schliessen(conn)
-
+        print(pool_statistiken())
@@ -0,0 +1,212 @@
+"""
+@fileoverview Versionierte Schemamigrationen für das Intranet-Kochbuch
+@module migrate
+
+Dieses Skript verwaltet die Migrationen im Verzeichnis migrationen/:
+- Jede Migration besteht aus <version>_<name>.up.sql und <version>_<name>.down.sql
+- Angewendete Versionen werden in der Tabelle schema_migrationen protokolliert
+- Migrationen können bis zu einer Zielversion angewendet oder zurückgerollt werden
+
+Aufruf:
+    python migrate.py status
+    python migrate.py up [zielversion]
+    python migrate.py down [zielversion]   (ohne Ziel: nur die letzte Migration)
+"""
+
+import os
+import re
+import sys
+from collections import namedtuple
+
+from db import verbindung_verwalten
+
+MIGRATIONS_VERZEICHNIS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrationen')
+
+_DATEINAME_MUSTER = re.compile(r'^(\d+)_(\w+)\.(up|down)\.sql$')
+
+Migration = namedtuple('Migration', ['version', 'name', 'up_pfad', 'down_pfad'])
+
+PROTOKOLL_TABELLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrationen (
+    version INT NOT NULL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    angewendet_am TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class MigrationsFehler(Exception):
+    """Wird bei unvollständigen oder fehlgeschlagenen Migrationen ausgelöst."""
+
+
+def migrationen_laden(verzeichnis=MIGRATIONS_VERZEICHNIS):
+    """
+    Liest alle Migrationen aus dem Verzeichnis, sortiert nach Version.
+
+    @param {string} [verzeichnis] - Verzeichnis mit den SQL-Dateien
+    @return {Array<Migration>} Migrationen in aufsteigender Reihenfolge
+
+    @throws {MigrationsFehler} Wenn zu einer Version die up- oder down-Datei fehlt
+    """
+    gefunden = {}
+    for dateiname in sorted(os.listdir(verzeichnis)):
+        treffer = _DATEINAME_MUSTER.match(dateiname)
+        if not treffer:
+            continue
+        version, name, richtung = int(treffer.group(1)), treffer.group(2), treffer.group(3)
+        eintrag = gefunden.setdefault(version, {'name': name})
+        if eintrag['name'] != name:
+            raise MigrationsFehler(f"Version {version} ist mehrfach vergeben")
+        eintrag[richtung] = os.path.join(verzeichnis, dateiname)
+
+    migrationen = []
+    for version in sorted(gefunden):
+        eintrag = gefunden[version]
+        if 'up' not in eintrag or 'down' not in eintrag:
+            raise MigrationsFehler(f"Migration {version} benötigt eine up- und eine down-Datei")
+        migrationen.append(Migration(version, eintrag['name'], eintrag['up'], eintrag['down']))
+    return migrationen
+
+
+def anweisungen_trennen(sql):
+    """
+    Zerlegt den Inhalt einer SQL-Datei in einzelne Anweisungen.
+
+    Zeilenkommentare (--) werden entfernt; Anweisungen enden mit einem Semikolon.
+
+    @param {string} sql - Inhalt der SQL-Datei
+    @return {Array<string>} Einzelne Anweisungen ohne abschließendes Semikolon
+    """
+    zeilen = [zeile for zeile in sql.splitlines() if not zeile.strip().startswith('--')]
+    return [anweisung.strip() for anweisung in '\n'.join(zeilen).split(';') if anweisung.strip()]
+
+
+def angewendete_versionen(cursor):
+    """
+    Liefert die bereits angewendeten Versionen und legt die Protokolltabelle bei Bedarf an.
+
+    @param {MySQLCursor} cursor - Datenbank-Cursor
+    @return {Set<int>} Angewendete Versionen
+    """
+    cursor.execute(PROTOKOLL_TABELLE_SQL)
+    cursor.execute("SELECT version FROM schema_migrationen")
+    return {zeile[0] for zeile in cursor.fetchall()}
+
+
+def _datei_ausfuehren(cursor, pfad):
+    with open(pfad, 'r', encoding='utf-8') as datei:
+        for anweisung in anweisungen_trennen(datei.read()):
+            cursor.execute(anweisung)
+
+
+def migrieren(ziel=None, migrationen=None):
+    """
+    Wendet alle ausstehenden Migrationen bis einschließlich der Zielversion an.
+
+    Hinweis: DDL-Anweisungen werden von MySQL implizit committet. Jede Migration
+    wird daher direkt nach ihrer Ausführung protokolliert.
+
+    @param {int} [ziel] - Höchste anzuwendende Version (Standard: alle)
+    @param {Array<Migration>} [migrationen] - Vorab geladene Migrationen
+    @return {Array<int>} Die angewendeten Versionen
+
+    @throws {MigrationsFehler} Wenn eine Migration fehlschlägt
+    """
+    migrationen = migrationen_laden() if migrationen is None else migrationen
+    angewendet = []
+    with verbindung_verwalten() as verbindung:
+        cursor = verbindung.cursor()
+        bereits = angewendete_versionen(cursor)
+        for migration in migrationen:
+            if migration.version in bereits or (ziel is not None and migration.version > ziel):
+                continue
+            print(f"⬆️  Wende Migration {migration.version:04d}_{migration.name} an...")
+            try:
+                _datei_ausfuehren(cursor, migration.up_pfad)
+                cursor.execute(
+                    "INSERT INTO schema_migrationen (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name)
+                )
+                verbindung.commit()
+            except Exception as fehler:
+                raise MigrationsFehler(
+                    f"Migration {migration.version:04d}_{migration.name} fehlgeschlagen: {fehler}"
+                ) from fehler
+            angewendet.append(migration.version)
+    return angewendet
+
+
+def zurueckrollen(ziel=None, migrationen=None):
+    """
+    Rollt angewendete Migrationen in umgekehrter Reihenfolge zurück.
+
+    @param {int} [ziel] - Version, die danach die höchste angewendete ist
+        (0 = alles zurückrollen); ohne Angabe wird nur die letzte Migration zurückgerollt
+    @param {Array<Migration>} [migrationen] - Vorab geladene Migrationen
+    @return {Array<int>} Die zurückgerollten Versionen
+
+    @throws {MigrationsFehler} Wenn eine Migration fehlschlägt
+    """
+    migrationen = migrationen_laden() if migrationen is None else migrationen
+    zurueckgerollt = []
+    with verbindung_verwalten() as verbindung:
+        cursor = verbindung.cursor()
+        bereits = angewendete_versionen(cursor)
+        kandidaten = [m for m in reversed(migrationen) if m.version in bereits]
+        if ziel is None:
+            kandidaten = kandidaten[:1]
+        else:
+            kandidaten = [m for m in kandidaten if m.version > ziel]
+
+        for migration in kandidaten:
+            print(f"⬇️  Rolle Migration {migration.version:04d}_{migration.name} zurück...")
+            try:
+                _datei_ausfuehren(cursor, migration.down_pfad)
+                cursor.execute("DELETE FROM schema_migrationen WHERE version = %s", (migration.version,))
+                verbindung.commit()
+            except Exception as fehler:
+                raise MigrationsFehler(
+                    f"Rückrollen von {migration.version:04d}_{migration.name} fehlgeschlagen: {fehler}"
+                ) from fehler
+            zurueckgerollt.append(migration.version)
+    return zurueckgerollt
+
+
+def status(migrationen=None):
+    """
+    Liefert den Stand aller Migrationen.
+
+    @param {Array<Migration>} [migrationen] - Vorab geladene Migrationen
+    @return {Array<tuple>} (version, name, angewendet) je Migration
+    """
+    migrationen = migrationen_laden() if migrationen is None else migrationen
+    with verbindung_verwalten() as verbindung:
+        bereits = angewendete_versionen(verbindung.cursor())
+    return [(m.version, m.name, m.version in bereits) for m in migrationen]
+
+
+def main(argumente):
+    befehl = argumente[0] if argumente else 'status'
+    ziel = int(argumente[1]) if len(argumente) > 1 else None
+
+    try:
+        if befehl == 'up':
+            versionen = migrieren(ziel)
+            print(f"✅ {len(versionen)} Migration(en) angewendet")
+        elif befehl == 'down':
+            versionen = zurueckrollen(ziel)
+            print(f"✅ {len(versionen)} Migration(en) zurückgerollt")
+        elif befehl == 'status':
+            for version, name, angewendet in status():
+                print(f"{'[x]' if angewendet else '[ ]'} {version:04d}_{name}")
+        else:
+            print(__doc__)
+            return 2
+    except Exception as fehler:
+        print(f"❌ {fehler}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
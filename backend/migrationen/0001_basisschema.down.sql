@@ -0,0 +1,11 @@
+-- Entfernt das komplette Basisschema inklusive aller Daten.
+-- Reihenfolge beachtet die Fremdschlüssel.
+
+DROP TABLE IF EXISTS passwort_reset;
+DROP TABLE IF EXISTS rezept_kategorien;
+DROP TABLE IF EXISTS kommentare;
+DROP TABLE IF EXISTS favoriten;
+DROP TABLE IF EXISTS bewertungen;
+DROP TABLE IF EXISTS rezepte;
+DROP TABLE IF EXISTS kategorien;
+DROP TABLE IF EXISTS benutzer;
@@ -0,0 +1,94 @@
+-- Basisschema des Intranet-Kochbuchs (entspricht dem Stand von schulze_dbdump.sql).
+-- IF NOT EXISTS, damit bestehende Installationen die Migration gefahrlos übernehmen.
+
+CREATE TABLE IF NOT EXISTS benutzer (
+    id INT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    passwort VARCHAR(255) NOT NULL,
+    profilbild_url VARCHAR(255) DEFAULT NULL,
+    beschreibung TEXT,
+    created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY email (email)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS kategorien (
+    id INT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL,
+    beschreibung TEXT,
+    PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS rezepte (
+    id INT NOT NULL AUTO_INCREMENT,
+    titel VARCHAR(200) NOT NULL,
+    zutaten TEXT NOT NULL,
+    zubereitung TEXT NOT NULL,
+    benutzer_id INT NOT NULL,
+    bild_pfad VARCHAR(255) DEFAULT NULL,
+    kategorie_id INT DEFAULT NULL,
+    erstellungsdatum TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    KEY benutzer_id (benutzer_id),
+    CONSTRAINT rezepte_ibfk_1 FOREIGN KEY (benutzer_id) REFERENCES benutzer (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS bewertungen (
+    id INT NOT NULL AUTO_INCREMENT,
+    rezept_id INT NOT NULL,
+    benutzer_id INT NOT NULL,
+    bewertung INT NOT NULL,
+    erstellungsdatum TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    aktualisierungsdatum TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY unique_user_recipe_rating (rezept_id, benutzer_id),
+    KEY benutzer_id (benutzer_id),
+    CONSTRAINT bewertungen_ibfk_1 FOREIGN KEY (rezept_id) REFERENCES rezepte (id) ON DELETE CASCADE,
+    CONSTRAINT bewertungen_ibfk_2 FOREIGN KEY (benutzer_id) REFERENCES benutzer (id) ON DELETE CASCADE,
+    CONSTRAINT bewertungen_chk_1 CHECK ((bewertung >= 1) AND (bewertung <= 5))
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS favoriten (
+    benutzer_id INT NOT NULL,
+    rezept_id INT NOT NULL,
+    PRIMARY KEY (benutzer_id, rezept_id),
+    KEY rezept_id (rezept_id),
+    CONSTRAINT favoriten_ibfk_1 FOREIGN KEY (benutzer_id) REFERENCES benutzer (id) ON DELETE CASCADE,
+    CONSTRAINT favoriten_ibfk_2 FOREIGN KEY (rezept_id) REFERENCES rezepte (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS kommentare (
+    id INT NOT NULL AUTO_INCREMENT,
+    benutzer_id INT NOT NULL,
+    rezept_id INT NOT NULL,
+    text TEXT NOT NULL,
+    erstellt_am TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    aktualisiert_am TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    KEY benutzer_id (benutzer_id),
+    KEY rezept_id (rezept_id),
+    CONSTRAINT kommentare_ibfk_1 FOREIGN KEY (benutzer_id) REFERENCES benutzer (id) ON DELETE CASCADE,
+    CONSTRAINT kommentare_ibfk_2 FOREIGN KEY (rezept_id) REFERENCES rezepte (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS rezept_kategorien (
+    rezept_id INT NOT NULL,
+    kategorie_id INT NOT NULL,
+    PRIMARY KEY (rezept_id, kategorie_id),
+    KEY kategorie_id (kategorie_id),
+    CONSTRAINT rezept_kategorien_ibfk_1 FOREIGN KEY (rezept_id) REFERENCES rezepte (id) ON DELETE CASCADE,
+    CONSTRAINT rezept_kategorien_ibfk_2 FOREIGN KEY (kategorie_id) REFERENCES kategorien (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+CREATE TABLE IF NOT EXISTS passwort_reset (
+    id INT NOT NULL AUTO_INCREMENT,
+    benutzer_id INT NOT NULL,
+    token VARCHAR(255) NOT NULL,
+    ablauf DATETIME NOT NULL,
+    erstellt_am TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    UNIQUE KEY unique_token (token),
+    UNIQUE KEY unique_benutzer (benutzer_id),
+    CONSTRAINT passwort_reset_ibfk_1 FOREIGN KEY (benutzer_id) REFERENCES benutzer (id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,5 @@
+DROP INDEX idx_kommentare_rezept_datum ON kommentare;
+DROP INDEX idx_rezepte_titel ON rezepte;
+DROP INDEX idx_rezepte_datum ON rezepte;
+DROP INDEX idx_rezepte_benutzer_datum ON rezepte;
+DROP INDEX idx_rezepte_kategorie_datum ON rezepte;
@@ -0,0 +1,16 @@
+-- Indizes für die heißen Listen- und Suchabfragen.
+-- Sekundärindizes enthalten in InnoDB implizit den Primärschlüssel, damit
+-- decken sie auch den ID-Tiebreaker der Keyset-Paginierung ab.
+
+-- Filter nach Kategorie, sortiert nach Erstellungsdatum (rezepte_auflisten_erweitert)
+CREATE INDEX idx_rezepte_kategorie_datum ON rezepte (kategorie_id, erstellungsdatum);
+
+-- Rezepte eines Benutzers, sortiert nach Erstellungsdatum (/api/rezepte/benutzer)
+CREATE INDEX idx_rezepte_benutzer_datum ON rezepte (benutzer_id, erstellungsdatum);
+
+-- Ungefilterte Listen nach Datum bzw. alphabetisch
+CREATE INDEX idx_rezepte_datum ON rezepte (erstellungsdatum);
+CREATE INDEX idx_rezepte_titel ON rezepte (titel);
+
+-- Kommentare eines Rezepts, sortiert nach Erstellungszeit (kommentare_abrufen)
+CREATE INDEX idx_kommentare_rezept_datum ON kommentare (rezept_id, erstellt_am);
@@ -0,0 +1,6 @@
+DROP INDEX idx_rezepte_bewertung ON rezepte;
+
+ALTER TABLE rezepte
+    DROP COLUMN bewertung_durchschnitt,
+    DROP COLUMN bewertung_anzahl,
+    DROP COLUMN bewertung_summe;
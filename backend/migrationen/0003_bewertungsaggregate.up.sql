@@ -0,0 +1,22 @@
+-- Denormalisierte Bewertungskennzahlen je Rezept.
+-- Werden von models/bewertung.py inkrementell gepflegt; Reparatur über
+-- script/bewertungen_reparieren.py.
+
+ALTER TABLE rezepte
+    ADD COLUMN bewertung_summe INT NOT NULL DEFAULT 0,
+    ADD COLUMN bewertung_anzahl INT NOT NULL DEFAULT 0,
+    ADD COLUMN bewertung_durchschnitt DOUBLE NOT NULL DEFAULT 0;
+
+-- Bestehende Bewertungen übernehmen
+UPDATE rezepte r
+JOIN (
+    SELECT rezept_id, SUM(bewertung) AS summe, COUNT(*) AS anzahl
+    FROM bewertungen
+    GROUP BY rezept_id
+) b ON b.rezept_id = r.id
+SET r.bewertung_summe = b.summe,
+    r.bewertung_anzahl = b.anzahl,
+    r.bewertung_durchschnitt = b.summe / b.anzahl;
+
+-- Sortierung nach Bewertung (sortierung=rating)
+CREATE INDEX idx_rezepte_bewertung ON rezepte (bewertung_durchschnitt);
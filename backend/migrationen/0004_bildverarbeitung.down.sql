@@ -0,0 +1,5 @@
+DROP INDEX idx_rezepte_bild_auftrag ON rezepte;
+
+ALTER TABLE rezepte
+    DROP COLUMN bild_auftrag,
+    DROP COLUMN bild_status;
@@ -0,0 +1,12 @@
+-- Status der asynchronen Bildverarbeitung je Rezept (utils/bildverarbeitung.py).
+-- bild_status: NULL (kein Upload seit Einführung), 'ausstehend', 'fertig', 'fehlgeschlagen'
+-- bild_auftrag: ID des laufenden Render-Auftrags; ein überholter Auftrag findet
+-- seine Zeile nicht mehr und überschreibt kein neueres Bild.
+
+ALTER TABLE rezepte
+    ADD COLUMN bild_status VARCHAR(20) DEFAULT NULL,
+    ADD COLUMN bild_auftrag VARCHAR(64) DEFAULT NULL;
+
+UPDATE rezepte SET bild_status = 'fertig' WHERE bild_pfad IS NOT NULL;
+
+CREATE INDEX idx_rezepte_bild_auftrag ON rezepte (bild_auftrag);
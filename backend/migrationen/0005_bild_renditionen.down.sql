@@ -0,0 +1,2 @@
+ALTER TABLE rezepte
+    DROP COLUMN bild_renditionen;
@@ -0,0 +1,6 @@
+-- Beschreibung der gerenderten Renditionen je Rezept (utils/bildverarbeitung.py,
+-- bilder_beschreiben): voll, thumb, responsive Breiten je Format und srcset als JSON.
+-- Wird zusammen mit bild_pfad gesetzt; NULL bei Bildern aus der Zeit davor.
+
+ALTER TABLE rezepte
+    ADD COLUMN bild_renditionen TEXT DEFAULT NULL;
@@ -0,0 +1,15 @@
+-- Referenzzählung für inhaltsadressierte Bilddateien (models/bilddatei.py).
+-- inhalt: SHA-256 des Inhalts, Beginn der Dateinamen in static/uploads bzw.
+-- static/profile_images; referenzen: Anzahl der Rezepte bzw. Benutzer, die darauf
+-- verweisen. Zähler auf 0 werden nach einer Karenzzeit samt Dateien entfernt
+-- (script/bilddateien_aufraeumen.py). Ältere Uploads mit zufälligen Namen werden
+-- nicht erfasst.
+
+CREATE TABLE IF NOT EXISTS bilddateien (
+    inhalt CHAR(64) NOT NULL,
+    art VARCHAR(20) NOT NULL,
+    referenzen INT NOT NULL DEFAULT 0,
+    aktualisiert TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (inhalt),
+    KEY idx_bilddateien_aufraeumen (referenzen, aktualisiert)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -0,0 +1,6 @@
+-- Entfernt nur Standardkategorien, die von keinem Rezept verwendet werden.
+DELETE FROM kategorien
+WHERE name IN ('Vorspeise', 'Hauptgericht', 'Nachspeise', 'Snack',
+               'Alkoholfreie Getränke', 'Alkoholische Getränke')
+  AND id NOT IN (SELECT kategorie_id FROM rezepte WHERE kategorie_id IS NOT NULL)
+  AND id NOT IN (SELECT kategorie_id FROM rezept_kategorien);
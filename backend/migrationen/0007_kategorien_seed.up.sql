@@ -0,0 +1,14 @@
+-- Standardkategorien (bisher sql/insert_kategorien.sql, das seit dem Migrations-Runner
+-- nicht mehr ausgeführt wurde). kategorien.name hat keinen eindeutigen Index, daher
+-- wird jede Kategorie nur eingefügt, wenn noch keine mit diesem Namen existiert.
+
+INSERT INTO kategorien (name, beschreibung)
+SELECT neu.name, neu.beschreibung FROM (
+    SELECT 'Vorspeise' AS name, 'Appetizers and starters' AS beschreibung
+    UNION ALL SELECT 'Hauptgericht', 'Main dishes and entrees'
+    UNION ALL SELECT 'Nachspeise', 'Desserts and sweet treats'
+    UNION ALL SELECT 'Snack', 'Small bites and appetizers'
+    UNION ALL SELECT 'Alkoholfreie Getränke', 'Non-alcoholic beverages'
+    UNION ALL SELECT 'Alkoholische Getränke', 'Alcoholic beverages'
+) AS neu
+WHERE NOT EXISTS (SELECT 1 FROM kategorien k WHERE k.name = neu.name);
@@ -8,155 +8,192 @@ Dieses Modul implementiert die Datenbankoperationen für Bewertungen:
 - Aktualisieren von Bewertungen
 - Löschen von Bewertungen
 - Berechnen von Durchschnittsbewertungen
+- Gebündeltes Abrufen eigener Bewertungen für mehrere Rezepte
+- Pflege der denormalisierten Kennzahlen (bewertung_summe/-anzahl/-durchschnitt)
+  auf der Tabelle rezepte
 """
 
-from db import verbinden, verbindung_schliessen
+from db import verbindung_verwalten
+from utils.abfragecache import tabellen_invalidieren
+from models.rezept import rezept_cache_invalidieren
+from suche import suchdienst
+
+# MySQL wertet die SET-Zuweisungen eines einfachen UPDATE von links nach rechts
+# aus; der Durchschnitt sieht daher bereits die neuen Werte von Summe und Anzahl.
+_AGGREGAT_ANPASSEN_SQL = """
+UPDATE rezepte
+SET bewertung_summe = bewertung_summe + %s,
+    bewertung_anzahl = bewertung_anzahl + %s,
+    bewertung_durchschnitt = IF(bewertung_anzahl > 0, bewertung_summe / bewertung_anzahl, 0)
+WHERE id = %s
+"""
+
+def _bisherige_bewertung_sperren(cursor, rezept_id, benutzer_id):
+    """
+    Liest die bisherige Bewertung und sperrt die Zeile bis zum Commit.
+
+    @return {int|None} Bisherige Bewertung oder None
+    """
+    cursor.execute(
+        "SELECT bewertung FROM bewertungen WHERE rezept_id = %s AND benutzer_id = %s FOR UPDATE",
+        (rezept_id, benutzer_id)
+    )
+    zeile = cursor.fetchone()
+    return zeile[0] if zeile else None
 
 def bewertung_erstellen(rezept_id, benutzer_id, bewertung):
     """
     Erstellt eine neue Bewertung oder aktualisiert eine bestehende.
-    
+
+    Die Kennzahlen auf rezepte werden in derselben Transaktion um die
+    Differenz zur bisherigen Bewertung angepasst.
+
     @param {int} rezept_id - ID des Rezepts
     @param {int} benutzer_id - ID des Benutzers
     @param {int} bewertung - Bewertung (1-5)
     @return {bool} True bei Erfolg, False bei Fehler
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return False
-
-        cursor = verbindung.cursor()
-        
-        # INSERT ... ON DUPLICATE KEY UPDATE für upsert
-        sql = """
-        INSERT INTO bewertungen (rezept_id, benutzer_id, bewertung) 
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE 
-        bewertung = VALUES(bewertung),
-        aktualisierungsdatum = CURRENT_TIMESTAMP
-        """
-        
-        cursor.execute(sql, (rezept_id, benutzer_id, bewertung))
-        verbindung.commit()
-        return True
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            bisher = _bisherige_bewertung_sperren(cursor, rezept_id, benutzer_id)
+
+            # INSERT ... ON DUPLICATE KEY UPDATE für upsert
+            sql = """
+            INSERT INTO bewertungen (rezept_id, benutzer_id, bewertung)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            bewertung = VALUES(bewertung),
+            aktualisierungsdatum = CURRENT_TIMESTAMP
+            """
+
+            cursor.execute(sql, (rezept_id, benutzer_id, bewertung))
+
+            if bisher is None:
+                cursor.execute(_AGGREGAT_ANPASSEN_SQL, (bewertung, 1, rezept_id))
+            elif bisher != bewertung:
+                cursor.execute(_AGGREGAT_ANPASSEN_SQL, (bewertung - bisher, 0, rezept_id))
+
+            verbindung.commit()
+            tabellen_invalidieren('bewertungen', 'rezepte')
+            rezept_cache_invalidieren(rezept_id)
+            # Der Suchindex hält Durchschnitt und Anzahl zum Sortieren und Gewichten
+            suchdienst.rezept_indexieren(rezept_id)
+            return True
 
     except Exception as fehler:
         print(f"Fehler beim Erstellen/Aktualisieren der Bewertung: {fehler}")
-        if verbindung:
-            verbindung.rollback()
         return False
 
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
-
 def bewertung_abrufen(rezept_id, benutzer_id):
     """
     Ruft die Bewertung eines Benutzers für ein Rezept ab.
-    
+
     @param {int} rezept_id - ID des Rezepts
     @param {int} benutzer_id - ID des Benutzers
     @return {dict|None} Bewertungsdaten oder None
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return None
-
-        cursor = verbindung.cursor(dictionary=True)
-        
-        sql = """
-        SELECT id, rezept_id, benutzer_id, bewertung, 
-               erstellungsdatum, aktualisierungsdatum
-        FROM bewertungen 
-        WHERE rezept_id = %s AND benutzer_id = %s
-        """
-        
-        cursor.execute(sql, (rezept_id, benutzer_id))
-        return cursor.fetchone()
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+
+            sql = """
+            SELECT id, rezept_id, benutzer_id, bewertung,
+                   erstellungsdatum, aktualisierungsdatum
+            FROM bewertungen
+            WHERE rezept_id = %s AND benutzer_id = %s
+            """
+
+            cursor.execute(sql, (rezept_id, benutzer_id))
+            return cursor.fetchone()
 
     except Exception as fehler:
         print(f"Fehler beim Abrufen der Bewertung: {fehler}")
         return None
 
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
-
 def bewertungen_fuer_rezept_abrufen(rezept_id):
     """
     Ruft alle Bewertungen für ein Rezept ab.
-    
+
     @param {int} rezept_id - ID des Rezepts
     @return {list} Liste der Bewertungen
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return []
-
-        cursor = verbindung.cursor(dictionary=True)
-        
-        sql = """
-        SELECT b.id, b.rezept_id, b.benutzer_id, b.bewertung,
-               b.erstellungsdatum, b.aktualisierungsdatum,
-               u.name as benutzer_name
-        FROM bewertungen b
-        JOIN benutzer u ON b.benutzer_id = u.id
-        WHERE b.rezept_id = %s
-        ORDER BY b.aktualisierungsdatum DESC
-        """
-        
-        cursor.execute(sql, (rezept_id,))
-        return cursor.fetchall()
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+
+            sql = """
+            SELECT b.id, b.rezept_id, b.benutzer_id, b.bewertung,
+                   b.erstellungsdatum, b.aktualisierungsdatum,
+                   u.name as benutzer_name
+            FROM bewertungen b
+            JOIN benutzer u ON b.benutzer_id = u.id
+            WHERE b.rezept_id = %s
+            ORDER BY b.aktualisierungsdatum DESC
+            """
+
+            cursor.execute(sql, (rezept_id,))
+            return cursor.fetchall()
 
     except Exception as fehler:
         print(f"Fehler beim Abrufen der Bewertungen: {fehler}")
         return []
 
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
+def eigene_bewertungen_abrufen(benutzer_id, rezept_ids):
+    """
+    Ruft die Bewertungen eines Benutzers für mehrere Rezepte mit einer Abfrage ab.
+
+    @param {int} benutzer_id - ID des Benutzers
+    @param {Array<int>} rezept_ids - IDs der Rezepte
+    @return {Object<int, int>} Bewertung je Rezept-ID (nur bewertete Rezepte)
+    """
+    rezept_ids = list(dict.fromkeys(rezept_ids))
+    if not benutzer_id or not rezept_ids:
+        return {}
+
+    try:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            platzhalter = ", ".join(["%s"] * len(rezept_ids))
+            sql = f"""
+            SELECT rezept_id, bewertung
+            FROM bewertungen
+            WHERE benutzer_id = %s AND rezept_id IN ({platzhalter})
+            """
+
+            cursor.execute(sql, [benutzer_id, *rezept_ids])
+            return {rezept_id: bewertung for rezept_id, bewertung in cursor.fetchall()}
+
+    except Exception as fehler:
+        print(f"Fehler beim Abrufen der eigenen Bewertungen: {fehler}")
+        return {}
 
 def durchschnittsbewertung_berechnen(rezept_id):
     """
-    Berechnet die Durchschnittsbewertung für ein Rezept.
-    
+    Liefert die Durchschnittsbewertung für ein Rezept.
+
+    Liest die auf rezepte gepflegten Kennzahlen, statt bei jedem Aufruf
+    AVG/COUNT über alle Bewertungen zu berechnen.
+
     @param {int} rezept_id - ID des Rezepts
     @return {dict} Durchschnitt und Anzahl der Bewertungen
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return {'durchschnitt': 0, 'anzahl': 0}
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            sql = """
+            SELECT bewertung_durchschnitt, bewertung_anzahl
+            FROM rezepte
+            WHERE id = %s
+            """
+
+            cursor.execute(sql, (rezept_id,))
+            result = cursor.fetchone()
 
-        cursor = verbindung.cursor()
-        
-        sql = """
-        SELECT AVG(bewertung) as durchschnitt, COUNT(*) as anzahl
-        FROM bewertungen 
-        WHERE rezept_id = %s
-        """
-        
-        cursor.execute(sql, (rezept_id,))
-        result = cursor.fetchone()
-        
-        if result and result[0] is not None:
+        if result and result[1]:
             return {
                 'durchschnitt': round(float(result[0]), 1),
                 'anzahl': int(result[1])
@@ -168,43 +205,79 @@ def durchschnittsbewertung_berechnen(rezept_id):
         print(f"Fehler beim Berechnen der Durchschnittsbewertung: {fehler}")
         return {'durchschnitt': 0, 'anzahl': 0}
 
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
-
 def bewertung_loeschen(rezept_id, benutzer_id):
     """
     Löscht die Bewertung eines Benutzers für ein Rezept.
-    
+
     @param {int} rezept_id - ID des Rezepts
     @param {int} benutzer_id - ID des Benutzers
     @return {bool} True bei Erfolg, False bei Fehler
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return False
-
-        cursor = verbindung.cursor()
-        
-        sql = "DELETE FROM bewertungen WHERE rezept_id = %s AND benutzer_id = %s"
-        cursor.execute(sql, (rezept_id, benutzer_id))
-        
-        verbindung.commit()
-        return cursor.rowcount > 0
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            bisher = _bisherige_bewertung_sperren(cursor, rezept_id, benutzer_id)
+            if bisher is None:
+                return False
+
+            sql = "DELETE FROM bewertungen WHERE rezept_id = %s AND benutzer_id = %s"
+            cursor.execute(sql, (rezept_id, benutzer_id))
+            geloescht = cursor.rowcount > 0
+
+            if geloescht:
+                cursor.execute(_AGGREGAT_ANPASSEN_SQL, (-bisher, -1, rezept_id))
+
+            verbindung.commit()
+            tabellen_invalidieren('bewertungen', 'rezepte')
+            rezept_cache_invalidieren(rezept_id)
+            suchdienst.rezept_indexieren(rezept_id)
+            return geloescht
 
     except Exception as fehler:
         print(f"Fehler beim Löschen der Bewertung: {fehler}")
-        if verbindung:
-            verbindung.rollback()
         return False
 
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung) 
\ No newline at end of file
+def bewertungsaggregate_reparieren(rezept_id=None):
+    """
+    Berechnet die Kennzahlen auf rezepte vollständig aus der Tabelle bewertungen neu.
+
+    Für den einmaligen Abgleich nach direkten Datenbankeingriffen oder zur
+    Prüfung der inkrementellen Pflege.
+
+    @param {int} [rezept_id] - Nur dieses Rezept reparieren (Standard: alle)
+    @return {int|None} Anzahl der korrigierten Rezepte oder None bei Fehler
+    """
+    try:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            sql = """
+            UPDATE rezepte r
+            LEFT JOIN (
+                SELECT rezept_id, SUM(bewertung) AS summe, COUNT(*) AS anzahl
+                FROM bewertungen
+                GROUP BY rezept_id
+            ) b ON b.rezept_id = r.id
+            SET r.bewertung_summe = COALESCE(b.summe, 0),
+                r.bewertung_anzahl = COALESCE(b.anzahl, 0),
+                r.bewertung_durchschnitt = COALESCE(b.summe / b.anzahl, 0)
+            """
+            parameter = []
+            if rezept_id is not None:
+                sql += " WHERE r.id = %s"
+                parameter.append(rezept_id)
+
+            cursor.execute(sql, parameter)
+            verbindung.commit()
+            tabellen_invalidieren('rezepte')
+            rezept_cache_invalidieren(rezept_id)
+            if rezept_id is not None:
+                suchdienst.rezept_indexieren(rezept_id)
+            else:
+                suchdienst.index_neu_aufbauen()
+            return cursor.rowcount
+
+    except Exception as fehler:
+        print(f"Fehler beim Reparieren der Bewertungskennzahlen: {fehler}")
+        return None
@@ -0,0 +1,174 @@
+"""
+@fileoverview Referenzzählung für inhaltsadressierte Bilddateien
+@module bilddatei
+
+Rezept- und Profilbilder werden unter dem SHA-256 ihres Inhalts abgelegt
+(utils/bilder.py); gleiche Bytes teilen sich dieselben Dateien. Dieses Modul
+implementiert die Datenbankoperationen dazu:
+- Pflege der Referenzen je Inhalt in der Tabelle bilddateien, in derselben
+  Transaktion wie die Änderung von rezepte.bild_pfad bzw. benutzer.profilbild_url
+- Abgleich der Zähler mit den tatsächlichen Verweisen (z.B. nach kaskadierendem Löschen)
+- Aufräumen: Dateien ohne Referenz werden erst nach einer Karenzzeit entfernt,
+  damit ein gerade gerenderter oder erneut hochgeladener Inhalt nicht verschwindet,
+  bevor sein Verweis gespeichert ist
+
+Ältere Uploads (zufällige Namen, profile_<id>.<endung>) werden nicht gezählt
+und nie entfernt.
+"""
+
+import os
+import time
+from collections import Counter
+
+from db import verbindung_verwalten
+from utils.bilder import inhalt_aus_name
+
+ART_REZEPT = 'rezept'
+ART_PROFIL = 'profil'
+
+# Mindestalter unreferenzierter Dateien in Sekunden, bevor sie entfernt werden
+BILD_KARENZZEIT = int(os.getenv('BILD_KARENZZEIT', 24 * 3600))
+
+
+def inhalt_aus_url(url):
+    """
+    Liest den Inhalts-Hash aus einer gespeicherten Bild-URL.
+
+    @param {string|None} url - z.B. 'static/uploads/<hash>.jpg'
+    @return {string|None} Hash oder None (keine URL oder älterer Upload)
+    """
+    if not url:
+        return None
+    return inhalt_aus_name(os.path.basename(url))
+
+
+def referenzen_aendern(cursor, alte_url, neue_url, art):
+    """
+    Verschiebt eine Referenz von einem Inhalt auf einen anderen.
+
+    Läuft im Cursor des Aufrufers, damit Zähler und Verweis in derselben
+    Transaktion geändert werden.
+
+    @param {Cursor} cursor - Cursor der laufenden Transaktion
+    @param {string|None} alte_url - Bisherige Bild-URL
+    @param {string|None} neue_url - Neue Bild-URL
+    @param {string} art - ART_REZEPT oder ART_PROFIL
+    """
+    alt = inhalt_aus_url(alte_url)
+    neu = inhalt_aus_url(neue_url)
+    if alt == neu:
+        return
+    if neu:
+        cursor.execute("""
+            INSERT INTO bilddateien (inhalt, art, referenzen) VALUES (%s, %s, 1)
+            ON DUPLICATE KEY UPDATE referenzen = referenzen + 1
+        """, (neu, art))
+    if alt:
+        cursor.execute(
+            "UPDATE bilddateien SET referenzen = GREATEST(referenzen - 1, 0) WHERE inhalt = %s",
+            (alt,)
+        )
+
+
+def bilddateien_reparieren():
+    """
+    Berechnet alle Referenzzähler aus rezepte.bild_pfad und benutzer.profilbild_url neu.
+
+    Nötig, wenn Verweise ohne Zählerpflege verschwinden, z.B. Rezepte, die beim
+    Löschen eines Benutzers kaskadierend entfernt werden.
+
+    @return {int|None} Anzahl der korrigierten Zähler oder None bei Fehler
+    """
+    try:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            soll = {}
+            for art, sql in (
+                (ART_REZEPT, "SELECT bild_pfad FROM rezepte WHERE bild_pfad IS NOT NULL"),
+                (ART_PROFIL, "SELECT profilbild_url FROM benutzer WHERE profilbild_url IS NOT NULL")
+            ):
+                cursor.execute(sql)
+                zaehler = Counter(inhalt_aus_url(zeile[0]) for zeile in cursor.fetchall())
+                zaehler.pop(None, None)
+                soll.update({inhalt: (art, anzahl) for inhalt, anzahl in zaehler.items()})
+
+            cursor.execute("SELECT inhalt, referenzen FROM bilddateien FOR UPDATE")
+            ist = dict(cursor.fetchall())
+
+            korrigiert = 0
+            for inhalt, referenzen in ist.items():
+                if inhalt not in soll and referenzen != 0:
+                    cursor.execute("UPDATE bilddateien SET referenzen = 0 WHERE inhalt = %s", (inhalt,))
+                    korrigiert += 1
+            for inhalt, (art, anzahl) in soll.items():
+                if ist.get(inhalt) != anzahl:
+                    cursor.execute("""
+                        INSERT INTO bilddateien (inhalt, art, referenzen) VALUES (%s, %s, %s)
+                        ON DUPLICATE KEY UPDATE referenzen = VALUES(referenzen)
+                    """, (inhalt, art, anzahl))
+                    korrigiert += 1
+
+            verbindung.commit()
+            return korrigiert
+
+    except Exception as fehler:
+        print(f"Fehler beim Abgleich der Bildreferenzen: {fehler}")
+        return None
+
+
+def bilddateien_aufraeumen(ordner, karenzzeit=BILD_KARENZZEIT, jetzt=None):
+    """
+    Entfernt inhaltsadressierte Dateien, auf die nichts mehr verweist.
+
+    Zuerst werden Zähler entfernt, die seit der Karenzzeit auf 0 stehen; danach
+    alle inhaltsadressierten Dateien ohne Zähler, die älter als die Karenzzeit
+    sind (auch Ausgaben überholter Render-Aufträge, die nie gezählt wurden).
+
+    @param {Object} ordner - Verzeichnis je Art, z.B. {ART_REZEPT: 'static/uploads'}
+    @param {int} [karenzzeit] - Mindestalter in Sekunden
+    @param {float} [jetzt] - Aktueller Zeitpunkt (für Tests)
+    @return {int|None} Anzahl der entfernten Dateien oder None bei Fehler
+    """
+    jetzt = time.time() if jetzt is None else jetzt
+    entfernt = 0
+    try:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+            # Bedingung referenzen = 0 erneut im DELETE: ein gleichzeitiger Upload
+            # desselben Inhalts kann den Zähler inzwischen erhöht haben
+            cursor.execute(
+                "DELETE FROM bilddateien WHERE referenzen = 0 AND aktualisiert < NOW() - INTERVAL %s SECOND",
+                (karenzzeit,)
+            )
+            verbindung.commit()
+            cursor.execute("SELECT inhalt FROM bilddateien")
+            bekannt = {zeile[0] for zeile in cursor.fetchall()}
+
+            for verzeichnis in ordner.values():
+                if not os.path.isdir(verzeichnis):
+                    continue
+                for eintrag in os.scandir(verzeichnis):
+                    inhalt = inhalt_aus_name(eintrag.name)
+                    if inhalt is None or inhalt in bekannt or not _verwaist(cursor, inhalt):
+                        continue
+                    try:
+                        # Erst nach der Prüfung der Zeile: ein erneuter Upload frischt die
+                        # Änderungszeit auf, bevor er seine Referenz zählt
+                        if jetzt - eintrag.stat().st_mtime < karenzzeit:
+                            continue
+                        os.remove(eintrag.path)
+                    except FileNotFoundError:
+                        continue
+                    entfernt += 1
+    except Exception as fehler:
+        print(f"Fehler beim Aufräumen der Bilddateien: {fehler}")
+        return None
+    return entfernt
+
+
+def _verwaist(cursor, inhalt):
+    # Die Momentaufnahme oben kann veraltet sein: ein Upload desselben Inhalts
+    # kann seine Referenz inzwischen committet haben
+    cursor.execute("SELECT 1 FROM bilddateien WHERE inhalt = %s", (inhalt,))
+    return cursor.fetchone() is None
@@ -6,9 +6,12 @@ Dieses Modul implementiert die Datenbankoperationen für Rezeptfavoriten:
 - Markieren von Rezepten als Favorit
 - Entfernen von Favoriten
 - Abrufen von Favoritenlisten
+- Gebündeltes Prüfen des Favoritenstatus für mehrere Rezepte
 """
 
-from db import get_db
+from db import verbindung_verwalten
+from utils.abfragecache import abfragen, tabellen_invalidieren
+from models.rezept import verarbeite_bewertung_info, verarbeite_bild_info
 
 def favorit_hinzufuegen(benutzer_id, rezept_id):
     """
@@ -21,29 +24,23 @@ def favorit_hinzufuegen(benutzer_id, rezept_id):
     try:
         print(f"🔄 Füge Favorit hinzu: Benutzer {benutzer_id}, Rezept {rezept_id}")
         
-        db = get_db()
-        if not db:
-            print("❌ Datenbankverbindung fehlgeschlagen")
-            return False
+        with verbindung_verwalten() as db:
+            cursor = db.cursor()
         
-        cursor = db.cursor()
-        
-        sql = """
-            INSERT INTO favoriten (benutzer_id, rezept_id)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE benutzer_id = benutzer_id
-        """
-        cursor.execute(sql, (benutzer_id, rezept_id))
-        db.commit()
+            sql = """
+                INSERT INTO favoriten (benutzer_id, rezept_id)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE benutzer_id = benutzer_id
+            """
+            cursor.execute(sql, (benutzer_id, rezept_id))
+            db.commit()
+            tabellen_invalidieren('favoriten')
         
         print(f"✅ Favorit erfolgreich hinzugefügt: Benutzer {benutzer_id}, Rezept {rezept_id}")
         return True
     except Exception as e:
         print(f"❌ Fehler beim Hinzufügen des Favoriten: {e}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
 
 def favorit_entfernen(benutzer_id, rezept_id):
     """
@@ -56,28 +53,22 @@ def favorit_entfernen(benutzer_id, rezept_id):
     try:
         print(f"🔄 Entferne Favorit: Benutzer {benutzer_id}, Rezept {rezept_id}")
         
-        db = get_db()
-        if not db:
-            print("❌ Datenbankverbindung fehlgeschlagen")
-            return False
+        with verbindung_verwalten() as db:
+            cursor = db.cursor()
         
-        cursor = db.cursor()
-        
-        sql = """
-            DELETE FROM favoriten 
-            WHERE benutzer_id = %s AND rezept_id = %s
-        """
-        cursor.execute(sql, (benutzer_id, rezept_id))
-        db.commit()
+            sql = """
+                DELETE FROM favoriten 
+                WHERE benutzer_id = %s AND rezept_id = %s
+            """
+            cursor.execute(sql, (benutzer_id, rezept_id))
+            db.commit()
+            tabellen_invalidieren('favoriten')
         
         print(f"✅ Favorit erfolgreich entfernt: Benutzer {benutzer_id}, Rezept {rezept_id}")
         return True
     except Exception as e:
         print(f"❌ Fehler beim Entfernen des Favoriten: {e}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
 
 def favoriten_auflisten(benutzer_id):
     """
@@ -89,13 +80,6 @@ def favoriten_auflisten(benutzer_id):
     try:
         print(f"🔄 Lade Favoriten für Benutzer {benutzer_id}")
         
-        db = get_db()
-        if not db:
-            print("❌ Datenbankverbindung fehlgeschlagen")
-            return []
-        
-        cursor = db.cursor(dictionary=True)
-        
         sql = """
             SELECT r.*, b.name as benutzer_name, k.name as kategorie_name,
                    r.erstellungsdatum as erstellungsdatum
@@ -106,8 +90,9 @@ def favoriten_auflisten(benutzer_id):
             WHERE f.benutzer_id = %s
             ORDER BY r.titel
         """
-        cursor.execute(sql, (benutzer_id,))
-        favoriten = cursor.fetchall()
+        favoriten = abfragen(
+            sql, (benutzer_id,), ('favoriten', 'rezepte', 'benutzer', 'kategorien'), verbindung_verwalten
+        )
         
         print(f"✅ {len(favoriten)} Favoriten gefunden für Benutzer {benutzer_id}")
         
@@ -126,13 +111,13 @@ def favoriten_auflisten(benutzer_id):
             if not favorit.get('kategorie_name'):
                 favorit['kategorie_name'] = 'Ohne Kategorie'
         
+            verarbeite_bewertung_info(favorit)
+            verarbeite_bild_info(favorit)
+
         return favoriten
     except Exception as e:
         print(f"❌ Fehler beim Abrufen der Favoriten: {e}")
         return []
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
 
 def ist_favorit(benutzer_id, rezept_id):
     """
@@ -145,20 +130,16 @@ def ist_favorit(benutzer_id, rezept_id):
     try:
         print(f"🔍 Prüfe Favorit: Benutzer {benutzer_id}, Rezept {rezept_id}")
         
-        db = get_db()
-        if not db:
-            print("❌ Datenbankverbindung fehlgeschlagen")
-            return False
+        with verbindung_verwalten() as db:
+            cursor = db.cursor()
         
-        cursor = db.cursor()
-        
-        sql = """
-            SELECT COUNT(*) 
-            FROM favoriten 
-            WHERE benutzer_id = %s AND rezept_id = %s
-        """
-        cursor.execute(sql, (benutzer_id, rezept_id))
-        (count,) = cursor.fetchone()
+            sql = """
+                SELECT COUNT(*) 
+                FROM favoriten 
+                WHERE benutzer_id = %s AND rezept_id = %s
+            """
+            cursor.execute(sql, (benutzer_id, rezept_id))
+            (count,) = cursor.fetchone()
         
         is_fav = count > 0
         print(f"✅ Favorit-Status: {is_fav} für Benutzer {benutzer_id}, Rezept {rezept_id}")
@@ -167,6 +148,31 @@ def ist_favorit(benutzer_id, rezept_id):
     except Exception as e:
         print(f"❌ Fehler beim Prüfen des Favoriten: {e}")
         return False
-    finally:
-        if 'cursor' in locals():
-            cursor.close() 
\ No newline at end of file
+
+def favoriten_status_abrufen(benutzer_id, rezept_ids):
+    """
+    Ermittelt mit einer einzigen Abfrage, welche Rezepte Favoriten des Benutzers sind.
+
+    @param {int} benutzer_id - ID des Benutzers
+    @param {Array<int>} rezept_ids - IDs der zu prüfenden Rezepte
+    @return {Set<int>} IDs der Rezepte, die der Benutzer favorisiert hat
+    """
+    rezept_ids = list(dict.fromkeys(rezept_ids))
+    if not benutzer_id or not rezept_ids:
+        return set()
+
+    try:
+        with verbindung_verwalten() as db:
+            cursor = db.cursor()
+
+            platzhalter = ", ".join(["%s"] * len(rezept_ids))
+            sql = f"""
+                SELECT rezept_id
+                FROM favoriten
+                WHERE benutzer_id = %s AND rezept_id IN ({platzhalter})
+            """
+            cursor.execute(sql, [benutzer_id, *rezept_ids])
+            return {zeile[0] for zeile in cursor.fetchall()}
+    except Exception as e:
+        print(f"❌ Fehler beim Abrufen des Favoritenstatus: {e}")
+        return set()
@@ -8,7 +8,9 @@ Dieses Modul implementiert die Datenbankoperationen für Rezeptkategorien:
 - Zuordnen von Rezepten zu Kategorien
 """
 
-from db import get_db
+from db import verbindung_verwalten
+from utils.abfragecache import abfragen, tabellen_invalidieren
+from models.rezept import verarbeite_bewertung_info, verarbeite_bild_info
 
 def kategorie_erstellen(name, beschreibung=None):
     """
@@ -19,22 +21,21 @@ def kategorie_erstellen(name, beschreibung=None):
     @return {int|None} ID der erstellten Kategorie oder None bei Fehler
     """
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
+        with verbindung_verwalten() as db:
+            cursor = db.cursor(dictionary=True)
         
-        sql = """
-            INSERT INTO kategorien (name, beschreibung)
-            VALUES (%s, %s)
-        """
-        cursor.execute(sql, (name, beschreibung))
-        db.commit()
+            sql = """
+                INSERT INTO kategorien (name, beschreibung)
+                VALUES (%s, %s)
+            """
+            cursor.execute(sql, (name, beschreibung))
+            db.commit()
+            tabellen_invalidieren('kategorien')
         
-        return cursor.lastrowid
+            return cursor.lastrowid
     except Exception as e:
         print(f"Fehler beim Erstellen der Kategorie: {e}")
         return None
-    finally:
-        cursor.close()
 
 def kategorie_abrufen(kategorie_id):
     """
@@ -44,19 +45,17 @@ def kategorie_abrufen(kategorie_id):
     @return {dict|None} Kategoriedaten oder None wenn nicht gefunden
     """
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
+        with verbindung_verwalten() as db:
+            cursor = db.cursor(dictionary=True)
         
-        sql = "SELECT * FROM kategorien WHERE id = %s"
-        cursor.execute(sql, (kategorie_id,))
-        kategorie = cursor.fetchone()
+            sql = "SELECT * FROM kategorien WHERE id = %s"
+            cursor.execute(sql, (kategorie_id,))
+            kategorie = cursor.fetchone()
         
         return kategorie
     except Exception as e:
         print(f"Fehler beim Abrufen der Kategorie: {e}")
         return None
-    finally:
-        cursor.close()
 
 def kategorien_auflisten():
     """
@@ -65,19 +64,17 @@ def kategorien_auflisten():
     @return {list} Liste aller Kategorien
     """
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
+        with verbindung_verwalten() as db:
+            cursor = db.cursor(dictionary=True)
         
-        sql = "SELECT * FROM kategorien ORDER BY name"
-        cursor.execute(sql)
-        kategorien = cursor.fetchall()
+            sql = "SELECT * FROM kategorien ORDER BY name"
+            cursor.execute(sql)
+            kategorien = cursor.fetchall()
         
         return kategorien
     except Exception as e:
         print(f"Fehler beim Auflisten der Kategorien: {e}")
         return []
-    finally:
-        cursor.close()
 
 def rezept_kategorie_zuordnen(rezept_id, kategorie_id):
     """
@@ -88,23 +85,22 @@ def rezept_kategorie_zuordnen(rezept_id, kategorie_id):
     @return {boolean} True bei Erfolg, False bei Fehler
     """
     try:
-        db = get_db()
-        cursor = db.cursor()
+        with verbindung_verwalten() as db:
+            cursor = db.cursor()
         
-        sql = """
-            INSERT INTO rezept_kategorien (rezept_id, kategorie_id)
-            VALUES (%s, %s)
-            ON DUPLICATE KEY UPDATE rezept_id = rezept_id
-        """
-        cursor.execute(sql, (rezept_id, kategorie_id))
-        db.commit()
+            sql = """
+                INSERT INTO rezept_kategorien (rezept_id, kategorie_id)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE rezept_id = rezept_id
+            """
+            cursor.execute(sql, (rezept_id, kategorie_id))
+            db.commit()
+            tabellen_invalidieren('rezept_kategorien')
         
         return True
     except Exception as e:
         print(f"Fehler beim Zuordnen der Kategorie: {e}")
         return False
-    finally:
-        cursor.close()
 
 def rezept_kategorien_abrufen(rezept_id):
     """
@@ -114,24 +110,22 @@ def rezept_kategorien_abrufen(rezept_id):
     @return {list} Liste der Kategorien des Rezepts
     """
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
+        with verbindung_verwalten() as db:
+            cursor = db.cursor(dictionary=True)
         
-        sql = """
-            SELECT k.* 
-            FROM kategorien k
-            JOIN rezept_kategorien rk ON k.id = rk.kategorie_id
-            WHERE rk.rezept_id = %s
-        """
-        cursor.execute(sql, (rezept_id,))
-        kategorien = cursor.fetchall()
+            sql = """
+                SELECT k.* 
+                FROM kategorien k
+                JOIN rezept_kategorien rk ON k.id = rk.kategorie_id
+                WHERE rk.rezept_id = %s
+            """
+            cursor.execute(sql, (rezept_id,))
+            kategorien = cursor.fetchall()
         
         return kategorien
     except Exception as e:
         print(f"Fehler beim Abrufen der Rezeptkategorien: {e}")
         return []
-    finally:
-        cursor.close()
 
 def rezepte_nach_kategorie_abrufen(kategorie_id):
     """
@@ -141,21 +135,19 @@ def rezepte_nach_kategorie_abrufen(kategorie_id):
     @return {list} Liste der Rezepte in dieser Kategorie
     """
     try:
-        db = get_db()
-        cursor = db.cursor(dictionary=True)
-        
         sql = """
             SELECT r.* 
             FROM rezepte r
             JOIN rezept_kategorien rk ON r.id = rk.rezept_id
             WHERE rk.kategorie_id = %s
         """
-        cursor.execute(sql, (kategorie_id,))
-        rezepte = cursor.fetchall()
+        rezepte = abfragen(sql, (kategorie_id,), ('rezepte', 'rezept_kategorien'), verbindung_verwalten)
+
+        for rezept in rezepte:
+            verarbeite_bewertung_info(rezept)
+            verarbeite_bild_info(rezept)
         
         return rezepte
     except Exception as e:
         print(f"Fehler beim Abrufen der Rezepte nach Kategorie: {e}")
         return []
-    finally:
-        cursor.close() 
\ No newline at end of file
@@ -7,13 +7,110 @@ Dieses Modul implementiert die Datenbankoperationen für Rezepte:
 - Abrufen von Rezepten
 - Aktualisieren bestehender Rezepte
 - Löschen von Rezepten
-- Suchen nach Rezepten
+- Suchen nach Rezepten (Volltextindex mit SQL-Rückfall)
+- Zählen von Rezepten (mit kurzlebigem Zwischenspeicher)
+- Zwischenspeicher für einzelne Rezepte mit Invalidierung bei Schreibvorgängen
+  (über das Cache-Backend auch in anderen Worker-Prozessen)
+- Listen- und Suchabfragen über den Abfrage-Zwischenspeicher (utils/abfragecache.py)
+- Gebündeltes Anreichern von Rezeptlisten mit betrachterbezogenen Angaben
 """
 
-from db import verbinden, verbindung_schliessen
+from db import arbeitseinheit_offen, nach_commit, verbindung_verwalten
+from utils.cachebackend import cache_backend
+from utils.abfragecache import abfragen, tabellen_invalidieren
+from utils.paginierung import seek_bedingung, sortierung_sql, zeilen_sortieren
+from suche import suchdienst
+from models.bilddatei import ART_REZEPT, referenzen_aendern
+import copy
 import json
-import mysql.connector
-from db import get_db
+import os
+import threading
+
+# Tabellen, die Rezeptlisten lesen (Markierungen im Abfrage-Zwischenspeicher)
+_REZEPT_TABELLEN = ('rezepte', 'benutzer', 'kategorien')
+
+# Kurzlebiger Zwischenspeicher für Gesamtanzahlen, Schlüssel ist der Filtersatz
+_anzahl_cache = cache_backend.zwischenspeicher(
+    'rezept_anzahl',
+    max_eintraege=256,
+    ttl=float(os.getenv('REZEPT_ANZAHL_CACHE_TTL', 30))
+)
+
+def _rezept_groesse(rezept):
+    """
+    Schätzt den Speicherbedarf eines Rezepts anhand seiner JSON-Darstellung.
+    """
+    return len(json.dumps(rezept, default=str).encode('utf-8'))
+
+# Zwischenspeicher für aufbereitete Einzelrezepte (rezept_abrufen), Schlüssel ist die ID
+_rezept_cache = cache_backend.zwischenspeicher(
+    'rezepte',
+    max_eintraege=int(os.getenv('REZEPT_CACHE_MAX_EINTRAEGE', 5000)),
+    ttl=float(os.getenv('REZEPT_CACHE_TTL', 300)),
+    max_bytes=int(os.getenv('REZEPT_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+    groesse=_rezept_groesse
+)
+# Wird bei jeder Invalidierung erhöht; Lesevorgänge, die eine Invalidierung
+# überlappen, legen ihr (womöglich veraltetes) Ergebnis nicht mehr ab
+_rezept_cache_generation = 0
+_rezept_cache_sperre = threading.Lock()
+
+def rezept_cache_invalidieren(rezept_id=None, benutzer_id=None, kategorie_id=None):
+    """
+    Verwirft zwischengespeicherte Einzelrezepte.
+
+    Ohne Parameter wird der gesamte Zwischenspeicher geleert. Die
+    Invalidierung gilt über das Cache-Backend für alle Worker-Prozesse und
+    wird innerhalb einer Arbeitseinheit erst nach deren Commit ausgelöst.
+
+    @param {int} [rezept_id] - Nur dieses Rezept
+    @param {int} [benutzer_id] - Alle Rezepte dieses Autors (z.B. nach Namensänderung)
+    @param {int} [kategorie_id] - Alle Rezepte dieser Kategorie (z.B. nach Umbenennung)
+    """
+    daten = {'rezept_id': rezept_id, 'benutzer_id': benutzer_id, 'kategorie_id': kategorie_id}
+    daten = {name: wert for name, wert in daten.items() if wert is not None}
+    nach_commit(lambda: cache_backend.invalidieren('rezepte', **daten))
+
+def _rezept_cache_lokal_invalidieren(daten):
+    """
+    Wendet eine Invalidierung (eigene oder aus einem anderen Prozess) auf den lokalen Zwischenspeicher an.
+    """
+    global _rezept_cache_generation
+    with _rezept_cache_sperre:
+        _rezept_cache_generation += 1
+    rezept_id = daten.get('rezept_id')
+    benutzer_id = daten.get('benutzer_id')
+    kategorie_id = daten.get('kategorie_id')
+    if rezept_id is not None:
+        _rezept_cache.entfernen(rezept_id)
+    if benutzer_id is not None:
+        _rezept_cache.entfernen_wenn(lambda rezept: rezept.get('benutzer_id') == benutzer_id)
+    if kategorie_id is not None:
+        _rezept_cache.entfernen_wenn(lambda rezept: rezept.get('kategorie_id') == kategorie_id)
+    if rezept_id is None and benutzer_id is None and kategorie_id is None:
+        _rezept_cache.leeren()
+
+cache_backend.abonnieren('rezepte', _rezept_cache_lokal_invalidieren)
+
+def rezept_cache_statistiken():
+    """
+    Liefert Kennzahlen des Rezept-Zwischenspeichers für /api/metriken.
+
+    @return {Object} Einträge, Bytes, Treffer, Fehlschläge und Verdrängungen
+    """
+    return _rezept_cache.statistiken()
+
+def anzahl_cache_invalidieren():
+    """
+    Verwirft alle zwischengespeicherten Rezeptanzahlen.
+
+    Wird nach jedem Erstellen, Aktualisieren oder Löschen eines Rezepts
+    aufgerufen, da sich dabei Filterzugehörigkeiten ändern können; innerhalb
+    einer Arbeitseinheit erst nach deren Commit.
+    """
+    nach_commit(lambda: cache_backend.invalidieren('rezept_anzahl'))
+
+cache_backend.abonnieren('rezept_anzahl', lambda daten: _anzahl_cache.leeren())
 
 def verarbeite_kategorie_info(rezept):
     """
@@ -23,6 +120,33 @@ def verarbeite_kategorie_info(rezept):
         rezept['kategorie_name'] = 'Ohne Kategorie'
     return rezept
 
+def verarbeite_bewertung_info(rezept):
+    """
+    Hilfsfunktion für die denormalisierten Bewertungskennzahlen eines Rezepts
+    """
+    rezept['bewertung_durchschnitt'] = float(rezept.get('bewertung_durchschnitt') or 0)
+    rezept['bewertung_anzahl'] = int(rezept.get('bewertung_anzahl') or 0)
+    rezept.pop('bewertung_summe', None)
+    return rezept
+
+def verarbeite_bild_info(rezept):
+    """
+    Hilfsfunktion zur Verarbeitung der Bildrenditionen von JSON zu Objekt (Feld bilder)
+    """
+    if 'bild_renditionen' not in rezept:
+        # Bereits verarbeitet (z.B. Zeile aus dem Abfrage-Cache)
+        rezept.setdefault('bilder', None)
+        return rezept
+    renditionen = rezept.pop('bild_renditionen')
+    if isinstance(renditionen, str):
+        try:
+            rezept['bilder'] = json.loads(renditionen)
+        except ValueError:
+            rezept['bilder'] = None
+    else:
+        rezept['bilder'] = renditionen or None
+    return rezept
+
 def verarbeite_rezept_zutaten(rezept):
     """
     Hilfsfunktion zur Verarbeitung der Zutaten von JSON zu Liste
@@ -36,7 +160,8 @@ def verarbeite_rezept_zutaten(rezept):
         rezept['zutaten'] = []
     return rezept
 
-def rezept_erstellen(titel, zutaten, zubereitung, benutzer_id, bild_pfad=None, kategorie_id=None):
+def rezept_erstellen(titel, zutaten, zubereitung, benutzer_id, bild_pfad=None, kategorie_id=None,
+                     bild_status=None, bild_auftrag=None):
     """
     Erstellt ein neues Rezept in der Datenbank.
     
@@ -46,45 +171,39 @@ def rezept_erstellen(titel, zutaten, zubereitung, benutzer_id, bild_pfad=None, k
     @param {int} benutzer_id - ID des Benutzers, der das Rezept erstellt
     @param {string} [bild_pfad] - Pfad zum Bild des Rezepts
     @param {int} [kategorie_id] - ID der Kategorie des Rezepts
+    @param {string} [bild_status] - Status der Bildverarbeitung, z.B. 'ausstehend'
+    @param {string} [bild_auftrag] - ID des Render-Auftrags für das hochgeladene Bild
     
     @return {int|None} ID des erstellten Rezepts bei Erfolg, None bei Fehler
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return None
-            
-        cursor = verbindung.cursor()
-        
-        # Zutaten als JSON-String speichern, falls sie als Liste übergeben wurden
-        if isinstance(zutaten, list):
-            zutaten = json.dumps(zutaten)
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
         
-        sql = """
-        INSERT INTO rezepte (titel, zutaten, zubereitung, benutzer_id, bild_pfad, kategorie_id)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        """
-        werte = (titel, zutaten, zubereitung, benutzer_id, bild_pfad, kategorie_id)
-        
-        cursor.execute(sql, werte)
-        verbindung.commit()
+            # Zutaten als JSON-String speichern, falls sie als Liste übergeben wurden
+            if isinstance(zutaten, list):
+                zutaten = json.dumps(zutaten)
         
-        # ID des erstellten Rezepts zurückgeben
-        return cursor.lastrowid
+            sql = """
+            INSERT INTO rezepte (titel, zutaten, zubereitung, benutzer_id, bild_pfad, kategorie_id,
+                                 bild_status, bild_auftrag)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            werte = (titel, zutaten, zubereitung, benutzer_id, bild_pfad, kategorie_id, bild_status, bild_auftrag)
+        
+            cursor.execute(sql, werte)
+            verbindung.commit()
+            anzahl_cache_invalidieren()
+            tabellen_invalidieren('rezepte')
+            suchdienst.rezept_indexieren(cursor.lastrowid)
+        
+            # ID des erstellten Rezepts zurückgeben
+            return cursor.lastrowid
     except Exception as fehler:
         print(f"Fehler beim Erstellen des Rezepts: {fehler}")
-        if verbindung:
-            verbindung.rollback()
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
 def rezept_abrufen(rezept_id):
     """
@@ -100,57 +219,63 @@ def rezept_abrufen(rezept_id):
     @return {string} return.benutzer_name - Name des Erstellers
     @return {Object} return.benutzer - Vollständige Benutzerinformationen
     @return {string} [return.bild_pfad] - Pfad zum Rezeptbild
+    @return {string} [return.bild_status] - 'ausstehend', 'fertig' oder 'fehlgeschlagen'
     @return {int} [return.kategorie_id] - ID der Kategorie
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
+    # In einer Arbeitseinheit sieht die Verbindung unbestätigte Änderungen, deren
+    # Invalidierung erst nach dem Commit folgt: Zwischenspeicher dann umgehen
+    zwischenspeichern = not arbeitseinheit_offen()
+    gespeichert = _rezept_cache.abrufen(rezept_id) if zwischenspeichern else None
+    if gespeichert is not None:
+        # Kopie, da Aufrufer das Ergebnis erweitern (z.B. is_favorite)
+        return copy.deepcopy(gespeichert)
+
+    generation = _rezept_cache_generation
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return None
-            
-        cursor = verbindung.cursor(dictionary=True)
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+        
+            sql = """
+            SELECT r.*, 
+                   b.name as benutzer_name, 
+                   b.id as benutzer_id,
+                   b.email as benutzer_email,
+                   k.name as kategorie_name
+            FROM rezepte r
+            JOIN benutzer b ON r.benutzer_id = b.id
+            LEFT JOIN kategorien k ON r.kategorie_id = k.id
+            WHERE r.id = %s
+            """
+            cursor.execute(sql, (rezept_id,))
+            rezept = cursor.fetchone()
         
-        sql = """
-        SELECT r.*, 
-               b.name as benutzer_name, 
-               b.id as benutzer_id,
-               b.email as benutzer_email,
-               k.name as kategorie_name
-        FROM rezepte r
-        JOIN benutzer b ON r.benutzer_id = b.id
-        LEFT JOIN kategorien k ON r.kategorie_id = k.id
-        WHERE r.id = %s
-        """
-        cursor.execute(sql, (rezept_id,))
-        rezept = cursor.fetchone()
-        
-        if rezept:
-            # Erstelle benutzer-Objekt mit vollständigen Informationen
-            rezept['benutzer'] = {
-                'id': rezept.get('benutzer_id'),
-                'name': rezept.get('benutzer_name', 'Unbekannt'),
-                'email': rezept.get('benutzer_email')
-            }
+            if rezept:
+                # Erstelle benutzer-Objekt mit vollständigen Informationen
+                rezept['benutzer'] = {
+                    'id': rezept.get('benutzer_id'),
+                    'name': rezept.get('benutzer_name', 'Unbekannt'),
+                    'email': rezept.get('benutzer_email')
+                }
             
-            # Verarbeite Zutaten von JSON-String zu Liste
-            rezept = verarbeite_rezept_zutaten(rezept)
-            # Verarbeite Kategorieinformationen
-            rezept = verarbeite_kategorie_info(rezept)
+                # Verarbeite Zutaten von JSON-String zu Liste
+                rezept = verarbeite_rezept_zutaten(rezept)
+                # Verarbeite Kategorieinformationen
+                rezept = verarbeite_kategorie_info(rezept)
+                rezept = verarbeite_bewertung_info(rezept)
+                rezept = verarbeite_bild_info(rezept)
             
-        return rezept
+                with _rezept_cache_sperre:
+                    if zwischenspeichern and generation == _rezept_cache_generation:
+                        _rezept_cache.setzen(rezept_id, copy.deepcopy(rezept))
+            
+            return rezept
     except Exception as fehler:
         print(f"Fehler beim Abrufen des Rezepts: {fehler}")
         return None
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
-def rezepte_auflisten(limit=10, offset=0, benutzer_id=None, kategorie_id=None):
+def rezepte_auflisten(limit=10, offset=0, benutzer_id=None, kategorie_id=None, nach=None):
     """
     Listet Rezepte mit optionaler Filterung und Paginierung auf.
     
@@ -158,6 +283,7 @@ def rezepte_auflisten(limit=10, offset=0, benutzer_id=None, kategorie_id=None):
     @param {int} [offset=0] - Anzahl der zu überspringenden Rezepte
     @param {int} [benutzer_id] - Filter für Rezepte eines bestimmten Benutzers
     @param {int} [kategorie_id] - Filter für Rezepte einer bestimmten Kategorie
+    @param {Object} [nach] - Dekodierter Cursor; ersetzt den Offset durch eine Seek-Bedingung
     
     @return {Array<Object>} Liste von Rezept-Objekten
     @return {int} return[].id - Rezept-ID
@@ -167,15 +293,7 @@ def rezepte_auflisten(limit=10, offset=0, benutzer_id=None, kategorie_id=None):
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return []
-            
-        cursor = verbindung.cursor(dictionary=True)
-        
         # Basis-SQL-Abfrage
         sql = """
         SELECT r.*, b.name as benutzer_name, k.name as kategorie_name
@@ -191,37 +309,39 @@ def rezepte_auflisten(limit=10, offset=0, benutzer_id=None, kategorie_id=None):
         if benutzer_id is not None:
             bedingungen.append("r.benutzer_id = %s")
             parameter.append(benutzer_id)
-            
+        
         if kategorie_id is not None:
             bedingungen.append("r.kategorie_id = %s")
             parameter.append(kategorie_id)
-            
+        
+        if nach is not None:
+            seek_sql, seek_parameter = seek_bedingung('newest', nach)
+            bedingungen.append(seek_sql)
+            parameter.extend(seek_parameter)
+            offset = 0
+        
         if bedingungen:
             sql += " WHERE " + " AND ".join(bedingungen)
-            
+        
         # Sortierung und Paginierung
-        sql += " ORDER BY r.erstellungsdatum DESC LIMIT %s OFFSET %s"
+        sql += sortierung_sql('newest') + " LIMIT %s OFFSET %s"
         parameter.extend([limit, offset])
         
-        cursor.execute(sql, parameter)
-        rezepte = cursor.fetchall()
+        rezepte = abfragen(sql, parameter, _REZEPT_TABELLEN, verbindung_verwalten)
         
         # Verarbeite alle Rezepte mit Hilfsfunktionen
         for rezept in rezepte:
             rezept = verarbeite_rezept_zutaten(rezept)
             rezept = verarbeite_kategorie_info(rezept)
+            rezept = verarbeite_bewertung_info(rezept)
+            rezept = verarbeite_bild_info(rezept)
         
         return rezepte
     except Exception as fehler:
         print(f"Fehler beim Auflisten der Rezepte: {fehler}")
         return []
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
-def rezepte_auflisten_erweitert(limit=10, offset=0, benutzer_id=None, kategorie_id=None, sortierung='newest'):
+def rezepte_auflisten_erweitert(limit=10, offset=0, benutzer_id=None, kategorie_id=None, sortierung='newest', nach=None):
     """
     Listet Rezepte mit erweiterten Informationen und Kategorien auf.
     
@@ -230,20 +350,13 @@ def rezepte_auflisten_erweitert(limit=10, offset=0, benutzer_id=None, kategorie_
     @param {int} [benutzer_id] - Filter für Rezepte eines bestimmten Benutzers
     @param {int} [kategorie_id] - Filter für Rezepte einer bestimmten Kategorie
     @param {string} [sortierung='newest'] - Sortierungsoption
+    @param {Object} [nach] - Dekodierter Cursor; ersetzt den Offset durch eine Seek-Bedingung
     
     @return {Array<Object>} Liste von Rezept-Objekten mit Kategorie-Informationen
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return []
-            
-        cursor = verbindung.cursor(dictionary=True)
-        
         # Basis-SQL-Abfrage mit Kategorie-Informationen
         sql = """
         SELECT r.*, b.name as benutzer_name, k.name as kategorie_name
@@ -259,48 +372,130 @@ def rezepte_auflisten_erweitert(limit=10, offset=0, benutzer_id=None, kategorie_
         if benutzer_id is not None:
             bedingungen.append("r.benutzer_id = %s")
             parameter.append(benutzer_id)
-            
+        
         if kategorie_id is not None:
             bedingungen.append("r.kategorie_id = %s")
             parameter.append(kategorie_id)
-            
+        
+        if nach is not None:
+            seek_sql, seek_parameter = seek_bedingung(sortierung, nach)
+            bedingungen.append(seek_sql)
+            parameter.extend(seek_parameter)
+            offset = 0
+        
         if bedingungen:
             sql += " WHERE " + " AND ".join(bedingungen)
-            
-        # Sortierung hinzufügen
-        if sortierung == 'oldest':
-            sql += " ORDER BY r.erstellungsdatum ASC"
-        elif sortierung == 'name_asc':
-            sql += " ORDER BY r.titel ASC"
-        elif sortierung == 'name_desc':
-            sql += " ORDER BY r.titel DESC"
-        else:  # newest (default)
-            sql += " ORDER BY r.erstellungsdatum DESC"
-            
+        
+        # Sortierung mit ID als Tiebreaker für stabile Seiten
+        sql += sortierung_sql(sortierung)
+        
         # Paginierung nur hinzufügen wenn limit gesetzt ist
         if limit is not None:
             sql += " LIMIT %s OFFSET %s"
             parameter.extend([limit, offset])
         
-        cursor.execute(sql, parameter)
-        rezepte = cursor.fetchall()
+        rezepte = abfragen(sql, parameter, _REZEPT_TABELLEN, verbindung_verwalten)
         
         # Verarbeite alle Rezepte mit Hilfsfunktionen
         for rezept in rezepte:
             rezept = verarbeite_rezept_zutaten(rezept)
             rezept = verarbeite_kategorie_info(rezept)
+            rezept = verarbeite_bewertung_info(rezept)
+            rezept = verarbeite_bild_info(rezept)
         
         return rezepte
     except Exception as fehler:
         print(f"Fehler beim Auflisten der Rezepte (erweitert): {fehler}")
         return []
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
-def rezept_aktualisieren(rezept_id, titel=None, zutaten=None, zubereitung=None, bild_pfad=None, kategorie_id=None, benutzer_id=None):
+def rezepte_zaehlen(benutzer_id=None, kategorie_id=None):
+    """
+    Zählt die Rezepte mit denselben Filtern wie rezepte_auflisten_erweitert.
+
+    Das Ergebnis wird je Filtersatz kurz zwischengespeichert und bei jeder
+    Änderung an Rezepten verworfen.
+
+    @param {int} [benutzer_id] - Filter für Rezepte eines bestimmten Benutzers
+    @param {int} [kategorie_id] - Filter für Rezepte einer bestimmten Kategorie
+
+    @return {int} Anzahl der passenden Rezepte, 0 bei Fehler
+    """
+    schluessel = (benutzer_id, kategorie_id)
+    zwischenspeichern = not arbeitseinheit_offen()
+    anzahl = _anzahl_cache.abrufen(schluessel) if zwischenspeichern else None
+    if anzahl is not None:
+        return anzahl
+
+    try:
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+
+            # Gleicher JOIN wie beim Auflisten, damit verwaiste Rezepte nicht mitzählen
+            sql = """
+            SELECT COUNT(*)
+            FROM rezepte r
+            JOIN benutzer b ON r.benutzer_id = b.id
+            """
+
+            bedingungen = []
+            parameter = []
+
+            if benutzer_id is not None:
+                bedingungen.append("r.benutzer_id = %s")
+                parameter.append(benutzer_id)
+
+            if kategorie_id is not None:
+                bedingungen.append("r.kategorie_id = %s")
+                parameter.append(kategorie_id)
+
+            if bedingungen:
+                sql += " WHERE " + " AND ".join(bedingungen)
+
+            cursor.execute(sql, parameter)
+            anzahl = int(cursor.fetchone()[0])
+
+        if zwischenspeichern:
+            _anzahl_cache.setzen(schluessel, anzahl)
+        return anzahl
+    except Exception as fehler:
+        print(f"Fehler beim Zählen der Rezepte: {fehler}")
+        return 0
+
+def rezepte_annotieren(rezepte, benutzer_id=None, alle_favoriten=False):
+    """
+    Ergänzt eine Rezeptliste um Angaben, die vom angemeldeten Betrachter abhängen.
+
+    Statt je Rezept eigene Abfragen zu stellen, werden Favoritenstatus und
+    eigene Bewertungen für alle Rezepte der Liste mit je einer IN-Abfrage
+    geladen.
+
+    @param {Array<Object>} rezepte - Die anzureichernden Rezepte (werden verändert)
+    @param {int} [benutzer_id] - ID des Betrachters, None für anonyme Anfragen
+    @param {boolean} [alle_favoriten=False] - Alle Rezepte sind bereits als Favoriten bekannt
+
+    @return {Array<Object>} Dieselbe Liste mit den Feldern is_favorite,
+        eigene_bewertung und ist_eigenes
+    """
+    from models.favorit import favoriten_status_abrufen
+    from models.bewertung import eigene_bewertungen_abrufen
+
+    favoriten = set()
+    bewertungen = {}
+    if benutzer_id and rezepte:
+        rezept_ids = [rezept['id'] for rezept in rezepte]
+        if not alle_favoriten:
+            favoriten = favoriten_status_abrufen(benutzer_id, rezept_ids)
+        bewertungen = eigene_bewertungen_abrufen(benutzer_id, rezept_ids)
+
+    for rezept in rezepte:
+        rezept['is_favorite'] = bool(benutzer_id) and (alle_favoriten or rezept['id'] in favoriten)
+        rezept['eigene_bewertung'] = bewertungen.get(rezept['id'])
+        rezept['ist_eigenes'] = bool(benutzer_id) and rezept.get('benutzer_id') == benutzer_id
+
+    return rezepte
+
+def rezept_aktualisieren(rezept_id, titel=None, zutaten=None, zubereitung=None, bild_pfad=None, kategorie_id=None, benutzer_id=None,
+                         bild_status=None, bild_auftrag=None):
     """
     Aktualisiert ein bestehendes Rezept.
     
@@ -311,74 +506,128 @@ def rezept_aktualisieren(rezept_id, titel=None, zutaten=None, zubereitung=None,
     @param {string} [bild_pfad] - Neuer Pfad zum Rezeptbild
     @param {int} [kategorie_id] - Neue Kategorie-ID
     @param {int} [benutzer_id] - ID des Benutzers für Berechtigungsprüfung
+    @param {string} [bild_status] - Neuer Status der Bildverarbeitung
+    @param {string} [bild_auftrag] - ID des Render-Auftrags für ein neues Bild
     
     @return {boolean} True bei erfolgreicher Aktualisierung, False bei Fehler
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return False
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
+        
+            # Prüfen, ob der Benutzer berechtigt ist, das Rezept zu aktualisieren
+            if benutzer_id is not None:
+                cursor.execute("SELECT benutzer_id FROM rezepte WHERE id = %s", (rezept_id,))
+                rezept = cursor.fetchone()
+                if not rezept or rezept[0] != benutzer_id:
+                    return False
+        
+            # Zu aktualisierende Felder sammeln
+            update_felder = []
+            parameter = []
+        
+            if titel is not None:
+                update_felder.append("titel = %s")
+                parameter.append(titel)
             
-        cursor = verbindung.cursor()
-        
-        # Prüfen, ob der Benutzer berechtigt ist, das Rezept zu aktualisieren
-        if benutzer_id is not None:
-            cursor.execute("SELECT benutzer_id FROM rezepte WHERE id = %s", (rezept_id,))
-            rezept = cursor.fetchone()
-            if not rezept or rezept[0] != benutzer_id:
-                return False
-        
-        # Zu aktualisierende Felder sammeln
-        update_felder = []
-        parameter = []
-        
-        if titel is not None:
-            update_felder.append("titel = %s")
-            parameter.append(titel)
+            if zutaten is not None:
+                # Zutaten als JSON-String speichern, falls sie als Liste übergeben wurden
+                if isinstance(zutaten, list):
+                    zutaten = json.dumps(zutaten)
+                update_felder.append("zutaten = %s")
+                parameter.append(zutaten)
             
-        if zutaten is not None:
-            # Zutaten als JSON-String speichern, falls sie als Liste übergeben wurden
-            if isinstance(zutaten, list):
-                zutaten = json.dumps(zutaten)
-            update_felder.append("zutaten = %s")
-            parameter.append(zutaten)
+            if zubereitung is not None:
+                update_felder.append("zubereitung = %s")
+                parameter.append(zubereitung)
             
-        if zubereitung is not None:
-            update_felder.append("zubereitung = %s")
-            parameter.append(zubereitung)
+            if bild_pfad is not None:
+                update_felder.append("bild_pfad = %s")
+                parameter.append(bild_pfad)
             
-        if bild_pfad is not None:
-            update_felder.append("bild_pfad = %s")
-            parameter.append(bild_pfad)
+            if kategorie_id is not None:
+                update_felder.append("kategorie_id = %s")
+                parameter.append(kategorie_id)
             
-        if kategorie_id is not None:
-            update_felder.append("kategorie_id = %s")
-            parameter.append(kategorie_id)
+            if bild_status is not None:
+                update_felder.append("bild_status = %s")
+                parameter.append(bild_status)
             
-        # Wenn keine Felder aktualisiert werden sollen
-        if not update_felder:
-            return True
+            if bild_auftrag is not None:
+                update_felder.append("bild_auftrag = %s")
+                parameter.append(bild_auftrag)
             
-        # SQL-Abfrage erstellen
-        sql = f"UPDATE rezepte SET {', '.join(update_felder)} WHERE id = %s"
-        parameter.append(rezept_id)
-        
-        cursor.execute(sql, parameter)
-        verbindung.commit()
-        
-        return cursor.rowcount > 0
+            # Wenn keine Felder aktualisiert werden sollen
+            if not update_felder:
+                return True
+            
+            # SQL-Abfrage erstellen
+            sql = f"UPDATE rezepte SET {', '.join(update_felder)} WHERE id = %s"
+            parameter.append(rezept_id)
+        
+            cursor.execute(sql, parameter)
+            verbindung.commit()
+            anzahl_cache_invalidieren()
+            tabellen_invalidieren('rezepte')
+            rezept_cache_invalidieren(rezept_id)
+            suchdienst.rezept_indexieren(rezept_id)
+        
+            return cursor.rowcount > 0
     except Exception as fehler:
         print(f"Fehler beim Aktualisieren des Rezepts: {fehler}")
         return False
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
+
+def rezept_bild_abschliessen(bild_auftrag, bild_status, bild_pfad=None, bilder=None):
+    """
+    Übernimmt das Ergebnis eines Render-Auftrags (Rückruf der Bildverarbeitung).
+    
+    Aktualisiert wird nur das Rezept, dessen laufender Auftrag bild_auftrag ist;
+    wurde inzwischen ein neueres Bild hochgeladen oder das Rezept gelöscht,
+    bleibt die Zeile unverändert. Die Referenz wandert in derselben Transaktion
+    vom bisherigen auf das neue Bild (models/bilddatei.py).
+    
+    @param {string} bild_auftrag - ID des Render-Auftrags
+    @param {string} bild_status - 'fertig' oder 'fehlgeschlagen'
+    @param {string} [bild_pfad] - Pfad des gerenderten Bildes (nur bei 'fertig')
+    @param {Object} [bilder] - Beschreibung der Renditionen (nur bei 'fertig')
+    
+    @return {boolean} True, wenn das Ergebnis zum aktuellen Bild eines Rezepts gehört
+    
+    @throws {Exception} Bei Datenbankfehlern (der Auftrag wird später erneut gemeldet)
+    """
+    with verbindung_verwalten() as verbindung:
+        cursor = verbindung.cursor()
+        cursor.execute("SELECT id, bild_pfad FROM rezepte WHERE bild_auftrag = %s", (bild_auftrag,))
+        zeile = cursor.fetchone()
+        if not zeile:
+            # Bereits von einem anderen Worker-Prozess übernommen?
+            if bild_pfad is None:
+                return False
+            cursor.execute("SELECT id FROM rezepte WHERE bild_pfad = %s", (bild_pfad,))
+            return cursor.fetchone() is not None
+    
+        rezept_id, alter_pfad = zeile
+        if bild_pfad is not None:
+            cursor.execute(
+                "UPDATE rezepte SET bild_pfad = %s, bild_renditionen = %s, bild_status = %s, bild_auftrag = NULL "
+                "WHERE id = %s AND bild_auftrag = %s",
+                (bild_pfad, json.dumps(bilder) if bilder else None, bild_status, rezept_id, bild_auftrag)
+            )
+            aktualisiert = cursor.rowcount > 0
+            if aktualisiert:
+                referenzen_aendern(cursor, alter_pfad, bild_pfad, ART_REZEPT)
+        else:
+            cursor.execute(
+                "UPDATE rezepte SET bild_status = %s, bild_auftrag = NULL WHERE id = %s AND bild_auftrag = %s",
+                (bild_status, rezept_id, bild_auftrag)
+            )
+            aktualisiert = cursor.rowcount > 0
+        verbindung.commit()
+        tabellen_invalidieren('rezepte')
+        rezept_cache_invalidieren(rezept_id)
+        return aktualisiert
 
 def rezept_loeschen(rezept_id, benutzer_id=None):
     """
@@ -391,36 +640,35 @@ def rezept_loeschen(rezept_id, benutzer_id=None):
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return False
-            
-        cursor = verbindung.cursor()
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor()
         
-        # Prüfen, ob der Benutzer berechtigt ist, das Rezept zu löschen
-        if benutzer_id is not None:
-            cursor.execute("SELECT benutzer_id FROM rezepte WHERE id = %s", (rezept_id,))
+            cursor.execute("SELECT benutzer_id, bild_pfad FROM rezepte WHERE id = %s", (rezept_id,))
             rezept = cursor.fetchone()
-            if not rezept or rezept[0] != benutzer_id:
-                return False
-        
-        cursor.execute("DELETE FROM rezepte WHERE id = %s", (rezept_id,))
-        verbindung.commit()
-        
-        return cursor.rowcount > 0
+            
+            # Prüfen, ob der Benutzer berechtigt ist, das Rezept zu löschen
+            if benutzer_id is not None:
+                if not rezept or rezept[0] != benutzer_id:
+                    return False
+        
+            cursor.execute("DELETE FROM rezepte WHERE id = %s", (rezept_id,))
+            geloescht = cursor.rowcount > 0
+            if geloescht and rezept:
+                # Die Bilddateien bleiben bis zum Aufräumen liegen; andere Rezepte können sie teilen
+                referenzen_aendern(cursor, rezept[1], None, ART_REZEPT)
+            verbindung.commit()
+            anzahl_cache_invalidieren()
+            tabellen_invalidieren('rezepte')
+            rezept_cache_invalidieren(rezept_id)
+            suchdienst.rezept_aus_index_entfernen(rezept_id)
+        
+            return geloescht
     except Exception as fehler:
         print(f"Fehler beim Löschen des Rezepts: {fehler}")
         return False
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
-def rezepte_suchen(suchbegriff, limit=10, offset=0, kategorie_id=None):
+def rezepte_suchen(suchbegriff, limit=10, offset=0, kategorie_id=None, nach=None):
     """
     Sucht nach Rezepten anhand eines Suchbegriffs.
     
@@ -428,6 +676,7 @@ def rezepte_suchen(suchbegriff, limit=10, offset=0, kategorie_id=None):
     @param {int} [limit=10] - Maximale Anzahl der Ergebnisse
     @param {int} [offset=0] - Anzahl der zu überspringenden Ergebnisse
     @param {int} [kategorie_id] - Filter für eine bestimmte Kategorie
+    @param {Object} [nach] - Dekodierter Cursor; ersetzt den Offset durch eine Seek-Bedingung
     
     @return {tuple} (rezepte, gesamtanzahl)
     @return {Array<Object>} return[0] - Liste der gefundenen Rezepte
@@ -435,72 +684,154 @@ def rezepte_suchen(suchbegriff, limit=10, offset=0, kategorie_id=None):
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return [], 0
-            
-        cursor = verbindung.cursor(dictionary=True)
-        
-        # Basis-SQL-Abfrage
-        count_sql = "SELECT COUNT(*) as anzahl FROM rezepte WHERE titel LIKE %s"
-        sql = """
-        SELECT r.*, b.name as benutzer_name, k.name as kategorie_name
-        FROM rezepte r
-        LEFT JOIN benutzer b ON r.benutzer_id = b.id
-        LEFT JOIN kategorien k ON r.kategorie_id = k.id
-        WHERE r.titel LIKE %s
-        """
-        
-        # Parameter für die Suche
-        such_param = f"%{suchbegriff}%"
-        params = [such_param]
-        
-        # Wenn eine Kategorie angegeben ist, füge sie zur Abfrage hinzu
-        if kategorie_id:
-            sql += " AND r.kategorie_id = %s"
-            count_sql += " AND kategorie_id = %s"
-            params.append(kategorie_id)
-        
-        # Sortierung und Paginierung
-        sql += " ORDER BY r.erstellungsdatum DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        # Gesamtanzahl der Ergebnisse ermitteln
-        cursor.execute(count_sql, params[:-2])  # Ohne limit und offset
-        anzahl = cursor.fetchone()['anzahl']
-        
-        # Rezepte abrufen
-        cursor.execute(sql, params)
-        rezepte = cursor.fetchall()
-        
-        # Verarbeite alle Rezepte mit Hilfsfunktionen
-        for rezept in rezepte:
-            rezept = verarbeite_rezept_zutaten(rezept)
-            rezept = verarbeite_kategorie_info(rezept)
-        
-        return rezepte, anzahl
+        with verbindung_verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+        
+            # Basis-SQL-Abfrage
+            count_sql = "SELECT COUNT(*) as anzahl FROM rezepte WHERE titel LIKE %s"
+            sql = """
+            SELECT r.*, b.name as benutzer_name, k.name as kategorie_name
+            FROM rezepte r
+            LEFT JOIN benutzer b ON r.benutzer_id = b.id
+            LEFT JOIN kategorien k ON r.kategorie_id = k.id
+            WHERE r.titel LIKE %s
+            """
+        
+            # Parameter für die Suche
+            such_param = f"%{suchbegriff}%"
+            params = [such_param]
+        
+            # Wenn eine Kategorie angegeben ist, füge sie zur Abfrage hinzu
+            if kategorie_id:
+                sql += " AND r.kategorie_id = %s"
+                count_sql += " AND kategorie_id = %s"
+                params.append(kategorie_id)
+        
+            # Gesamtanzahl der Ergebnisse ermitteln (ohne Seek und Paginierung)
+            cursor.execute(count_sql, params)
+            anzahl = cursor.fetchone()['anzahl']
+        
+            if nach is not None:
+                seek_sql, seek_parameter = seek_bedingung('newest', nach)
+                sql += " AND " + seek_sql
+                params.extend(seek_parameter)
+                offset = 0
+        
+            # Sortierung und Paginierung
+            sql += sortierung_sql('newest') + " LIMIT %s OFFSET %s"
+            params.extend([limit, offset])
+        
+            # Rezepte abrufen
+            cursor.execute(sql, params)
+            rezepte = cursor.fetchall()
+        
+            # Verarbeite alle Rezepte mit Hilfsfunktionen
+            for rezept in rezepte:
+                rezept = verarbeite_rezept_zutaten(rezept)
+                rezept = verarbeite_kategorie_info(rezept)
+                rezept = verarbeite_bewertung_info(rezept)
+                rezept = verarbeite_bild_info(rezept)
+        
+            return rezepte, anzahl
         
     except Exception as fehler:
         print(f"Fehler beim Suchen von Rezepten: {fehler}")
         return [], 0
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
 
-def rezepte_suchen_erweitert(suchbegriff, limit=10, offset=0, kategorie_id=None, sortierung='newest'):
+def _rezepte_nach_ids_laden(rezept_ids):
+    """
+    Lädt vollständige Rezeptzeilen für eine Seite von IDs in deren Reihenfolge.
+
+    IDs ohne Zeile (z.B. inzwischen gelöscht) werden übersprungen und dem
+    Suchdienst zum Nachladen gemeldet.
+    """
+    if not rezept_ids:
+        return []
+
+    sql = f"""
+    SELECT r.*, b.name as benutzer_name, k.name as kategorie_name
+    FROM rezepte r
+    LEFT JOIN benutzer b ON r.benutzer_id = b.id
+    LEFT JOIN kategorien k ON r.kategorie_id = k.id
+    WHERE r.id IN ({", ".join(["%s"] * len(rezept_ids))})
+    """
+    zeilen = abfragen(sql, list(rezept_ids), _REZEPT_TABELLEN, verbindung_verwalten)
+    nach_id = {rezept['id']: rezept for rezept in zeilen}
+    if len(nach_id) < len(rezept_ids):
+        suchdienst.veraltet_melden([rezept_id for rezept_id in rezept_ids if rezept_id not in nach_id])
+    return [nach_id[rezept_id] for rezept_id in rezept_ids if rezept_id in nach_id]
+
+def _rezepte_suchen_index(index, suchbegriff, limit, offset, kategorie_id, sortierung, nach):
+    """
+    Führt die Suche über den Volltextindex aus; Treffer und Anzahl stammen
+    aus derselben Treffermenge. Ohne Treffer wird mit der korrigierten
+    Schreibweise (Trigrammindex) erneut gesucht.
+
+    Auch nach Titel, Datum oder Bewertung wird mit den im Index gehaltenen
+    Werten sortiert und paginiert; aus der Datenbank wird nur die Seite geladen.
+    """
+    treffer = index.suchen(suchbegriff, kategorie_id)
+    if not treffer:
+        vorschlag = suchdienst.korrektur_vorschlagen(suchbegriff)
+        if vorschlag:
+            treffer = index.suchen(vorschlag, kategorie_id)
+    anzahl = len(treffer)
+    if not treffer:
+        return [], 0
+
+    punkte = dict(treffer)
+    if sortierung == 'relevance':
+        reihenfolge = [rezept_id for rezept_id, _ in treffer]
+    else:
+        if nach is not None:
+            offset = 0
+        reihenfolge = [
+            zeile['id'] for zeile in zeilen_sortieren(index.merkmale(punkte), sortierung, nach)
+        ]
+    seite = reihenfolge[offset:] if limit is None else reihenfolge[offset:offset + limit]
+
+    rezepte = _rezepte_nach_ids_laden(seite)
+    for rezept in rezepte:
+        rezept = verarbeite_rezept_zutaten(rezept)
+        rezept = verarbeite_kategorie_info(rezept)
+        rezept = verarbeite_bewertung_info(rezept)
+        rezept = verarbeite_bild_info(rezept)
+        if sortierung == 'relevance':
+            rezept['relevanz'] = round(punkte[rezept['id']], 4)
+
+    return rezepte, anzahl
+
+def suchvorschlag_ermitteln(suchbegriff):
+    """
+    Ermittelt einen Korrekturvorschlag ("Meinten Sie ...?") für einen Suchbegriff.
+    
+    @param {string} suchbegriff - Der eingegebene Suchbegriff
+    @return {string|None} Korrigierter Suchbegriff oder None, wenn alle Wörter bekannt sind
+        oder der Suchindex nicht verfügbar ist
+    """
+    try:
+        return suchdienst.korrektur_vorschlagen(suchbegriff)
+    except Exception as fehler:
+        print(f"Fehler beim Ermitteln des Suchvorschlags: {fehler}")
+        return None
+
+def rezepte_suchen_erweitert(suchbegriff, limit=10, offset=0, kategorie_id=None, sortierung='newest', nach=None):
     """
     Sucht nach Rezepten mit erweiterten Informationen und Kategorien.
     
+    Durchsucht Titel, Zutaten und Zubereitung über den Volltextindex
+    (deutsche Normalisierung, BM25). Findet der Suchbegriff nichts, wird
+    fehlertolerant mit dem Korrekturvorschlag gesucht. Ist der Index nicht verfügbar, wird
+    auf eine LIKE-Suche im Titel zurückgegriffen.
+    
     @param {string} suchbegriff - Der zu suchende Begriff
     @param {int} [limit=10] - Maximale Anzahl der Ergebnisse
     @param {int} [offset=0] - Anzahl der zu überspringenden Ergebnisse
     @param {int} [kategorie_id] - Filter für eine bestimmte Kategorie
-    @param {string} [sortierung='newest'] - Sortierungsoption
+    @param {string} [sortierung='newest'] - Sortierungsoption, zusätzlich 'relevance'
+    @param {Object} [nach] - Dekodierter Cursor; ersetzt den Offset durch eine Seek-Bedingung
+        (nicht bei Sortierung nach Relevanz)
     
     @return {tuple} (rezepte, gesamtanzahl)
     @return {Array<Object>} return[0] - Liste der gefundenen Rezepte mit Kategorie-Informationen
@@ -508,15 +839,17 @@ def rezepte_suchen_erweitert(suchbegriff, limit=10, offset=0, kategorie_id=None,
     
     @throws {Exception} Bei Datenbankfehlern
     """
-    verbindung = None
-    cursor = None
     try:
-        verbindung = verbinden()
-        if not verbindung:
-            return [], 0
-            
-        cursor = verbindung.cursor(dictionary=True)
-        
+        index = suchdienst.suchindex_abrufen()
+        if index is not None:
+            return _rezepte_suchen_index(index, suchbegriff, limit, offset, kategorie_id, sortierung, nach)
+    except Exception as fehler:
+        print(f"Fehler bei der Indexsuche, nutze SQL-Suche: {fehler}")
+
+    if sortierung == 'relevance':
+        sortierung, nach = 'newest', None
+
+    try:
         # Basis-SQL-Abfrage mit Kategorie-Informationen
         count_sql = """
         SELECT COUNT(*) as anzahl 
@@ -542,43 +875,81 @@ def rezepte_suchen_erweitert(suchbegriff, limit=10, offset=0, kategorie_id=None,
             count_sql += " AND kategorie_id = %s"
             params.append(kategorie_id)
         
-        # Sortierung hinzufügen
-        if sortierung == 'oldest':
-            sql += " ORDER BY r.erstellungsdatum ASC"
-        elif sortierung == 'name_asc':
-            sql += " ORDER BY r.titel ASC"
-        elif sortierung == 'name_desc':
-            sql += " ORDER BY r.titel DESC"
-        else:  # newest (default)
-            sql += " ORDER BY r.erstellungsdatum DESC"
+        params_with_pagination = list(params)
+        if nach is not None:
+            seek_sql, seek_parameter = seek_bedingung(sortierung, nach)
+            sql += " AND " + seek_sql
+            params_with_pagination.extend(seek_parameter)
+            offset = 0
+        
+        # Sortierung mit ID als Tiebreaker für stabile Seiten
+        sql += sortierung_sql(sortierung)
         
         # Paginierung nur hinzufügen wenn limit gesetzt ist
         if limit is not None:
             sql += " LIMIT %s OFFSET %s"
-            params_with_pagination = params + [limit, offset]
-        else:
-            params_with_pagination = params
+            params_with_pagination.extend([limit, offset])
         
         # Gesamtanzahl der Ergebnisse ermitteln
-        cursor.execute(count_sql, params)
-        anzahl = cursor.fetchone()['anzahl']
+        anzahl = abfragen(count_sql, params, ('rezepte',), verbindung_verwalten)[0]['anzahl']
         
         # Rezepte abrufen
-        cursor.execute(sql, params_with_pagination)
-        rezepte = cursor.fetchall()
+        rezepte = abfragen(sql, params_with_pagination, _REZEPT_TABELLEN, verbindung_verwalten)
         
         # Verarbeite alle Rezepte mit Hilfsfunktionen
         for rezept in rezepte:
             rezept = verarbeite_rezept_zutaten(rezept)
             rezept = verarbeite_kategorie_info(rezept)
+            rezept = verarbeite_bewertung_info(rezept)
+            rezept = verarbeite_bild_info(rezept)
         
         return rezepte, anzahl
-        
+
     except Exception as fehler:
         print(f"Fehler beim Suchen von Rezepten (erweitert): {fehler}")
         return [], 0
-    finally:
-        if cursor:
-            cursor.close()
-        if verbindung:
-            verbindung_schliessen(verbindung)
\ No newline at end of file
+
+def rezepte_nach_zutaten_suchen(zutaten, limit=10, offset=0, kategorie_id=None):
+    """
+    Sucht Rezepte, die die angegebenen Zutaten verwenden.
+    
+    Die Treffer stammen aus dem Zutatenindex (Schnittmengen je Zutat) und sind
+    nach der Anzahl verwendeter Zutaten sortiert; bei Gleichstand zuerst Rezepte,
+    für die weniger zusätzliche Zutaten benötigt werden.
+    
+    @param {Array<string>} zutaten - Vorhandene Zutaten, z.B. ['Tomaten', 'Zwiebel']
+    @param {int} [limit=10] - Maximale Anzahl der Ergebnisse
+    @param {int} [offset=0] - Anzahl der zu überspringenden Ergebnisse
+    @param {int} [kategorie_id] - Filter für eine bestimmte Kategorie
+    
+    @return {tuple|None} (rezepte, gesamtanzahl) oder None, wenn der Zutatenindex
+        nicht verfügbar ist; jedes Rezept enthält passende_zutaten und fehlende_zutaten
+    """
+    index = suchdienst.zutatenindex_abrufen()
+    if index is None:
+        return None
+
+    try:
+        treffer = index.suchen(zutaten, kategorie_id)
+        anzahl = len(treffer)
+        seite = treffer[offset:] if limit is None else treffer[offset:offset + limit]
+        if not seite:
+            return [], anzahl
+
+        rezepte = _rezepte_nach_ids_laden([rezept_id for rezept_id, _, _ in seite])
+
+        details = {rezept_id: (passend, gesamt) for rezept_id, passend, gesamt in seite}
+        for rezept in rezepte:
+            rezept = verarbeite_rezept_zutaten(rezept)
+            rezept = verarbeite_kategorie_info(rezept)
+            rezept = verarbeite_bewertung_info(rezept)
+            rezept = verarbeite_bild_info(rezept)
+            passend, gesamt = details[rezept['id']]
+            rezept['passende_zutaten'] = passend
+            rezept['fehlende_zutaten'] = max(gesamt - len(passend), 0)
+
+        return rezepte, anzahl
+
+    except Exception as fehler:
+        print(f"Fehler bei der Zutatensuche: {fehler}")
+        return [], 0
@@ -30,12 +30,15 @@ from utils.token import (
     token_blacklisten,
     token_verifizieren
 )
-from utils.email import registrierungs_email_senden
+from utils.email import registrierungs_email_senden, passwort_reset_email_senden
+from utils.security import PasswortDienstUeberlastet
+from utils.ratenbegrenzung import ratenbegrenzt
 import os
 
 benutzer_bp = Blueprint('benutzer', __name__)
 
 @benutzer_bp.route("/register", methods=["POST"])
+@ratenbegrenzt('registrierung')
 def register():
     """
     Endpunkt für die Benutzerregistrierung.
@@ -55,6 +58,8 @@ def register():
     
     @throws {400} - Bei ungültigen Eingabedaten
     @throws {500} - Bei Serverfehler
+    @throws {503} - Wenn die Passwortberechnung überlastet ist (mit Retry-After)
+    @throws {429} - Bei zu vielen Anfragen (mit Retry-After)
     """
     daten = request.get_json()
     name = daten.get("name")
@@ -81,7 +86,7 @@ def register():
             }
             access_token, refresh_token = generate_tokens(benutzer['id'], benutzer['email'])
             
-            # E-Mail mit Registrierungsbestätigung senden
+            # Registrierungsbestätigung einreihen; der Versand blockiert die Antwort nicht
             registrierungs_email_senden(email, name)
             
             return jsonify({
@@ -93,11 +98,15 @@ def register():
             return jsonify({"message": "Registrierung fehlgeschlagen."}), 500
     except ValueError as ve:
         return jsonify({"message": str(ve)}), 400
+    except PasswortDienstUeberlastet:
+        # Wird vom Fehlerbehandler der App mit 503 und Retry-After beantwortet
+        raise
     except Exception as e:
         print(f"Unerwarteter Fehler bei der Registrierung: {e}")
         return jsonify({"message": "Ein unerwarteter Fehler ist aufgetreten. Bitte versuchen Sie es später erneut."}), 500
 
 @benutzer_bp.route("/login", methods=["POST"])
+@ratenbegrenzt('anmeldung')
 def login():
     """
     Endpunkt für die Benutzeranmeldung.
@@ -116,6 +125,8 @@ def login():
     
     @throws {400} - Bei fehlenden Anmeldedaten
     @throws {401} - Bei ungültigen Anmeldedaten
+    @throws {503} - Wenn die Passwortprüfung überlastet ist (mit Retry-After)
+    @throws {429} - Bei zu vielen Anfragen (mit Retry-After)
     """
     daten = request.get_json()
     email = daten.get("email")
@@ -190,6 +201,9 @@ def logout(token_daten):
     
     @auth Erfordert gültigen JWT-Token
     
+    @body {Object} [request_body]
+    @body {string} [request_body.refresh_token] - Wird ebenfalls widerrufen
+    
     @return {Object} response
     @return {string} response.nachricht - Erfolgsmeldung
     
@@ -198,6 +212,13 @@ def logout(token_daten):
     token = request.headers.get('Authorization').split(' ')[1]
     token_blacklisten(token)
     
+    # Refresh Token desselben Benutzers mit widerrufen, damit er keine neuen Access Tokens liefert
+    refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+    if refresh_token:
+        refresh_daten = token_verifizieren(refresh_token)
+        if refresh_daten and refresh_daten.get('benutzer_id') == token_daten['benutzer_id']:
+            token_blacklisten(refresh_token)
+    
     return jsonify({
         "nachricht": "Erfolgreich ausgeloggt"
     }), 200
@@ -235,6 +256,7 @@ def profil_abrufen(token_daten):
         }), 404
 
 @benutzer_bp.route("/profil", methods=["PUT"])
+@ratenbegrenzt('schreiben')
 @token_erforderlich
 def profil_aktualisieren(token_daten):
     """
@@ -254,6 +276,7 @@ def profil_aktualisieren(token_daten):
     
     @throws {400} Bei ungültigen Eingabedaten
     @throws {401} Bei fehlendem oder ungültigem Token
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
     """
     benutzer_id = token_daten["benutzer_id"]
     daten = request.get_json()
@@ -283,6 +306,7 @@ def profil_aktualisieren(token_daten):
         }), 500
 
 @benutzer_bp.route("/profil/bild", methods=["POST"])
+@ratenbegrenzt('schreiben')
 @token_erforderlich
 def profilbild_hochladen(token_daten):
     """
@@ -300,6 +324,7 @@ def profilbild_hochladen(token_daten):
     
     @throws {400} Bei fehlender oder ungültiger Bilddatei
     @throws {401} Bei fehlendem oder ungültigem Token
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
     """
     if 'bild' not in request.files:
         return jsonify({
@@ -334,6 +359,7 @@ def profilbild_hochladen(token_daten):
         }), 500
 
 @benutzer_bp.route("/passwort-vergessen", methods=["POST"])
+@ratenbegrenzt('passwort_reset')
 def passwort_vergessen():
     """
     Endpunkt für die Anforderung eines Passwort-Reset-Links.
@@ -348,6 +374,7 @@ def passwort_vergessen():
     @return {string} [response.fehler] - Fehlermeldung bei Misserfolg
     
     @throws {400} Bei ungültiger E-Mail-Adresse
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
     """
     daten = request.get_json()
     email = daten.get("email")
@@ -364,10 +391,7 @@ def passwort_vergessen():
     if benutzer:
         token = reset_token_erstellen(benutzer["id"])
         if token:
-            # TODO: E-Mail mit Reset-Link senden
-            # Für Testzwecke geben wir den Token direkt zurück
-            reset_url = f"{request.host_url}passwort-zuruecksetzen/{token}"
-            print(f"Reset URL für {email}: {reset_url}")  # Für Debug
+            passwort_reset_email_senden(benutzer["email"], benutzer["name"], token)
     
     return jsonify({
         "success": True,
@@ -400,6 +424,7 @@ def reset_token_pruefen(token):
     }), 200
 
 @benutzer_bp.route("/passwort-reset/<token>", methods=["POST"])
+@ratenbegrenzt('passwort_reset')
 def passwort_reset(token):
     """
     Setzt das Passwort mit einem gültigen Reset-Token zurück.
@@ -415,6 +440,7 @@ def passwort_reset(token):
     @return {string} [response.message] - Fehlermeldung bei Misserfolg
     
     @throws {400} Bei ungültigem Token oder Passwort
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
     """
     if not token:
         return jsonify({
@@ -12,6 +12,8 @@ Dieses Modul implementiert die API-Endpunkte für Bewertungsverwaltung:
 from flask import Blueprint, request, jsonify
 from functools import wraps
 from utils.token import token_erforderlich
+from utils.ratenbegrenzung import blueprint_begrenzen
+from db import arbeitseinheit
 from models.bewertung import (
     bewertung_erstellen,
     bewertung_abrufen,
@@ -22,6 +24,9 @@ from models.bewertung import (
 
 bewertung_bp = Blueprint('bewertung', __name__)
 
+# Schreibende Anfragen (POST, PUT, DELETE) je Benutzer begrenzen
+blueprint_begrenzen(bewertung_bp, 'schreiben')
+
 @bewertung_bp.route('/rezept/<int:rezept_id>', methods=['POST'])
 @token_erforderlich
 def bewertung_hinzufuegen(token_daten, rezept_id):
@@ -49,9 +54,12 @@ def bewertung_hinzufuegen(token_daten, rezept_id):
 
         benutzer_id = token_daten['benutzer_id']
         
-        if bewertung_erstellen(rezept_id, benutzer_id, bewertung):
+        with arbeitseinheit():
+            erfolg = bewertung_erstellen(rezept_id, benutzer_id, bewertung)
             # Durchschnitt neu berechnen
-            stats = durchschnittsbewertung_berechnen(rezept_id)
+            stats = durchschnittsbewertung_berechnen(rezept_id) if erfolg else None
+        
+        if erfolg:
             return jsonify({
                 "nachricht": "Bewertung erfolgreich gespeichert",
                 "bewertung": bewertung,
@@ -131,9 +139,12 @@ def bewertung_entfernen(token_daten, rezept_id):
     try:
         benutzer_id = token_daten['benutzer_id']
         
-        if bewertung_loeschen(rezept_id, benutzer_id):
+        with arbeitseinheit():
+            erfolg = bewertung_loeschen(rezept_id, benutzer_id)
             # Durchschnitt neu berechnen
-            stats = durchschnittsbewertung_berechnen(rezept_id)
+            stats = durchschnittsbewertung_berechnen(rezept_id) if erfolg else None
+        
+        if erfolg:
             return jsonify({
                 "nachricht": "Bewertung erfolgreich gelöscht",
                 "durchschnitt": stats['durchschnitt'],
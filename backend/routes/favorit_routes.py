@@ -15,10 +15,15 @@ from models.favorit import (
     favoriten_auflisten,
     ist_favorit
 )
+from models.rezept import rezepte_annotieren
 from utils.token import token_erforderlich
+from utils.ratenbegrenzung import blueprint_begrenzen
 
 favorit_bp = Blueprint('favorit', __name__)
 
+# Schreibende Anfragen (POST, PUT, DELETE) je Benutzer begrenzen
+blueprint_begrenzen(favorit_bp, 'schreiben')
+
 @favorit_bp.route('/<int:rezept_id>', methods=['POST'])
 @token_erforderlich
 def favorit_hinzufuegen_route(token_daten, rezept_id):
@@ -105,6 +110,7 @@ def favoriten_liste(token_daten):
     print(f"🔄 API: Lade Favoriten für Benutzer {benutzer_id}")
     
     favoriten = favoriten_auflisten(benutzer_id)
+    rezepte_annotieren(favoriten, benutzer_id, alle_favoriten=True)
     
     print(f"✅ API: {len(favoriten)} Favoriten gefunden")
     
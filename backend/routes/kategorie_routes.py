@@ -18,10 +18,15 @@ from models.kategorie import (
     rezept_kategorien_abrufen,
     rezepte_nach_kategorie_abrufen
 )
-from utils.token import token_erforderlich
+from models.rezept import rezepte_annotieren
+from utils.token import token_erforderlich, betrachter_id_ermitteln
+from utils.ratenbegrenzung import blueprint_begrenzen
 
 kategorie_bp = Blueprint('kategorie', __name__)
 
+# Schreibende Anfragen (POST, PUT, DELETE) je Benutzer begrenzen
+blueprint_begrenzen(kategorie_bp, 'schreiben')
+
 @kategorie_bp.route('', methods=['POST'])
 @token_erforderlich
 def neue_kategorie(token_daten):
@@ -85,7 +90,8 @@ def kategorie_rezepte(kategorie_id):
     @param {int} kategorie_id - ID der Kategorie
     
     @return {Object} response
-    @return {Array<Object>} response.rezepte - Liste der Rezepte in dieser Kategorie
+    @return {Array<Object>} response.rezepte - Liste der Rezepte in dieser Kategorie,
+        bei Anmeldung mit Favoritenstatus und eigener Bewertung
     
     @throws {404} Wenn Kategorie nicht gefunden
     @throws {500} Bei Serverfehler
@@ -95,6 +101,7 @@ def kategorie_rezepte(kategorie_id):
         return jsonify({"fehler": "Kategorie nicht gefunden"}), 404
 
     rezepte = rezepte_nach_kategorie_abrufen(kategorie_id)
+    rezepte_annotieren(rezepte, betrachter_id_ermitteln())
     return jsonify({"rezepte": rezepte}), 200
 
 @kategorie_bp.route('/rezept/<int:rezept_id>', methods=['POST'])
@@ -17,9 +17,13 @@ from models.kommentar import (
     kommentar_bearbeiten
 )
 from utils.token import token_erforderlich
+from utils.ratenbegrenzung import blueprint_begrenzen
 
 kommentar_bp = Blueprint('kommentar', __name__)
 
+# Schreibende Anfragen (POST, PUT, DELETE) je Benutzer begrenzen
+blueprint_begrenzen(kommentar_bp, 'schreiben')
+
 @kommentar_bp.route('/rezept/<int:rezept_id>', methods=['POST'])
 @token_erforderlich
 def kommentar_erstellen_route(token_daten, rezept_id):
@@ -4,22 +4,14 @@
 
 Dieses Modul implementiert die API-Endpunkte für Rezeptverwaltung:
 - Auflisten und Suchen von Rezepten
+- Suche nach vorhandenen Zutaten
+- Autovervollständigung für das Suchfeld
 - Erstellen neuer Rezepte
 - Aktualisieren bestehender Rezepte
 - Löschen von Rezepten
-- Bildupload-Funktionalität
+- Bildupload-Funktionalität (Rendern asynchron, Statusabfrage je Rezept)
 """
 
-import os
-import uuid
-import imghdr
-from PIL import Image
-# AVIF-Unterstützung aktivieren
-try:
-    from pillow_avif import AvifImagePlugin
-    print("✅ AVIF support loaded successfully")
-except ImportError:
-    print("⚠️ AVIF support not available")
 from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from werkzeug.utils import secure_filename
 from models.rezept import (
@@ -29,23 +21,40 @@ from models.rezept import (
     rezepte_auflisten_erweitert,
     rezept_aktualisieren, 
     rezept_loeschen, 
-    rezepte_suchen,
-    rezepte_suchen_erweitert
+    rezepte_suchen_erweitert,
+    suchvorschlag_ermitteln,
+    rezepte_nach_zutaten_suchen,
+    rezepte_zaehlen,
+    rezepte_annotieren
 )
-from utils.token import token_erforderlich as token_required
+from utils.token import token_erforderlich as token_required, token_optional, betrachter_id_ermitteln
+from utils.ratenbegrenzung import blueprint_begrenzen, ratenbegrenzt
+from utils.paginierung import (
+    limit_begrenzen,
+    cursor_dekodieren,
+    seite_abschliessen,
+    UngueltigerCursor
+)
+from utils.bilder import bild_pruefen, UngueltigesBild
+from utils.bildverarbeitung import (
+    bildverarbeitung_abrufen,
+    STATUS_AUSSTEHEND,
+    STATUS_FERTIG
+)
+from db import arbeitseinheit
+from suche import suchdienst
 import json
-import jwt as pyjwt  # Renomear para evitar conflitos
 
 # Blueprint für Rezepte erstellen
 rezept_bp = Blueprint('rezept', __name__)
 
+# Schreibende Anfragen (POST, PUT, DELETE) je Benutzer begrenzen
+blueprint_begrenzen(rezept_bp, 'schreiben')
+
 # Explizit erlaubte Dateierweiterungen definieren
 ERLAUBTE_ERWEITERUNGEN = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif'}
 # Maximale Dateigröße definieren (5 MB)
 MAX_BILD_GROESSE_MB = 5
-# Maximale Bildabmessungen definieren
-MAX_IMAGE_SIZE = (1920, 1080)  # Full HD
-THUMB_SIZE = (300, 200)  # Thumbnail
 
 def datei_erlaubt(dateiname):
     """
@@ -57,197 +66,64 @@ def datei_erlaubt(dateiname):
     return '.' in dateiname and \
            dateiname.rsplit('.', 1)[1].lower() in ERLAUBTE_ERWEITERUNGEN
 
-def ist_bild(file_stream):
-    """
-    Überprüft, ob der Dateiinhalt tatsächlich ein Bild ist.
-    
-    @param {FileStorage} file_stream - Der zu prüfende Datei-Stream
-    @return {boolean} True wenn die Datei ein gültiges Bild ist, sonst False
+def cursor_lesen(sortierung):
     """
-    try:
-        # Lesen Sie die ersten Bytes, um den Dateityp zu überprüfen
-        header = file_stream.read(512)
-        file_stream.seek(0)  # Zurück zum Anfang
-        
-        # Überprüfen Sie den Dateiheader auf gängige Bildformate
-        format = imghdr.what(None, header)
-        # Unterstützung für AVIF und andere Formate hinzufügen
-        valid_formats = {'png', 'jpeg', 'gif', 'webp', 'bmp', 'tiff'}
-        
-        # Für AVIF und andere Formate, die imghdr nicht erkennt
-        if not format:
-            # Versuche die Datei mit PIL zu öffnen
-            try:
-                file_stream.seek(0)
-                with Image.open(file_stream) as test_img:
-                    return test_img.format.lower() in {'png', 'jpeg', 'jpg', 'gif', 'webp', 'avif', 'bmp', 'tiff'}
-            except Exception:
-                return False
-            finally:
-                file_stream.seek(0)
-        
-        return format in valid_formats
-    except Exception:
-        return False
+    Liest den optionalen cursor-Parameter der Anfrage.
 
-def optimize_image(image_path, max_size):
-    """
-    Optimiert ein Bild durch Größenänderung und Komprimierung.
-    
-    @param {string} image_path - Pfad zum Bild
-    @param {tuple} max_size - Maximale Größe (Breite, Höhe)
-    @return {Image} Optimiertes Bild
+    @param {string} sortierung - Sortierung, zu der der Cursor passen muss
+    @return {Object|None} Dekodierter Cursor oder None, wenn keiner übergeben wurde
+
+    @throws {UngueltigerCursor} Bei beschädigtem oder unpassendem Cursor
     """
-    try:
-        print(f"Debug - Opening image: {image_path}")
-        with Image.open(image_path) as img:
-            print(f"Debug - Image format: {img.format}, mode: {img.mode}, size: {img.size}")
-            
-            # In RGB konvertieren falls notwendig (für JPEG-Ausgabe)
-            if img.mode in ('RGBA', 'P', 'LA'):
-                print(f"Debug - Converting from {img.mode} to RGB")
-                img = img.convert('RGB')
-            elif img.mode == 'L':  # Grayscale
-                print(f"Debug - Converting from grayscale to RGB")
-                img = img.convert('RGB')
-            
-            # Größe ändern unter Beibehaltung des Seitenverhältnisses falls größer als max_size
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                print(f"Debug - Resizing from {img.size} to max {max_size}")
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                print(f"Debug - New size: {img.size}")
-            
-            return img
-    except Exception as e:
-        print(f"Debug - Error in optimize_image: {e}")
-        raise
+    token = request.args.get('cursor')
+    return cursor_dekodieren(token, sortierung) if token else None
 
-def create_thumbnail(image_path, thumb_path, size):
+def ist_bild(file_stream):
     """
-    Erstellt eine Miniaturansicht des Bildes.
+    Überprüft, ob der Dateiinhalt tatsächlich ein unterstütztes Bild ist.
     
-    @param {string} image_path - Pfad zum ursprünglichen Bild
-    @param {string} thumb_path - Pfad zum Speichern der Miniaturansicht
-    @param {tuple} size - Größe der Miniaturansicht (Breite, Höhe)
+    Geprüft werden Dateisignatur und Abmessungen (Pixel-Obergrenze), ohne das
+    Bild zu dekodieren.
+    
+    @param {FileStorage} file_stream - Der zu prüfende Datei-Stream
+    @return {boolean} True wenn die Datei ein gültiges Bild ist, sonst False
     """
     try:
-        with Image.open(image_path) as img:
-            print(f"Debug - Creating thumbnail from {img.format} image")
-            
-            # In RGB konvertieren für JPEG-Ausgabe
-            if img.mode in ('RGBA', 'P', 'LA', 'L'):
-                img = img.convert('RGB')
-            
-            img.thumbnail(size, Image.Resampling.LANCZOS)
-            img.save(thumb_path, 'JPEG', quality=85, optimize=True)
-            print(f"Debug - Thumbnail saved: {thumb_path}")
-    except Exception as e:
-        print(f"Debug - Error creating thumbnail: {e}")
-        raise
+        bild_pruefen(file_stream)
+        return True
+    except UngueltigesBild as fehler:
+        print(f"Debug - Invalid image file: {fehler}")
+        return False
+    finally:
+        file_stream.seek(0)
 
 def bild_speichern(bild):
     """
-    Speichert ein hochgeladenes Bild sicher ab.
+    Prüft ein hochgeladenes Bild und legt es zur asynchronen Verarbeitung ab.
+    
+    Das Rendern (optimiertes Bild, Thumbnail) übernimmt die Bildverarbeitung
+    (utils/bildverarbeitung.py) nach dem Speichern des Rezepts; siehe
+    bildverarbeitung_abrufen().einreichen().
     
     @param {FileStorage} bild - Das hochgeladene Bild
-    @return {dict|None} Dictionary mit Bildpfaden oder None bei Fehler
+    @return {string|None} Auftrags-ID oder None bei ungültiger Datei oder Fehler
     """
     if not bild or not bild.filename:
-        print("Debug - No image or filename provided")
         return None
         
     if not datei_erlaubt(bild.filename):
         print(f"Debug - File extension not allowed: {bild.filename}")
         return None
+    
+    # Nur den Dateikopf prüfen; dekodiert wird erst im Worker-Prozess
+    if not ist_bild(bild.stream):
+        return None
         
     try:
-        print(f"Debug - Processing image: {bild.filename}")
-        
-        # Sicheren Dateinamen erstellen
-        dateiname = secure_filename(bild.filename)
-        base_name = str(uuid.uuid4())
-        original_extension = dateiname.rsplit('.', 1)[1].lower() if '.' in dateiname else 'jpg'
-        
-        print(f"Debug - Original extension: {original_extension}, Base name: {base_name}")
-        
-        # Pfade definieren - alle Ausgabebilder werden als JPEG gespeichert
-        upload_ordner = os.path.join(current_app.static_folder, 'uploads')
-        os.makedirs(upload_ordner, exist_ok=True)
-        print(f"Debug - Upload folder: {upload_ordner}")
-        
-        # Pfade für temporäres Original, optimiert und Thumbnail (alle als JPEG)
-        temp_original_name = f"{base_name}_temp.{original_extension}"
-        optimized_name = f"{base_name}.jpg"  # Immer JPEG
-        thumb_name = f"{base_name}_thumb.jpg"  # Immer JPEG
-        
-        temp_original_path = os.path.join(upload_ordner, temp_original_name)
-        optimized_path = os.path.join(upload_ordner, optimized_name)
-        thumb_path = os.path.join(upload_ordner, thumb_name)
-        
-        # Temporäres Original speichern
-        print(f"Debug - Saving temporary original to: {temp_original_path}")
-        bild.save(temp_original_path)
-        
-        # Überprüfen ob die Datei gespeichert wurde
-        if not os.path.exists(temp_original_path):
-            print("Debug - Failed to save temporary file")
-            return None
-            
-        print(f"Debug - File size: {os.path.getsize(temp_original_path)} bytes")
-        
-        # Überprüfen ob es sich um ein gültiges Bild handelt
-        try:
-            with Image.open(temp_original_path) as test_img:
-                print(f"Debug - Image verified: {test_img.format}, {test_img.mode}, {test_img.size}")
-        except Exception as e:
-            print(f"Debug - Invalid image file: {e}")
-            if os.path.exists(temp_original_path):
-                os.remove(temp_original_path)
-            return None
-        
-        # Optimieren und als JPEG speichern
-        print(f"Debug - Optimizing image...")
-        optimized_img = optimize_image(temp_original_path, MAX_IMAGE_SIZE)
-        optimized_img.save(optimized_path, 'JPEG', quality=90, optimize=True)
-        print(f"Debug - Optimized image saved to: {optimized_path}")
-        
-        # Thumbnail erstellen und als JPEG speichern
-        print(f"Debug - Creating thumbnail...")
-        create_thumbnail(temp_original_path, thumb_path, THUMB_SIZE)
-        print(f"Debug - Thumbnail saved to: {thumb_path}")
-        
-        # Temporäres Original nach Verarbeitung entfernen
-        if os.path.exists(temp_original_path):
-            os.remove(temp_original_path)
-            print(f"Debug - Temporary file removed")
-        
-        result = {
-            'image_url': f"static/uploads/{optimized_name}",
-            'thumb_url': f"static/uploads/{thumb_name}"
-        }
-        print(f"Debug - Image processing successful: {result}")
-        return result
-        
+        erweiterung = secure_filename(bild.filename).rsplit('.', 1)[1].lower()
+        return bildverarbeitung_abrufen().roh_speichern(bild, erweiterung)
     except Exception as e:
-        print(f"Debug - Error in bild_speichern: {type(e).__name__}: {e}")
-        import traceback
-        print(f"Debug - Traceback: {traceback.format_exc()}")
-        
-        # Limpeza em caso de erro
-        cleanup_files = [
-            os.path.join(upload_ordner, f"{base_name}_temp.{original_extension}") if 'original_extension' in locals() else None,
-            os.path.join(upload_ordner, f"{base_name}.jpg") if 'base_name' in locals() else None,
-            os.path.join(upload_ordner, f"{base_name}_thumb.jpg") if 'base_name' in locals() else None
-        ]
-        
-        for file_path in cleanup_files:
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    print(f"Debug - Cleaned up: {file_path}")
-                except:
-                    pass
-                    
+        print(f"Fehler beim Speichern des Bildes: {type(e).__name__}: {e}")
         return None
 
 # Route für statische Bilder
@@ -271,20 +147,22 @@ def rezepte_liste():
     @route GET /api/rezepte
     
     @query {int} [page=1] - Aktuelle Seite
-    @query {int} [limit=10] - Anzahl der Rezepte pro Seite  
+    @query {int} [limit=10] - Anzahl der Rezepte pro Seite (höchstens MAX_SEITENGROESSE)
+    @query {string} [cursor] - Cursor aus meta.next_cursor; hat Vorrang vor page
     @query {string} [kategorie=''] - Kategorie-ID für Filterung
-    @query {string} [sortierung='newest'] - Sortierungsoption
+    @query {string} [sortierung='newest'] - Sortierungsoption (newest, oldest, name_asc, name_desc, rating)
     
     @return {Object} response
     @return {Array<Object>} response.rezepte - Liste der gefundenen Rezepte mit Favoritenstatus
-    @return {Object} response.meta - Metadaten zur Paginierung
+    @return {Object} response.meta - Metadaten zur Paginierung inklusive next_cursor
     
+    @throws {400} Bei ungültigem Cursor
     @throws {500} Bei internem Serverfehler
     """
     try:
         # Parameter aus der Anfrage extrahieren
         page = request.args.get('page', default=1, type=int)
-        limit = request.args.get('limit', default=10, type=int)
+        limit = limit_begrenzen(request.args.get('limit', type=int))
         kategorie = request.args.get('kategorie', default='', type=str)
         sortierung = request.args.get('sortierung', default='newest', type=str)
         
@@ -296,50 +174,23 @@ def rezepte_liste():
         if kategorie and kategorie.isdigit():
             kategorie_id = int(kategorie)
         
-        # Offset aus Page berechnen
-        offset = (page - 1) * limit
+        # Offset aus Page berechnen (wird bei Cursor-Paginierung ignoriert)
+        offset = (max(page, 1) - 1) * limit
         
-        # Rezepte abrufen mit verbesserter Funktion
-        rezepte = rezepte_auflisten_erweitert(limit, offset, benutzer_id, kategorie_id, sortierung)
+        try:
+            nach = cursor_lesen(sortierung)
+        except UngueltigerCursor:
+            return jsonify({'fehler': 'Ungültiger Cursor'}), 400
         
-        # Gesamtanzahl für Paginierung berechnen (ohne Limit/Offset)
-        total_rezepte = rezepte_auflisten_erweitert(None, 0, benutzer_id, kategorie_id, sortierung)
-        total = len(total_rezepte)
+        # Eine Zeile mehr abrufen, um zu erkennen, ob es eine nächste Seite gibt
+        rezepte = rezepte_auflisten_erweitert(limit + 1, offset, benutzer_id, kategorie_id, sortierung, nach)
+        rezepte, next_cursor = seite_abschliessen(rezepte, limit, sortierung)
         
-        # Prüfe, ob der Benutzer angemeldet ist und füge Favoritenstatus hinzu
-        authorization_header = request.headers.get('Authorization')
-        current_user_id = None
+        # Gesamtanzahl für Paginierung per COUNT(*) ermitteln
+        total = rezepte_zaehlen(benutzer_id, kategorie_id)
         
-        if authorization_header and authorization_header.startswith('Bearer '):
-            try:
-                token = authorization_header.split(' ')[1]
-                
-                try:
-                    token_daten = pyjwt.decode(
-                        token, 
-                        current_app.config['SECRET_KEY'], 
-                        algorithms=['HS256']
-                    )
-                    current_user_id = token_daten.get('benutzer_id')
-                except Exception:
-                    # Token ungültig oder abgelaufen - ignorieren
-                    pass
-            except Exception:
-                # Fehler beim Verarbeiten - ignorieren
-                pass
-        
-        # Favoritenstatus für jedes Rezept hinzufügen
-        if current_user_id:
-            from models.favorit import ist_favorit
-            print(f"🔍 Adicionando status de favorito para usuário {current_user_id}")
-            for rezept in rezepte:
-                is_fav = ist_favorit(current_user_id, rezept['id'])
-                rezept['is_favorite'] = is_fav
-                print(f"  Rezept {rezept['id']} ({rezept['titel']}): is_favorite = {is_fav}")
-        else:
-            print("🔍 Nenhum usuário logado - marcando todos como não favoritos")
-            for rezept in rezepte:
-                rezept['is_favorite'] = False
+        # Favoritenstatus und eigene Bewertung gebündelt ergänzen
+        rezepte_annotieren(rezepte, betrachter_id_ermitteln())
         
         # Metadaten für Paginierung
         metadaten = {
@@ -347,7 +198,8 @@ def rezepte_liste():
             'total': total,
             'page': page,
             'limit': limit,
-            'pages': max(1, (total + limit - 1) // limit)
+            'pages': max(1, (total + limit - 1) // limit),
+            'next_cursor': next_cursor
         }
         
         return jsonify({
@@ -362,7 +214,8 @@ def rezepte_liste():
         return jsonify({'fehler': 'Interner Serverfehler'}), 500
 
 @rezept_bp.route('/<int:rezept_id>', methods=['GET'])
-def rezept_details(rezept_id):
+@token_optional
+def rezept_details(rezept_id, token_daten):
     """
     Gibt die Details eines bestimmten Rezepts zurück.
     
@@ -382,30 +235,7 @@ def rezept_details(rezept_id):
             # Prüfe, ob der Benutzer angemeldet ist und das Rezept als Favorit markiert hat
             from models.favorit import ist_favorit
             
-            # Versuche Token zu extrahieren (optional)
-            authorization_header = request.headers.get('Authorization')
-            is_favorite = False
-            
-            if authorization_header and authorization_header.startswith('Bearer '):
-                try:
-                    token = authorization_header.split(' ')[1]
-                    
-                    # Versuche Token zu dekodieren ohne Fehler zu werfen
-                    try:
-                        token_daten = pyjwt.decode(
-                            token, 
-                            current_app.config['SECRET_KEY'], 
-                            algorithms=['HS256']
-                        )
-                        benutzer_id = token_daten.get('benutzer_id')
-                        if benutzer_id:
-                            is_favorite = ist_favorit(benutzer_id, rezept_id)
-                    except Exception:
-                        # Token ungültig oder abgelaufen - ignorieren
-                        pass
-                except Exception:
-                    # Fehler beim Verarbeiten - ignorieren
-                    pass
+            is_favorite = bool(token_daten) and ist_favorit(token_daten['benutzer_id'], rezept_id)
             
             # Favoritenstatus zum Rezept hinzufügen
             rezept['is_favorite'] = is_favorite
@@ -437,7 +267,8 @@ def rezept_erstellen_route(token_daten):
     
     @return {Object} response
     @return {string} response.nachricht - Erfolgsmeldung
-    @return {Object} response.rezept - Das erstellte Rezept
+    @return {Object} response.rezept - Das erstellte Rezept; mit Bild ist
+        bild_status 'ausstehend', bis GET /api/rezepte/{id}/bild 'fertig' meldet
     
     @throws {400} Bei fehlenden oder ungültigen Daten
     @throws {500} Bei internem Serverfehler
@@ -469,16 +300,13 @@ def rezept_erstellen_route(token_daten):
                 except json.JSONDecodeError:
                     return jsonify({'fehler': 'Ungültiges JSON-Format für Zutaten'}), 400
         
-        # Bild verarbeiten, falls vorhanden
-        bild_pfad = None
+        # Bild ablegen, falls vorhanden; gerendert wird nach dem Speichern im Hintergrund
+        bild_auftrag = None
         if 'bild' in request.files:
             bild = request.files['bild']
-            bild_result = bild_speichern(bild)
-            if bild and not bild_result:
+            bild_auftrag = bild_speichern(bild)
+            if bild and not bild_auftrag:
                 return jsonify({'fehler': 'Ungültiger Dateityp für Bild'}), 400
-            elif bild_result:
-                # Extract the main image URL from the result dictionary
-                bild_pfad = bild_result.get('image_url', bild_result) if isinstance(bild_result, dict) else bild_result
         
         # Kategorie-ID extrahieren, falls vorhanden
         kategorie_id = daten.get('kategorie_id')
@@ -491,19 +319,27 @@ def rezept_erstellen_route(token_daten):
         # Benutzer-ID aus Token extrahieren
         benutzer_id = token_daten['benutzer_id']
         
-        # Rezept erstellen
-        rezept_id = rezept_erstellen(
-            titel=daten['titel'],
-            zutaten=zutaten,
-            zubereitung=daten['zubereitung'],
-            benutzer_id=benutzer_id,
-            bild_pfad=bild_pfad,
-            kategorie_id=kategorie_id
-        )
+        # Rezept erstellen und in derselben Transaktion zurücklesen
+        with arbeitseinheit():
+            rezept_id = rezept_erstellen(
+                titel=daten['titel'],
+                zutaten=zutaten,
+                zubereitung=daten['zubereitung'],
+                benutzer_id=benutzer_id,
+                kategorie_id=kategorie_id,
+                bild_status=STATUS_AUSSTEHEND if bild_auftrag else None,
+                bild_auftrag=bild_auftrag
+            )
+            neues_rezept = rezept_abrufen(rezept_id) if rezept_id else None
+        
+        # Erst nach dem Commit einreichen, damit der Auftrag seine Zeile findet
+        if bild_auftrag:
+            if rezept_id:
+                bildverarbeitung_abrufen().einreichen(bild_auftrag)
+            else:
+                bildverarbeitung_abrufen().verwerfen(bild_auftrag)
         
         if rezept_id:
-            # Neu erstelltes Rezept abrufen
-            neues_rezept = rezept_abrufen(rezept_id)
             return jsonify({
                 'nachricht': 'Rezept erfolgreich erstellt',
                 'rezept': neues_rezept
@@ -612,38 +448,38 @@ def rezept_aktualisieren_route(token_daten, rezept_id):
                 update_felder['kategorie_id'] = None
         
         print(f"Debug - Processing image...")
-        # Bild aktualisieren, falls vorhanden
+        # Bild aktualisieren, falls vorhanden; bis zum Abschluss bleibt das bisherige Bild sichtbar
+        bild_auftrag = None
         if 'bild' in request.files:
             bild = request.files['bild']
             print(f"Debug - Image file: {bild.filename}")
             if bild.filename:  # Nur verarbeiten wenn eine Datei hochgeladen wurde
-                try:
-                    bild_result = bild_speichern(bild)
-                    if not bild_result:
-                        print(f"Debug - Image save failed")
-                        return jsonify({'fehler': 'Ungültiger Dateityp für Bild'}), 400
-                    else:
-                        # Extract the main image URL from the result dictionary
-                        bild_pfad = bild_result.get('image_url', bild_result) if isinstance(bild_result, dict) else bild_result
-                        update_felder['bild_pfad'] = bild_pfad
-                        print(f"Debug - Image saved: {bild_pfad}")
-                except Exception as e:
-                    print(f"Error processing image: {e}")
-                    return jsonify({'fehler': 'Fehler beim Verarbeiten des Bildes'}), 400
+                bild_auftrag = bild_speichern(bild)
+                if not bild_auftrag:
+                    print(f"Debug - Image save failed")
+                    return jsonify({'fehler': 'Ungültiger Dateityp für Bild'}), 400
+                update_felder['bild_status'] = STATUS_AUSSTEHEND
+                update_felder['bild_auftrag'] = bild_auftrag
         
         print(f"Debug - Update fields: {update_felder}")
         
-        # Rezept aktualisieren
+        # Rezept aktualisieren und zurücklesen, gemeinsam committet
         try:
-            erfolg = rezept_aktualisieren(
-                rezept_id=rezept_id,
-                benutzer_id=benutzer_id,
-                **update_felder
-            )
+            with arbeitseinheit():
+                erfolg = rezept_aktualisieren(
+                    rezept_id=rezept_id,
+                    benutzer_id=benutzer_id,
+                    **update_felder
+                )
+                aktualisiertes_rezept = rezept_abrufen(rezept_id) if erfolg else None
+            
+            if bild_auftrag:
+                if erfolg:
+                    bildverarbeitung_abrufen().einreichen(bild_auftrag)
+                else:
+                    bildverarbeitung_abrufen().verwerfen(bild_auftrag)
             
             if erfolg:
-                # Aktualisiertes Rezept abrufen
-                aktualisiertes_rezept = rezept_abrufen(rezept_id)
                 return jsonify({
                     'nachricht': 'Rezept erfolgreich aktualisiert',
                     'rezept': aktualisiertes_rezept
@@ -657,6 +493,37 @@ def rezept_aktualisieren_route(token_daten, rezept_id):
         print(f"Fehler beim Aktualisieren des Rezepts: {fehler}")
         return jsonify({'fehler': 'Interner Serverfehler'}), 500
 
+@rezept_bp.route('/<int:rezept_id>/bild', methods=['GET'])
+def rezept_bild_status(rezept_id):
+    """
+    Liefert den Stand der Bildverarbeitung eines Rezepts.
+    
+    @route GET /api/rezepte/{rezept_id}/bild
+    
+    @param {int} rezept_id - ID des Rezepts
+    
+    @return {Object} response
+    @return {string|null} response.bild_status - 'ausstehend', 'fertig', 'fehlgeschlagen'
+        oder null, wenn das Rezept kein Bild hat
+    @return {string|null} response.bild_pfad - Pfad des aktuellen Bildes (während der
+        Verarbeitung eines neuen Bildes das bisherige)
+    
+    @throws {404} Wenn das Rezept nicht gefunden wurde
+    """
+    rezept = rezept_abrufen(rezept_id)
+    if not rezept:
+        return jsonify({'fehler': 'Rezept nicht gefunden'}), 404
+    
+    bild_status = rezept.get('bild_status')
+    if bild_status is None and rezept.get('bild_pfad'):
+        # Bilder aus der Zeit vor der asynchronen Verarbeitung
+        bild_status = STATUS_FERTIG
+    return jsonify({
+        'rezept_id': rezept_id,
+        'bild_status': bild_status,
+        'bild_pfad': rezept.get('bild_pfad')
+    }), 200
+
 @rezept_bp.route('/<int:rezept_id>', methods=['DELETE'])
 @token_required
 def rezept_loeschen_route(token_daten, rezept_id):
@@ -700,6 +567,7 @@ def rezept_loeschen_route(token_daten, rezept_id):
         return jsonify({'fehler': 'Interner Serverfehler'}), 500
 
 @rezept_bp.route('/suche', methods=['GET'])
+@ratenbegrenzt('suche')
 def rezepte_suche_route():
     """
     Sucht nach Rezepten anhand eines Suchbegriffs.
@@ -708,15 +576,21 @@ def rezepte_suche_route():
     
     @query {string} q - Der zu suchende Begriff
     @query {string} [kategorie=''] - Kategorie-ID für Filterung
-    @query {string} [sortierung='newest'] - Sortierungsoption
+    @query {string} [sortierung='newest'] - Sortierungsoption (newest, oldest, name_asc, name_desc, rating, relevance)
     @query {int} [page=1] - Aktuelle Seite
-    @query {int} [limit=10] - Anzahl der Rezepte pro Seite
+    @query {int} [limit=10] - Anzahl der Rezepte pro Seite (höchstens MAX_SEITENGROESSE)
+    @query {string} [cursor] - Cursor aus meta.next_cursor; hat Vorrang vor page
+        (bei sortierung=relevance wird nur page unterstützt)
     
     @return {Object} response
     @return {Array<Object>} response.rezepte - Liste der gefundenen Rezepte
-    @return {Object} response.meta - Metadaten zur Paginierung
+        (bei sortierung=relevance mit Feld relevanz)
+    @return {Object} response.meta - Metadaten zur Paginierung inklusive next_cursor
+        und vorschlag (korrigierte Schreibweise bei unbekannten Wörtern, sonst null)
     
+    @throws {400} Bei fehlendem Suchbegriff oder ungültigem Cursor
     @throws {500} Bei internem Serverfehler
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
     """
     try:
         # Suchbegriff aus der Anfrage extrahieren
@@ -730,7 +604,7 @@ def rezepte_suche_route():
         kategorie = request.args.get('kategorie', default='', type=str)
         sortierung = request.args.get('sortierung', default='newest', type=str)
         page = request.args.get('page', default=1, type=int)
-        limit = request.args.get('limit', default=10, type=int)
+        limit = limit_begrenzen(request.args.get('limit', type=int))
         
         # Kategorie-ID extrahieren
         kategorie_id = None
@@ -741,11 +615,23 @@ def rezepte_suche_route():
         if not kategorie_id:
             kategorie_id = request.args.get('kategorie_id', type=int)
         
-        # Offset berechnen
-        offset = (page - 1) * limit
+        # Offset berechnen (wird bei Cursor-Paginierung ignoriert)
+        offset = (max(page, 1) - 1) * limit
+        
+        # Relevanz hat keinen stabilen Sortierschlüssel und wird nur seitenweise paginiert
+        nach_relevanz = sortierung == 'relevance'
+        try:
+            nach = None if nach_relevanz else cursor_lesen(sortierung)
+        except UngueltigerCursor:
+            return jsonify({'fehler': 'Ungültiger Cursor'}), 400
         
         # Rezepte suchen mit erweiterter Funktion
-        rezepte, total = rezepte_suchen_erweitert(suchbegriff, limit, offset, kategorie_id, sortierung)
+        rezepte, total = rezepte_suchen_erweitert(suchbegriff, limit + 1, offset, kategorie_id, sortierung, nach)
+        if nach_relevanz:
+            rezepte, next_cursor = rezepte[:limit], None
+        else:
+            rezepte, next_cursor = seite_abschliessen(rezepte, limit, sortierung)
+        rezepte_annotieren(rezepte, betrachter_id_ermitteln())
         
         return jsonify({
             'rezepte': rezepte,
@@ -759,13 +645,105 @@ def rezepte_suche_route():
                 'limit': limit,
                 'pages': max(1, (total + limit - 1) // limit),
                 'suchbegriff': suchbegriff,
-                'kategorie': kategorie
+                'kategorie': kategorie,
+                'next_cursor': next_cursor,
+                'vorschlag': suchvorschlag_ermitteln(suchbegriff)
             }
         })
     except Exception as fehler:
         print(f"Fehler bei der Rezeptsuche: {fehler}")
         return jsonify({'fehler': 'Interner Serverfehler'}), 500
 
+# Obergrenze für Vorschläge der Autovervollständigung
+MAX_VORSCHLAEGE = 20
+
+@rezept_bp.route('/autocomplete', methods=['GET'])
+def rezepte_autocomplete_route():
+    """
+    Liefert Vervollständigungen für das Suchfeld ohne Datenbankabfrage.
+    
+    @route GET /api/rezepte/autocomplete
+    
+    @query {string} q - Bisherige Eingabe
+    @query {int} [limit=8] - Anzahl der Vorschläge (höchstens MAX_VORSCHLAEGE)
+    
+    @return {Object} response
+    @return {Array<Object>} response.vorschlaege - Vorschläge mit text, typ
+        (rezept, kategorie, zutat) und bei Rezepten rezept_id, nach Beliebtheit sortiert
+    
+    @throws {500} Bei internem Serverfehler
+    """
+    try:
+        praefix = request.args.get('q', default='', type=str)
+        limit = limit_begrenzen(request.args.get('limit', type=int), standard=8, maximum=MAX_VORSCHLAEGE)
+        
+        # Ohne Index bleibt die Liste leer; das Suchfeld funktioniert trotzdem
+        vorschlaege = suchdienst.vervollstaendigen(praefix, limit) or []
+        
+        return jsonify({'q': praefix, 'vorschlaege': vorschlaege}), 200
+    except Exception as fehler:
+        print(f"Fehler bei der Autovervollständigung: {fehler}")
+        return jsonify({'fehler': 'Interner Serverfehler'}), 500
+
+@rezept_bp.route('/zutaten-suche', methods=['GET'])
+@ratenbegrenzt('suche')
+def rezepte_zutaten_suche_route():
+    """
+    Findet Rezepte, die sich mit den angegebenen Zutaten kochen lassen.
+    
+    @route GET /api/rezepte/zutaten-suche
+    
+    @query {string} zutaten - Kommagetrennte Zutatenliste, z.B. "tomaten,zwiebel"
+    @query {string} [kategorie=''] - Kategorie-ID für Filterung
+    @query {int} [page=1] - Aktuelle Seite
+    @query {int} [limit=10] - Anzahl der Rezepte pro Seite (höchstens MAX_SEITENGROESSE)
+    
+    @return {Object} response
+    @return {Array<Object>} response.rezepte - Rezepte, absteigend nach Anzahl passender Zutaten,
+        jeweils mit passende_zutaten und fehlende_zutaten
+    @return {Object} response.meta - Metadaten zur Paginierung
+    
+    @throws {400} Wenn keine Zutaten angegeben wurden
+    @throws {503} Wenn der Zutatenindex vorübergehend nicht verfügbar ist
+    @throws {500} Bei internem Serverfehler
+    @throws {429} Bei zu vielen Anfragen (mit Retry-After)
+    """
+    try:
+        zutaten = [zutat.strip() for zutat in request.args.get('zutaten', '').split(',') if zutat.strip()]
+        if not zutaten:
+            return jsonify({'fehler': 'Mindestens eine Zutat ist erforderlich'}), 400
+        
+        kategorie = request.args.get('kategorie', default='', type=str)
+        page = request.args.get('page', default=1, type=int)
+        limit = limit_begrenzen(request.args.get('limit', type=int))
+        kategorie_id = int(kategorie) if kategorie.isdigit() else None
+        offset = (max(page, 1) - 1) * limit
+        
+        ergebnis = rezepte_nach_zutaten_suchen(zutaten, limit, offset, kategorie_id)
+        if ergebnis is None:
+            return jsonify({'fehler': 'Zutatensuche vorübergehend nicht verfügbar'}), 503
+        rezepte, total = ergebnis
+        rezepte_annotieren(rezepte, betrachter_id_ermitteln())
+        
+        return jsonify({
+            'rezepte': rezepte,
+            'total': total,
+            'page': page,
+            'limit': limit,
+            'meta': {
+                'anzahl': len(rezepte),
+                'total': total,
+                'page': page,
+                'limit': limit,
+                'pages': max(1, (total + limit - 1) // limit),
+                'zutaten': zutaten,
+                'kategorie': kategorie
+            }
+        }), 200
+    except Exception as fehler:
+        print(f"Fehler bei der Zutatensuche: {fehler}")
+        return jsonify({'fehler': 'Interner Serverfehler'}), 500
+
 @rezept_bp.route('/benutzer', methods=['GET'])
 @token_required
 def benutzer_rezepte(token_daten):
@@ -779,30 +757,39 @@ def benutzer_rezepte(token_daten):
     @query {int} [limit=10] - Maximale Anzahl der zurückzugebenden Rezepte
     @query {int} [offset=0] - Anzahl der zu überspringenden Rezepte
     @query {int} [page=1] - Seitennummer (wird in offset umgewandelt)
+    @query {string} [cursor] - Cursor aus meta.next_cursor; hat Vorrang vor offset
     
     @return {Object} response
     @return {Array<Object>} response.rezepte - Liste der Benutzerrezepte
-    @return {Object} response.meta - Metadaten zur Paginierung
+    @return {Object} response.meta - Metadaten zur Paginierung inklusive next_cursor
     
+    @throws {400} Bei ungültigem Cursor
     @throws {401} Bei fehlendem oder ungültigem Token
     """
     try:
         benutzer_id = token_daten['benutzer_id']
         
         # Parameter aus der Anfrage extrahieren
-        limit = request.args.get('limit', default=10, type=int)
+        limit = limit_begrenzen(request.args.get('limit', type=int))
         page = request.args.get('page', default=1, type=int)
-        offset = request.args.get('offset', default=(page-1)*limit, type=int)
+        offset = max(0, request.args.get('offset', default=(max(page, 1)-1)*limit, type=int))
+        
+        try:
+            nach = cursor_lesen('newest')
+        except UngueltigerCursor:
+            return jsonify({'fehler': 'Ungültiger Cursor'}), 400
         
         # Rezepte des Benutzers abrufen
-        rezepte = rezepte_auflisten(limit, offset, benutzer_id, None)
+        rezepte = rezepte_auflisten(limit + 1, offset, benutzer_id, None, nach)
+        rezepte, next_cursor = seite_abschliessen(rezepte, limit, 'newest')
         
         # Metadaten für Paginierung
         metadaten = {
             'anzahl': len(rezepte),
             'limit': limit,
             'offset': offset,
-            'page': page
+            'page': page,
+            'next_cursor': next_cursor
         }
         
         return jsonify({
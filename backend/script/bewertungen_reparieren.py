@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+@fileoverview Abgleich der denormalisierten Bewertungskennzahlen
+@module bewertungen_reparieren
+
+Berechnet bewertung_summe, bewertung_anzahl und bewertung_durchschnitt auf der
+Tabelle rezepte vollständig aus der Tabelle bewertungen neu. Nützlich nach
+direkten Datenbankeingriffen oder als Backfill nach einem Import.
+
+Aufruf:
+    python script/bewertungen_reparieren.py            # alle Rezepte
+    python script/bewertungen_reparieren.py <rezept_id>
+"""
+import sys
+from pathlib import Path
+
+# Backend-Verzeichnis zum Python-Pfad hinzufügen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.bewertung import bewertungsaggregate_reparieren
+
+
+def main(argumente):
+    rezept_id = int(argumente[0]) if argumente else None
+
+    print("🔧 Berechne Bewertungskennzahlen neu...")
+    korrigiert = bewertungsaggregate_reparieren(rezept_id)
+
+    if korrigiert is None:
+        print("❌ Abgleich fehlgeschlagen")
+        return 1
+
+    print(f"✅ {korrigiert} Rezept(e) korrigiert")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
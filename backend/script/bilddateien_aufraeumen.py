@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+@fileoverview Abgleich und Aufräumen der inhaltsadressierten Bilddateien
+@module bilddateien_aufraeumen
+
+Berechnet die Referenzzähler der Tabelle bilddateien aus rezepte.bild_pfad und
+benutzer.profilbild_url neu und entfernt danach Dateien in static/uploads und
+static/profile_images, auf die seit der Karenzzeit (BILD_KARENZZEIT) nichts mehr
+verweist. Für einen regelmäßigen Lauf, z.B. täglich per Cron.
+
+Aufruf:
+    python script/bilddateien_aufraeumen.py
+"""
+import os
+import sys
+from pathlib import Path
+
+# Backend-Verzeichnis zum Python-Pfad hinzufügen
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from models.bilddatei import ART_PROFIL, ART_REZEPT, bilddateien_aufraeumen, bilddateien_reparieren
+
+
+def main(argumente):
+    print("🔧 Gleiche Bildreferenzen ab...")
+    korrigiert = bilddateien_reparieren()
+    if korrigiert is None:
+        print("❌ Abgleich fehlgeschlagen")
+        return 1
+    print(f"✅ {korrigiert} Zähler korrigiert")
+
+    print("🧹 Entferne unreferenzierte Bilddateien...")
+    entfernt = bilddateien_aufraeumen({
+        ART_REZEPT: os.path.join(backend_dir, 'static', 'uploads'),
+        ART_PROFIL: os.path.join(backend_dir, 'static', 'profile_images')
+    })
+    if entfernt is None:
+        print("❌ Aufräumen fehlgeschlagen")
+        return 1
+    print(f"✅ {entfernt} Datei(en) entfernt")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
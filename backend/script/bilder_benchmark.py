@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+@fileoverview Vergleich der Bildverarbeitung: bisheriger Pfad gegen Bild-Engine
+@module bilder_benchmark
+
+Misst für ein Eingabebild die Zeit bis zu allen gespeicherten Ausgaben:
+- bisher: Prüf-Öffnen, optimize_image (Dekodierung 1) und create_thumbnail
+  (Dekodierung 2) wie im früheren bild_speichern, nur Vollbild und Thumbnail
+- Engine: eine Dekodierung (JPEG im Draft-Modus), Vollbild, responsive Breiten
+  je Format (BILD_BREITEN, BILD_FORMATE) und Thumbnail (utils/bilder.py)
+
+Ohne Eingabedatei wird ein synthetisches Handyfoto (4032x3024 JPEG) erzeugt.
+
+Aufruf:
+    python script/bilder_benchmark.py [bild] [--wiederholungen N]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Backend-Verzeichnis zum Python-Pfad hinzufügen
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+from utils.bilder import ausgabe_dateien, renditionen_speichern
+
+
+def _testbild():
+    # Verlauf mit Rauschen, damit der JPEG-Decoder realistisch arbeiten muss
+    breite, hoehe = 4032, 3024
+    verlauf = Image.linear_gradient('L').resize((breite, hoehe))
+    rauschen = Image.effect_noise((breite, hoehe), 40)
+    bild = Image.merge('RGB', (verlauf, rauschen, verlauf.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    puffer = io.BytesIO()
+    bild.save(puffer, 'JPEG', quality=92)
+    return puffer.getvalue()
+
+
+def _bisheriger_pfad(daten, verzeichnis):
+    original = os.path.join(verzeichnis, 'alt_temp.jpg')
+    with open(original, 'wb') as datei:
+        datei.write(daten)
+    with Image.open(original) as test_img:
+        test_img.verify()
+    with Image.open(original) as img:
+        img = img.convert('RGB')
+        img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+        img.save(os.path.join(verzeichnis, 'alt.jpg'), 'JPEG', quality=90, optimize=True)
+    with Image.open(original) as img:
+        img = img.convert('RGB')
+        img.thumbnail((300, 200), Image.Resampling.LANCZOS)
+        img.save(os.path.join(verzeichnis, 'alt_thumb.jpg'), 'JPEG', quality=85, optimize=True)
+    os.remove(original)
+
+
+def _ausgaben():
+    return len(ausgabe_dateien('neu'))
+
+
+def _engine(daten, verzeichnis):
+    renditionen_speichern(io.BytesIO(daten), verzeichnis, 'neu')
+
+
+def _messen(funktion, daten, wiederholungen):
+    zeiten = []
+    with tempfile.TemporaryDirectory() as verzeichnis:
+        funktion(daten, verzeichnis)  # Aufwärmen
+        for _ in range(wiederholungen):
+            begonnen = time.perf_counter()
+            funktion(daten, verzeichnis)
+            zeiten.append((time.perf_counter() - begonnen) * 1000)
+    return statistics.median(zeiten), min(zeiten)
+
+
+def main(argumente):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('bild', nargs='?', help='Eingabebild (Standard: synthetisches 12-MP-JPEG)')
+    parser.add_argument('--wiederholungen', type=int, default=10)
+    optionen = parser.parse_args(argumente)
+
+    if optionen.bild:
+        daten = Path(optionen.bild).read_bytes()
+    else:
+        daten = _testbild()
+    with Image.open(io.BytesIO(daten)) as bild:
+        print(f"🖼️  Eingabe: {bild.format} {bild.size[0]}x{bild.size[1]}, {len(daten) / 1024 / 1024:.1f} MB")
+
+    alt_median, alt_min = _messen(_bisheriger_pfad, daten, optionen.wiederholungen)
+    neu_median, neu_min = _messen(_engine, daten, optionen.wiederholungen)
+
+    print(f"bisher (2 Ausgaben):  Median {alt_median:8.1f} ms   Minimum {alt_min:8.1f} ms")
+    print(f"Engine ({_ausgaben()} Ausgaben):  Median {neu_median:8.1f} ms   Minimum {neu_min:8.1f} ms")
+    print(f"Faktor: {alt_median / neu_median:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main(sys.argv[1:]))
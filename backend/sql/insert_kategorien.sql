@@ -1,8 +0,0 @@
--- Inserir categorias alemãs para o sistema de receitas
-INSERT IGNORE INTO kategorien (name, beschreibung) VALUES
-('Vorspeise', 'Appetizers and starters'),
-('Hauptgericht', 'Main dishes and entrees'),
-('Nachspeise', 'Desserts and sweet treats'),
-('Snack', 'Small bites and appetizers'),
-('Alkoholfreie Getränke', 'Non-alcoholic beverages'),
-('Alkoholische Getränke', 'Alcoholic beverages'); 
\ No newline at end of file
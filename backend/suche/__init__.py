@@ -0,0 +1,11 @@
+"""
+@fileoverview Initialisierungsmodul für das Suche-Paket
+@module suche
+
+Dieses Paket enthält die prozesslokale Rezeptsuche:
+- normalisierung: Textnormalisierung und Stammformen
+- volltext, zutaten, trigramme, autovervollstaendigung: die einzelnen Indizes
+- suchdienst: Aufbau, Aktualisierung und Abruf der Indizes
+
+Die Module werden direkt importiert (z.B. `from suche import suchdienst`).
+"""
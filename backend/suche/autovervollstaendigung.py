@@ -0,0 +1,207 @@
+"""
+@fileoverview Präfixbaum für die Autovervollständigung im Suchfeld
+@module autovervollstaendigung
+
+Dieses Modul liefert Vervollständigungen ohne Datenbankzugriff:
+- Einträge für Rezepttitel, Kategorien und Zutatennamen
+- Treffer am Anfang jedes Wortes ("bolo" -> "Spaghetti Bolognese")
+- Gewichtung nach Beliebtheit (Bewertungen bzw. Anzahl der Rezepte)
+- Top-k per Bestensuche über das Maximalgewicht je Teilbaum
+- Inkrementelle Pflege beim Hinzufügen, Ersetzen und Entfernen von Rezepten
+"""
+
+import heapq
+import itertools
+import threading
+from collections import Counter
+
+from suche.normalisierung import text_normalisieren, zutaten_namen
+
+# Maximale Tiefe des Baums; längere Anfragen werden an den Einträgen nachgeprüft
+MAX_TIEFE = 12
+
+
+def _schluessel(text):
+    """
+    Normalisiert einen Text zu einem Vergleichsschlüssel mit einfachen Leerzeichen.
+    """
+    return ' '.join(text_normalisieren(text).split())
+
+
+def _wortanfaenge(schluessel):
+    """
+    Liefert die Teilschlüssel ab jedem Wortanfang, gekürzt auf MAX_TIEFE.
+    """
+    teile = schluessel.split(' ')
+    return {' '.join(teile[i:])[:MAX_TIEFE] for i in range(len(teile))}
+
+
+class _Knoten:
+    __slots__ = ('kinder', 'eintraege', 'bestes')
+
+    def __init__(self):
+        self.kinder = {}
+        self.eintraege = {}
+        self.bestes = 0
+
+
+class Praefixbaum:
+    """
+    Thread-sicherer Präfixbaum mit gewichteten Einträgen.
+
+    Ein Eintrag ist ein Tupel (typ, schluessel, rezept_id); Kategorien und
+    Zutaten werden über alle Rezepte zusammengefasst (rezept_id None).
+    """
+
+    def __init__(self):
+        self._wurzel = _Knoten()
+        self._gewichte = Counter()
+        self._anzeige = {}
+        self._rezept_beitraege = {}
+        self._sperre = threading.RLock()
+
+    def hinzufuegen(self, rezept_id, titel='', kategorie_name=None, zutaten=None, beliebtheit=1):
+        """
+        Nimmt die Vervollständigungen eines Rezepts auf oder ersetzt sie.
+
+        @param {int} rezept_id - ID des Rezepts
+        @param {string} [titel] - Titel des Rezepts
+        @param {string} [kategorie_name] - Name der Kategorie
+        @param {string|Array} [zutaten] - Zutaten als JSON-String oder Liste
+        @param {int} [beliebtheit=1] - Gewicht des Rezepttitels, z.B. 1 + Anzahl der Bewertungen
+        """
+        beitraege = {}
+        anzeige = {}
+        if titel and _schluessel(titel):
+            eintrag = ('rezept', _schluessel(titel), rezept_id)
+            beitraege[eintrag] = max(int(beliebtheit or 0), 1)
+            anzeige[eintrag] = titel.strip()
+        if kategorie_name and _schluessel(kategorie_name):
+            eintrag = ('kategorie', _schluessel(kategorie_name), None)
+            beitraege[eintrag] = 1
+            anzeige[eintrag] = kategorie_name.strip()
+        for name in zutaten_namen(zutaten):
+            if _schluessel(name):
+                eintrag = ('zutat', _schluessel(name), None)
+                beitraege[eintrag] = 1
+                anzeige.setdefault(eintrag, name)
+
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+            for eintrag, gewicht in beitraege.items():
+                self._anzeige.setdefault(eintrag, anzeige[eintrag])
+                self._gewicht_aendern(eintrag, gewicht)
+            self._rezept_beitraege[rezept_id] = beitraege
+
+    def entfernen(self, rezept_id):
+        """
+        Entfernt die Beiträge eines Rezepts.
+
+        @param {int} rezept_id - ID des Rezepts
+        """
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+
+    def _entfernen_ohne_sperre(self, rezept_id):
+        for eintrag, gewicht in self._rezept_beitraege.pop(rezept_id, {}).items():
+            self._gewicht_aendern(eintrag, -gewicht)
+
+    def _gewicht_aendern(self, eintrag, differenz):
+        gewicht = self._gewichte[eintrag] + differenz
+        if gewicht > 0:
+            self._gewichte[eintrag] = gewicht
+        else:
+            del self._gewichte[eintrag]
+            self._anzeige.pop(eintrag, None)
+
+        for teilschluessel in _wortanfaenge(eintrag[1]):
+            pfad = [self._wurzel]
+            for zeichen in teilschluessel:
+                knoten = pfad[-1].kinder.get(zeichen)
+                if knoten is None:
+                    knoten = pfad[-1].kinder[zeichen] = _Knoten()
+                pfad.append(knoten)
+
+            if gewicht > 0:
+                pfad[-1].eintraege[eintrag] = gewicht
+            else:
+                pfad[-1].eintraege.pop(eintrag, None)
+
+            # Maximalgewichte von unten nach oben anpassen, bis sich nichts mehr ändert
+            for tiefe in range(len(pfad) - 1, -1, -1):
+                knoten = pfad[tiefe]
+                bisher = knoten.bestes
+                if differenz > 0:
+                    knoten.bestes = max(bisher, gewicht)
+                else:
+                    knoten.bestes = max(
+                        max(knoten.eintraege.values(), default=0),
+                        max((kind.bestes for kind in knoten.kinder.values()), default=0)
+                    )
+                    # Leere Knoten abhängen
+                    if tiefe and not knoten.bestes:
+                        del pfad[tiefe - 1].kinder[teilschluessel[tiefe - 1]]
+                if knoten.bestes == bisher:
+                    break
+
+    def vervollstaendigen(self, praefix, anzahl=8):
+        """
+        Liefert die beliebtesten Vervollständigungen für einen Präfix.
+
+        @param {string} praefix - Eingabe im Suchfeld
+        @param {int} [anzahl=8] - Maximale Anzahl der Vorschläge
+        @return {Array<Object>} Vorschläge mit text, typ und (bei Rezepten) rezept_id,
+            absteigend nach Gewicht
+        """
+        gesucht = _schluessel(praefix)
+        if not gesucht:
+            return []
+
+        with self._sperre:
+            knoten = self._wurzel
+            for zeichen in gesucht[:MAX_TIEFE]:
+                knoten = knoten.kinder.get(zeichen)
+                if knoten is None:
+                    return []
+
+            reihenfolge = itertools.count()
+            warteschlange = [(-knoten.bestes, next(reihenfolge), knoten, None)]
+            ergebnisse = []
+            gesehen = set()
+            while warteschlange and len(ergebnisse) < anzahl:
+                _, _, knoten, eintrag = heapq.heappop(warteschlange)
+                if knoten is None:
+                    if eintrag in gesehen:
+                        continue
+                    gesehen.add(eintrag)
+                    if len(gesucht) > MAX_TIEFE and not self._passt(eintrag, gesucht):
+                        continue
+                    typ, _, rezept_id = eintrag
+                    vorschlag = {'text': self._anzeige[eintrag], 'typ': typ}
+                    if rezept_id is not None:
+                        vorschlag['rezept_id'] = rezept_id
+                    ergebnisse.append(vorschlag)
+                    continue
+                for kind_eintrag, gewicht in knoten.eintraege.items():
+                    heapq.heappush(warteschlange, (-gewicht, next(reihenfolge), None, kind_eintrag))
+                for kind in knoten.kinder.values():
+                    heapq.heappush(warteschlange, (-kind.bestes, next(reihenfolge), kind, None))
+            return ergebnisse
+
+    @staticmethod
+    def _passt(eintrag, gesucht):
+        schluessel = eintrag[1]
+        return schluessel.startswith(gesucht) or f" {gesucht}" in schluessel
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zum Präfixbaum.
+
+        @return {Object} Anzahl der Vervollständigungen
+        """
+        with self._sperre:
+            return {'vervollstaendigungen': len(self._gewichte)}
+
+    def __len__(self):
+        with self._sperre:
+            return len(self._gewichte)
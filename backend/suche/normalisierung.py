@@ -0,0 +1,102 @@
+"""
+@fileoverview Textnormalisierung für die Rezeptsuche
+@module normalisierung
+
+Dieses Modul bereitet deutsche Texte für den Suchindex auf:
+- Kleinschreibung, Umlaute und ß, Entfernen von Akzenten
+- Zerlegung in Wörter und Entfernen von Stoppwörtern
+- Einfache Stammformreduktion (angelehnt an CISTEM)
+- Extraktion der Zutatennamen aus dem gespeicherten JSON
+"""
+
+import json
+import re
+import unicodedata
+
+_WORT_MUSTER = re.compile(r'[a-z0-9]+')
+
+_ERSETZUNGEN = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+
+STOPPWOERTER = frozenset({
+    'und', 'oder', 'mit', 'ohne', 'der', 'die', 'das', 'den', 'dem', 'des',
+    'ein', 'eine', 'einen', 'einem', 'einer', 'von', 'vom', 'zu', 'zum', 'zur',
+    'in', 'im', 'an', 'am', 'auf', 'aus', 'bei', 'fur', 'nach', 'mit', 'uber',
+    'unter', 'bis', 'dann', 'auch', 'noch', 'etwas', 'sowie', 'so', 'es', 'ist',
+    'sie', 'er', 'wir', 'ihr', 'man', 'nicht', 'als', 'wie', 'alle', 'alles'
+})
+
+
+def text_normalisieren(text):
+    """
+    Normalisiert einen Text für Vergleiche: klein, ohne Umlaute und Akzente.
+
+    @param {string} text - Beliebiger Text
+    @return {string} Normalisierter Text
+    """
+    text = (text or '').lower().translate(_ERSETZUNGEN)
+    zerlegt = unicodedata.normalize('NFKD', text)
+    return ''.join(zeichen for zeichen in zerlegt if not unicodedata.combining(zeichen))
+
+
+def woerter(text):
+    """
+    Zerlegt einen Text in normalisierte Wörter (ohne Stammformreduktion).
+
+    @param {string} text - Beliebiger Text
+    @return {Array<string>} Wörter in Originalreihenfolge
+    """
+    return _WORT_MUSTER.findall(text_normalisieren(text))
+
+
+def stammform(wort):
+    """
+    Reduziert ein normalisiertes Wort auf eine einfache Stammform.
+
+    Vereinfachte Variante des CISTEM-Verfahrens: häufige Flexionsendungen
+    werden abgeschnitten, solange das Wort länger als drei Zeichen ist.
+    "sch", "ie" und "ei" werden dabei als ein Zeichen behandelt.
+
+    @param {string} wort - Normalisiertes Wort
+    @return {string} Stammform
+    """
+    if wort.isdigit():
+        return wort
+    wort = wort.replace('sch', '$').replace('ie', '&').replace('ei', '%')
+    while len(wort) > 3:
+        if len(wort) > 5 and wort[-2:] in ('em', 'er', 'nd'):
+            wort = wort[:-2]
+        elif wort[-1] in 'testn':
+            wort = wort[:-1]
+        else:
+            break
+    return wort.replace('%', 'ei').replace('&', 'ie').replace('$', 'sch')
+
+
+def terme(text):
+    """
+    Liefert die Suchterme eines Textes: normalisiert, ohne Stoppwörter, gestemmt.
+
+    @param {string} text - Beliebiger Text
+    @return {Array<string>} Suchterme in Originalreihenfolge (mit Wiederholungen)
+    """
+    return [stammform(wort) for wort in woerter(text) if wort not in STOPPWOERTER]
+
+
+def zutaten_namen(zutaten):
+    """
+    Extrahiert die Zutatennamen aus der gespeicherten Zutatenliste.
+
+    @param {string|Array} zutaten - JSON-String oder Liste aus Objekten ({name, ...}) bzw. Strings
+    @return {Array<string>} Zutatennamen (nicht normalisiert)
+    """
+    if isinstance(zutaten, str):
+        try:
+            zutaten = json.loads(zutaten)
+        except (TypeError, ValueError):
+            return [zutaten] if zutaten.strip() else []
+    namen = []
+    for zutat in zutaten or []:
+        name = zutat.get('name') if isinstance(zutat, dict) else zutat
+        if isinstance(name, str) and name.strip():
+            namen.append(name.strip())
+    return namen
@@ -0,0 +1,396 @@
+"""
+@fileoverview Lebenszyklus des prozesslokalen Suchindex
+@module suchdienst
+
+Dieses Modul verwaltet den Suchindex der Anwendung:
+- Verzögerter Aufbau aus der Tabelle rezepte beim ersten Zugriff
+- Inkrementelle Aktualisierung bei Schreibvorgängen auf Rezepte, innerhalb
+  einer Arbeitseinheit erst nach deren Commit (db.nach_commit)
+- Änderungen anderer Worker-Prozesse kommen als Nachrichten über das
+  Cache-Backend und werden beim nächsten Zugriff nachgeladen
+- Periodischer Neuaufbau im Hintergrund (gleicht verlorene Nachrichten aus);
+  währenddessen geänderte Rezepte werden nach dem Austausch erneut übernommen
+- Rückfall auf die SQL-Suche, wenn der Index nicht verfügbar ist
+
+Volltext-, Zutaten- und Trigrammindex sowie der Präfixbaum für die
+Autovervollständigung werden gemeinsam aufgebaut und ausgetauscht,
+damit alle stets denselben Datenstand abbilden.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+
+from db import nach_commit, verbindung_verwalten
+from utils.cachebackend import cache_backend
+from suche.autovervollstaendigung import Praefixbaum
+from suche.normalisierung import stammform
+from suche.trigramme import Trigrammindex
+from suche.volltext import Suchindex
+from suche.zutaten import Zutatenindex
+
+SUCHINDEX_AKTIV = os.getenv('SUCHINDEX_AKTIV', 'true').lower() in ('1', 'true', 'ja')
+# Maximales Alter des Index in Sekunden, bevor er im Hintergrund neu aufgebaut wird
+SUCHINDEX_MAX_ALTER = float(os.getenv('SUCHINDEX_MAX_ALTER', 300))
+# Wartezeit nach einem fehlgeschlagenen Aufbau, bevor erneut versucht wird
+_WIEDERHOLEN_NACH = 30.0
+
+# Gemeinsam aufgebaute Indizes eines Datenstands
+Indizes = namedtuple('Indizes', ['volltext', 'zutaten', 'trigramme', 'praefixe'])
+
+_indizes = None
+_aufgebaut_um = 0.0
+_fehlgeschlagen_um = None
+_neuaufbau_laeuft = False
+# Rezepte, die ein anderer Prozess geändert hat und die noch nachzuladen sind
+_ausstehend = set()
+# Während eines Neuaufbaus geänderte Rezepte; der neue Index kann ältere Zeilen enthalten
+_waehrend_neuaufbau = set()
+_sperre = threading.Lock()
+
+
+def _rezepte_laden(rezept_ids=None):
+    """
+    Lädt die indexrelevanten Spalten aller (oder ausgewählter) Rezepte.
+
+    @param {Array<int>} [rezept_ids] - Nur diese Rezepte laden
+    @return {Array<Object>} Rezeptzeilen
+    """
+    with verbindung_verwalten() as verbindung:
+        cursor = verbindung.cursor(dictionary=True)
+        sql = """
+        SELECT r.id, r.titel, r.zutaten, r.zubereitung, r.kategorie_id,
+               r.erstellungsdatum, r.bewertung_durchschnitt, r.bewertung_anzahl,
+               k.name AS kategorie_name
+        FROM rezepte r
+        LEFT JOIN kategorien k ON r.kategorie_id = k.id
+        """
+        parameter = []
+        if rezept_ids is not None:
+            sql += " WHERE r.id IN (" + ", ".join(["%s"] * len(rezept_ids)) + ")"
+            parameter = list(rezept_ids)
+        cursor.execute(sql, parameter)
+        return cursor.fetchall()
+
+
+def _aufnehmen(indizes, zeile):
+    indizes.volltext.hinzufuegen(
+        zeile['id'],
+        titel=zeile.get('titel'),
+        zutaten=zeile.get('zutaten'),
+        zubereitung=zeile.get('zubereitung'),
+        kategorie_id=zeile.get('kategorie_id'),
+        # Sortierwerte für die Suche nach Datum und Bewertung (utils/paginierung.py)
+        erstellungsdatum=zeile.get('erstellungsdatum'),
+        bewertung_durchschnitt=zeile.get('bewertung_durchschnitt')
+    )
+    indizes.zutaten.hinzufuegen(
+        zeile['id'],
+        zeile.get('zutaten'),
+        kategorie_id=zeile.get('kategorie_id')
+    )
+    indizes.trigramme.hinzufuegen(zeile['id'], zeile.get('titel'), zeile.get('zutaten'))
+    indizes.praefixe.hinzufuegen(
+        zeile['id'],
+        titel=zeile.get('titel'),
+        kategorie_name=zeile.get('kategorie_name'),
+        zutaten=zeile.get('zutaten'),
+        beliebtheit=1 + (zeile.get('bewertung_anzahl') or 0)
+    )
+
+
+def _entfernen(indizes, rezept_id):
+    indizes.volltext.entfernen(rezept_id)
+    indizes.zutaten.entfernen(rezept_id)
+    indizes.trigramme.entfernen(rezept_id)
+    indizes.praefixe.entfernen(rezept_id)
+
+
+def index_aufbauen(zeilen=None):
+    """
+    Baut alle Suchindizes vollständig auf.
+
+    @param {Array<Object>} [zeilen] - Rezeptzeilen; ohne Angabe aus der Datenbank geladen
+    @return {Indizes} Die neuen Indizes
+    """
+    indizes = Indizes(Suchindex(), Zutatenindex(), Trigrammindex(), Praefixbaum())
+    for zeile in (_rezepte_laden() if zeilen is None else zeilen):
+        _aufnehmen(indizes, zeile)
+    return indizes
+
+
+def _geaendert_merken(rezept_ids):
+    """
+    Merkt Rezepte vor, die während eines Neuaufbaus im bisherigen Index
+    aktualisiert werden; sie werden nach dem Austausch im neuen Index wiederholt.
+    """
+    if not _neuaufbau_laeuft:
+        return
+    with _sperre:
+        if _neuaufbau_laeuft:
+            _waehrend_neuaufbau.update(rezept_ids)
+
+
+def _neuaufbau_im_hintergrund():
+    global _neuaufbau_laeuft
+
+    def aufbauen():
+        global _indizes, _aufgebaut_um, _neuaufbau_laeuft
+        try:
+            neu = index_aufbauen()
+            with _sperre:
+                _indizes, _aufgebaut_um = neu, time.monotonic()
+                _neuaufbau_laeuft = False
+                _ausstehend.update(_waehrend_neuaufbau)
+                _waehrend_neuaufbau.clear()
+            _ausstehende_uebernehmen(neu)
+        except Exception as fehler:
+            print(f"⚠️  Neuaufbau des Suchindex fehlgeschlagen: {fehler}")
+        finally:
+            with _sperre:
+                _neuaufbau_laeuft = False
+                _waehrend_neuaufbau.clear()
+
+    with _sperre:
+        if _neuaufbau_laeuft:
+            return
+        _neuaufbau_laeuft = True
+    threading.Thread(target=aufbauen, name='suchindex-neuaufbau', daemon=True).start()
+
+
+def _indizes_abrufen():
+    global _indizes, _aufgebaut_um, _fehlgeschlagen_um
+
+    if not SUCHINDEX_AKTIV:
+        return None
+
+    indizes = _indizes
+    if indizes is None:
+        with _sperre:
+            if _indizes is None:
+                if _fehlgeschlagen_um and time.monotonic() - _fehlgeschlagen_um < _WIEDERHOLEN_NACH:
+                    return None
+                try:
+                    _indizes = index_aufbauen()
+                    _aufgebaut_um = time.monotonic()
+                    _fehlgeschlagen_um = None
+                    print(f"🔎 Suchindex aufgebaut: {len(_indizes.volltext)} Rezepte")
+                except Exception as fehler:
+                    print(f"⚠️  Suchindex nicht verfügbar, nutze SQL-Suche: {fehler}")
+                    _fehlgeschlagen_um = time.monotonic()
+                    return None
+            indizes = _indizes
+    else:
+        if _ausstehend:
+            _ausstehende_uebernehmen(indizes)
+        if time.monotonic() - _aufgebaut_um > SUCHINDEX_MAX_ALTER:
+            _neuaufbau_im_hintergrund()
+    return indizes
+
+
+def _ausstehende_uebernehmen(indizes):
+    """
+    Lädt die von anderen Prozessen gemeldeten Rezepte nach.
+    """
+    with _sperre:
+        if indizes is not _indizes:
+            # Inzwischen ausgetauscht; die Vormerkungen gelten dem neuen Index
+            return
+        rezept_ids = list(_ausstehend)
+        _ausstehend.clear()
+        if _neuaufbau_laeuft:
+            _waehrend_neuaufbau.update(rezept_ids)
+    if not rezept_ids:
+        return
+    try:
+        zeilen = {zeile['id']: zeile for zeile in _rezepte_laden(rezept_ids)}
+    except Exception as fehler:
+        print(f"⚠️  Geänderte Rezepte konnten nicht nachgeladen werden: {fehler}")
+        with _sperre:
+            _ausstehend.update(rezept_ids)
+        return
+    for rezept_id in rezept_ids:
+        if rezept_id in zeilen:
+            _aufnehmen(indizes, zeilen[rezept_id])
+        else:
+            _entfernen(indizes, rezept_id)
+
+
+def _aenderung_empfangen(daten):
+    """
+    Merkt ein in einem anderen Prozess geändertes Rezept vor; ohne Angabe
+    wird der Index beim nächsten Zugriff neu aufgebaut.
+    """
+    global _aufgebaut_um
+    with _sperre:
+        if daten.get('rezept_id') is not None:
+            _ausstehend.add(daten['rezept_id'])
+        else:
+            _aufgebaut_um = 0.0
+
+
+cache_backend.abonnieren('suchindex', _aenderung_empfangen)
+
+
+def suchindex_abrufen():
+    """
+    Liefert den Volltextindex und baut ihn beim ersten Zugriff auf.
+
+    @return {Suchindex|None} Der Index oder None, wenn er deaktiviert oder
+        (vorübergehend) nicht aufbaubar ist
+    """
+    indizes = _indizes_abrufen()
+    return indizes.volltext if indizes is not None else None
+
+
+def zutatenindex_abrufen():
+    """
+    Liefert den Zutatenindex und baut ihn beim ersten Zugriff auf.
+
+    @return {Zutatenindex|None} Der Index oder None, wenn er deaktiviert oder
+        (vorübergehend) nicht aufbaubar ist
+    """
+    indizes = _indizes_abrufen()
+    return indizes.zutaten if indizes is not None else None
+
+
+def vervollstaendigen(praefix, anzahl=8):
+    """
+    Liefert Vervollständigungen für das Suchfeld aus dem Präfixbaum.
+
+    @param {string} praefix - Bisherige Eingabe
+    @param {int} [anzahl=8] - Maximale Anzahl der Vorschläge
+    @return {Array<Object>|None} Vorschläge oder None, wenn der Index nicht verfügbar ist
+    """
+    indizes = _indizes_abrufen()
+    if indizes is None:
+        return None
+    return indizes.praefixe.vervollstaendigen(praefix, anzahl)
+
+
+def korrektur_vorschlagen(anfrage):
+    """
+    Schlägt eine korrigierte Schreibweise für eine Suchanfrage vor.
+
+    Wörter, deren Suchterm im Volltextindex vorkommt, bleiben unverändert;
+    alle anderen werden durch das ähnlichste Wort aus Titeln und Zutaten ersetzt.
+
+    @param {string} anfrage - Suchanfrage des Benutzers
+    @return {string|None} Vorschlag ("Meinten Sie ...?") oder None
+    """
+    indizes = _indizes_abrufen()
+    if indizes is None:
+        return None
+    return indizes.trigramme.korrigieren(
+        anfrage, lambda wort: indizes.volltext.enthaelt_term(stammform(wort))
+    )
+
+
+def rezept_indexieren(rezept_id):
+    """
+    Übernimmt den aktuellen Stand eines Rezepts in den Index.
+
+    Ist der Index noch nicht aufgebaut, passiert nichts – er wird beim
+    nächsten Zugriff ohnehin mit aktuellen Daten erstellt. Innerhalb einer
+    Arbeitseinheit geschieht das (wie die Meldung an andere Prozesse) erst
+    nach deren Commit, damit ein Rollback keine Phantomtreffer hinterlässt.
+
+    @param {int} rezept_id - ID des erstellten oder geänderten Rezepts
+    """
+    nach_commit(lambda: _rezept_uebernehmen(rezept_id))
+
+
+def _rezept_uebernehmen(rezept_id):
+    cache_backend.nachricht_senden('suchindex', rezept_id=rezept_id)
+    _geaendert_merken([rezept_id])
+    indizes = _indizes
+    if indizes is None:
+        return
+    try:
+        zeilen = _rezepte_laden([rezept_id])
+        if zeilen:
+            _aufnehmen(indizes, zeilen[0])
+        else:
+            _entfernen(indizes, rezept_id)
+    except Exception as fehler:
+        print(f"⚠️  Rezept {rezept_id} konnte nicht indexiert werden: {fehler}")
+
+
+def rezept_aus_index_entfernen(rezept_id):
+    """
+    Entfernt ein gelöschtes Rezept aus dem Index (in einer Arbeitseinheit nach deren Commit).
+
+    @param {int} rezept_id - ID des gelöschten Rezepts
+    """
+    def entfernen():
+        cache_backend.nachricht_senden('suchindex', rezept_id=rezept_id)
+        _geaendert_merken([rezept_id])
+        indizes = _indizes
+        if indizes is not None:
+            _entfernen(indizes, rezept_id)
+
+    nach_commit(entfernen)
+
+
+def index_neu_aufbauen():
+    """
+    Fordert in allen Prozessen einen Neuaufbau des Index an (in einer
+    Arbeitseinheit nach deren Commit), z.B. nach Änderungen an vielen Rezepten.
+    """
+    def anfordern():
+        cache_backend.nachricht_senden('suchindex')
+        _aenderung_empfangen({})
+
+    nach_commit(anfordern)
+
+
+def veraltet_melden(rezept_ids):
+    """
+    Merkt Rezepte zum Nachladen vor, deren Indexeintrag nicht mehr zur Datenbank passt
+    (z.B. Treffer, deren Zeile beim Laden fehlte).
+
+    @param {Array<int>} rezept_ids - IDs der betroffenen Rezepte
+    """
+    with _sperre:
+        _ausstehend.update(rezept_ids)
+
+
+def suchindex_setzen(index, zutatenindex=None, trigrammindex=None, praefixbaum=None):
+    """
+    Ersetzt die aktuellen Indizes (für Tests und Neuaufbau von außen).
+
+    @param {Suchindex|None} index - Neuer Volltextindex; None erzwingt einen
+        Neuaufbau beim nächsten Zugriff
+    @param {Zutatenindex} [zutatenindex] - Neuer Zutatenindex (Standard: leer)
+    @param {Trigrammindex} [trigrammindex] - Neuer Trigrammindex (Standard: leer)
+    @param {Praefixbaum} [praefixbaum] - Neuer Präfixbaum (Standard: leer)
+    """
+    global _indizes, _aufgebaut_um, _fehlgeschlagen_um
+    with _sperre:
+        _indizes = None if index is None else Indizes(
+            index, zutatenindex or Zutatenindex(), trigrammindex or Trigrammindex(),
+            praefixbaum or Praefixbaum()
+        )
+        _aufgebaut_um = time.monotonic()
+        _fehlgeschlagen_um = None
+        _ausstehend.clear()
+        _waehrend_neuaufbau.clear()
+
+
+def statistiken():
+    """
+    Liefert Kennzahlen zum Suchindex für /api/metriken.
+
+    @return {Object} Status und Größe des Index
+    """
+    indizes = _indizes
+    return {
+        'aktiv': SUCHINDEX_AKTIV,
+        'aufgebaut': indizes is not None,
+        'alter_s': round(time.monotonic() - _aufgebaut_um, 1) if indizes is not None else None,
+        **(indizes.volltext.statistiken() if indizes is not None else {}),
+        **(indizes.zutaten.statistiken() if indizes is not None else {}),
+        **(indizes.trigramme.statistiken() if indizes is not None else {}),
+        **(indizes.praefixe.statistiken() if indizes is not None else {})
+    }
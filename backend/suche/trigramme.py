@@ -0,0 +1,215 @@
+"""
+@fileoverview Trigrammindex für fehlertolerante Suche
+@module trigramme
+
+Dieses Modul findet ähnlich geschriebene Wörter ("Tiramissu" -> "Tiramisu"):
+- Vokabular aus Rezepttiteln und Zutatennamen mit Referenzzählern
+- Postings je Trigramm auf die Wörter des Vokabulars
+- Ähnlichkeit als Jaccard-Koeffizient der Trigrammmengen (wie pg_trgm)
+- Präfixfilter: häufige Trigramme werden nur noch für Kandidaten geprüft
+- Zwischenspeicher für wiederkehrende Tippfehler, gültig bis zur nächsten
+  Änderung des Vokabulars
+- Inkrementelle Pflege beim Hinzufügen, Ersetzen und Entfernen von Rezepten
+"""
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from suche.normalisierung import STOPPWOERTER, woerter, zutaten_namen
+from utils.cache import Zwischenspeicher
+
+# Mindestähnlichkeit für Korrekturvorschläge
+STANDARD_SCHWELLE = 0.4
+# Kürzere Wörter werden nicht aufgenommen und nicht korrigiert
+MIN_WORTLAENGE = 3
+
+_TOKEN_MUSTER = re.compile(r'[^\W_]+')
+
+
+def trigramme(wort):
+    """
+    Zerlegt ein normalisiertes Wort in Trigramme (mit Rand-Auffüllung).
+
+    @param {string} wort - Normalisiertes Wort
+    @return {Set<string>} Trigramme, z.B. {'  t', ' ti', 'tir', ...}
+    """
+    aufgefuellt = f"  {wort} "
+    return {aufgefuellt[i:i + 3] for i in range(len(aufgefuellt) - 2)}
+
+
+def _anzeigewoerter(text):
+    """
+    Liefert (normalisiertes Wort, Originalschreibweise) für alle Wörter eines Textes.
+    """
+    for token in _TOKEN_MUSTER.findall(text or ''):
+        normalisiert = woerter(token)
+        if len(normalisiert) == 1:
+            wort = normalisiert[0]
+            if len(wort) >= MIN_WORTLAENGE and not wort.isdigit() and wort not in STOPPWOERTER:
+                yield wort, token
+
+
+class Trigrammindex:
+    """
+    Thread-sicherer Trigrammindex über das Vokabular der Rezepte.
+
+    Jedes Wort wird mit der Anzahl der Rezepte gezählt, die es enthalten;
+    Wörter ohne Rezept verschwinden wieder aus dem Index.
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._haeufigkeit = Counter()
+        self._trigramm_anzahl = {}
+        self._anzeigeform = {}
+        self._rezept_woerter = {}
+        self._version = 0
+        self._ergebnisse = Zwischenspeicher(max_eintraege=2048, ttl=3600)
+        self._sperre = threading.RLock()
+
+    def hinzufuegen(self, rezept_id, titel='', zutaten=None):
+        """
+        Nimmt die Wörter aus Titel und Zutatennamen eines Rezepts auf.
+
+        @param {int} rezept_id - ID des Rezepts
+        @param {string} [titel] - Titel des Rezepts
+        @param {string|Array} [zutaten] - Zutaten als JSON-String oder Liste
+        """
+        neue_woerter = {}
+        for text in [titel, *zutaten_namen(zutaten)]:
+            for wort, anzeige in _anzeigewoerter(text):
+                neue_woerter.setdefault(wort, anzeige)
+
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+            for wort, anzeige in neue_woerter.items():
+                if not self._haeufigkeit[wort]:
+                    wort_trigramme = trigramme(wort)
+                    for trigramm in wort_trigramme:
+                        self._postings[trigramm].add(wort)
+                    self._trigramm_anzahl[wort] = len(wort_trigramme)
+                    self._version += 1
+                self._haeufigkeit[wort] += 1
+                self._anzeigeform[wort] = anzeige
+            self._rezept_woerter[rezept_id] = set(neue_woerter)
+
+    def entfernen(self, rezept_id):
+        """
+        Entfernt die Wörter eines Rezepts aus dem Index.
+
+        @param {int} rezept_id - ID des Rezepts
+        """
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+
+    def _entfernen_ohne_sperre(self, rezept_id):
+        for wort in self._rezept_woerter.pop(rezept_id, ()):
+            self._haeufigkeit[wort] -= 1
+            if self._haeufigkeit[wort] > 0:
+                continue
+            del self._haeufigkeit[wort]
+            del self._trigramm_anzahl[wort]
+            self._anzeigeform.pop(wort, None)
+            self._version += 1
+            for trigramm in trigramme(wort):
+                woerter_mit_trigramm = self._postings.get(trigramm)
+                if woerter_mit_trigramm is not None:
+                    woerter_mit_trigramm.discard(wort)
+                    if not woerter_mit_trigramm:
+                        del self._postings[trigramm]
+
+    def aehnliche_woerter(self, wort, schwelle=STANDARD_SCHWELLE, anzahl=5):
+        """
+        Sucht Wörter des Vokabulars mit ähnlicher Schreibweise.
+
+        @param {string} wort - Normalisiertes Suchwort
+        @param {float} [schwelle=0.4] - Mindestähnlichkeit (0..1, größer als 0)
+        @param {int} [anzahl=5] - Maximale Anzahl der Ergebnisse
+        @return {Array<tuple>} (wort, anzeigeform, ähnlichkeit), absteigend nach
+            Ähnlichkeit, bei Gleichstand häufigere Wörter zuerst
+        """
+        schluessel = (wort, schwelle, anzahl, self._version)
+        gespeichert = self._ergebnisse.abrufen(schluessel)
+        if gespeichert is not None:
+            return gespeichert
+
+        gesucht = trigramme(wort)
+        anzahl_gesucht = len(gesucht)
+        # Jaccard >= schwelle erfordert mindestens schwelle * |A| gemeinsame Trigramme.
+        # Jeder Treffer muss daher eines der seltensten (|A| - mindestens + 1) Trigramme enthalten.
+        mindestens = math.ceil(schwelle * anzahl_gesucht)
+        with self._sperre:
+            listen = sorted((self._postings.get(trigramm, ()) for trigramm in gesucht), key=len)
+            praefix, rest = listen[:anzahl_gesucht - mindestens + 1], listen[anzahl_gesucht - mindestens + 1:]
+
+            gemeinsam = Counter()
+            for liste in praefix:
+                gemeinsam.update(liste)
+
+            ergebnisse = []
+            for kandidat, treffer in gemeinsam.items():
+                anzahl_kandidat = self._trigramm_anzahl[kandidat]
+                hoechstens = treffer + len(rest)
+                if hoechstens / (anzahl_gesucht + anzahl_kandidat - hoechstens) < schwelle:
+                    continue
+                treffer += sum(1 for liste in rest if kandidat in liste)
+                aehnlichkeit = treffer / (anzahl_gesucht + anzahl_kandidat - treffer)
+                if aehnlichkeit >= schwelle:
+                    ergebnisse.append((kandidat, self._anzeigeform[kandidat], aehnlichkeit,
+                                       self._haeufigkeit[kandidat]))
+
+        ergebnisse.sort(key=lambda e: (-e[2], -e[3], e[0]))
+        ergebnisse = [(kandidat, anzeige, aehnlichkeit) for kandidat, anzeige, aehnlichkeit, _ in ergebnisse[:anzahl]]
+        self._ergebnisse.setzen(schluessel, ergebnisse)
+        return ergebnisse
+
+    def korrigieren(self, anfrage, ist_bekannt, schwelle=STANDARD_SCHWELLE):
+        """
+        Ersetzt unbekannte Wörter einer Anfrage durch das ähnlichste Wort des Vokabulars.
+
+        @param {string} anfrage - Suchanfrage des Benutzers
+        @param {Function} ist_bekannt - Prüft ein normalisiertes Wort; bekannte Wörter bleiben erhalten
+        @param {float} [schwelle=0.4] - Mindestähnlichkeit für eine Korrektur
+        @return {string|None} Korrigierte Anfrage oder None, wenn nichts zu korrigieren ist
+        """
+        ergebnis = []
+        korrigiert = False
+        for token in _TOKEN_MUSTER.findall(anfrage or ''):
+            normalisiert = woerter(token)
+            if (len(normalisiert) == 1 and len(normalisiert[0]) >= MIN_WORTLAENGE
+                    and normalisiert[0] not in STOPPWOERTER and not ist_bekannt(normalisiert[0])):
+                beste = self.aehnliche_woerter(normalisiert[0], schwelle, anzahl=1)
+                if beste:
+                    ergebnis.append(beste[0][1])
+                    korrigiert = True
+                    continue
+            ergebnis.append(token)
+        return ' '.join(ergebnis) if korrigiert else None
+
+    def enthaelt_wort(self, wort):
+        """
+        Prüft, ob ein normalisiertes Wort im Vokabular vorkommt.
+
+        @param {string} wort - Normalisiertes Wort
+        @return {boolean} True, wenn mindestens ein Rezept das Wort enthält
+        """
+        with self._sperre:
+            return self._haeufigkeit[wort] > 0
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zum Index.
+
+        @return {Object} Größe von Vokabular und Trigrammliste
+        """
+        with self._sperre:
+            return {
+                'vokabular': len(self._haeufigkeit),
+                'trigramme': len(self._postings)
+            }
+
+    def __len__(self):
+        with self._sperre:
+            return len(self._haeufigkeit)
@@ -0,0 +1,191 @@
+"""
+@fileoverview Invertierter Volltextindex für Rezepte
+@module volltext
+
+Dieses Modul implementiert einen prozesslokalen Suchindex:
+- Postings je Suchterm über Titel, Zutaten und Zubereitung
+- Feldgewichtung (Titel > Zutaten > Zubereitung)
+- BM25-Ranking mit UND-Verknüpfung der Suchterme
+- Inkrementelles Hinzufügen, Ersetzen und Entfernen einzelner Rezepte
+- Merkmale je Rezept (Titel, Filter- und Sortierwerte), damit Treffer ohne
+  Datenbankabfrage gefiltert und sortiert werden können
+"""
+
+import math
+import threading
+from collections import Counter
+
+from suche.normalisierung import terme, zutaten_namen
+
+# Gewichtung der Felder beim Zählen der Termhäufigkeit
+FELDGEWICHTE = {
+    'titel': 3.0,
+    'zutaten': 2.0,
+    'zubereitung': 1.0,
+}
+
+# BM25-Parameter
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+class Suchindex:
+    """
+    Thread-sicherer invertierter Index mit BM25-Ranking.
+
+    Dokumente werden über ihre Rezept-ID adressiert. Neben den Postings
+    werden je Dokument der Titel und weitere Merkmale (z.B. kategorie_id,
+    erstellungsdatum) gehalten.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._laengen = {}
+        self._dokument_terme = {}
+        self._merkmale = {}
+        self._gesamtlaenge = 0.0
+        self._sperre = threading.RLock()
+
+    def hinzufuegen(self, rezept_id, titel='', zutaten=None, zubereitung='', **merkmale):
+        """
+        Nimmt ein Rezept in den Index auf oder ersetzt dessen bisherigen Eintrag.
+
+        @param {int} rezept_id - ID des Rezepts
+        @param {string} [titel] - Titel des Rezepts
+        @param {string|Array} [zutaten] - Zutaten als JSON-String oder Liste
+        @param {string} [zubereitung] - Zubereitungstext
+        @param {Object} merkmale - Weitere Filter- und Sortiermerkmale, z.B. kategorie_id
+        """
+        haeufigkeiten = Counter()
+        felder = {
+            'titel': titel or '',
+            'zutaten': ' '.join(zutaten_namen(zutaten)),
+            'zubereitung': zubereitung or '',
+        }
+        for feld, text in felder.items():
+            gewicht = FELDGEWICHTE[feld]
+            for term in terme(text):
+                haeufigkeiten[term] += gewicht
+
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+            for term, haeufigkeit in haeufigkeiten.items():
+                self._postings.setdefault(term, {})[rezept_id] = haeufigkeit
+            laenge = sum(haeufigkeiten.values())
+            self._laengen[rezept_id] = laenge
+            self._gesamtlaenge += laenge
+            self._dokument_terme[rezept_id] = set(haeufigkeiten)
+            self._merkmale[rezept_id] = {'titel': titel or '', **merkmale}
+
+    def entfernen(self, rezept_id):
+        """
+        Entfernt ein Rezept aus dem Index.
+
+        @param {int} rezept_id - ID des Rezepts
+        """
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+
+    def _entfernen_ohne_sperre(self, rezept_id):
+        for term in self._dokument_terme.pop(rezept_id, ()):
+            dokumente = self._postings.get(term)
+            if dokumente is not None:
+                dokumente.pop(rezept_id, None)
+                if not dokumente:
+                    del self._postings[term]
+        self._gesamtlaenge -= self._laengen.pop(rezept_id, 0.0)
+        self._merkmale.pop(rezept_id, None)
+
+    def enthaelt_term(self, term):
+        """
+        Prüft, ob ein (bereits normalisierter) Suchterm im Index vorkommt.
+
+        @param {string} term - Suchterm
+        @return {boolean} True, wenn mindestens ein Dokument den Term enthält
+        """
+        with self._sperre:
+            return term in self._postings
+
+    def suchen(self, anfrage, kategorie_id=None):
+        """
+        Sucht Rezepte, die alle Terme der Anfrage enthalten, und bewertet sie mit BM25.
+
+        @param {string} anfrage - Suchanfrage des Benutzers
+        @param {int} [kategorie_id] - Nur Rezepte dieser Kategorie
+        @return {Array<tuple>} (rezept_id, punktzahl), absteigend nach Relevanz,
+            bei Gleichstand neuere IDs zuerst
+        """
+        anfrage_terme = list(dict.fromkeys(terme(anfrage)))
+        if not anfrage_terme:
+            return []
+
+        with self._sperre:
+            listen = [self._postings.get(term) for term in anfrage_terme]
+            if any(liste is None for liste in listen):
+                return []
+
+            # Schnittmenge beginnend mit der kürzesten Postingliste
+            reihenfolge = sorted(range(len(listen)), key=lambda i: len(listen[i]))
+            kandidaten = set(listen[reihenfolge[0]])
+            for i in reihenfolge[1:]:
+                kandidaten.intersection_update(listen[i])
+                if not kandidaten:
+                    return []
+
+            if kategorie_id is not None:
+                kandidaten = {
+                    rezept_id for rezept_id in kandidaten
+                    if self._merkmale.get(rezept_id, {}).get('kategorie_id') == kategorie_id
+                }
+
+            anzahl = len(self._laengen)
+            mittlere_laenge = (self._gesamtlaenge / anzahl) if anzahl else 1.0
+            idf = [
+                math.log(1 + (anzahl - len(liste) + 0.5) / (len(liste) + 0.5))
+                for liste in listen
+            ]
+
+            ergebnisse = []
+            for rezept_id in kandidaten:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._laengen[rezept_id] / (mittlere_laenge or 1.0))
+                punktzahl = 0.0
+                for liste, gewicht in zip(listen, idf):
+                    tf = liste[rezept_id]
+                    punktzahl += gewicht * tf * (BM25_K1 + 1) / (tf + norm)
+                ergebnisse.append((rezept_id, punktzahl))
+
+        ergebnisse.sort(key=lambda eintrag: (-eintrag[1], -eintrag[0]))
+        return ergebnisse
+
+    def merkmale(self, rezept_ids):
+        """
+        Liefert Titel und Merkmale mehrerer Rezepte, z.B. zum Sortieren von Treffern.
+
+        @param {Array<int>} rezept_ids - IDs der Rezepte
+        @return {Array<Object>} Je bekanntem Rezept ein Objekt mit id, titel und Merkmalen
+        """
+        with self._sperre:
+            return [
+                {'id': rezept_id, **self._merkmale[rezept_id]}
+                for rezept_id in rezept_ids if rezept_id in self._merkmale
+            ]
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zum Index.
+
+        @return {Object} Anzahl der Dokumente und Terme
+        """
+        with self._sperre:
+            return {
+                'dokumente': len(self._laengen),
+                'terme': len(self._postings)
+            }
+
+    def __len__(self):
+        with self._sperre:
+            return len(self._laengen)
+
+    def __contains__(self, rezept_id):
+        with self._sperre:
+            return rezept_id in self._laengen
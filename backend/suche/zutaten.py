@@ -0,0 +1,141 @@
+"""
+@fileoverview Invertierter Zutatenindex für Rezepte
+@module zutaten
+
+Dieses Modul beantwortet "Was kann ich damit kochen?"-Anfragen:
+- Postings je normalisiertem Zutatenterm (Rezept-IDs als Mengen)
+- Treffer über Mengenoperationen statt JSON-Auswertung pro Anfrage
+- Ranking nach Anzahl der verwendeten angefragten Zutaten
+"""
+
+import threading
+from collections import defaultdict
+
+from suche.normalisierung import terme, zutaten_namen
+
+
+def zutat_terme(name):
+    """
+    Liefert die Suchterme eines Zutatennamens ohne Wiederholungen.
+
+    @param {string} name - Zutatenname, z.B. "Rote Zwiebeln"
+    @return {Array<string>} Normalisierte, gestemmte Terme
+    """
+    return list(dict.fromkeys(terme(name)))
+
+
+class Zutatenindex:
+    """
+    Thread-sicherer invertierter Index von Zutatentermen auf Rezept-IDs.
+
+    Eine angefragte Zutat passt zu einem Rezept, wenn alle ihre Terme in den
+    Zutaten des Rezepts vorkommen ("rote Zwiebel" passt zu "Zwiebeln, rot").
+    """
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._rezept_terme = {}
+        self._zutaten_anzahl = {}
+        self._merkmale = {}
+        self._sperre = threading.RLock()
+
+    def hinzufuegen(self, rezept_id, zutaten, **merkmale):
+        """
+        Nimmt die Zutaten eines Rezepts auf oder ersetzt den bisherigen Eintrag.
+
+        @param {int} rezept_id - ID des Rezepts
+        @param {string|Array} zutaten - Zutaten als JSON-String oder Liste
+        @param {Object} merkmale - Weitere Filtermerkmale, z.B. kategorie_id
+        """
+        namen = zutaten_namen(zutaten)
+        rezept_terme = set()
+        for name in namen:
+            rezept_terme.update(zutat_terme(name))
+
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+            for term in rezept_terme:
+                self._postings[term].add(rezept_id)
+            self._rezept_terme[rezept_id] = rezept_terme
+            self._zutaten_anzahl[rezept_id] = len(namen)
+            self._merkmale[rezept_id] = merkmale
+
+    def entfernen(self, rezept_id):
+        """
+        Entfernt ein Rezept aus dem Index.
+
+        @param {int} rezept_id - ID des Rezepts
+        """
+        with self._sperre:
+            self._entfernen_ohne_sperre(rezept_id)
+
+    def _entfernen_ohne_sperre(self, rezept_id):
+        for term in self._rezept_terme.pop(rezept_id, ()):
+            rezepte = self._postings.get(term)
+            if rezepte is not None:
+                rezepte.discard(rezept_id)
+                if not rezepte:
+                    del self._postings[term]
+        self._zutaten_anzahl.pop(rezept_id, None)
+        self._merkmale.pop(rezept_id, None)
+
+    def suchen(self, zutaten, kategorie_id=None):
+        """
+        Sucht Rezepte, die mindestens eine der angefragten Zutaten verwenden.
+
+        @param {Array<string>} zutaten - Angefragte Zutatennamen
+        @param {int} [kategorie_id] - Nur Rezepte dieser Kategorie
+        @return {Array<tuple>} (rezept_id, passende Zutaten, Zutatenanzahl des Rezepts);
+            sortiert nach Anzahl passender Zutaten, dann nach fehlenden Zutaten,
+            bei Gleichstand neuere IDs zuerst
+        """
+        treffer = defaultdict(list)
+        gesehen = set()
+        with self._sperre:
+            for zutat in zutaten:
+                zutat_termliste = zutat_terme(zutat)
+                schluessel = frozenset(zutat_termliste)
+                if not schluessel or schluessel in gesehen:
+                    continue
+                gesehen.add(schluessel)
+                listen = [self._postings.get(term) for term in zutat_termliste]
+                if any(liste is None for liste in listen):
+                    continue
+                listen.sort(key=len)
+                rezepte = listen[0].intersection(*listen[1:])
+                for rezept_id in rezepte:
+                    treffer[rezept_id].append(zutat)
+
+            if kategorie_id is not None:
+                treffer = {
+                    rezept_id: passend for rezept_id, passend in treffer.items()
+                    if self._merkmale.get(rezept_id, {}).get('kategorie_id') == kategorie_id
+                }
+
+            ergebnisse = [
+                (rezept_id, passend, self._zutaten_anzahl.get(rezept_id, 0))
+                for rezept_id, passend in treffer.items()
+            ]
+
+        ergebnisse.sort(key=lambda e: (-len(e[1]), e[2] - len(e[1]), -e[0]))
+        return ergebnisse
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zum Index.
+
+        @return {Object} Anzahl der Rezepte und Zutatenterme
+        """
+        with self._sperre:
+            return {
+                'rezepte': len(self._zutaten_anzahl),
+                'zutatenterme': len(self._postings)
+            }
+
+    def __len__(self):
+        with self._sperre:
+            return len(self._zutaten_anzahl)
+
+    def __contains__(self, rezept_id):
+        with self._sperre:
+            return rezept_id in self._zutaten_anzahl
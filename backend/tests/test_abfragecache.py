@@ -0,0 +1,97 @@
+"""
+Tests für den Abfrage-Zwischenspeicher der Listen- und Suchabfragen
+"""
+import threading
+
+import pytest
+
+from utils.abfragecache import Abfragecache
+
+
+@pytest.fixture
+def datenbank(fake_db):
+    """
+    Liefert eine Datenbank-Attrappe, die jede Abfrage protokolliert
+    """
+    attrappe = fake_db(antwort=lambda sql, parameter: [{'id': len(attrappe.anweisungen), 'titel': 'Gulasch'}])
+    return attrappe
+
+
+class TestAbfragecache:
+    """Tests für Schlüsselbildung, Invalidierung und veraltete Auslieferung"""
+
+    def test_treffer_ohne_datenbank(self, datenbank):
+        """Eine wiederholte Abfrage wird aus dem Zwischenspeicher beantwortet"""
+        cache = Abfragecache()
+        erstes = cache.abfragen("SELECT * FROM rezepte LIMIT %s", [20], ('rezepte',), datenbank.verwalten)
+        zweites = cache.abfragen("SELECT *  FROM rezepte\n LIMIT %s", [20], ('rezepte',), datenbank.verwalten)
+
+        assert erstes == zweites
+        assert len(datenbank.anweisungen) == 1
+        assert cache.statistiken()['treffer'] == 1
+
+    def test_parameter_trennen_eintraege(self, datenbank):
+        """Unterschiedliche Parameter ergeben eigene Einträge"""
+        cache = Abfragecache()
+        cache.abfragen("SELECT * FROM rezepte LIMIT %s", [20], ('rezepte',), datenbank.verwalten)
+        cache.abfragen("SELECT * FROM rezepte LIMIT %s", [40], ('rezepte',), datenbank.verwalten)
+
+        assert len(datenbank.anweisungen) == 2
+
+    def test_tabellen_invalidieren_erzwingt_neue_abfrage(self, datenbank):
+        """Ein Schreibvorgang auf eine gelesene Tabelle macht das Ergebnis ungültig"""
+        cache = Abfragecache()
+        sql = "SELECT * FROM rezepte r JOIN benutzer b ON r.benutzer_id = b.id"
+        cache.abfragen(sql, [], ('rezepte', 'benutzer'), datenbank.verwalten)
+
+        cache.tabellen_invalidieren('kommentare')
+        cache.abfragen(sql, [], ('rezepte', 'benutzer'), datenbank.verwalten)
+        assert len(datenbank.anweisungen) == 1
+
+        cache.tabellen_invalidieren('benutzer')
+        neu = cache.abfragen(sql, [], ('rezepte', 'benutzer'), datenbank.verwalten)
+        assert len(datenbank.anweisungen) == 2
+        assert neu[0]['id'] == 2
+
+    def test_ergebnis_ist_kopie(self, datenbank):
+        """Änderungen am Ergebnis verändern den gespeicherten Eintrag nicht"""
+        cache = Abfragecache()
+        ergebnis = cache.abfragen("SELECT * FROM rezepte", [], ('rezepte',), datenbank.verwalten)
+        ergebnis[0]['titel'] = 'Verändert'
+
+        assert cache.abfragen("SELECT * FROM rezepte", [], ('rezepte',), datenbank.verwalten)[0]['titel'] == 'Gulasch'
+
+    def test_veraltetes_ergebnis_waehrend_neuberechnung(self, fake_db):
+        """Während eine Anfrage neu berechnet, erhalten andere das veraltete Ergebnis"""
+        cache = Abfragecache(ttl=60, veraltet_erlaubt=30)
+        gestartet = threading.Event()
+        freigabe = threading.Event()
+
+        def antwort(sql, parameter):
+            if len(datenbank.anweisungen) == 2:
+                gestartet.set()
+                freigabe.wait(5)
+            return [{'stand': len(datenbank.anweisungen)}]
+
+        datenbank = fake_db(antwort=antwort)
+        verwalten = datenbank.verwalten
+
+        sql = "SELECT COUNT(*) AS stand FROM rezepte"
+        assert cache.abfragen(sql, [], ('rezepte',), verwalten) == [{'stand': 1}]
+        cache.tabellen_invalidieren('rezepte')
+
+        ergebnisse = []
+        neuberechnung = threading.Thread(
+            target=lambda: ergebnisse.append(cache.abfragen(sql, [], ('rezepte',), verwalten))
+        )
+        neuberechnung.start()
+        assert gestartet.wait(5)
+
+        assert cache.abfragen(sql, [], ('rezepte',), verwalten) == [{'stand': 1}]
+        freigabe.set()
+        neuberechnung.join(5)
+
+        assert ergebnisse == [[{'stand': 2}]]
+        assert len(datenbank.anweisungen) == 2
+        assert cache.statistiken()['veraltet_ausgeliefert'] == 1
+        assert cache.abfragen(sql, [], ('rezepte',), verwalten) == [{'stand': 2}]
@@ -17,6 +17,13 @@ class TestAuth:
         data = json.loads(response.data)
         assert data['status'] == 'healthy'
 
+    def test_metriken_ohne_freigabe_nicht_erreichbar(self, client):
+        """
+        Test Metriken-Endpunkt (ohne METRIKEN_AKTIV nicht registriert)
+        """
+        response = client.get('/api/metriken')
+        assert response.status_code == 404
+
     def test_register_missing_fields(self, client):
         """
         Test Registrierung mit fehlenden Feldern
@@ -144,4 +151,127 @@ class TestTokenValidation:
         response = client.get('/')
         assert response.status_code == 200
         data = json.loads(response.data)
-        assert 'nachricht' in data 
\ No newline at end of file
+        assert 'nachricht' in data 
+
+class TestTokenWiderruf:
+    """Tests für den Widerruf von Tokens über die jti"""
+
+    def test_tokens_haben_eigene_jti(self):
+        """Jeder erzeugte Token erhält eine eigene ID"""
+        from utils.token import generate_tokens, token_verifizieren
+
+        access_token, refresh_token = generate_tokens(1, 'koch@example.com')
+        zweiter_access, _ = generate_tokens(1, 'koch@example.com')
+
+        ids = {token_verifizieren(t)['jti'] for t in (access_token, refresh_token, zweiter_access)}
+        assert len(ids) == 3
+
+    def test_widerrufener_token_ist_ungueltig(self):
+        """Nach dem Widerruf wird nur der betroffene Token abgelehnt"""
+        from utils.token import generate_tokens, token_blacklisten, token_verifizieren
+
+        access_token, refresh_token = generate_tokens(1, 'koch@example.com')
+        token_blacklisten(access_token)
+
+        assert token_verifizieren(access_token) is None
+        assert token_verifizieren(refresh_token) is not None
+
+    def test_widerruf_endet_mit_ablauf(self):
+        """Einträge leben nur bis zum Ablauf des Tokens"""
+        import time
+        from utils.cachebackend import SpeicherBackend
+        from utils.token import Widerrufsliste
+
+        liste = Widerrufsliste(SpeicherBackend())
+        liste.widerrufen('kurz', time.time() + 0.05)
+        liste.widerrufen('abgelaufen', time.time() - 1)
+
+        assert liste.ist_widerrufen('kurz')
+        assert not liste.ist_widerrufen('abgelaufen')
+        time.sleep(0.06)
+        assert not liste.ist_widerrufen('kurz')
+
+    def test_logout_widerruft_auch_refresh_token(self, client):
+        """Logout mit Refresh Token sperrt beide Tokens"""
+        from utils.token import generate_tokens, token_verifizieren
+
+        access_token, refresh_token = generate_tokens(5, 'koch@example.com')
+        response = client.post(
+            '/api/benutzer/logout',
+            headers={'Authorization': f'Bearer {access_token}'},
+            json={'refresh_token': refresh_token}
+        )
+
+        assert response.status_code == 200
+        assert token_verifizieren(access_token) is None
+        assert token_verifizieren(refresh_token) is None
+
+
+class TestTokenZwischenspeicher:
+    """Tests für den Zwischenspeicher verifizierter Tokens und die optionale Anmeldung"""
+
+    @pytest.fixture
+    def decode_zaehler(self, monkeypatch):
+        """Zählt die Signaturprüfungen von PyJWT"""
+        import jwt
+        aufrufe = []
+        original = jwt.decode
+
+        def zaehlen(*args, **kwargs):
+            aufrufe.append(kwargs.get('options'))
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(jwt, 'decode', zaehlen)
+        return aufrufe
+
+    def test_wiederholte_pruefung_ohne_signaturpruefung(self, decode_zaehler):
+        """Ein bereits verifizierter Token wird aus dem Zwischenspeicher bedient"""
+        from utils.token import generate_tokens, token_verifizieren
+
+        access_token, _ = generate_tokens(3, 'koch@example.com')
+        vorher = len(decode_zaehler)
+
+        erste = token_verifizieren(access_token)
+        zweite = token_verifizieren(access_token)
+
+        assert erste == zweite
+        assert len(decode_zaehler) == vorher + 1
+
+    def test_widerruf_verwirft_zwischengespeicherten_token(self):
+        """Nach dem Widerruf hilft auch der Zwischenspeicher nicht mehr"""
+        from utils.token import generate_tokens, token_blacklisten, token_verifizieren
+
+        access_token, _ = generate_tokens(3, 'koch@example.com')
+        assert token_verifizieren(access_token) is not None
+
+        token_blacklisten(access_token)
+        assert token_verifizieren(access_token) is None
+
+    def test_einmal_je_anfrage(self, app, decode_zaehler):
+        """Der Bearer-Token wird je Anfrage höchstens einmal geprüft"""
+        from utils.token import _token_cache, betrachter_id_ermitteln, generate_tokens
+
+        access_token, _ = generate_tokens(9, 'koch@example.com')
+        with app.test_request_context(headers={'Authorization': f'Bearer {access_token}'}):
+            assert betrachter_id_ermitteln() == 9
+            _token_cache.leeren()
+            assert betrachter_id_ermitteln() == 9
+        assert len(decode_zaehler) == 1
+
+    def test_optionale_anmeldung(self, app):
+        """token_optional liefert Claims bei gültigem Access Token, sonst None"""
+        from utils.token import generate_tokens, token_optional
+
+        @token_optional
+        def route(token_daten):
+            return token_daten
+
+        access_token, refresh_token = generate_tokens(4, 'koch@example.com')
+        with app.test_request_context(headers={'Authorization': f'Bearer {access_token}'}):
+            assert route()['benutzer_id'] == 4
+        with app.test_request_context(headers={'Authorization': f'Bearer {refresh_token}'}):
+            assert route() is None
+        with app.test_request_context(headers={'Authorization': 'Bearer kaputt'}):
+            assert route() is None
+        with app.test_request_context():
+            assert route() is None
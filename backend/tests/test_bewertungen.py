@@ -0,0 +1,69 @@
+"""
+Tests für die denormalisierten Bewertungskennzahlen
+"""
+import pytest
+
+import models.bewertung as bewertung_modell
+from utils.paginierung import cursor_dekodieren, cursor_kodieren
+
+
+@pytest.fixture
+def bewertungs_db(fake_db):
+    """
+    Ersetzt die Datenbank des Bewertungsmodells durch eine Attrappe; bisher ist der
+    Wert einer vorhandenen Bewertung (None = keine)
+    """
+    datenbank = fake_db(
+        bewertung_modell,
+        antwort=lambda sql, parameter: (datenbank.bisher,) if datenbank.bisher is not None else None
+    )
+    datenbank.bisher = None
+    return datenbank
+
+
+def aggregat_anpassungen(datenbank):
+    return [parameter for sql, parameter in datenbank.anweisungen if sql.startswith('UPDATE rezepte')]
+
+
+class TestBewertungsaggregate:
+    """Test-Klasse für die inkrementelle Pflege der Kennzahlen"""
+
+    def test_neue_bewertung_erhoeht_summe_und_anzahl(self, bewertungs_db):
+        """
+        Eine Erstbewertung addiert ihren Wert und erhöht die Anzahl
+        """
+        assert bewertung_modell.bewertung_erstellen(5, 1, 4)
+        assert aggregat_anpassungen(bewertungs_db) == [(4, 1, 5)]
+
+    def test_geaenderte_bewertung_passt_nur_summe_an(self, bewertungs_db):
+        """
+        Eine geänderte Bewertung verschiebt nur die Summe um die Differenz
+        """
+        bewertungs_db.bisher = 2
+
+        assert bewertung_modell.bewertung_erstellen(5, 1, 5)
+        assert aggregat_anpassungen(bewertungs_db) == [(3, 0, 5)]
+
+    def test_loeschen_zieht_bewertung_ab(self, bewertungs_db):
+        """
+        Beim Löschen werden Wert und Anzahl wieder abgezogen
+        """
+        bewertungs_db.bisher = 3
+
+        assert bewertung_modell.bewertung_loeschen(5, 1)
+        assert aggregat_anpassungen(bewertungs_db) == [(-3, -1, 5)]
+
+    def test_loeschen_ohne_bewertung(self, bewertungs_db):
+        """
+        Ohne vorhandene Bewertung bleibt das Rezept unverändert
+        """
+        assert not bewertung_modell.bewertung_loeschen(5, 1)
+        assert aggregat_anpassungen(bewertungs_db) == []
+
+    def test_cursor_fuer_bewertungssortierung(self):
+        """
+        Die Sortierung nach Bewertung liefert einen numerischen Cursor
+        """
+        token = cursor_kodieren('rating', {'id': 9, 'bewertung_durchschnitt': 4.25})
+
+        assert cursor_dekodieren(token, 'rating') == {'wert': 4.25, 'id': 9}
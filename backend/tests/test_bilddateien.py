@@ -0,0 +1,162 @@
+"""
+Tests für inhaltsadressierte Bilddateien (Referenzzählung, Aufräumen, Cache-Header)
+"""
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import models.bilddatei as bilddatei_modell
+from models.bilddatei import ART_PROFIL, ART_REZEPT, inhalt_aus_url, referenzen_aendern
+
+ALT = 'a' * 64
+NEU = 'b' * 64
+
+
+@pytest.fixture
+def datenbank(fake_db):
+    """
+    Ersetzt die Datenbank von models.bilddatei und models.rezept durch eine Attrappe
+    """
+    import models.rezept as rezept_modell
+
+    return fake_db(bilddatei_modell, rezept_modell)
+
+
+class TestReferenzen:
+    """Tests für das Verschieben von Referenzen"""
+
+    def test_inhalt_aus_url(self):
+        """Test: Nur inhaltsadressierte Namen liefern einen Hash"""
+        assert inhalt_aus_url(f'static/uploads/{ALT}_w640.webp') == ALT
+        assert inhalt_aus_url('static/profile_images/profile_7.jpg') is None
+        assert inhalt_aus_url('static/uploads/0f1e2d3c4b5a69788796a5b4c3d2e1f0.jpg') is None
+        assert inhalt_aus_url(None) is None
+
+    def test_referenz_wandert(self, fake_db):
+        """Test: Das neue Bild wird hochgezählt, das bisherige heruntergezählt"""
+        cursor = fake_db()
+
+        referenzen_aendern(cursor, f'static/uploads/{ALT}.jpg', f'static/uploads/{NEU}.jpg', ART_REZEPT)
+
+        assert cursor.anweisungen[0][0].startswith('INSERT INTO bilddateien')
+        assert cursor.anweisungen[0][1] == (NEU, ART_REZEPT)
+        assert cursor.anweisungen[1] == (
+            'UPDATE bilddateien SET referenzen = GREATEST(referenzen - 1, 0) WHERE inhalt = %s', (ALT,)
+        )
+
+    def test_gleicher_inhalt_und_alte_uploads_ohne_aenderung(self, fake_db):
+        """Test: Gleicher Inhalt und ältere Uploads ändern keine Zähler"""
+        cursor = fake_db()
+
+        referenzen_aendern(cursor, f'static/uploads/{ALT}.jpg', f'static/uploads/{ALT}.jpg', ART_REZEPT)
+        referenzen_aendern(cursor, 'static/profile_images/profile_7.jpg', None, ART_PROFIL)
+
+        assert cursor.anweisungen == []
+
+    def test_loeschen_gibt_referenz_frei(self, datenbank):
+        """Test: Beim Löschen eines Rezepts wird sein Bild heruntergezählt"""
+        from models.rezept import rezept_loeschen
+
+        datenbank.ergebnisse = [(3, f'static/uploads/{ALT}.jpg')]
+
+        assert rezept_loeschen(9, benutzer_id=3)
+        assert datenbank.anweisungen[-1] == (
+            'UPDATE bilddateien SET referenzen = GREATEST(referenzen - 1, 0) WHERE inhalt = %s', (ALT,)
+        )
+
+    def test_fremdes_rezept_wird_nicht_geloescht(self, datenbank):
+        """Test: Ohne Berechtigung bleiben Rezept und Zähler unverändert"""
+        from models.rezept import rezept_loeschen
+
+        datenbank.ergebnisse = [(4, f'static/uploads/{ALT}.jpg')]
+
+        assert rezept_loeschen(9, benutzer_id=3) is False
+        assert len(datenbank.anweisungen) == 1
+
+
+class TestAbgleichUndAufraeumen:
+    """Tests für bilddateien_reparieren und bilddateien_aufraeumen"""
+
+    def test_reparieren_zaehlt_aus_verweisen(self, datenbank):
+        """Test: Zähler werden aus Rezepten und Profilen neu berechnet"""
+        datenbank.ergebnisse = [
+            [(f'static/uploads/{ALT}.jpg',), (f'static/uploads/{ALT}.jpg',), ('static/uploads/alt.jpg',)],
+            [(f'static/profile_images/{NEU}.webp',)],
+            [(ALT, 1), (NEU, 1), ('c' * 64, 4)]
+        ]
+
+        assert bilddatei_modell.bilddateien_reparieren() == 2
+
+        aenderungen = [(sql.split()[0], parameter) for sql, parameter in datenbank.anweisungen[3:]]
+        assert aenderungen == [('UPDATE', ('c' * 64,)), ('INSERT', (ALT, ART_REZEPT, 2))]
+
+    def test_aufraeumen_entfernt_nur_alte_unreferenzierte_dateien(self, datenbank, tmp_path):
+        """Test: Referenzierte, junge und ältere Dateien bleiben, alte Waisen werden entfernt"""
+        for name in (f'{ALT}.jpg', f'{ALT}_thumb.jpg', f'{NEU}.jpg', f'{NEU}_w320.webp', 'legacy.jpg'):
+            (tmp_path / name).write_bytes(b'x')
+            os.utime(tmp_path / name, (1000, 1000))
+        (tmp_path / f'{"d" * 64}.jpg').write_bytes(b'x')
+        os.utime(tmp_path / f'{"d" * 64}.jpg', (9500, 9500))
+        # Momentaufnahme, danach je Kandidat die erneute Prüfung (keine Zeile)
+        datenbank.ergebnisse = [[(ALT,)], None, None, None]
+
+        entfernt = bilddatei_modell.bilddateien_aufraeumen({ART_REZEPT: str(tmp_path)}, karenzzeit=3600, jetzt=10000)
+
+        assert entfernt == 2
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            [f'{ALT}.jpg', f'{ALT}_thumb.jpg', 'legacy.jpg', f'{"d" * 64}.jpg']
+        )
+        assert datenbank.anweisungen[0] == (
+            'DELETE FROM bilddateien WHERE referenzen = 0 AND aktualisiert < NOW() - INTERVAL %s SECOND', (3600,)
+        )
+
+    def test_nach_der_momentaufnahme_referenzierte_datei_bleibt(self, datenbank, tmp_path):
+        """Test: Zählt ein Upload den Inhalt nach der Momentaufnahme, wird die Datei nicht entfernt"""
+        (tmp_path / f'{NEU}.jpg').write_bytes(b'x')
+        os.utime(tmp_path / f'{NEU}.jpg', (1000, 1000))
+        datenbank.ergebnisse = [[], (1,)]
+
+        assert bilddatei_modell.bilddateien_aufraeumen({ART_REZEPT: str(tmp_path)}, karenzzeit=3600, jetzt=10000) == 0
+        assert (tmp_path / f'{NEU}.jpg').exists()
+        assert datenbank.anweisungen[-1] == ('SELECT 1 FROM bilddateien WHERE inhalt = %s', (NEU,))
+
+    def test_erneuter_upload_frischt_alte_datei_auf(self, tmp_path):
+        """Test: Gleiche Bytes schreiben nicht neu, setzen aber die Änderungszeit für die Karenzzeit"""
+        from utils.bilder import inhalt_speichern
+
+        name = inhalt_speichern(b'gleich', str(tmp_path), 'jpg')
+        os.utime(tmp_path / name, (1000, 1000))
+
+        assert inhalt_speichern(b'gleich', str(tmp_path), 'jpg') == name
+        assert os.path.getmtime(tmp_path / name) > 1000
+
+
+class TestUnveraenderlicheUrls:
+    """Tests für Cache-Control beim Ausliefern"""
+
+    @pytest.fixture
+    def ordner(self, app, monkeypatch, tmp_path):
+        monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+        monkeypatch.setitem(app.config, 'PROFILE_FOLDER', str(tmp_path))
+        puffer = io.BytesIO()
+        Image.new('RGB', (400, 300)).save(puffer, 'JPEG')
+        for name in (f'{ALT}.jpg', f'{NEU}.webp', 'profile_7.jpg'):
+            (tmp_path / name).write_bytes(puffer.getvalue())
+        return tmp_path
+
+    def test_inhaltsadressierte_dateien_sind_unveraenderlich(self, client, ordner):
+        """Test: Uploads, Varianten und Profilbilder mit Hash-Namen werden unbegrenzt gecacht"""
+        for url in (f'/static/uploads/{ALT}.jpg', f'/static/uploads/{ALT}.jpg?w=320', f'/static/profile_images/{NEU}.webp'):
+            antwort = client.get(url)
+            assert antwort.status_code == 200
+            assert antwort.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+
+    def test_feste_namen_bleiben_revalidierbar(self, client, ordner):
+        """Test: Ältere Dateien mit festen Namen erhalten keinen unbegrenzten Cache"""
+        antwort = client.get('/static/profile_images/profile_7.jpg')
+
+        assert antwort.status_code == 200
+        assert 'immutable' not in antwort.headers.get('Cache-Control', '')
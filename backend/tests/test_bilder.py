@@ -0,0 +1,206 @@
+"""
+Tests für die Bild-Engine (Formaterkennung, Pixel-Obergrenze, einmaliges Dekodieren)
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+import utils.bilder as bilder
+from utils.bilder import UngueltigesBild, Rendition
+
+
+def _bild_bytes(groesse=(800, 600), format_name='JPEG', modus='RGB', farbe=(10, 120, 200), **optionen):
+    puffer = io.BytesIO()
+    Image.new(modus, groesse, farbe).save(puffer, format_name, **optionen)
+    puffer.seek(0)
+    return puffer
+
+
+class TestFormaterkennung:
+    """Tests für Signaturprüfung und Abmessungen"""
+
+    @pytest.mark.parametrize('format_name, erwartet', [
+        ('JPEG', 'jpeg'), ('PNG', 'png'), ('GIF', 'gif'), ('WEBP', 'webp')
+    ])
+    def test_signaturen(self, format_name, erwartet):
+        """Test: Unterstützte Formate werden am Dateikopf erkannt"""
+        assert bilder.format_erkennen(_bild_bytes(format_name=format_name).read(16)) == erwartet
+
+    def test_unbekanntes_format(self):
+        """Test: Andere Inhalte werden unabhängig von der Endung abgelehnt"""
+        with pytest.raises(UngueltigesBild):
+            bilder.bild_pruefen(io.BytesIO(b'<svg xmlns="http://www.w3.org/2000/svg"/>'))
+
+    def test_pixel_obergrenze(self, monkeypatch):
+        """Test: Zu große Bilder werden vor dem Dekodieren abgelehnt"""
+        monkeypatch.setattr(bilder, 'BILD_MAX_PIXEL', 100 * 100)
+
+        with pytest.raises(UngueltigesBild, match='zu groß'):
+            bilder.dekodieren(_bild_bytes((200, 100)))
+
+    def test_pruefen_setzt_stream_zurueck(self):
+        """Test: Nach der Prüfung kann der Upload vollständig gelesen werden"""
+        stream = _bild_bytes((64, 48))
+
+        assert bilder.bild_pruefen(stream) == ('jpeg', (64, 48))
+        assert stream.tell() == 0
+
+
+class TestDekodieren:
+    """Tests für Dekodierung und Renditionen"""
+
+    def test_jpeg_draft_modus(self):
+        """Test: Große JPEGs werden verkleinert dekodiert, aber nicht kleiner als benötigt"""
+        bild = bilder.dekodieren(_bild_bytes((4000, 3000)), (1000, 750))
+
+        assert 1000 <= bild.width <= 2000
+        assert bild.height >= 750
+
+    def test_exif_ausrichtung(self):
+        """Test: Hochformatfotos mit EXIF-Drehung werden richtig ausgerichtet"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # 90° im Uhrzeigersinn
+
+        bild = bilder.dekodieren(_bild_bytes((400, 300), exif=exif.tobytes()))
+
+        assert bild.size == (300, 400)
+
+    def test_transparenz_wird_weiss(self):
+        """Test: Transparente PNG-Bereiche werden auf weißen Hintergrund gelegt"""
+        bild = bilder.dekodieren(_bild_bytes((20, 20), 'PNG', 'RGBA', (0, 0, 0, 0)))
+
+        assert bild.mode == 'RGB'
+        assert bild.getpixel((0, 0)) == (255, 255, 255)
+
+    def test_renditionen_aus_einer_dekodierung(self, monkeypatch):
+        """Test: Alle Renditionen entstehen aus einem einzigen Öffnen und Dekodieren"""
+        geoeffnet = []
+        echtes_oeffnen = bilder.bild_oeffnen
+
+        def oeffnen(quelle):
+            geoeffnet.append(quelle)
+            return echtes_oeffnen(quelle)
+
+        monkeypatch.setattr(bilder, 'bild_oeffnen', oeffnen)
+
+        ergebnis = bilder.renditionen_erzeugen(_bild_bytes((2400, 1600)), [
+            Rendition('voll', 1920, 1080, 90, ''),
+            Rendition('w1280', 1280, 1280, 85, '_w1280'),
+            Rendition('karte', 640, 480, 85, '_karte'),
+            Rendition('thumb', 300, 200, 85, '_thumb')
+        ])
+
+        assert len(geoeffnet) == 1
+        assert {name: bild.size for name, bild in ergebnis.items()} == {
+            'voll': (1620, 1080), 'w1280': (1280, 853), 'karte': (640, 427), 'thumb': (300, 200)
+        }
+
+    def test_hochformat_in_breiten_renditionen(self):
+        """Test: Hochformatige Bilder werden in quadratischen Boxen auf die Höhe begrenzt"""
+        ergebnis = bilder.renditionen_erzeugen(_bild_bytes((1200, 1600)), [
+            Rendition('voll', 1920, 1080, 90, ''),
+            Rendition('w640', 640, 640, 85, '_w640')
+        ])
+
+        assert ergebnis['voll'].size == (810, 1080)
+        assert ergebnis['w640'].size == (480, 640)
+
+    def test_kleine_bilder_werden_nicht_vergroessert(self, tmp_path):
+        """Test: Renditionen sind nie größer als das Original"""
+        ergebnis = bilder.renditionen_speichern(
+            _bild_bytes((200, 100)), str(tmp_path), 'klein', [Rendition('voll', 1920, 1080, 90, '')]
+        )
+
+        assert ergebnis == {'voll': {'breite': 200, 'hoehe': 100, 'dateien': {'jpeg': 'klein.jpg'}}}
+        assert (tmp_path / 'klein.jpg').exists()
+
+    def test_renditionen_in_allen_formaten(self, tmp_path):
+        """Test: Jede Rendition wird in jedem ihrer Formate gespeichert"""
+        ergebnis = bilder.renditionen_speichern(
+            _bild_bytes((800, 600)), str(tmp_path), 'abc', [Rendition('w320', 320, 320, 85, '_w320', ('WEBP', 'JPEG'))]
+        )
+
+        assert ergebnis['w320']['dateien'] == {'webp': 'abc_w320.webp', 'jpeg': 'abc_w320.jpg'}
+        with Image.open(tmp_path / 'abc_w320.webp') as webp, Image.open(tmp_path / 'abc_w320.jpg') as jpeg:
+            assert (webp.format, webp.size) == ('WEBP', (320, 240))
+            assert (jpeg.format, jpeg.size) == ('JPEG', (320, 240))
+        assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+            bilder.ausgabe_dateien('abc', [Rendition('w320', 320, 320, 85, '_w320', ('WEBP', 'JPEG'))])
+        )
+
+    def test_gleich_grosse_renditionen_teilen_dateien(self, tmp_path):
+        """Test: Ist das Original schmaler als mehrere Breiten, wird nur einmal kodiert"""
+        renditionen = [Rendition(f'w{b}', b, b, 85, f'_w{b}', ('WEBP', 'JPEG')) for b in (320, 640, 1280)]
+
+        ergebnis = bilder.renditionen_speichern(_bild_bytes((500, 250)), str(tmp_path), 'abc', renditionen)
+
+        assert ergebnis['w640']['dateien'] == ergebnis['w1280']['dateien'] == {
+            'webp': 'abc_w640.webp', 'jpeg': 'abc_w640.jpg'
+        }
+        assert ergebnis['w1280']['breite'] == 500
+        assert not (tmp_path / 'abc_w1280.webp').exists()
+
+    def test_formate_lesen(self, monkeypatch):
+        """Test: Unbekannte und nicht verfügbare Formate entfallen, JPEG ist immer dabei"""
+        monkeypatch.setattr(bilder, 'AVIF_VERFUEGBAR', False)
+        assert bilder._formate_lesen('avif, webp, gif') == ('WEBP', 'JPEG')
+        assert bilder._formate_lesen('jpeg,webp') == ('JPEG', 'WEBP')
+
+        monkeypatch.setattr(bilder, 'AVIF_VERFUEGBAR', True)
+        assert bilder._formate_lesen('avif,webp,jpeg') == ('AVIF', 'WEBP', 'JPEG')
+
+
+@pytest.fixture
+def profil_datenbank(fake_db, monkeypatch, tmp_path):
+    """
+    Attrappe für das Speichern der Profilbild-URL; Dateien landen im temporären Verzeichnis
+    """
+    import models.user as benutzer_modell
+
+    datenbank = fake_db(benutzer_modell, antwort=('static/profile_images/profile_7.jpg',))
+    monkeypatch.chdir(tmp_path)
+    yield datenbank
+
+
+class TestProfilbild:
+    """Tests für profilbild_speichern über die Bild-Engine"""
+
+    class _Upload:
+        def __init__(self, stream, filename):
+            self.stream = stream
+            self.filename = filename
+
+    def test_profilbild_wird_begrenzt_und_als_jpeg_gespeichert(self, profil_datenbank, tmp_path):
+        """Test: PNG-Uploads werden auf 500x500 begrenzt und als JPEG gespeichert"""
+        from models.user import profilbild_speichern
+
+        bild_url = profilbild_speichern(7, self._Upload(_bild_bytes((1000, 800), 'PNG'), 'ich.png'))
+
+        inhalt = bilder.inhalt_hash(str(tmp_path / bild_url))
+        assert bild_url == f'static/profile_images/{inhalt}.jpg'
+        with Image.open(tmp_path / bild_url) as bild:
+            assert bild.format == 'JPEG'
+            assert bild.size == (500, 400)
+        assert ('UPDATE benutzer SET profilbild_url = %s WHERE id = %s', (bild_url, 7)) in profil_datenbank.anweisungen
+        assert profil_datenbank.anweisungen[-1][1] == (inhalt, 'profil')
+
+    def test_gleiches_bild_eine_datei_neues_bild_neue_url(self, profil_datenbank, tmp_path):
+        """Test: Gleiche Bilder teilen eine Datei, geänderte Bilder erhalten eine neue URL"""
+        from models.user import profilbild_speichern
+
+        erste = profilbild_speichern(7, self._Upload(_bild_bytes((600, 600)), 'ich.jpg'))
+        zweite = profilbild_speichern(8, self._Upload(_bild_bytes((600, 600)), 'du.jpg'))
+        dritte = profilbild_speichern(7, self._Upload(_bild_bytes((600, 600), farbe=(0, 0, 0)), 'ich.jpg'))
+
+        assert erste == zweite
+        assert dritte != erste
+        assert len(list((tmp_path / 'static' / 'profile_images').iterdir())) == 2
+
+    def test_ungueltiges_profilbild(self, profil_datenbank):
+        """Test: Dateien mit Bild-Endung, aber ohne Bildinhalt werden abgelehnt"""
+        from models.user import profilbild_speichern
+
+        assert profilbild_speichern(7, self._Upload(io.BytesIO(b'kein Bild'), 'ich.png')) is None
+        assert profil_datenbank.anweisungen == []
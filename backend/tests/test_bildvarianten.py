@@ -0,0 +1,180 @@
+"""
+Tests für Bildvarianten auf Abruf (Erlaubnisliste, Platten-Cache, Zusammenfassen)
+"""
+
+import io
+import os
+import threading
+
+import pytest
+from PIL import Image
+
+import utils.bildvarianten as bildvarianten
+from utils.bilder import UngueltigesBild
+from utils.bildvarianten import Bildvarianten, UngueltigeVariante, groessen_lesen
+
+
+def _jpeg_bytes(groesse=(1600, 1200), farbe=(200, 80, 40)):
+    puffer = io.BytesIO()
+    Image.new('RGB', groesse, farbe).save(puffer, 'JPEG')
+    return puffer.getvalue()
+
+
+@pytest.fixture
+def quelle(tmp_path):
+    pfad = tmp_path / 'abc.jpg'
+    pfad.write_bytes(_jpeg_bytes())
+    return str(pfad)
+
+
+@pytest.fixture
+def varianten(tmp_path):
+    return Bildvarianten(str(tmp_path / 'cache'), groessen_lesen('320,640,300x200'))
+
+
+class TestParameter:
+    """Tests für die Prüfung von w, h und fmt"""
+
+    def test_erlaubte_groessen(self, varianten):
+        """Test: Nur Größen aus der Konfiguration werden angenommen"""
+        assert varianten.parameter_lesen({'w': '320'}) == (320, None, 'jpeg')
+        assert varianten.parameter_lesen({'w': '300', 'h': '200', 'fmt': 'webp'}) == (300, 200, 'webp')
+        assert varianten.parameter_lesen({'w': '640', 'fmt': 'JPG'}) == (640, None, 'jpeg')
+
+    @pytest.mark.parametrize('argumente', [
+        {'w': '321'}, {'w': '320', 'h': '200'}, {'h': '200'}, {'w': 'gross'}, {'w': '320', 'fmt': 'gif'}
+    ])
+    def test_ungueltige_parameter(self, varianten, argumente):
+        """Test: Andere Größen, fehlende Breite und unbekannte Formate werden abgelehnt"""
+        with pytest.raises(UngueltigeVariante):
+            varianten.parameter_lesen(argumente)
+
+
+class TestVariantencache:
+    """Tests für Erzeugung, Treffer und Verdrängung"""
+
+    def test_erzeugt_einmal_dann_treffer(self, varianten, quelle):
+        """Test: Die erste Anfrage erzeugt die Variante, weitere lesen sie aus dem Cache"""
+        pfad = varianten.variante(quelle, 320, None, 'webp')
+
+        assert varianten.variante(quelle, 320, None, 'webp') == pfad
+        with Image.open(pfad) as bild:
+            assert (bild.format, bild.size) == ('WEBP', (320, 240))
+        statistiken = varianten.statistiken()
+        assert (statistiken['erzeugt'], statistiken['treffer']) == (1, 1)
+        assert statistiken['belegt_bytes'] == os.path.getsize(pfad)
+
+    def test_geaenderte_quelle_ergibt_neue_variante(self, varianten, quelle):
+        """Test: Wird die Quelldatei ersetzt, wird die Variante neu berechnet"""
+        alt = varianten.variante(quelle, 300, 200, 'jpeg')
+        with open(quelle, 'wb') as datei:
+            datei.write(_jpeg_bytes((800, 800)))
+
+        neu = varianten.variante(quelle, 300, 200, 'jpeg')
+
+        assert neu != alt
+        with Image.open(neu) as bild:
+            assert bild.size == (200, 200)
+
+    def test_am_laengsten_ungenutzte_variante_wird_verdraengt(self, tmp_path, quelle):
+        """Test: Beim Überschreiten der Obergrenze fallen die ältesten Varianten heraus"""
+        varianten = Bildvarianten(str(tmp_path / 'cache'), groessen_lesen('320,640,300x200'), max_bytes=1)
+        erste = varianten.variante(quelle, 320, None, 'jpeg')
+        zweite = varianten.variante(quelle, 640, None, 'jpeg')
+
+        assert not os.path.exists(erste)
+        assert os.path.exists(zweite)
+        assert varianten.statistiken()['verdraengt'] == 1
+
+    def test_treffer_zaehlen_als_nutzung(self, varianten, quelle):
+        """Test: Ein Treffer schützt die Variante vor der Verdrängung"""
+        erste = varianten.variante(quelle, 320, None, 'jpeg')
+        zweite = varianten.variante(quelle, 300, 200, 'jpeg')
+        dritte = varianten.variante(quelle, 640, None, 'jpeg')
+        for zeitpunkt, pfad in enumerate((erste, zweite, dritte), start=1):
+            os.utime(pfad, (zeitpunkt, zeitpunkt))
+        varianten.variante(quelle, 320, None, 'jpeg')
+
+        # Platz für erste und dritte, nicht für alle drei
+        varianten.max_bytes = int((os.path.getsize(erste) + os.path.getsize(dritte)) / bildvarianten.NIEDRIGWASSER) + 1
+        varianten._aufraeumen()
+
+        assert not os.path.exists(zweite)
+        assert os.path.exists(erste) and os.path.exists(dritte)
+
+    def test_bestand_wird_beim_start_gezaehlt(self, tmp_path, quelle):
+        """Test: Eine neue Instanz übernimmt die Belegung eines vorhandenen Caches"""
+        erste = Bildvarianten(str(tmp_path / 'cache'), groessen_lesen('320'))
+        pfad = erste.variante(quelle, 320, None, 'jpeg')
+
+        zweite = Bildvarianten(str(tmp_path / 'cache'), groessen_lesen('320'))
+
+        assert zweite.statistiken()['belegt_bytes'] == os.path.getsize(pfad)
+
+    def test_gleichzeitige_anfragen_werden_zusammengefasst(self, varianten, quelle, monkeypatch):
+        """Test: Bei leerem Cache rechnet nur eine von mehreren gleichzeitigen Anfragen"""
+        echtes_erzeugen = bildvarianten.renditionen_erzeugen
+        aufrufe = []
+        freigabe = threading.Event()
+
+        def erzeugen(*argumente):
+            aufrufe.append(argumente)
+            freigabe.wait(5)
+            return echtes_erzeugen(*argumente)
+
+        monkeypatch.setattr(bildvarianten, 'renditionen_erzeugen', erzeugen)
+        ergebnisse = []
+        threads = [threading.Thread(target=lambda: ergebnisse.append(varianten.variante(quelle, 640, None, 'jpeg')))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while varianten.statistiken()['zusammengefasst'] < 4:
+            threading.Event().wait(0.01)
+        freigabe.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(aufrufe) == 1
+        assert len(set(ergebnisse)) == 1 and len(ergebnisse) == 5
+
+    def test_defekte_quelle_hinterlaesst_nichts(self, varianten, tmp_path):
+        """Test: Ist die Quelle kein Bild, wird der Fehler gemeldet und nichts zwischengespeichert"""
+        defekt = tmp_path / 'defekt.jpg'
+        defekt.write_bytes(b'kein Bild')
+
+        with pytest.raises(UngueltigesBild):
+            varianten.variante(str(defekt), 320, None, 'jpeg')
+        assert varianten.statistiken()['erzeugt'] == 0
+        assert os.listdir(varianten.verzeichnis) == []
+
+
+class TestVariantenRoute:
+    """Tests für /static/uploads/<name>?w=&h=&fmt="""
+
+    @pytest.fixture
+    def upload_ordner(self, app, monkeypatch, tmp_path):
+        monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+        (tmp_path / 'abc.jpg').write_bytes(_jpeg_bytes())
+        return tmp_path
+
+    def test_variante_wird_ausgeliefert(self, client, upload_ordner):
+        """Test: Eine erlaubte Variante wird im gewünschten Format ausgeliefert"""
+        antwort = client.get('/static/uploads/abc.jpg?w=320&fmt=webp')
+
+        assert antwort.status_code == 200
+        assert antwort.mimetype == 'image/webp'
+        with Image.open(io.BytesIO(antwort.data)) as bild:
+            assert bild.size == (320, 240)
+
+    def test_ohne_parameter_das_original(self, client, upload_ordner):
+        """Test: Ohne Abfrageparameter wird die Datei unverändert ausgeliefert"""
+        antwort = client.get('/static/uploads/abc.jpg')
+
+        assert antwort.status_code == 200
+        assert antwort.data == (upload_ordner / 'abc.jpg').read_bytes()
+
+    def test_nicht_erlaubte_groesse_und_fehlende_datei(self, client, upload_ordner):
+        """Test: Fremde Größen ergeben 400, fehlende Dateien 404"""
+        assert client.get('/static/uploads/abc.jpg?w=333').status_code == 400
+        assert client.get('/static/uploads/fehlt.jpg?w=320').status_code == 404
+        assert client.get('/static/uploads/../abc.jpg?w=320').status_code == 404
@@ -0,0 +1,371 @@
+"""
+Tests für die asynchrone Bildverarbeitung (Prozess-Pool, Wiederholungen, Status)
+"""
+
+import io
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+
+from utils.bilder import BILD_BREITEN, BILD_FORMATE, RENDER_SIGNATUR, inhalt_hash
+from utils.bildverarbeitung import Bildverarbeitung, bild_rendern, STATUS_FERTIG, STATUS_FEHLGESCHLAGEN
+
+
+def _jpeg_bytes(groesse=(2400, 1600), farbe=(200, 80, 40)):
+    puffer = io.BytesIO()
+    Image.new('RGB', groesse, farbe).save(puffer, 'JPEG')
+    return puffer.getvalue()
+
+
+class _Datei:
+    """Minimaler Ersatz für FileStorage"""
+
+    def __init__(self, daten):
+        self.daten = daten
+
+    def save(self, ziel):
+        with open(ziel, 'wb') as datei:
+            datei.write(self.daten)
+
+
+class _Meldungen:
+    """Sammelt Rückrufe der Bildverarbeitung und signalisiert deren Eingang"""
+
+    def __init__(self, antwort=True):
+        self.antwort = antwort
+        self.eintraege = []
+        self.bilder = []
+        self.eingegangen = threading.Event()
+
+    def __call__(self, auftrag, status, bild_pfad, bilder=None):
+        self.eintraege.append((auftrag, status, bild_pfad))
+        self.bilder.append(bilder)
+        self.eingegangen.set()
+        return self.antwort
+
+
+def _urls(bilder):
+    yield bilder['voll']['url']
+    yield bilder['thumb']['url']
+    for eintrag in bilder['renditionen']:
+        yield from eintrag['formate'].values()
+
+
+@pytest.fixture
+def verzeichnisse(tmp_path):
+    return str(tmp_path / 'roh'), str(tmp_path / 'uploads')
+
+
+def _verarbeitung(verzeichnisse, meldungen, **optionen):
+    optionen.setdefault('ausfuehrer_erstellen', lambda anzahl: ThreadPoolExecutor(max_workers=anzahl))
+    return Bildverarbeitung(verzeichnisse[0], verzeichnisse[1], meldungen, worker=2, **optionen)
+
+
+class TestBildRendern:
+    """Tests für die Render-Funktion der Worker-Prozesse"""
+
+    def test_erzeugt_bild_und_thumbnail(self, tmp_path):
+        """Test: Optimiertes Bild und Thumbnail werden in den Grenzen erzeugt"""
+        roh_pfad = tmp_path / 'roh.jpg'
+        roh_pfad.write_bytes(_jpeg_bytes())
+
+        ergebnis = bild_rendern(str(roh_pfad), str(tmp_path), 'abc')
+
+        inhalt = inhalt_hash(str(roh_pfad), RENDER_SIGNATUR)
+        assert ergebnis['inhalt'] == inhalt
+        assert ergebnis['image_url'] == f'static/uploads/{inhalt}.jpg'
+        assert ergebnis['thumb_url'] == f'static/uploads/{inhalt}_thumb.jpg'
+        assert ergebnis['bilder']['voll'] == {'url': f'static/uploads/{inhalt}.jpg', 'breite': 1620, 'hoehe': 1080}
+        assert ergebnis['bilder']['thumb'] == {'url': f'static/uploads/{inhalt}_thumb.jpg', 'breite': 300, 'hoehe': 200}
+        with Image.open(tmp_path / f'{inhalt}.jpg') as bild:
+            assert bild.size == (1620, 1080)
+        with Image.open(tmp_path / f'{inhalt}_thumb.jpg') as thumb:
+            assert thumb.size == (300, 200)
+        assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+    def test_responsive_renditionen_und_srcset(self, tmp_path):
+        """Test: Jede konfigurierte Breite liegt in allen Formaten vor und steht im srcset"""
+        roh_pfad = tmp_path / 'roh.jpg'
+        roh_pfad.write_bytes(_jpeg_bytes())
+
+        bilder = bild_rendern(str(roh_pfad), str(tmp_path), 'abc')['bilder']
+        inhalt = inhalt_hash(str(roh_pfad), RENDER_SIGNATUR)
+
+        assert [eintrag['breite'] for eintrag in bilder['renditionen']] == list(BILD_BREITEN)
+        formate = [format_name.lower() for format_name in BILD_FORMATE]
+        for eintrag in bilder['renditionen']:
+            assert list(eintrag['formate']) == formate
+            for url in eintrag['formate'].values():
+                with Image.open(tmp_path / os.path.basename(url)) as bild:
+                    assert bild.size == (eintrag['breite'], eintrag['hoehe'])
+        assert bilder['srcset']['webp'] == ', '.join(
+            f'static/uploads/{inhalt}_w{breite}.webp {breite}w' for breite in BILD_BREITEN
+        )
+
+    def test_kleines_original_ohne_doppelte_breiten(self, tmp_path):
+        """Test: Breiten über der Originalgröße erscheinen nicht doppelt im srcset"""
+        roh_pfad = tmp_path / 'roh.jpg'
+        roh_pfad.write_bytes(_jpeg_bytes((400, 300)))
+
+        bilder = bild_rendern(str(roh_pfad), str(tmp_path), 'abc')['bilder']
+
+        breiten = [eintrag['breite'] for eintrag in bilder['renditionen']]
+        assert breiten == sorted(set(breiten))
+        assert breiten[-1] == 400
+
+
+class TestBildverarbeitung:
+    """Tests für Auftragsverteilung, Wiederholungen und Wiederaufnahme"""
+
+    def test_auftrag_wird_gerendert_und_gemeldet(self, verzeichnisse):
+        """Test: Nach dem Rendern wird bild_pfad gemeldet und die Rohdatei entfernt"""
+        meldungen = _Meldungen()
+        verarbeitung = _verarbeitung(verzeichnisse, meldungen)
+        daten = _jpeg_bytes()
+        auftrag = verarbeitung.roh_speichern(_Datei(daten), 'jpg')
+
+        verarbeitung.einreichen(auftrag)
+        assert meldungen.eingegangen.wait(10)
+        verarbeitung.anhalten()
+
+        inhalt = inhalt_hash(daten, RENDER_SIGNATUR)
+        assert meldungen.eintraege == [(auftrag, STATUS_FERTIG, f'static/uploads/{inhalt}.jpg')]
+        assert meldungen.bilder[0]['thumb']['url'] == f'static/uploads/{inhalt}_thumb.jpg'
+        assert os.listdir(verzeichnisse[0]) == []
+        assert os.path.exists(os.path.join(verzeichnisse[1], f'{inhalt}_thumb.jpg'))
+        assert verarbeitung.statistiken()['fertig'] == 1
+
+    def test_voruebergehender_fehler_wird_wiederholt(self, verzeichnisse, monkeypatch):
+        """Test: Fehlgeschlagene Aufträge werden nach einer Wartezeit wiederholt"""
+        import utils.bildverarbeitung as bildverarbeitung
+
+        echtes_rendern = bildverarbeitung.bild_rendern
+        aufrufe = []
+
+        def rendern(*argumente):
+            aufrufe.append(argumente)
+            if len(aufrufe) < 3:
+                raise OSError("Platte voll")
+            return echtes_rendern(*argumente)
+
+        monkeypatch.setattr(bildverarbeitung, 'bild_rendern', rendern)
+        meldungen = _Meldungen()
+        verarbeitung = _verarbeitung(verzeichnisse, meldungen, max_versuche=3, wartezeit=0.01)
+        auftrag = verarbeitung.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+
+        verarbeitung.einreichen(auftrag)
+        assert meldungen.eingegangen.wait(10)
+        verarbeitung.anhalten()
+
+        assert len(aufrufe) == 3
+        assert meldungen.eintraege[0][:2] == (auftrag, STATUS_FERTIG)
+        assert verarbeitung.statistiken()['wiederholungen'] == 2
+
+    def test_defektes_bild_wird_sofort_aufgegeben(self, verzeichnisse):
+        """Test: Ungültige Bilder werden ohne Wiederholung als fehlgeschlagen gemeldet"""
+        meldungen = _Meldungen()
+        verarbeitung = _verarbeitung(verzeichnisse, meldungen, max_versuche=3, wartezeit=0.01)
+        auftrag = verarbeitung.roh_speichern(_Datei(b'\xff\xd8\xff kein Bild'), 'jpg')
+
+        verarbeitung.einreichen(auftrag)
+        assert meldungen.eingegangen.wait(10)
+        verarbeitung.anhalten()
+
+        statistiken = verarbeitung.statistiken()
+        assert meldungen.eintraege == [(auftrag, STATUS_FEHLGESCHLAGEN, None)]
+        assert statistiken['wiederholungen'] == 0
+        assert statistiken['fehlgeschlagen'] == 1
+        assert os.listdir(verzeichnisse[0]) == []
+
+    def test_ueberholter_auftrag_ueberlaesst_ausgaben_dem_aufraeumen(self, verzeichnisse):
+        """Test: Ausgaben überholter Aufträge bleiben liegen, ein anderes Rezept kann sie teilen"""
+        meldungen = _Meldungen(antwort=False)
+        verarbeitung = _verarbeitung(verzeichnisse, meldungen)
+        auftrag = verarbeitung.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+
+        verarbeitung.einreichen(auftrag)
+        assert meldungen.eingegangen.wait(10)
+        verarbeitung.anhalten()
+
+        assert verarbeitung.statistiken()['ueberholt'] == 1
+        assert os.path.exists(os.path.join(verzeichnisse[1], os.path.basename(meldungen.eintraege[0][2])))
+        assert os.listdir(verzeichnisse[0]) == []
+
+    def test_gleiche_uploads_teilen_dateien(self, verzeichnisse):
+        """Test: Gleiche Bytes ergeben dieselben Dateinamen und werden nur einmal abgelegt"""
+        meldungen = _Meldungen()
+        verarbeitung = _verarbeitung(verzeichnisse, meldungen)
+        daten = _jpeg_bytes((400, 300))
+        erster = verarbeitung.roh_speichern(_Datei(daten), 'jpg')
+        zweiter = verarbeitung.roh_speichern(_Datei(daten), 'jpg')
+
+        verarbeitung.einreichen(erster)
+        verarbeitung.einreichen(zweiter)
+        for _ in range(1000):
+            if len(meldungen.eintraege) == 2:
+                break
+            threading.Event().wait(0.01)
+        verarbeitung.anhalten()
+
+        assert {eintrag[0] for eintrag in meldungen.eintraege} == {erster, zweiter}
+        assert meldungen.eintraege[0][2] == meldungen.eintraege[1][2]
+        assert meldungen.bilder[0] == meldungen.bilder[1]
+        assert sorted(os.listdir(verzeichnisse[1])) == sorted({os.path.basename(url) for url in _urls(meldungen.bilder[0])})
+
+    def test_liegengebliebene_auftraege_werden_wieder_aufgenommen(self, verzeichnisse):
+        """Test: Rohdateien einer früheren Instanz werden beim Start verarbeitet"""
+        erste = _verarbeitung(verzeichnisse, _Meldungen())
+        auftrag = erste.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+
+        meldungen = _Meldungen()
+        zweite = _verarbeitung(verzeichnisse, meldungen)
+        assert zweite.wiederaufnehmen() == 1
+        assert meldungen.eingegangen.wait(10)
+        zweite.anhalten()
+
+        assert meldungen.eintraege[0][:2] == (auftrag, STATUS_FERTIG)
+
+    def test_beanspruchte_rohdatei_bleibt_dem_anderen_prozess(self, verzeichnisse):
+        """Test: Eine von einem laufenden Prozess beanspruchte Rohdatei wird nicht erneut gerendert"""
+        erste = _verarbeitung(verzeichnisse, _Meldungen())
+        auftrag = erste.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+        roh_pfad = os.path.join(verzeichnisse[0], f'{auftrag}.jpg')
+        os.rename(roh_pfad, f'{roh_pfad}.{os.getppid()}')
+
+        meldungen = _Meldungen()
+        zweite = _verarbeitung(verzeichnisse, meldungen)
+        assert zweite.wiederaufnehmen() == 0
+        zweite.einreichen(auftrag)
+        zweite.anhalten()
+
+        assert meldungen.eintraege == []
+        assert os.listdir(verzeichnisse[0]) == [f'{auftrag}.jpg.{os.getppid()}']
+
+    def test_rohdatei_eines_beendeten_prozesses_wird_freigegeben(self, verzeichnisse):
+        """Test: Beanspruchte Rohdateien beendeter Prozesse werden beim Start wieder aufgenommen"""
+        beendet = subprocess.Popen([sys.executable, '-c', 'pass'])
+        beendet.wait()
+        erste = _verarbeitung(verzeichnisse, _Meldungen())
+        auftrag = erste.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+        roh_pfad = os.path.join(verzeichnisse[0], f'{auftrag}.jpg')
+        os.rename(roh_pfad, f'{roh_pfad}.{beendet.pid}')
+
+        meldungen = _Meldungen()
+        zweite = _verarbeitung(verzeichnisse, meldungen)
+        assert zweite.wiederaufnehmen() == 1
+        assert meldungen.eingegangen.wait(10)
+        zweite.anhalten()
+
+        assert meldungen.eintraege[0][:2] == (auftrag, STATUS_FERTIG)
+        assert os.listdir(verzeichnisse[0]) == []
+
+    def test_prozess_pool(self, verzeichnisse):
+        """Test: Mit dem Standard-Executor wird in einem eigenen Prozess gerendert"""
+        meldungen = _Meldungen()
+        verarbeitung = Bildverarbeitung(verzeichnisse[0], verzeichnisse[1], meldungen, worker=1)
+        auftrag = verarbeitung.roh_speichern(_Datei(_jpeg_bytes((400, 300))), 'jpg')
+
+        verarbeitung.einreichen(auftrag)
+        assert meldungen.eingegangen.wait(60)
+        verarbeitung.anhalten()
+
+        assert meldungen.eintraege[0][1] == STATUS_FERTIG
+
+
+class TestBildRouten:
+    """Tests für Upload und Statusabfrage"""
+
+    def test_upload_antwortet_mit_ausstehendem_bild(self, client, monkeypatch):
+        """Test: Das Rezept wird sofort mit bild_status 'ausstehend' gespeichert"""
+        import routes.rezept_routes as rezept_routes
+        from utils.token import generate_tokens
+
+        gespeichert = {}
+        eingereicht = []
+
+        def erstellen(**felder):
+            gespeichert.update(felder)
+            return 11
+
+        monkeypatch.setattr(rezept_routes, 'rezept_erstellen', erstellen)
+        monkeypatch.setattr(rezept_routes, 'rezept_abrufen', lambda rezept_id: {'id': rezept_id, **gespeichert})
+        verarbeitung = rezept_routes.bildverarbeitung_abrufen()
+        monkeypatch.setattr(verarbeitung, 'einreichen', eingereicht.append)
+
+        token, _ = generate_tokens(3, 'koch@example.com')
+        antwort = client.post('/api/rezepte', headers={'Authorization': f'Bearer {token}'}, data={
+            'titel': 'Pizza', 'zubereitung': 'Backen',
+            'bild': (io.BytesIO(_jpeg_bytes((400, 300))), 'pizza.jpg')
+        }, content_type='multipart/form-data')
+
+        assert antwort.status_code == 201
+        assert antwort.get_json()['rezept']['bild_status'] == 'ausstehend'
+        assert eingereicht == [gespeichert['bild_auftrag']]
+        verarbeitung.verwerfen(gespeichert['bild_auftrag'])
+
+    def test_ungueltige_datei_wird_abgelehnt(self, client):
+        """Test: Dateien, die keine Bilder sind, werden schon bei der Anfrage abgelehnt"""
+        from utils.token import generate_tokens
+
+        token, _ = generate_tokens(3, 'koch@example.com')
+        antwort = client.post('/api/rezepte', headers={'Authorization': f'Bearer {token}'}, data={
+            'titel': 'Pizza', 'zubereitung': 'Backen',
+            'bild': (io.BytesIO(b'kein Bild'), 'pizza.jpg')
+        }, content_type='multipart/form-data')
+
+        assert antwort.status_code == 400
+
+    def test_bildstatus(self, client, monkeypatch):
+        """Test: Der Status-Endpunkt meldet Status und aktuellen Bildpfad"""
+        import routes.rezept_routes as rezept_routes
+
+        monkeypatch.setattr(rezept_routes, 'rezept_abrufen', lambda rezept_id: {
+            'id': rezept_id, 'bild_status': None, 'bild_pfad': 'static/uploads/alt.jpg'
+        } if rezept_id == 4 else None)
+
+        antwort = client.get('/api/rezepte/4/bild')
+
+        assert antwort.status_code == 200
+        assert antwort.get_json() == {'rezept_id': 4, 'bild_status': 'fertig', 'bild_pfad': 'static/uploads/alt.jpg'}
+        assert client.get('/api/rezepte/5/bild').status_code == 404
+
+
+class TestRezeptBilder:
+    """Tests für das Speichern und Ausliefern der Renditionsbeschreibung"""
+
+    def test_ergebnis_speichert_renditionen_als_json(self, fake_db):
+        """Test: Der Rückruf schreibt bild_pfad und die Beschreibung in die Rezeptzeile"""
+        import json
+
+        import models.rezept as rezept_modell
+
+        datenbank = fake_db(rezept_modell, antwort=(7, 'static/uploads/alt.jpg'))
+        anweisungen = datenbank.anweisungen
+        bilder = {'thumb': {'url': 'static/uploads/abc_thumb.jpg', 'breite': 300, 'hoehe': 200}}
+
+        inhalt = 'a' * 64
+        assert rezept_modell.rezept_bild_abschliessen('abc', STATUS_FERTIG, f'static/uploads/{inhalt}.jpg', bilder)
+
+        sql, parameter = anweisungen[1]
+        assert sql.startswith('UPDATE rezepte SET bild_pfad = %s, bild_renditionen = %s')
+        assert json.loads(parameter[1]) == bilder
+        # Älterer Upload ohne Inhalts-Hash: nur die neue Referenz wird gezählt
+        assert anweisungen[2][0].startswith('INSERT INTO bilddateien')
+        assert anweisungen[2][1] == (inhalt, 'rezept')
+        assert len(anweisungen) == 3
+
+    def test_bilder_feld_im_rezept(self):
+        """Test: Die gespeicherte Beschreibung erscheint als Objekt bilder, auch bei erneuter Verarbeitung"""
+        from models.rezept import verarbeite_bild_info
+
+        rezept = verarbeite_bild_info({'id': 1, 'bild_renditionen': '{"srcset": {"webp": "a.webp 320w"}}'})
+        assert rezept == {'id': 1, 'bilder': {'srcset': {'webp': 'a.webp 320w'}}}
+        assert verarbeite_bild_info(rezept)['bilder'] == {'srcset': {'webp': 'a.webp 320w'}}
+
+        assert verarbeite_bild_info({'id': 2, 'bild_renditionen': None}) == {'id': 2, 'bilder': None}
+        assert verarbeite_bild_info({'id': 3, 'bild_renditionen': 'kaputt'})['bilder'] is None
@@ -0,0 +1,255 @@
+"""
+Tests für den Zwischenspeicher, die zwischengespeicherte Rezeptanzahl
+und den Zwischenspeicher für Einzelrezepte
+"""
+
+import pytest
+
+import models.rezept as rezept_modell
+from utils.cache import Zwischenspeicher
+
+
+@pytest.fixture
+def zaehl_datenbank(fake_db):
+    """
+    Ersetzt die Datenbankverbindung des Rezeptmodells durch eine Attrappe
+    """
+    datenbank = fake_db(rezept_modell, antwort=(42,))
+    rezept_modell.anzahl_cache_invalidieren()
+    yield datenbank.anweisungen
+    rezept_modell.anzahl_cache_invalidieren()
+
+
+class TestZwischenspeicher:
+    """Test-Klasse für den LRU-Zwischenspeicher"""
+
+    def test_abgelaufener_eintrag_wird_verworfen(self):
+        """
+        Einträge sind nach Ablauf ihrer TTL nicht mehr abrufbar
+        """
+        cache = Zwischenspeicher(ttl=0)
+        cache.setzen('a', 1)
+
+        assert cache.abrufen('a') is None
+        assert len(cache) == 0
+
+    def test_lru_verdraengung(self):
+        """
+        Bei voller Kapazität wird der am längsten ungenutzte Eintrag verdrängt
+        """
+        cache = Zwischenspeicher(max_eintraege=2, ttl=60)
+        cache.setzen('a', 1)
+        cache.setzen('b', 2)
+        cache.abrufen('a')
+        cache.setzen('c', 3)
+
+        assert cache.abrufen('a') == 1
+        assert cache.abrufen('b') is None
+        assert cache.statistiken()['treffer'] == 2
+
+
+    def test_byte_grenze_verdraengt_und_zaehlt(self):
+        """
+        Die Summe der Eintragsgrößen bleibt unter max_bytes
+        """
+        cache = Zwischenspeicher(max_eintraege=10, ttl=60, max_bytes=10, groesse=len)
+        cache.setzen('a', 'xxxx')
+        cache.setzen('b', 'yyyy')
+        cache.setzen('c', 'zzzz')
+        cache.setzen('d', 'x' * 11)
+
+        statistiken = cache.statistiken()
+        assert cache.abrufen('a') is None
+        assert cache.abrufen('d') is None
+        assert statistiken['bytes'] == 8
+        assert statistiken['verdraengungen'] == 1
+
+    def test_entfernen_wenn(self):
+        """
+        Einträge können anhand ihres Werts gezielt entfernt werden
+        """
+        cache = Zwischenspeicher(ttl=60)
+        cache.setzen(1, {'benutzer_id': 7})
+        cache.setzen(2, {'benutzer_id': 8})
+
+        assert cache.entfernen_wenn(lambda wert: wert['benutzer_id'] == 7) == 1
+        assert cache.abrufen(1) is None
+        assert cache.abrufen(2) == {'benutzer_id': 8}
+
+
+class TestRezeptAnzahl:
+    """Test-Klasse für den Zählpfad der Rezeptliste"""
+
+    def test_anzahl_wird_je_filtersatz_zwischengespeichert(self, zaehl_datenbank):
+        """
+        Wiederholte Zählungen mit gleichen Filtern treffen die Datenbank nur einmal
+        """
+        assert rezept_modell.rezepte_zaehlen(kategorie_id=3) == 42
+        assert rezept_modell.rezepte_zaehlen(kategorie_id=3) == 42
+        assert rezept_modell.rezepte_zaehlen(benutzer_id=1) == 42
+
+        assert len(zaehl_datenbank) == 2
+        sql, parameter = zaehl_datenbank[0]
+        assert 'COUNT(*)' in sql
+        assert parameter == [3]
+
+    def test_schreibvorgang_invalidiert_anzahl(self, zaehl_datenbank):
+        """
+        Nach dem Erstellen eines Rezepts wird die Anzahl neu ermittelt
+        """
+        rezept_modell.rezepte_zaehlen()
+        rezept_modell.rezept_erstellen('Suppe', [], 'Kochen', 1)
+        rezept_modell.rezepte_zaehlen()
+
+        zaehlungen = [sql for sql, _ in zaehl_datenbank if 'COUNT(*)' in sql]
+        assert len(zaehlungen) == 2
+
+
+@pytest.fixture
+def rezept_datenbank(fake_db, monkeypatch):
+    """
+    Attrappe, die für rezept_abrufen eine Rezeptzeile liefert und Abfragen zählt
+    """
+    datenbank = fake_db(rezept_modell, antwort={
+        'id': 5, 'titel': 'Suppe', 'zutaten': '[{"name": "Wasser"}]', 'benutzer_id': 7,
+        'benutzer_name': 'Anna', 'benutzer_email': 'anna@example.com',
+        'kategorie_id': 2, 'kategorie_name': 'Suppen'
+    })
+    datenbank.lastrowid = 5
+    monkeypatch.setattr(rezept_modell.suchdienst, 'rezept_indexieren', lambda rezept_id: None)
+    rezept_modell.rezept_cache_invalidieren()
+    yield datenbank.anweisungen
+    rezept_modell.rezept_cache_invalidieren()
+
+
+class TestRezeptCache:
+    """Test-Klasse für den Zwischenspeicher von rezept_abrufen"""
+
+    def test_wiederholter_abruf_ohne_datenbank(self, rezept_datenbank):
+        """
+        Ein zweiter Abruf kommt aus dem Zwischenspeicher und ist eine eigene Kopie
+        """
+        erstes = rezept_modell.rezept_abrufen(5)
+        erstes['is_favorite'] = True
+        zweites = rezept_modell.rezept_abrufen(5)
+
+        assert len(rezept_datenbank) == 1
+        assert zweites['zutaten'] == [{'name': 'Wasser'}]
+        assert 'is_favorite' not in zweites
+
+    def test_aktualisieren_invalidiert(self, rezept_datenbank):
+        """
+        Nach dem Aktualisieren wird das Rezept neu geladen
+        """
+        rezept_modell.rezept_abrufen(5)
+        rezept_modell.rezept_aktualisieren(5, titel='Brühe')
+        rezept_modell.rezept_abrufen(5)
+
+        selects = [sql for sql, _ in rezept_datenbank if 'SELECT' in sql]
+        assert len(selects) == 2
+
+    def test_autor_invalidiert_eigene_rezepte(self, rezept_datenbank):
+        """
+        Eine Namensänderung des Autors verwirft dessen Rezepte
+        """
+        rezept_modell.rezept_abrufen(5)
+        rezept_modell.rezept_cache_invalidieren(benutzer_id=8)
+        rezept_modell.rezept_abrufen(5)
+        assert len(rezept_datenbank) == 1
+
+        rezept_modell.rezept_cache_invalidieren(benutzer_id=7)
+        rezept_modell.rezept_abrufen(5)
+        assert len(rezept_datenbank) == 2
+
+
+@pytest.fixture
+def gepoolte_datenbank(monkeypatch):
+    """
+    Echter Verbindungspool mit einer Attrappe als physischer Verbindung, damit
+    arbeitseinheit() Commit und Rollback wie im Betrieb behandelt
+    """
+    import db
+
+    protokoll = []
+
+    class Cursor:
+        rowcount = 1
+        lastrowid = 5
+
+        def execute(self, sql, parameter=None):
+            protokoll.append(' '.join(sql.split())[:6])
+
+        def fetchone(self):
+            return {'id': 5, 'titel': 'Suppe', 'zutaten': '[]', 'benutzer_id': 7,
+                    'benutzer_name': 'Anna', 'benutzer_email': 'anna@example.com',
+                    'kategorie_id': None, 'kategorie_name': None}
+
+        def close(self):
+            pass
+
+    class RoheVerbindung:
+        in_transaction = False
+
+        def cursor(self, **optionen):
+            return Cursor()
+
+        def commit(self):
+            protokoll.append('COMMIT')
+
+        def rollback(self):
+            protokoll.append('ROLLBACK')
+
+        def is_connected(self):
+            return True
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(db, '_pool', db.VerbindungsPool(RoheVerbindung, groesse=1, max_ueberlauf=0))
+    monkeypatch.setattr(rezept_modell.suchdienst, 'rezept_indexieren', lambda rezept_id: None)
+    echtes_invalidieren = rezept_modell.cache_backend.invalidieren
+
+    def invalidieren(bereich, **daten):
+        protokoll.append(f'INVALIDIEREN {bereich}')
+        echtes_invalidieren(bereich, **daten)
+
+    monkeypatch.setattr(rezept_modell.cache_backend, 'invalidieren', invalidieren)
+    rezept_modell.rezept_cache_invalidieren()
+    protokoll.clear()
+    yield protokoll
+    rezept_modell.rezept_cache_invalidieren()
+
+
+class TestInvalidierungNachCommit:
+    """Test-Klasse für Invalidierungen innerhalb einer Arbeitseinheit"""
+
+    def test_rollback_hinterlaesst_keinen_eintrag(self, gepoolte_datenbank):
+        """
+        Ein in der Einheit gelesenes, nie committetes Rezept landet nicht im Zwischenspeicher
+        """
+        from db import arbeitseinheit
+
+        with pytest.raises(RuntimeError):
+            with arbeitseinheit():
+                rezept_id = rezept_modell.rezept_erstellen('Suppe', [], 'Kochen', 7)
+                assert rezept_modell.rezept_abrufen(rezept_id)['titel'] == 'Suppe'
+                raise RuntimeError("Commit fehlgeschlagen")
+
+        assert rezept_modell._rezept_cache.abrufen(5) is None
+        assert not [eintrag for eintrag in gepoolte_datenbank if eintrag.startswith('INVALIDIEREN')]
+        assert gepoolte_datenbank[-1] == 'ROLLBACK'
+
+    def test_invalidierung_folgt_dem_commit(self, gepoolte_datenbank):
+        """
+        Andere Prozesse erfahren von der Änderung erst, wenn sie committet ist
+        """
+        from db import arbeitseinheit
+
+        rezept_modell.rezept_abrufen(5)
+        with arbeitseinheit():
+            rezept_modell.rezept_erstellen('Suppe', [], 'Kochen', 7)
+            rezept_modell.rezept_cache_invalidieren(5)
+
+        ende = gepoolte_datenbank[gepoolte_datenbank.index('COMMIT'):]
+        assert ende[1:] == ['INVALIDIEREN rezept_anzahl', 'INVALIDIEREN abfragen', 'INVALIDIEREN rezepte']
+        assert rezept_modell._rezept_cache.abrufen(5) is None
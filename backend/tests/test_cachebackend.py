@@ -0,0 +1,228 @@
+"""
+Tests für das Cache-Backend (prozesslokal und Redis-kompatibel)
+"""
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from utils.cachebackend import NACHRICHTEN_KANAL, CacheBackend, NetzwerkBackend, SpeicherBackend, backend_erstellen
+
+
+class _RespBehandler(socketserver.StreamRequestHandler):
+    """Beantwortet die vom Netzwerk-Backend genutzten Befehle"""
+
+    def _befehl_lesen(self):
+        zeile = self.rfile.readline()
+        if not zeile:
+            return None
+        teile = []
+        for _ in range(int(zeile[1:-2])):
+            laenge = int(self.rfile.readline()[1:-2])
+            teile.append(self.rfile.read(laenge + 2)[:-2])
+        return teile
+
+    @staticmethod
+    def _bulk(wert):
+        return b'$-1\r\n' if wert is None else b'$%d\r\n%s\r\n' % (len(wert), wert)
+
+    def handle(self):
+        server = self.server
+        while True:
+            teile = self._befehl_lesen()
+            if teile is None:
+                break
+            befehl = teile[0].upper()
+            with server.sperre:
+                if befehl == b'GET':
+                    wert, ablauf = server.daten.get(teile[1], (None, None))
+                    if ablauf is not None and ablauf <= time.monotonic():
+                        wert = None
+                    antwort = self._bulk(wert)
+                elif befehl == b'SET':
+                    ablauf = time.monotonic() + int(teile[4]) / 1000 if len(teile) > 3 else None
+                    server.daten[teile[1]] = (teile[2], ablauf)
+                    antwort = b'+OK\r\n'
+                elif befehl == b'DEL':
+                    antwort = b':%d\r\n' % int(server.daten.pop(teile[1], None) is not None)
+                elif befehl == b'PUBLISH':
+                    nachricht = b'*3\r\n' + self._bulk(b'message') + self._bulk(teile[1]) + self._bulk(teile[2])
+                    for abonnent in server.abonnenten.get(teile[1], []):
+                        abonnent.sendall(nachricht)
+                    antwort = b':%d\r\n' % len(server.abonnenten.get(teile[1], []))
+                elif befehl == b'SUBSCRIBE':
+                    server.abonnenten.setdefault(teile[1], []).append(self.connection)
+                    antwort = b'*3\r\n' + self._bulk(b'subscribe') + self._bulk(teile[1]) + b':1\r\n'
+                else:
+                    antwort = b'-ERR unbekannter Befehl\r\n'
+            self.connection.sendall(antwort)
+
+
+@pytest.fixture
+def resp_server():
+    """
+    Startet einen lokalen Redis-kompatiblen Ersatzserver
+    """
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RespBehandler)
+    server.daemon_threads = True
+    server.daten = {}
+    server.abonnenten = {}
+    server.sperre = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f"redis://127.0.0.1:{server.server_address[1]}/0"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _warten_bis(bedingung, sekunden=2.0):
+    ende = time.monotonic() + sekunden
+    while time.monotonic() < ende:
+        if bedingung():
+            return True
+        time.sleep(0.01)
+    return bedingung()
+
+
+class TestSpeicherBackend:
+    """Tests für das prozesslokale Backend"""
+
+    def test_ablage_mit_ablaufzeit(self):
+        """Werte sind bis zum Ablauf abrufbar"""
+        backend = SpeicherBackend()
+        backend.setzen('a', {'wert': 1}, ttl=0.05)
+        backend.setzen('b', [1, 2])
+
+        assert backend.abrufen('a') == {'wert': 1}
+        time.sleep(0.06)
+        assert backend.abrufen('a', 'fehlt') == 'fehlt'
+        assert backend.abrufen('b') == [1, 2]
+
+    def test_invalidieren_erreicht_eigene_abonnenten(self):
+        """invalidieren() wirkt sofort im eigenen Prozess, nachricht_senden() nicht"""
+        backend = SpeicherBackend()
+        empfangen = []
+        backend.abonnieren('rezepte', empfangen.append)
+
+        backend.invalidieren('rezepte', rezept_id=3)
+        backend.nachricht_senden('rezepte', rezept_id=4)
+
+        assert empfangen == [{'rezept_id': 3}]
+
+    def test_zwischenspeicher_erscheinen_in_statistiken(self):
+        """Über das Backend erzeugte Zwischenspeicher werden gemeldet"""
+        backend = SpeicherBackend()
+        speicher = backend.zwischenspeicher('test', max_eintraege=2, ttl=10)
+        speicher.setzen(1, 'eins')
+
+        assert backend.statistiken()['zwischenspeicher']['test']['eintraege'] == 1
+
+    def test_schnittstelle_ist_abstrakt(self):
+        """Ein Backend ohne alle Ablage- und Nachrichtenmethoden lässt sich nicht erzeugen"""
+        class Unvollstaendig(CacheBackend):
+            def abrufen(self, schluessel, standard=None):
+                return standard
+
+        with pytest.raises(TypeError):
+            Unvollstaendig()
+
+    def test_unbekanntes_schema(self):
+        """Unbekannte Backend-Adressen werden abgelehnt"""
+        assert isinstance(backend_erstellen(''), SpeicherBackend)
+        with pytest.raises(ValueError):
+            backend_erstellen('memcached://localhost')
+
+
+class TestNetzwerkBackend:
+    """Tests mit zwei Backends als Stellvertreter zweier Worker-Prozesse"""
+
+    def test_gemeinsame_ablage(self, resp_server):
+        """Ein Prozess sieht die Werte des anderen"""
+        erster, zweiter = NetzwerkBackend(resp_server.url), NetzwerkBackend(resp_server.url)
+        erster.setzen('token_sperre:abc', True, ttl=60)
+
+        assert zweiter.abrufen('token_sperre:abc') is True
+        zweiter.entfernen('token_sperre:abc')
+        assert erster.abrufen('token_sperre:abc') is None
+
+    def test_invalidierung_erreicht_andere_prozesse(self, resp_server):
+        """Invalidierungen werden an andere Prozesse verteilt, nicht doppelt an den eigenen"""
+        erster, zweiter = NetzwerkBackend(resp_server.url), NetzwerkBackend(resp_server.url)
+        beim_ersten, beim_zweiten = [], []
+        erster.abonnieren('abfragen', beim_ersten.append)
+        zweiter.abonnieren('abfragen', beim_zweiten.append)
+        # Abonnieren beim Import startet noch keinen Empfänger (erst init_app bzw. der erste Befehl)
+        assert erster._empfaenger is None and zweiter._empfaenger is None
+        erster.empfang_starten()
+        zweiter.empfang_starten()
+        assert _warten_bis(lambda: len(resp_server.abonnenten.get(NACHRICHTEN_KANAL.encode(), [])) == 2)
+
+        erster.invalidieren('abfragen', tabellen=['rezepte'])
+
+        assert _warten_bis(lambda: beim_zweiten == [{'tabellen': ['rezepte']}])
+        time.sleep(0.05)
+        assert beim_ersten == [{'tabellen': ['rezepte']}]
+        assert zweiter.statistiken()['nachrichten_empfangen'] == 1
+
+    def test_server_nicht_erreichbar(self, monkeypatch):
+        """Ohne Server wird nach dem ersten Fehler prozesslokal weitergearbeitet"""
+        with socket.socket() as frei:
+            frei.bind(('127.0.0.1', 0))
+            port = frei.getsockname()[1]
+        backend = NetzwerkBackend(f"redis://127.0.0.1:{port}/0", timeout=0.2)
+        monkeypatch.setattr(backend, 'empfang_starten', lambda: None)
+
+        backend.setzen('a', 1)
+        assert backend.abrufen('a', 'standard') == 1
+        assert backend.abrufen('b', 'standard') == 'standard'
+        statistiken = backend.statistiken()
+        assert statistiken['fehler'] == 1
+        assert statistiken['uebersprungen'] == 2
+
+    def test_pause_nach_ausfall(self, resp_server, monkeypatch):
+        """Während der Pause begrenzen die Buckets lokal; danach wird der Server wieder gefragt"""
+        backend = NetzwerkBackend(resp_server.url, pause=60)
+        monkeypatch.setattr(backend, 'empfang_starten', lambda: None)
+        verbinden = backend._verbindung
+        versuche = []
+
+        def nicht_erreichbar():
+            versuche.append(1)
+            raise ConnectionError("abgelehnt")
+
+        monkeypatch.setattr(backend, '_verbindung', nicht_erreichbar)
+        assert backend.eimer_entnehmen('ip', rate=0.001, kapazitaet=1) == (True, 0.0)
+        assert backend.eimer_entnehmen('ip', rate=0.001, kapazitaet=1)[0] is False
+        assert len(versuche) == 1
+
+        monkeypatch.setattr(backend, '_verbindung', verbinden)
+        backend.setzen('a', 1)
+        assert resp_server.daten == {}
+        backend._pause_bis = 0.0
+        backend.setzen('a', 2)
+        assert backend.abrufen('a') == 2
+        assert b'kochbuch:a' in resp_server.daten
+
+    def test_warnung_nur_beim_ersten_fehler_und_nach_wiederherstellung(self, resp_server, monkeypatch, capsys):
+        """Ein ausgefallener Server erzeugt eine Warnung, nicht eine je Befehl"""
+        backend = NetzwerkBackend(resp_server.url, pause=0)
+        monkeypatch.setattr(backend, 'empfang_starten', lambda: None)
+        verbinden = backend._verbindung
+
+        def nicht_erreichbar():
+            raise ConnectionError("abgelehnt")
+
+        monkeypatch.setattr(backend, '_verbindung', nicht_erreichbar)
+        for _ in range(3):
+            assert backend.abrufen('a', 'standard') == 'standard'
+        monkeypatch.setattr(backend, '_verbindung', verbinden)
+        backend.setzen('a', 1)
+        backend.setzen('a', 2)
+
+        ausgabe = capsys.readouterr().out.splitlines()
+        assert len(ausgabe) == 2
+        assert ausgabe[0].startswith('⚠️  Cache-Server nicht erreichbar')
+        assert ausgabe[1].startswith('✅ Cache-Server wieder erreichbar')
+        assert backend.statistiken()['fehler'] == 3
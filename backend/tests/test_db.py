@@ -0,0 +1,292 @@
+"""
+Tests für den Datenbank-Verbindungspool
+"""
+import pytest
+
+import db
+from db import (
+    VerbindungsPool,
+    PoolErschoepft,
+    arbeitseinheit,
+    gemeldete_lecks,
+    get_db,
+    offene_ausleihen,
+    verbindung_schliessen,
+    verbindung_verwalten
+)
+
+
+class FakeCursor:
+    """Minimale Attrappe eines Cursors"""
+
+    def close(self):
+        pass
+
+
+class FakeVerbindung:
+    """Minimale Attrappe einer MySQL-Verbindung"""
+
+    def __init__(self):
+        self.verbunden = True
+        self.geschlossen = False
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+
+    def cursor(self, **optionen):
+        return FakeCursor()
+
+    def is_connected(self):
+        return self.verbunden
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.geschlossen = True
+        self.verbunden = False
+
+
+class FakeFabrik:
+    """Zählt erzeugte Verbindungen"""
+
+    def __init__(self):
+        self.erzeugt = []
+
+    def __call__(self):
+        verbindung = FakeVerbindung()
+        self.erzeugt.append(verbindung)
+        return verbindung
+
+
+@pytest.fixture
+def fake_pool(monkeypatch):
+    """
+    Ersetzt den prozessweiten Pool durch einen Pool mit Attrappen
+    """
+    fabrik = FakeFabrik()
+    pool = VerbindungsPool(fabrik, groesse=2, max_ueberlauf=0, timeout=0.1)
+    monkeypatch.setattr(db, '_pool', pool)
+    return pool, fabrik
+
+
+class TestVerbindungsPool:
+    """Test-Klasse für den Verbindungspool"""
+
+    def test_verbindung_wird_wiederverwendet(self):
+        """
+        Eine zurückgegebene Verbindung wird beim nächsten Ausleihen wiederverwendet
+        """
+        fabrik = FakeFabrik()
+        pool = VerbindungsPool(fabrik, groesse=2, max_ueberlauf=0, timeout=0.1)
+
+        erste = pool.ausleihen()
+        verbindung_schliessen(erste)
+        zweite = pool.ausleihen()
+
+        assert len(fabrik.erzeugt) == 1
+        assert zweite._roh is fabrik.erzeugt[0]
+        assert pool.statistiken()['ausgeliehen'] == 1
+        zweite.freigeben()
+
+    def test_timeout_bei_erschoepftem_pool(self):
+        """
+        Ist der Pool samt Überlauf ausgeschöpft, schlägt das Ausleihen fehl
+        """
+        pool = VerbindungsPool(FakeFabrik(), groesse=1, max_ueberlauf=1, timeout=0.05)
+        gehalten = [pool.ausleihen(), pool.ausleihen()]
+
+        with pytest.raises(PoolErschoepft):
+            pool.ausleihen()
+
+        statistiken = pool.statistiken()
+        assert statistiken['fehlgeschlagen'] == 1
+        assert statistiken['ausgeliehen'] == len(gehalten)
+        for verbindung in gehalten:
+            verbindung.freigeben()
+
+    def test_ueberlaufverbindung_wird_geschlossen(self):
+        """
+        Verbindungen über die Poolgröße hinaus werden bei Rückgabe geschlossen
+        """
+        fabrik = FakeFabrik()
+        pool = VerbindungsPool(fabrik, groesse=1, max_ueberlauf=1, timeout=0.1)
+        erste, zweite = pool.ausleihen(), pool.ausleihen()
+
+        erste.freigeben()
+        zweite.freigeben()
+
+        assert fabrik.erzeugt[1].geschlossen
+        assert pool.statistiken()['offen'] == 1
+
+    def test_pre_ping_ersetzt_tote_verbindung(self):
+        """
+        Eine abgebrochene Leerlaufverbindung wird verworfen und neu aufgebaut
+        """
+        fabrik = FakeFabrik()
+        pool = VerbindungsPool(fabrik, groesse=1, max_ueberlauf=0, timeout=0.1)
+        pool.ausleihen().freigeben()
+        fabrik.erzeugt[0].verbunden = False
+
+        verbindung = pool.ausleihen()
+
+        assert verbindung._roh is fabrik.erzeugt[1]
+        assert pool.statistiken()['verworfen'] == 1
+        verbindung.freigeben()
+
+    def test_offene_transaktion_wird_zurueckgerollt(self):
+        """
+        Bei der Rückgabe wird eine offene Transaktion zurückgerollt
+        """
+        fabrik = FakeFabrik()
+        pool = VerbindungsPool(fabrik, groesse=1, max_ueberlauf=0, timeout=0.1)
+        verbindung = pool.ausleihen()
+        verbindung.in_transaction = True
+
+        verbindung.freigeben()
+
+        assert fabrik.erzeugt[0].rollbacks == 1
+
+
+class TestAnfrageVerbindung:
+    """Test-Klasse für anfragegebundene Verbindungen und Arbeitseinheiten"""
+
+    def test_eine_verbindung_pro_anfrage(self, app, fake_pool):
+        """
+        Alle Aufrufe innerhalb einer Anfrage erhalten dieselbe Verbindung
+        """
+        pool, fabrik = fake_pool
+        with app.test_request_context('/'):
+            erste = get_db()
+            verbindung_schliessen(erste)
+            zweite = get_db()
+            assert erste is zweite
+            assert pool.statistiken()['ausgeliehen'] == 1
+            app.do_teardown_request()
+
+        assert pool.statistiken()['ausgeliehen'] == 0
+        assert len(fabrik.erzeugt) == 1
+
+    def test_vorzeitige_freigabe_in_der_anfrage(self, app, fake_pool):
+        """
+        Eine vorzeitig freigegebene Anfrageverbindung geht sofort an den Pool, außer in einer Arbeitseinheit
+        """
+        pool, fabrik = fake_pool
+        with app.test_request_context('/'):
+            erste = get_db()
+            db.verbindung_vorzeitig_freigeben()
+            assert pool.statistiken()['ausgeliehen'] == 0
+
+            with arbeitseinheit():
+                zweite = get_db()
+                db.verbindung_vorzeitig_freigeben()
+                assert get_db() is zweite
+            assert zweite is not erste
+            assert pool.statistiken()['ausgeliehen'] == 1
+            app.do_teardown_request()
+
+        assert pool.statistiken()['ausgeliehen'] == 0
+
+    def test_arbeitseinheit_committet_einmal(self, fake_pool):
+        """
+        Commits innerhalb einer Arbeitseinheit werden gebündelt
+        """
+        pool, fabrik = fake_pool
+        with arbeitseinheit():
+            for _ in range(3):
+                verbindung = get_db()
+                verbindung.commit()
+                verbindung_schliessen(verbindung)
+
+        assert len(fabrik.erzeugt) == 1
+        assert fabrik.erzeugt[0].commits == 1
+        assert pool.statistiken()['ausgeliehen'] == 0
+
+    def test_arbeitseinheit_rollt_bei_fehler_zurueck(self, fake_pool):
+        """
+        Eine Ausnahme verwirft alle vorgemerkten Commits
+        """
+        pool, fabrik = fake_pool
+        with pytest.raises(RuntimeError):
+            with arbeitseinheit():
+                get_db().commit()
+                raise RuntimeError("Abbruch")
+
+        assert fabrik.erzeugt[0].commits == 0
+        assert fabrik.erzeugt[0].rollbacks == 1
+
+    def test_nach_commit_laeuft_erst_nach_dem_commit(self, fake_pool):
+        """
+        Vorgemerkte Aufrufe laufen nach dem Commit der Einheit, außerhalb sofort
+        """
+        pool, fabrik = fake_pool
+        aufrufe = []
+        with arbeitseinheit():
+            get_db().commit()
+            db.nach_commit(lambda: aufrufe.append(fabrik.erzeugt[0].commits))
+            assert db.arbeitseinheit_offen()
+            assert aufrufe == []
+
+        assert aufrufe == [1]
+        assert not db.arbeitseinheit_offen()
+        db.nach_commit(lambda: aufrufe.append('sofort'))
+        assert aufrufe == [1, 'sofort']
+
+    def test_nach_commit_entfaellt_bei_rollback(self, fake_pool):
+        """
+        Bei einer Ausnahme oder einem rollback() werden vorgemerkte Aufrufe verworfen
+        """
+        aufrufe = []
+        with pytest.raises(RuntimeError):
+            with arbeitseinheit():
+                get_db().commit()
+                db.nach_commit(lambda: aufrufe.append('ausnahme'))
+                raise RuntimeError("Abbruch")
+        with arbeitseinheit():
+            verbindung = get_db()
+            verbindung.commit()
+            db.nach_commit(lambda: aufrufe.append('rollback'))
+            verbindung.rollback()
+
+        assert aufrufe == []
+
+
+class TestLeckErkennung:
+    """Test-Klasse für den Leck-Detektor"""
+
+    def test_verwaltete_verbindung_wird_freigegeben(self, fake_pool):
+        """
+        verbindung_verwalten gibt die Verbindung auch bei Fehlern zurück
+        """
+        pool, fabrik = fake_pool
+        with pytest.raises(ValueError):
+            with verbindung_verwalten() as verbindung:
+                verbindung.cursor()
+                raise ValueError("Abbruch")
+
+        assert pool.statistiken()['ausgeliehen'] == 0
+        assert fabrik.erzeugt[0].rollbacks == 1
+        assert offene_ausleihen() == []
+
+    def test_leck_wird_am_anfrageende_gemeldet(self, app, fake_pool):
+        """
+        Eine außerhalb der Anfrageverbindung geliehene Verbindung wird gemeldet
+        """
+        pool, fabrik = fake_pool
+        vorher = len(gemeldete_lecks())
+        with app.test_request_context('/'):
+            verwaist = pool.ausleihen()
+            with pytest.warns(ResourceWarning):
+                app.do_teardown_request()
+
+        meldungen = gemeldete_lecks()[vorher:]
+        assert len(meldungen) == 1
+        assert 'test_leck_wird_am_anfrageende_gemeldet' in meldungen[0]
+
+        # Meldung für den Test-Fixture-Check wieder entfernen
+        db._gemeldete_lecks[vorher:] = []
+        verwaist.freigeben()
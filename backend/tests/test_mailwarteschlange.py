@@ -0,0 +1,208 @@
+"""
+Tests für die Mailwarteschlange (Spool, Verbindungswiederverwendung, Wiederholungen)
+"""
+
+import os
+import socketserver
+import threading
+import time
+
+import pytest
+
+from utils.mailwarteschlange import Mailwarteschlange
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """
+    Minimaler SMTP-Server: nimmt Nachrichten an oder antwortet mit vorgegebenen Fehlercodes
+    """
+
+    def _antworten(self, zeile):
+        self.wfile.write((zeile + '\r\n').encode())
+
+    def handle(self):
+        server = self.server
+        server.verbindungen += 1
+        self._antworten('220 test ESMTP')
+        while True:
+            zeile = self.rfile.readline()
+            if not zeile:
+                return
+            befehl = zeile.decode().strip().upper()
+            if befehl.startswith(('EHLO', 'HELO')):
+                self._antworten('250 test')
+            elif befehl.startswith('MAIL'):
+                self._antworten('250 OK')
+            elif befehl.startswith('RCPT'):
+                self._antworten(server.rcpt_antworten.pop(0) if server.rcpt_antworten else '250 OK')
+            elif befehl == 'DATA':
+                self._antworten('354 Daten senden')
+                zeilen = []
+                while True:
+                    daten = self.rfile.readline()
+                    if daten in (b'.\r\n', b''):
+                        break
+                    zeilen.append(daten)
+                server.nachrichten.append(b''.join(zeilen).decode())
+                self._antworten('250 angenommen')
+            elif befehl in ('NOOP', 'RSET'):
+                self._antworten('250 OK')
+            elif befehl == 'QUIT':
+                self._antworten('221 Tschüss')
+                return
+            else:
+                self._antworten('502 unbekannt')
+
+
+@pytest.fixture
+def smtp_server():
+    """
+    SMTP-Stand-in auf einem freien Port
+    """
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.verbindungen = 0
+    server.nachrichten = []
+    server.rcpt_antworten = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _warteschlange(verzeichnis, server, **optionen):
+    return Mailwarteschlange(
+        str(verzeichnis),
+        {'server': '127.0.0.1', 'port': server.server_address[1], 'starttls': False, 'timeout': 5},
+        **optionen
+    )
+
+
+class TestMailwarteschlange:
+    """
+    Tests für Versand und Wiederholungen über den Spool
+    """
+
+    def test_stapel_ueber_eine_verbindung(self, tmp_path, smtp_server):
+        """Test: Mehrere Nachrichten werden über dieselbe SMTP-Verbindung versendet"""
+        warteschlange = _warteschlange(tmp_path, smtp_server)
+        for nummer in range(5):
+            warteschlange._schreiben(warteschlange.wartend_verzeichnis, {
+                'id': f'{nummer}', 'absender': 'a@test.de', 'empfaenger': f'e{nummer}@test.de',
+                'nachricht': f'Subject: {nummer}\r\n\r\nInhalt', 'versuche': 0,
+                'naechster_versuch': 0.0, 'letzter_fehler': None
+            })
+
+        ergebnis = warteschlange.abarbeiten()
+        warteschlange.anhalten()
+
+        assert ergebnis['gesendet'] == 5
+        assert len(smtp_server.nachrichten) == 5
+        assert smtp_server.verbindungen == 1
+        assert warteschlange.statistiken()['wartend'] == 0
+
+    def test_einreihen_versendet_im_hintergrund(self, tmp_path, smtp_server):
+        """Test: einreihen() kehrt sofort zurück, der Hintergrund-Thread stellt zu"""
+        warteschlange = _warteschlange(tmp_path, smtp_server)
+        warteschlange.einreihen('a@test.de', 'e@test.de', 'Subject: Hallo\r\n\r\nInhalt')
+
+        frist = time.monotonic() + 5
+        while not smtp_server.nachrichten and time.monotonic() < frist:
+            time.sleep(0.01)
+        warteschlange.anhalten()
+
+        assert len(smtp_server.nachrichten) == 1
+        assert 'Subject: Hallo' in smtp_server.nachrichten[0]
+
+    def test_spool_uebersteht_neustart(self, tmp_path, smtp_server):
+        """Test: Eingereihte Nachrichten werden von einer neuen Instanz zugestellt"""
+        erste = _warteschlange(tmp_path, smtp_server)
+        erste._schreiben(erste.wartend_verzeichnis, {
+            'id': 'x', 'absender': 'a@test.de', 'empfaenger': 'e@test.de',
+            'nachricht': 'Subject: Neustart\r\n\r\nInhalt', 'versuche': 0,
+            'naechster_versuch': 0.0, 'letzter_fehler': None
+        })
+
+        zweite = _warteschlange(tmp_path, smtp_server)
+        assert zweite.statistiken()['wartend'] == 1
+        assert zweite.abarbeiten()['gesendet'] == 1
+        zweite.anhalten()
+
+        assert 'Subject: Neustart' in smtp_server.nachrichten[0]
+
+    def test_voruebergehender_fehler_wird_wiederholt(self, tmp_path, smtp_server):
+        """Test: Ein 4xx-Fehler führt zu einem späteren Versuch mit Wartezeit"""
+        warteschlange = _warteschlange(tmp_path, smtp_server, basis_wartezeit=10)
+        smtp_server.rcpt_antworten = ['451 später erneut versuchen']
+        warteschlange._schreiben(warteschlange.wartend_verzeichnis, {
+            'id': 'x', 'absender': 'a@test.de', 'empfaenger': 'e@test.de',
+            'nachricht': 'Subject: Wiederholung\r\n\r\nInhalt', 'versuche': 0,
+            'naechster_versuch': 0.0, 'letzter_fehler': None
+        })
+
+        jetzt = time.time()
+        ergebnis = warteschlange.abarbeiten(jetzt)
+        assert ergebnis['fehlgeschlagen'] == 1
+        assert ergebnis['naechster_versuch'] == pytest.approx(jetzt + 10)
+
+        # Vor Ablauf der Wartezeit passiert nichts, danach wird zugestellt
+        assert os.listdir(warteschlange.wartend_verzeichnis) == ['x.json']
+        assert warteschlange.abarbeiten(jetzt + 5)['gesendet'] == 0
+        assert warteschlange.abarbeiten(jetzt + 11)['gesendet'] == 1
+        warteschlange.anhalten()
+
+        assert len(smtp_server.nachrichten) == 1
+
+    def test_endgueltiger_fehler_wird_aufgegeben(self, tmp_path, smtp_server):
+        """Test: Ein 5xx-Fehler verschiebt die Nachricht nach fehlgeschlagen/"""
+        warteschlange = _warteschlange(tmp_path, smtp_server)
+        smtp_server.rcpt_antworten = ['550 Postfach unbekannt']
+        warteschlange._schreiben(warteschlange.wartend_verzeichnis, {
+            'id': 'x', 'absender': 'a@test.de', 'empfaenger': 'gibtsnicht@test.de',
+            'nachricht': 'Subject: Fehler\r\n\r\nInhalt', 'versuche': 0,
+            'naechster_versuch': 0.0, 'letzter_fehler': None
+        })
+
+        ergebnis = warteschlange.abarbeiten()
+        warteschlange.anhalten()
+
+        statistiken = warteschlange.statistiken()
+        assert ergebnis['naechster_versuch'] is None
+        assert statistiken['wartend'] == 0
+        assert statistiken['fehlgeschlagen'] == 1
+        assert statistiken['aufgegeben'] == 1
+        assert os.listdir(warteschlange.fehlgeschlagen_verzeichnis) == ['x.json']
+
+    def test_server_nicht_erreichbar(self, tmp_path):
+        """Test: Ohne erreichbaren Server bleibt die Nachricht im Spool"""
+        warteschlange = Mailwarteschlange(
+            str(tmp_path), {'server': '127.0.0.1', 'port': 9, 'starttls': False, 'timeout': 1}
+        )
+        warteschlange._schreiben(warteschlange.wartend_verzeichnis, {
+            'id': 'x', 'absender': 'a@test.de', 'empfaenger': 'e@test.de',
+            'nachricht': 'Subject: x\r\n\r\nInhalt', 'versuche': 0,
+            'naechster_versuch': 0.0, 'letzter_fehler': None
+        })
+
+        ergebnis = warteschlange.abarbeiten()
+
+        assert ergebnis['fehlgeschlagen'] == 1
+        assert warteschlange.statistiken()['wartend'] == 1
+
+    def test_verwaiste_beanspruchung_wird_freigegeben(self, tmp_path, smtp_server):
+        """Test: Von einem beendeten Prozess beanspruchte Nachrichten werden erneut versendet"""
+        erste = _warteschlange(tmp_path, smtp_server)
+        erste._schreiben(erste.wartend_verzeichnis, {
+            'id': 'x', 'absender': 'a@test.de', 'empfaenger': 'e@test.de',
+            'nachricht': 'Subject: Verwaist\r\n\r\nInhalt', 'versuche': 0,
+            'naechster_versuch': 0.0, 'letzter_fehler': None
+        })
+        # PID, die es nicht gibt (über dem Linux-Maximum)
+        pfad = os.path.join(erste.wartend_verzeichnis, 'x.json')
+        os.rename(pfad, pfad + '.4999999')
+
+        zweite = _warteschlange(tmp_path, smtp_server)
+        assert zweite.abarbeiten()['gesendet'] == 1
+        zweite.anhalten()
+
+        assert 'Subject: Verwaist' in smtp_server.nachrichten[0]
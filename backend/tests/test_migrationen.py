@@ -0,0 +1,123 @@
+"""
+Tests für den Migrations-Runner
+"""
+import pytest
+
+import migrate
+from migrate import (
+    MigrationsFehler,
+    anweisungen_trennen,
+    migrationen_laden,
+    migrieren,
+    zurueckrollen
+)
+
+
+class ProtokollDatenbank:
+    """Attrappe, die ausgeführte Anweisungen und die Versionstabelle nachbildet"""
+
+    def __init__(self):
+        self.anweisungen = []
+        self.versionen = set()
+
+    def cursor(self, **optionen):
+        return self
+
+    def execute(self, sql, parameter=None):
+        if sql.startswith("INSERT INTO schema_migrationen"):
+            self.versionen.add(parameter[0])
+        elif sql.startswith("DELETE FROM schema_migrationen"):
+            self.versionen.discard(parameter[0])
+        elif "schema_migrationen" not in sql:
+            self.anweisungen.append(sql)
+
+    def fetchall(self):
+        return [(version,) for version in self.versionen]
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def datenbank(fake_db):
+    """
+    Ersetzt die Datenbankverbindung des Runners durch eine Attrappe
+    """
+    return fake_db(migrate, verbindung=ProtokollDatenbank())
+
+
+@pytest.fixture
+def migrationsordner(tmp_path):
+    """
+    Legt zwei Testmigrationen an
+    """
+    (tmp_path / '0001_tabelle.up.sql').write_text("-- Kommentar\nCREATE TABLE a (id INT);\n")
+    (tmp_path / '0001_tabelle.down.sql').write_text("DROP TABLE a;")
+    (tmp_path / '0002_index.up.sql').write_text("CREATE INDEX i ON a (id);\nCREATE INDEX j ON a (id);")
+    (tmp_path / '0002_index.down.sql').write_text("DROP INDEX j ON a;\nDROP INDEX i ON a;")
+    return migrationen_laden(str(tmp_path))
+
+
+class TestMigrationen:
+    """Test-Klasse für das Laden und Anwenden von Migrationen"""
+
+    def test_mitgelieferte_migrationen_sind_vollstaendig(self):
+        """
+        Alle mitgelieferten Migrationen haben up- und down-Dateien
+        """
+        versionen = [m.version for m in migrationen_laden()]
+
+        assert versionen == sorted(versionen)
+        assert 2 in versionen
+
+    def test_standardkategorien_werden_mitgeliefert(self):
+        """
+        Eine frische Installation erhält die Standardkategorien, ohne bestehende zu verdoppeln
+        """
+        seed = next(m for m in migrationen_laden() if m.name == 'kategorien_seed')
+        with open(seed.up_pfad, encoding='utf-8') as datei:
+            anweisungen = anweisungen_trennen(datei.read())
+
+        assert len(anweisungen) == 1
+        assert anweisungen[0].startswith('INSERT INTO kategorien')
+        assert 'WHERE NOT EXISTS' in anweisungen[0]
+        for name in ('Vorspeise', 'Hauptgericht', 'Nachspeise', 'Snack'):
+            assert f"'{name}'" in anweisungen[0]
+
+    def test_fehlende_down_datei(self, tmp_path):
+        """
+        Eine Migration ohne down-Datei wird abgelehnt
+        """
+        (tmp_path / '0001_x.up.sql').write_text("SELECT 1;")
+
+        with pytest.raises(MigrationsFehler):
+            migrationen_laden(str(tmp_path))
+
+    def test_anweisungen_trennen(self):
+        """
+        Kommentare werden entfernt und Anweisungen am Semikolon getrennt
+        """
+        sql = "-- Kopf\nCREATE TABLE a (id INT);\n\nCREATE INDEX i ON a (id);\n"
+
+        assert anweisungen_trennen(sql) == ["CREATE TABLE a (id INT)", "CREATE INDEX i ON a (id)"]
+
+    def test_nur_ausstehende_migrationen_werden_angewendet(self, datenbank, migrationsordner):
+        """
+        Bereits protokollierte Versionen werden übersprungen
+        """
+        assert migrieren(ziel=1, migrationen=migrationsordner) == [1]
+        assert migrieren(migrationen=migrationsordner) == [2]
+        assert migrieren(migrationen=migrationsordner) == []
+        assert datenbank.versionen == {1, 2}
+        assert len(datenbank.anweisungen) == 3
+
+    def test_zurueckrollen(self, datenbank, migrationsordner):
+        """
+        Ohne Ziel wird nur die letzte Migration zurückgerollt, mit Ziel 0 alle
+        """
+        migrieren(migrationen=migrationsordner)
+
+        assert zurueckrollen(migrationen=migrationsordner) == [2]
+        assert datenbank.anweisungen[-2:] == ["DROP INDEX j ON a", "DROP INDEX i ON a"]
+        assert zurueckrollen(ziel=0, migrationen=migrationsordner) == [1]
+        assert datenbank.versionen == set()
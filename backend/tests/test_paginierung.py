@@ -0,0 +1,96 @@
+"""
+Tests für die Cursor-Paginierung
+"""
+import datetime
+import json
+
+import pytest
+
+from utils.paginierung import (
+    UngueltigerCursor,
+    cursor_dekodieren,
+    cursor_kodieren,
+    limit_begrenzen,
+    seek_bedingung,
+    seite_abschliessen,
+    sortierung_sql
+)
+
+
+class TestCursor:
+    """Test-Klasse für Cursor-Token"""
+
+    def test_cursor_rundreise_mit_datum(self):
+        """
+        Ein Cursor enthält Sortierwert und ID der letzten Zeile
+        """
+        zeile = {'id': 17, 'erstellungsdatum': datetime.datetime(2024, 5, 1, 12, 30), 'titel': 'Suppe'}
+
+        token = cursor_kodieren('newest', zeile)
+        nach = cursor_dekodieren(token, 'newest')
+
+        assert nach == {'wert': zeile['erstellungsdatum'], 'id': 17}
+
+    def test_cursor_fremder_sortierung_wird_abgelehnt(self):
+        """
+        Ein Cursor ist nur für die Sortierung gültig, mit der er erzeugt wurde
+        """
+        token = cursor_kodieren('name_asc', {'id': 3, 'titel': 'Apfelkuchen'})
+
+        with pytest.raises(UngueltigerCursor):
+            cursor_dekodieren(token, 'newest')
+
+    def test_beschaedigter_cursor(self):
+        """
+        Beliebige Zeichenketten werden als ungültiger Cursor erkannt
+        """
+        with pytest.raises(UngueltigerCursor):
+            cursor_dekodieren('kein-cursor', 'newest')
+
+
+class TestSeitenaufteilung:
+    """Test-Klasse für Limit und Seek-Bedingung"""
+
+    def test_limit_wird_begrenzt(self):
+        """
+        Das Limit liegt immer zwischen 1 und der Obergrenze
+        """
+        assert limit_begrenzen(None) == 10
+        assert limit_begrenzen(0) == 1
+        assert limit_begrenzen(10000, maximum=50) == 50
+
+    def test_seek_bedingung_folgt_sortierrichtung(self):
+        """
+        Absteigende Sortierungen suchen nach kleineren, aufsteigende nach größeren Werten
+        """
+        sql, parameter = seek_bedingung('name_asc', {'wert': 'Brot', 'id': 4})
+
+        assert 'r.titel > %s' in sql and 'r.id > %s' in sql
+        assert parameter == ['Brot', 'Brot', 4]
+        assert sortierung_sql('newest') == " ORDER BY r.erstellungsdatum DESC, r.id DESC"
+
+    def test_seite_abschliessen(self):
+        """
+        Nur wenn mehr Zeilen als das Limit geliefert wurden, gibt es einen nächsten Cursor
+        """
+        zeilen = [{'id': i, 'titel': f"R{i}"} for i in range(3)]
+
+        seite, cursor = seite_abschliessen(zeilen, 2, 'name_asc')
+        assert [z['id'] for z in seite] == [0, 1]
+        assert cursor_dekodieren(cursor, 'name_asc') == {'wert': 'R1', 'id': 1}
+
+        seite, cursor = seite_abschliessen(zeilen, 3, 'name_asc')
+        assert cursor is None
+
+
+class TestCursorRouten:
+    """Test-Klasse für Cursor-Parameter an den Routen"""
+
+    def test_ungueltiger_cursor_liefert_400(self, client):
+        """
+        Ein beschädigter Cursor wird mit 400 abgelehnt
+        """
+        response = client.get('/api/rezepte?cursor=kaputt')
+
+        assert response.status_code == 400
+        assert 'fehler' in json.loads(response.data)
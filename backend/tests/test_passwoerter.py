@@ -0,0 +1,158 @@
+"""
+Tests für das Passwort-Hashing im begrenzten Thread-Pool
+"""
+import threading
+
+import bcrypt
+import pytest
+
+import models.user as user_modell
+import utils.security as security
+from utils.security import PasswortDienstUeberlastet, _PasswortDienst
+
+
+@pytest.fixture
+def niedrige_kosten(monkeypatch):
+    """
+    Verwendet einen kleinen Kostenfaktor, damit die Tests schnell bleiben
+    """
+    monkeypatch.setattr(security, 'BCRYPT_KOSTEN', 4)
+
+
+class TestPasswortDienst:
+    """Tests für Pool, Überlastschutz und Kennzahlen"""
+
+    def test_hashen_und_verifizieren(self, niedrige_kosten):
+        """Hash und Prüfung laufen über den Pool und werden gemessen"""
+        passwort_hash = security.passwort_hashen('Geheim!123')
+
+        assert passwort_hash.startswith('$2b$04$')
+        assert security.passwort_verifizieren('Geheim!123', passwort_hash)
+        assert not security.passwort_verifizieren('falsch', passwort_hash)
+        operationen = security.passwort_statistiken()['operationen']
+        assert operationen['hashen']['anzahl'] >= 1
+        assert operationen['verifizieren']['anzahl'] >= 2
+
+    def test_volle_warteschlange_lehnt_sofort_ab(self):
+        """Ist kein Platz frei, wird ohne Warten abgelehnt"""
+        dienst = _PasswortDienst(groesse=1, max_warteschlange=0, timeout=5)
+        gestartet, freigabe = threading.Event(), threading.Event()
+
+        def blockieren():
+            gestartet.set()
+            freigabe.wait(5)
+            return True
+
+        hintergrund = threading.Thread(target=dienst.ausfuehren, args=('test', blockieren))
+        hintergrund.start()
+        assert gestartet.wait(5)
+
+        with pytest.raises(PasswortDienstUeberlastet):
+            dienst.ausfuehren('test', lambda: True)
+        freigabe.set()
+        hintergrund.join(5)
+
+        assert dienst.statistiken()['abgelehnt'] == 1
+        assert dienst.ausfuehren('test', lambda: 'wieder frei') == 'wieder frei'
+
+    def test_zeitueberschreitung_gibt_platz_frei(self):
+        """Nach einer Zeitüberschreitung wird der Platz wieder verfügbar"""
+        dienst = _PasswortDienst(groesse=1, max_warteschlange=1, timeout=0.05)
+        freigabe = threading.Event()
+
+        with pytest.raises(PasswortDienstUeberlastet):
+            dienst.ausfuehren('test', freigabe.wait, 5)
+        with pytest.raises(PasswortDienstUeberlastet):
+            dienst.ausfuehren('test', lambda: True)
+        freigabe.set()
+
+        assert dienst.ausfuehren('test', lambda: 42) == 42
+        assert dienst.statistiken()['zeitueberschreitungen'] == 2
+
+    def test_neuberechnung_bei_anderem_kostenfaktor(self, niedrige_kosten):
+        """Hashes mit anderem Kostenfaktor werden erkannt"""
+        assert not security.neuberechnung_erforderlich(bcrypt.hashpw(b'x', bcrypt.gensalt(4)).decode())
+        assert security.neuberechnung_erforderlich(bcrypt.hashpw(b'x', bcrypt.gensalt(5)).decode())
+        assert not security.neuberechnung_erforderlich('kein-bcrypt-hash')
+
+
+class TestAnmeldung:
+    """Tests für Anmeldung mit Neuberechnung und Überlastantwort"""
+
+    def test_anmeldung_berechnet_hash_neu(self, fake_db, niedrige_kosten):
+        """Ein Hash mit veraltetem Kostenfaktor wird bei der Anmeldung ersetzt"""
+        alter_hash = bcrypt.hashpw(b'Geheim!123', bcrypt.gensalt(5)).decode()
+        datenbank = fake_db(user_modell, antwort={'id': 7, 'name': 'Koch', 'email': 'koch@example.com',
+                                                  'passwort': alter_hash, 'profilbild_url': None,
+                                                  'beschreibung': None})
+
+        benutzer = user_modell.benutzer_anmelden('koch@example.com', 'Geheim!123')
+
+        assert benutzer['id'] == 7 and 'passwort' not in benutzer
+        sql, (neuer_hash, benutzer_id) = datenbank.anweisungen[-1]
+        assert sql.startswith('UPDATE benutzer SET passwort')
+        assert benutzer_id == 7 and neuer_hash.startswith('$2b$04$')
+
+    def test_bcrypt_ohne_ausgeliehene_verbindung(self, fake_db, monkeypatch, niedrige_kosten):
+        """Prüfen und Hashen laufen erst, nachdem die Verbindung zurückgegeben wurde"""
+        alter_hash = bcrypt.hashpw(b'Geheim!123', bcrypt.gensalt(5)).decode()
+        datenbank = fake_db(user_modell, antwort={'id': 7, 'name': 'Koch', 'email': 'koch@example.com',
+                                                  'passwort': alter_hash, 'profilbild_url': None,
+                                                  'beschreibung': None})
+        waehrend_bcrypt = []
+        verifizieren, hashen = user_modell.passwort_verifizieren, user_modell.passwort_hashen
+
+        def verifizieren_beobachtet(*argumente):
+            waehrend_bcrypt.append(datenbank.ausgeliehen)
+            return verifizieren(*argumente)
+
+        def hashen_beobachtet(*argumente):
+            waehrend_bcrypt.append(datenbank.ausgeliehen)
+            return hashen(*argumente)
+
+        monkeypatch.setattr(user_modell, 'passwort_verifizieren', verifizieren_beobachtet)
+        monkeypatch.setattr(user_modell, 'passwort_hashen', hashen_beobachtet)
+
+        assert user_modell.benutzer_anmelden('koch@example.com', 'Geheim!123')['id'] == 7
+        assert user_modell.benutzer_registrieren('Koch', 'neu@example.com', 'Geheim!123')['id'] == 7
+
+        # Prüfen und Neuberechnen bei der Anmeldung, Hashen bei der Registrierung
+        assert waehrend_bcrypt == [0, 0, 0]
+        befehle = [sql.split()[0] for sql, _ in datenbank.anweisungen]
+        assert befehle == ['SELECT', 'UPDATE', 'INSERT', 'SELECT']
+
+    def test_zuruecksetzen_hasht_ohne_verbindung_und_verbraucht_token(self, fake_db, monkeypatch, niedrige_kosten):
+        """Beim Zurücksetzen wird ohne Verbindung gehasht; ein bereits verbrauchter Token setzt nichts"""
+        datenbank = fake_db(user_modell, antwort=(7,))
+        waehrend_bcrypt = []
+        hashen = user_modell.passwort_hashen
+
+        def hashen_beobachtet(*argumente):
+            waehrend_bcrypt.append(datenbank.ausgeliehen)
+            return hashen(*argumente)
+
+        monkeypatch.setattr(user_modell, 'passwort_hashen', hashen_beobachtet)
+
+        assert user_modell.passwort_zuruecksetzen('abc', 'Neu!12345')
+        befehle = [sql.split()[0] for sql, _ in datenbank.anweisungen]
+        assert befehle == ['SELECT', 'DELETE', 'UPDATE']
+        assert waehrend_bcrypt == [0]
+
+        # Ein paralleler Aufruf hat den Token inzwischen gelöscht
+        datenbank.anweisungen.clear()
+        datenbank.rowcount = 0
+        assert user_modell.passwort_zuruecksetzen('abc', 'Neu!12345') is False
+        assert [sql.split()[0] for sql, _ in datenbank.anweisungen] == ['SELECT', 'DELETE']
+
+    def test_ueberlast_liefert_503_mit_retry_after(self, client, monkeypatch):
+        """Bei voller Warteschlange antwortet der Login schnell mit 503"""
+        import routes.benutzer_routes as benutzer_routes
+
+        def ueberlastet(email, passwort):
+            raise PasswortDienstUeberlastet("voll")
+
+        monkeypatch.setattr(benutzer_routes, 'benutzer_anmelden', ueberlastet)
+        response = client.post('/api/benutzer/login', json={'email': 'a@b.de', 'passwort': 'x'})
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == str(security.PASSWORT_RETRY_AFTER)
@@ -0,0 +1,94 @@
+"""
+Tests für die Ratenbegrenzung mit Token-Buckets
+"""
+import time
+
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from utils.cachebackend import SpeicherBackend
+from utils.ratenbegrenzung import Regel, _regel_lesen, ratenbegrenzer
+from utils.token import generate_tokens
+
+
+@pytest.fixture
+def regel_setzen(monkeypatch):
+    """
+    Ersetzt eine Regel des globalen Ratenbegrenzers für die Dauer eines Tests
+    """
+    def setzen(name, anzahl, zeitraum, schluesselart):
+        monkeypatch.setitem(ratenbegrenzer.regeln, name, Regel(name, anzahl, zeitraum, schluesselart))
+    return setzen
+
+
+class TestTokenBucket:
+    """Tests für die Token-Buckets im Cache-Backend"""
+
+    def test_burst_und_nachfuellen(self):
+        """Die Kapazität ist sofort verfügbar, danach füllt sich der Bucket mit der Rate"""
+        backend = SpeicherBackend()
+        ergebnisse = [backend.eimer_entnehmen('a', rate=20, kapazitaet=3) for _ in range(4)]
+
+        assert [erlaubt for erlaubt, _ in ergebnisse] == [True, True, True, False]
+        assert 0 < ergebnisse[-1][1] <= 0.05
+        time.sleep(0.06)
+        assert backend.eimer_entnehmen('a', rate=20, kapazitaet=3)[0]
+        assert backend.eimer_entnehmen('b', rate=20, kapazitaet=3)[0]
+
+    def test_regel_aus_umgebung(self, monkeypatch):
+        """RATENLIMIT_<REGEL> überschreibt die Standardwerte"""
+        monkeypatch.setenv('RATENLIMIT_SUCHE', '5/10')
+        regel = _regel_lesen('suche', 60, 60, 'benutzer')
+
+        assert (regel.anzahl, regel.zeitraum, regel.rate) == (5, 10.0, 0.5)
+
+
+class TestRatenbegrenzteRouten:
+    """Tests für begrenzte Endpunkte"""
+
+    def test_login_je_ip_mit_retry_after(self, client, regel_setzen):
+        """Nach Ausschöpfen des Limits antwortet der Login mit 429 und Retry-After"""
+        regel_setzen('anmeldung', 2, 60, 'ip')
+
+        antworten = [client.post('/api/benutzer/login', json={}) for _ in range(3)]
+
+        assert [a.status_code for a in antworten] == [400, 400, 429]
+        assert antworten[-1].headers['Retry-After'] == '30'
+        assert ratenbegrenzer.statistiken()['anmeldung']['abgelehnt'] == 1
+
+    def test_ip_hinter_proxy(self, app, client, regel_setzen, monkeypatch):
+        """X-Forwarded-For zählt nur mit ProxyFix (PROXY_ANZAHL), sonst die Adresse der Verbindung"""
+        regel_setzen('anmeldung', 1, 60, 'ip')
+
+        def anmelden(client_ip):
+            return client.post('/api/benutzer/login', json={}, headers={'X-Forwarded-For': client_ip}).status_code
+
+        assert anmelden('10.0.0.1') == 400
+        assert anmelden('10.0.0.2') == 429
+
+        ratenbegrenzer.zuruecksetzen()
+        monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+        assert anmelden('10.0.0.1') == 400
+        assert anmelden('10.0.0.1') == 429
+        assert anmelden('10.0.0.2') == 400
+
+    def test_suche_je_benutzer(self, client, regel_setzen):
+        """Angemeldete Benutzer haben eigene Buckets"""
+        regel_setzen('suche', 1, 60, 'benutzer')
+        erster, _ = generate_tokens(1, 'eins@example.com')
+        zweiter, _ = generate_tokens(2, 'zwei@example.com')
+
+        def suchen(token):
+            return client.get('/api/rezepte/suche', headers={'Authorization': f'Bearer {token}'}).status_code
+
+        assert suchen(erster) != 429
+        assert suchen(erster) == 429
+        assert suchen(zweiter) != 429
+
+    def test_blueprint_begrenzt_nur_schreibende_anfragen(self, client, regel_setzen):
+        """Die Blueprint-Regel greift für POST/DELETE, nicht für GET"""
+        regel_setzen('schreiben', 1, 60, 'benutzer')
+
+        assert client.post('/api/favoriten/1').status_code == 403
+        assert client.delete('/api/favoriten/1').status_code == 429
+        assert client.get('/api/favoriten').status_code == 403
@@ -172,4 +172,49 @@ class TestRecipeSorting:
         assert response.status_code == 200
         data = json.loads(response.data)
         assert 'rezepte' in data
-        assert isinstance(data['rezepte'], list) 
\ No newline at end of file
+        assert isinstance(data['rezepte'], list)
+
+
+class TestBetrachterAnnotation:
+    """Test-Klasse für die gebündelte Anreicherung mit Betrachterdaten"""
+
+    @pytest.fixture
+    def abfragen(self, fake_db):
+        """
+        Ersetzt die Datenbankzugriffe von Favoriten und Bewertungen durch Attrappen
+        """
+        import models.favorit
+        import models.bewertung
+
+        def antwort(sql, parameter):
+            return [(2,)] if 'FROM favoriten' in sql else [(1, 4), (3, 5)]
+
+        return fake_db(models.favorit, models.bewertung, antwort=antwort).anweisungen
+
+    def test_eine_abfrage_je_merkmal(self, abfragen):
+        """
+        Für eine ganze Seite wird je Merkmal nur eine IN-Abfrage gestellt
+        """
+        from models.rezept import rezepte_annotieren
+
+        rezepte = [{'id': 1, 'benutzer_id': 7}, {'id': 2, 'benutzer_id': 9}, {'id': 3, 'benutzer_id': 7}]
+        rezepte_annotieren(rezepte, 7)
+
+        assert len(abfragen) == 2
+        assert 'FROM favoriten' in abfragen[0][0] and 'FROM bewertungen' in abfragen[1][0]
+        assert list(abfragen[0][1]) == [7, 1, 2, 3]
+        assert [r['is_favorite'] for r in rezepte] == [False, True, False]
+        assert [r['eigene_bewertung'] for r in rezepte] == [4, None, 5]
+        assert [r['ist_eigenes'] for r in rezepte] == [True, False, True]
+
+    def test_anonym_ohne_abfragen(self, abfragen):
+        """
+        Ohne angemeldeten Benutzer wird keine Abfrage gestellt
+        """
+        from models.rezept import rezepte_annotieren
+
+        rezepte = rezepte_annotieren([{'id': 1, 'benutzer_id': 7}], None)
+
+        assert abfragen == []
+        assert rezepte[0]['is_favorite'] is False
+        assert rezepte[0]['eigene_bewertung'] is None
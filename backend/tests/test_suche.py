@@ -0,0 +1,458 @@
+"""
+Tests für den Volltext-Suchindex
+"""
+import json
+import threading
+
+import pytest
+
+from suche import suchdienst
+from suche.autovervollstaendigung import Praefixbaum
+from suche.normalisierung import stammform, terme, text_normalisieren, zutaten_namen
+from suche.trigramme import Trigrammindex
+from suche.volltext import Suchindex
+from suche.zutaten import Zutatenindex
+
+
+@pytest.fixture
+def index():
+    """
+    Kleiner Index mit drei Rezepten
+    """
+    index = Suchindex()
+    index.hinzufuegen(1, 'Tomatensuppe', [{'name': 'Tomaten'}, {'name': 'Zwiebel'}],
+                      'Tomaten würfeln und kochen.', kategorie_id=1)
+    index.hinzufuegen(2, 'Spaghetti Bolognese', [{'name': 'Spaghetti'}, {'name': 'Tomate'}, {'name': 'Hackfleisch'}],
+                      'Soße köcheln lassen.', kategorie_id=2)
+    index.hinzufuegen(3, 'Käsespätzle', json.dumps([{'name': 'Käse'}, {'name': 'Spätzle'}]),
+                      'Mit Röstzwiebeln servieren.', kategorie_id=2)
+    return index
+
+
+class TestNormalisierung:
+    """Test-Klasse für die deutsche Textnormalisierung"""
+
+    def test_umlaute_und_eszett(self):
+        """
+        Umlaute werden auf Grundvokale, ß auf ss abgebildet
+        """
+        assert text_normalisieren('Käsespätzle mit Soße') == 'kasespatzle mit sosse'
+
+    def test_flexionsformen_haben_gleiche_stammform(self):
+        """
+        Singular und Plural führen zum selben Suchterm
+        """
+        assert stammform('tomaten') == stammform('tomate')
+        assert stammform('zwiebeln') == stammform('zwiebel')
+
+    def test_stoppwoerter_werden_entfernt(self):
+        """
+        Füllwörter erzeugen keine Suchterme
+        """
+        assert terme('Nudeln mit der Soße') == [stammform('nudeln'), stammform('sosse')]
+
+    def test_zutaten_namen(self):
+        """
+        Zutatennamen werden aus JSON und Listen gelesen
+        """
+        assert zutaten_namen('[{"name": "Mehl"}, {"name": ""}]') == ['Mehl']
+        assert zutaten_namen(['Salz', {'name': 'Pfeffer'}]) == ['Salz', 'Pfeffer']
+
+
+class TestSuchindex:
+    """Test-Klasse für Ranking und Pflege des Index"""
+
+    def test_sucht_in_allen_feldern(self, index):
+        """
+        Treffer in Titel, Zutaten und Zubereitung werden gefunden
+        """
+        assert {rezept_id for rezept_id, _ in index.suchen('Tomate')} == {1, 2}
+        assert [rezept_id for rezept_id, _ in index.suchen('Röstzwiebeln')] == [3]
+
+    def test_titeltreffer_rangieren_hoeher(self, index):
+        """
+        Ein Treffer im Titel zählt mehr als ein Treffer in den Zutaten
+        """
+        treffer = index.suchen('tomaten')
+
+        assert treffer[0][0] == 1
+        assert treffer[0][1] > treffer[1][1]
+
+    def test_alle_terme_muessen_vorkommen(self, index):
+        """
+        Mehrere Suchbegriffe werden UND-verknüpft
+        """
+        assert [rezept_id for rezept_id, _ in index.suchen('Tomate Hackfleisch')] == [2]
+        assert index.suchen('Tomate Käse') == []
+
+    def test_kategoriefilter(self, index):
+        """
+        Der Kategoriefilter schränkt die Treffermenge ein
+        """
+        assert [rezept_id for rezept_id, _ in index.suchen('Tomate', kategorie_id=2)] == [2]
+
+    def test_ersetzen_und_entfernen(self, index):
+        """
+        Aktualisierte Rezepte ersetzen ihren alten Eintrag vollständig
+        """
+        index.hinzufuegen(1, 'Gurkensalat', [{'name': 'Gurke'}], '', kategorie_id=1)
+        assert [rezept_id for rezept_id, _ in index.suchen('Tomate')] == [2]
+
+        index.entfernen(2)
+        assert index.suchen('Tomate') == []
+        assert index.statistiken()['dokumente'] == 2
+
+
+class TestZutatenindex:
+    """Test-Klasse für die Suche nach vorhandenen Zutaten"""
+
+    @pytest.fixture
+    def zutatenindex(self):
+        zutatenindex = Zutatenindex()
+        zutatenindex.hinzufuegen(1, [{'name': 'Tomaten'}, {'name': 'Zwiebeln, rot'}], kategorie_id=1)
+        zutatenindex.hinzufuegen(2, [{'name': 'Spaghetti'}, {'name': 'Tomate'}, {'name': 'Hackfleisch'},
+                                     {'name': 'Zwiebel'}], kategorie_id=2)
+        zutatenindex.hinzufuegen(3, json.dumps([{'name': 'Käse'}, {'name': 'Spätzle'}]), kategorie_id=2)
+        return zutatenindex
+
+    def test_ranking_nach_anzahl_passender_zutaten(self, zutatenindex):
+        """
+        Rezepte mit mehr passenden Zutaten stehen vorne, bei Gleichstand
+        die mit weniger fehlenden Zutaten
+        """
+        treffer = zutatenindex.suchen(['tomate', 'zwiebeln', 'käse'])
+
+        assert [rezept_id for rezept_id, _, _ in treffer] == [1, 2, 3]
+        assert treffer[0][1] == ['tomate', 'zwiebeln']
+        assert treffer[1][2] == 4
+
+    def test_mehrwortzutat_erfordert_alle_terme(self, zutatenindex):
+        """
+        "rote Zwiebel" passt nur zu Rezepten mit roten Zwiebeln
+        """
+        assert [rezept_id for rezept_id, _, _ in zutatenindex.suchen(['rote Zwiebel'])] == [1]
+
+    def test_doppelte_zutaten_zaehlen_einmal(self, zutatenindex):
+        """
+        Flexionsformen derselben Zutat werden nicht doppelt gezählt
+        """
+        treffer = zutatenindex.suchen(['Tomate', 'Tomaten'])
+        assert all(len(passend) == 1 for _, passend, _ in treffer)
+
+    def test_kategoriefilter_und_entfernen(self, zutatenindex):
+        """
+        Kategoriefilter und Entfernen wirken auf die Treffermenge
+        """
+        assert [rezept_id for rezept_id, _, _ in zutatenindex.suchen(['Tomate'], kategorie_id=2)] == [2]
+
+        zutatenindex.entfernen(2)
+        assert [rezept_id for rezept_id, _, _ in zutatenindex.suchen(['Tomate'])] == [1]
+        assert zutatenindex.statistiken()['rezepte'] == 2
+
+
+class TestTrigrammindex:
+    """Test-Klasse für die fehlertolerante Suche"""
+
+    @pytest.fixture
+    def trigrammindex(self):
+        trigrammindex = Trigrammindex()
+        trigrammindex.hinzufuegen(1, 'Tiramisu', [{'name': 'Mascarpone'}])
+        trigrammindex.hinzufuegen(2, 'Spaghetti Bolognese', [{'name': 'Spaghetti'}])
+        trigrammindex.hinzufuegen(3, 'Käsespätzle', [{'name': 'Käse'}])
+        return trigrammindex
+
+    def test_aehnliche_woerter(self, trigrammindex):
+        """
+        Vertippte Wörter finden die richtige Schreibweise
+        """
+        assert trigrammindex.aehnliche_woerter('tiramissu')[0][:2] == ('tiramisu', 'Tiramisu')
+        assert trigrammindex.aehnliche_woerter('spagetti')[0][:2] == ('spaghetti', 'Spaghetti')
+        assert trigrammindex.aehnliche_woerter('gurke') == []
+
+    def test_korrektur_behaelt_bekannte_woerter(self, trigrammindex):
+        """
+        Nur unbekannte Wörter werden ersetzt, Originalschreibweise bleibt erhalten
+        """
+        bekannt = {'bolognese'}.__contains__
+
+        assert trigrammindex.korrigieren('Spagetti Bolognese', bekannt) == 'Spaghetti Bolognese'
+        assert trigrammindex.korrigieren('Bolognese', bekannt) is None
+
+    def test_entfernen_aktualisiert_vokabular(self, trigrammindex):
+        """
+        Wörter verschwinden erst, wenn kein Rezept sie mehr enthält
+        """
+        trigrammindex.hinzufuegen(4, 'Tiramisu mit Beeren', [])
+        trigrammindex.entfernen(1)
+        assert trigrammindex.enthaelt_wort('tiramisu')
+
+        trigrammindex.entfernen(4)
+        assert not trigrammindex.enthaelt_wort('tiramisu')
+        assert trigrammindex.aehnliche_woerter('tiramissu') == []
+
+
+class TestPraefixbaum:
+    """Test-Klasse für die Autovervollständigung"""
+
+    @pytest.fixture
+    def praefixbaum(self):
+        praefixbaum = Praefixbaum()
+        praefixbaum.hinzufuegen(1, 'Spaghetti Bolognese', 'Nudelgerichte', [{'name': 'Spaghetti'}], beliebtheit=5)
+        praefixbaum.hinzufuegen(2, 'Spinatlasagne', 'Nudelgerichte', [{'name': 'Spinat'}], beliebtheit=2)
+        praefixbaum.hinzufuegen(3, 'Käsespätzle', 'Hauptgerichte', [{'name': 'Käse'}, {'name': 'Spinat'}])
+        return praefixbaum
+
+    def test_sortierung_nach_beliebtheit(self, praefixbaum):
+        """
+        Vorschläge erscheinen absteigend nach Gewicht, begrenzt auf top-k
+        """
+        vorschlaege = praefixbaum.vervollstaendigen('sp', anzahl=3)
+
+        assert vorschlaege[0] == {'text': 'Spaghetti Bolognese', 'typ': 'rezept', 'rezept_id': 1}
+        assert vorschlaege[1]['text'] == 'Spinat' and vorschlaege[1]['typ'] == 'zutat'
+        assert len(vorschlaege) == 3
+
+    def test_treffer_am_wortanfang_und_umlaute(self, praefixbaum):
+        """
+        Auch spätere Wörter und Eingaben ohne Umlaute werden vervollständigt
+        """
+        assert praefixbaum.vervollstaendigen('bolo')[0]['rezept_id'] == 1
+        assert {v['text'] for v in praefixbaum.vervollstaendigen('kase')} == {'Käsespätzle', 'Käse'}
+        assert {v['text'] for v in praefixbaum.vervollstaendigen('nudel')} == {'Nudelgerichte'}
+
+    def test_lange_anfragen_werden_nachgeprueft(self, praefixbaum):
+        """
+        Anfragen länger als die Baumtiefe liefern nur passende Einträge
+        """
+        assert praefixbaum.vervollstaendigen('spaghetti bolognese')[0]['rezept_id'] == 1
+        assert praefixbaum.vervollstaendigen('spaghetti carbonara') == []
+
+    def test_entfernen_und_aggregation(self, praefixbaum):
+        """
+        Gemeinsame Kategorien bleiben erhalten, bis kein Rezept sie mehr nutzt
+        """
+        praefixbaum.entfernen(1)
+        assert [v['text'] for v in praefixbaum.vervollstaendigen('nudel')] == ['Nudelgerichte']
+
+        praefixbaum.entfernen(2)
+        assert praefixbaum.vervollstaendigen('nudel') == []
+        assert praefixbaum.vervollstaendigen('sp') == [{'text': 'Spinat', 'typ': 'zutat'}]
+
+
+class TestSuchdienst:
+    """Test-Klasse für den Lebenszyklus des Index"""
+
+    def test_schreibvorgaenge_aktualisieren_index(self, index, monkeypatch):
+        """
+        Neue Rezepte werden aus der Datenbank nachgeladen und indexiert
+        """
+        monkeypatch.setattr(suchdienst, '_rezepte_laden', lambda ids=None: [
+            {'id': 4, 'titel': 'Pilzrisotto', 'zutaten': '[]', 'zubereitung': '', 'kategorie_id': 2}
+        ])
+        suchdienst.suchindex_setzen(index)
+        try:
+            suchdienst.rezept_indexieren(4)
+            assert [rezept_id for rezept_id, _ in index.suchen('Risotto')] == []
+            assert [rezept_id for rezept_id, _ in index.suchen('Pilzrisotto')] == [4]
+
+            suchdienst.rezept_aus_index_entfernen(4)
+            assert index.suchen('Pilzrisotto') == []
+        finally:
+            suchdienst.suchindex_setzen(None)
+
+    def test_zutatenindex_wird_mitgepflegt(self, index, monkeypatch):
+        """
+        Schreibvorgänge aktualisieren auch den Zutatenindex
+        """
+        monkeypatch.setattr(suchdienst, '_rezepte_laden', lambda ids=None: [
+            {'id': 4, 'titel': 'Pilzrisotto', 'zutaten': '[{"name": "Champignons"}]',
+             'zubereitung': '', 'kategorie_id': 2}
+        ])
+        suchdienst.suchindex_setzen(index, Zutatenindex())
+        try:
+            suchdienst.rezept_indexieren(4)
+            zutatenindex = suchdienst.zutatenindex_abrufen()
+            assert [rezept_id for rezept_id, _, _ in zutatenindex.suchen(['Champignon'])] == [4]
+
+            suchdienst.rezept_aus_index_entfernen(4)
+            assert zutatenindex.suchen(['Champignon']) == []
+        finally:
+            suchdienst.suchindex_setzen(None)
+
+    def test_korrektur_vorschlagen(self, index):
+        """
+        Der Vorschlag ersetzt nur Wörter, die im Volltextindex fehlen
+        """
+        suchdienst.suchindex_setzen(index, trigrammindex=suchdienst.index_aufbauen([
+            {'id': 2, 'titel': 'Spaghetti Bolognese', 'zutaten': '[]', 'zubereitung': ''}
+        ]).trigramme)
+        try:
+            assert suchdienst.korrektur_vorschlagen('Spagetti Bolognese') == 'Spaghetti Bolognese'
+            assert suchdienst.korrektur_vorschlagen('Spaghetti') is None
+        finally:
+            suchdienst.suchindex_setzen(None)
+
+    def test_autocomplete_endpunkt(self, client):
+        """
+        Der Endpunkt liefert Vorschläge aus dem Präfixbaum
+        """
+        praefixbaum = Praefixbaum()
+        praefixbaum.hinzufuegen(7, 'Tiramisu', 'Desserts', [])
+        suchdienst.suchindex_setzen(Suchindex(), praefixbaum=praefixbaum)
+        try:
+            antwort = client.get('/api/rezepte/autocomplete?q=tira')
+
+            assert antwort.status_code == 200
+            assert antwort.get_json()['vorschlaege'] == [{'text': 'Tiramisu', 'typ': 'rezept', 'rezept_id': 7}]
+        finally:
+            suchdienst.suchindex_setzen(None)
+
+    def test_aenderung_waehrend_neuaufbau_geht_nicht_verloren(self, monkeypatch):
+        """
+        Ein während des Hintergrund-Neuaufbaus gespeichertes Rezept landet auch im neuen Index
+        """
+        zeilen = {4: {'id': 4, 'titel': 'Linsensuppe', 'zutaten': '[]', 'zubereitung': '', 'kategorie_id': 2}}
+        gestartet, freigabe = threading.Event(), threading.Event()
+        aufbauen = suchdienst.index_aufbauen
+
+        def langsam_aufbauen():
+            # Liest den Stand vor der Änderung und wartet dann
+            alter_stand = [dict(zeile) for zeile in zeilen.values()]
+            gestartet.set()
+            freigabe.wait(5)
+            return aufbauen(alter_stand)
+
+        monkeypatch.setattr(suchdienst, 'index_aufbauen', langsam_aufbauen)
+        monkeypatch.setattr(suchdienst, '_rezepte_laden',
+                            lambda ids=None: [dict(zeilen[i]) for i in (ids or zeilen) if i in zeilen])
+        suchdienst.suchindex_setzen(aufbauen(list(zeilen.values())).volltext)
+        try:
+            suchdienst._neuaufbau_im_hintergrund()
+            assert gestartet.wait(5)
+
+            zeilen[4]['titel'] = 'Kürbissuppe'
+            suchdienst.rezept_indexieren(4)
+            zeilen[5] = {'id': 5, 'titel': 'Gulasch', 'zutaten': '[]', 'zubereitung': '', 'kategorie_id': 2}
+            suchdienst._aenderung_empfangen({'rezept_id': 5})
+            # Eine Suche während des Neuaufbaus übernimmt die Meldung in den alten Index
+            assert [i for i, _ in suchdienst.suchindex_abrufen().suchen('Gulasch')] == [5]
+
+            freigabe.set()
+            for thread in threading.enumerate():
+                if thread.name == 'suchindex-neuaufbau':
+                    thread.join(5)
+
+            neu = suchdienst.suchindex_abrufen()
+            assert [i for i, _ in neu.suchen('Kürbissuppe')] == [4]
+            assert neu.suchen('Linsensuppe') == []
+            assert [i for i, _ in neu.suchen('Gulasch')] == [5]
+        finally:
+            freigabe.set()
+            suchdienst.suchindex_setzen(None)
+
+    def test_rollback_laesst_index_unveraendert(self, index, monkeypatch):
+        """
+        Innerhalb einer Arbeitseinheit wird erst nach dem Commit indexiert; ein Rollback verwirft die Änderung
+        """
+        import db
+
+        class Verbindung:
+            in_transaction = False
+
+            def commit(self):
+                pass
+
+            def rollback(self):
+                pass
+
+            def close(self):
+                pass
+
+        monkeypatch.setattr(db, '_pool', db.VerbindungsPool(Verbindung, groesse=1, max_ueberlauf=0))
+        monkeypatch.setattr(suchdienst, '_rezepte_laden', lambda ids=None: [
+            {'id': 4, 'titel': 'Pilzrisotto', 'zutaten': '[]', 'zubereitung': '', 'kategorie_id': 2}
+        ])
+        suchdienst.suchindex_setzen(index)
+        try:
+            with pytest.raises(RuntimeError):
+                with db.arbeitseinheit() as verbindung:
+                    verbindung.commit()
+                    suchdienst.rezept_indexieren(4)
+                    suchdienst.rezept_aus_index_entfernen(1)
+                    raise RuntimeError("Abbruch")
+            assert index.suchen('Pilzrisotto') == []
+            assert 1 in index
+
+            with db.arbeitseinheit() as verbindung:
+                verbindung.commit()
+                suchdienst.rezept_indexieren(4)
+                assert index.suchen('Pilzrisotto') == []
+            assert [rezept_id for rezept_id, _ in index.suchen('Pilzrisotto')] == [4]
+        finally:
+            suchdienst.suchindex_setzen(None)
+
+
+class TestIndexsucheSortierung:
+    """Test-Klasse für Sortierung und Paginierung der Indexsuche"""
+
+    @pytest.fixture
+    def sortierindex(self, monkeypatch):
+        """
+        Index mit zwölf Suppen und einer Datenbank-Attrappe, die nur die angefragten IDs liefert
+        """
+        import datetime
+
+        import models.rezept as rezept_modell
+
+        zeilen = [
+            {'id': i, 'titel': f'{"abcdefghijkl"[(i * 5) % 12].upper()} Suppe', 'zutaten': '[]', 'zubereitung': '',
+             'kategorie_id': 1, 'erstellungsdatum': datetime.datetime(2024, 1, i),
+             'bewertung_durchschnitt': (i * 7) % 5}
+            for i in range(1, 13)
+        ]
+        geladen = []
+        geloescht = set()
+
+        def abfragen(sql, parameter, tabellen, verwalten):
+            geladen.append(list(parameter))
+            return [dict(zeile) for zeile in zeilen if zeile['id'] in parameter and zeile['id'] not in geloescht]
+
+        monkeypatch.setattr(rezept_modell, 'abfragen', abfragen)
+        suchdienst.suchindex_setzen(suchdienst.index_aufbauen(zeilen).volltext)
+        yield rezept_modell, zeilen, geladen, geloescht
+        suchdienst.suchindex_setzen(None)
+
+    def test_sortierung_aus_dem_index_und_nur_eine_seite(self, sortierindex):
+        """
+        Nach Titel, Datum und Bewertung wird im Index sortiert; geladen wird nur die Seite
+        """
+        rezept_modell, zeilen, geladen, _ = sortierindex
+
+        rezepte, anzahl = rezept_modell.rezepte_suchen_erweitert('Suppe', 3, 0, sortierung='name_asc')
+        assert anzahl == 12
+        assert [rezept['titel'] for rezept in rezepte] == ['A Suppe', 'B Suppe', 'C Suppe']
+        assert len(geladen[-1]) == 3
+
+        rezepte, _ = rezept_modell.rezepte_suchen_erweitert('Suppe', 2, 1, sortierung='newest')
+        assert [rezept['id'] for rezept in rezepte] == [11, 10]
+        assert geladen[-1] == [11, 10]
+
+        rezepte, _ = rezept_modell.rezepte_suchen_erweitert('Suppe', 4, 0, sortierung='rating')
+        erwartet = sorted(zeilen, key=lambda zeile: (zeile['bewertung_durchschnitt'], zeile['id']), reverse=True)
+        assert [rezept['id'] for rezept in rezepte] == [zeile['id'] for zeile in erwartet[:4]]
+
+    def test_cursor_und_fehlende_zeile(self, sortierindex):
+        """
+        Der Cursor setzt hinter der letzten Zeile an; fehlt eine Zeile in der Datenbank, wird sie nachgeladen
+        """
+        import datetime
+
+        rezept_modell, _, geladen, geloescht = sortierindex
+        geloescht.add(12)
+
+        rezepte, _ = rezept_modell.rezepte_suchen_erweitert(
+            'Suppe', 3, 0, sortierung='oldest', nach={'wert': datetime.datetime(2024, 1, 10), 'id': 10}
+        )
+        assert geladen[-1] == [11, 12]
+        assert [rezept['id'] for rezept in rezepte] == [11]
+        assert 12 in suchdienst._ausstehend
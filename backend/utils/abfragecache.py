@@ -0,0 +1,193 @@
+"""
+@fileoverview Ergebnis-Zwischenspeicher für Leseabfragen der Modelle
+@module abfragecache
+
+Dieses Modul speichert Ergebnisse häufig wiederholter SELECT-Abfragen:
+- Schlüssel aus normalisiertem SQL und Parametern
+- Jeder Eintrag ist mit den gelesenen Tabellen markiert
+- Schreibvorgänge erhöhen die Generation ihrer Tabellen und machen damit
+  alle abhängigen Einträge ungültig
+- Optional stale-while-revalidate: ein veralteter Eintrag wird weiter
+  ausgeliefert, während genau eine Anfrage ihn neu berechnet
+- Invalidierungen werden über das Cache-Backend an alle Worker-Prozesse verteilt,
+  innerhalb einer Arbeitseinheit erst nach deren Commit (db.nach_commit)
+"""
+
+import copy
+import os
+import threading
+import time
+
+from db import arbeitseinheit_offen, nach_commit
+from utils.cache import Zwischenspeicher
+from utils.cachebackend import cache_backend
+
+
+def sql_normalisieren(sql):
+    """
+    Vereinheitlicht Leerraum, damit gleich formulierte Abfragen denselben Schlüssel erhalten.
+
+    @param {string} sql - SQL-Anweisung
+    @return {string} SQL mit einfachen Leerzeichen
+    """
+    return ' '.join(sql.split())
+
+
+def _parameter_schluessel(parameter):
+    if parameter is None:
+        return ()
+    return tuple(tuple(wert) if isinstance(wert, list) else wert for wert in parameter)
+
+
+class Abfragecache:
+    """
+    Zwischenspeicher für Abfrageergebnisse mit Tabellen-Generationen.
+
+    @param {int} [max_eintraege=512] - Maximale Anzahl gespeicherter Ergebnisse
+    @param {float} [ttl=60] - Zeit in Sekunden, in der ein Ergebnis als frisch gilt
+    @param {float} [veraltet_erlaubt=0] - Zusätzliches Fenster in Sekunden, in dem ein
+        veraltetes Ergebnis ausgeliefert wird, während es neu berechnet wird (0 = aus)
+    @param {Function} [speicher_erstellen] - Erzeugt den Zwischenspeicher aus
+        max_eintraege und ttl (Standard: Zwischenspeicher)
+    """
+
+    def __init__(self, max_eintraege=512, ttl=60, veraltet_erlaubt=0, speicher_erstellen=Zwischenspeicher):
+        self.ttl = ttl
+        self.veraltet_erlaubt = veraltet_erlaubt
+        self._speicher = speicher_erstellen(max_eintraege=max_eintraege, ttl=ttl + veraltet_erlaubt)
+        self._generationen = {}
+        self._in_berechnung = set()
+        self._sperre = threading.Lock()
+        self._veraltet_ausgeliefert = 0
+        self._invalidierungen = 0
+
+    def _stand(self, tabellen):
+        with self._sperre:
+            return tuple(self._generationen.get(tabelle, 0) for tabelle in tabellen)
+
+    def tabellen_invalidieren(self, *tabellen):
+        """
+        Erhöht die Generation der Tabellen; abhängige Ergebnisse werden ungültig.
+
+        @param {string} tabellen - Namen der geänderten Tabellen
+        """
+        with self._sperre:
+            for tabelle in tabellen:
+                self._generationen[tabelle] = self._generationen.get(tabelle, 0) + 1
+            self._invalidierungen += 1
+
+    def abfragen(self, sql, parameter, tabellen, verwalten):
+        """
+        Liefert das Ergebnis einer Leseabfrage, bei Bedarf aus dem Zwischenspeicher.
+
+        @param {string} sql - SELECT-Anweisung
+        @param {Array} parameter - Parameter der Anweisung
+        @param {Array<string>} tabellen - Alle Tabellen, die die Abfrage liest
+        @param {Function} verwalten - Kontextmanager für die Datenbankverbindung
+            (z.B. verbindung_verwalten des aufrufenden Modells)
+        @return {Array<Object>} Ergebniszeilen als eigene Kopie
+
+        @throws {Exception} Bei Datenbankfehlern (nur wenn neu berechnet werden muss)
+        """
+        tabellen = tuple(sorted(tabellen))
+        schluessel = (sql_normalisieren(sql), _parameter_schluessel(parameter), tabellen)
+        stand = self._stand(tabellen)
+
+        eintrag = self._speicher.abrufen(schluessel)
+        if eintrag is not None:
+            zeilen, eintrag_stand, erstellt_um = eintrag
+            alter = time.monotonic() - erstellt_um
+            if eintrag_stand == stand and alter < self.ttl:
+                return copy.deepcopy(zeilen)
+            if self.veraltet_erlaubt and alter < self.ttl + self.veraltet_erlaubt:
+                with self._sperre:
+                    if schluessel in self._in_berechnung:
+                        # Eine andere Anfrage berechnet bereits neu
+                        self._veraltet_ausgeliefert += 1
+                        return copy.deepcopy(zeilen)
+                    self._in_berechnung.add(schluessel)
+
+        try:
+            erstellt_um = time.monotonic()
+            with verwalten() as verbindung:
+                cursor = verbindung.cursor(dictionary=True)
+                cursor.execute(sql, parameter)
+                zeilen = cursor.fetchall()
+            # Nur ablegen, wenn während der Abfrage keine der Tabellen geändert wurde
+            if self._stand(tabellen) == stand:
+                self._speicher.setzen(schluessel, (copy.deepcopy(zeilen), stand, erstellt_um))
+            return zeilen
+        finally:
+            with self._sperre:
+                self._in_berechnung.discard(schluessel)
+
+    def leeren(self):
+        """
+        Verwirft alle gespeicherten Ergebnisse.
+        """
+        self._speicher.leeren()
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zur Nutzung des Abfrage-Zwischenspeichers.
+
+        @return {Object} Kennzahlen des Speichers, ausgelieferte veraltete Ergebnisse
+            und Anzahl der Invalidierungen
+        """
+        with self._sperre:
+            zusaetzlich = {
+                'veraltet_ausgeliefert': self._veraltet_ausgeliefert,
+                'invalidierungen': self._invalidierungen
+            }
+        return {**self._speicher.statistiken(), **zusaetzlich}
+
+
+ABFRAGE_CACHE_AKTIV = os.getenv('ABFRAGE_CACHE_AKTIV', 'true').lower() in ('1', 'true', 'ja')
+
+abfrage_cache = Abfragecache(
+    max_eintraege=int(os.getenv('ABFRAGE_CACHE_MAX_EINTRAEGE', 512)),
+    ttl=float(os.getenv('ABFRAGE_CACHE_TTL', 60)),
+    veraltet_erlaubt=float(os.getenv('ABFRAGE_CACHE_VERALTET', 10)),
+    speicher_erstellen=lambda **optionen: cache_backend.zwischenspeicher('abfragen', **optionen)
+)
+
+
+def _lokal_invalidieren(daten):
+    tabellen = daten.get('tabellen')
+    if tabellen:
+        abfrage_cache.tabellen_invalidieren(*tabellen)
+    else:
+        abfrage_cache.leeren()
+
+
+cache_backend.abonnieren('abfragen', _lokal_invalidieren)
+
+
+def abfragen(sql, parameter, tabellen, verwalten):
+    """
+    Führt eine Leseabfrage über den globalen Abfrage-Zwischenspeicher aus.
+
+    Ist der Zwischenspeicher deaktiviert oder läuft eine Arbeitseinheit (deren
+    unbestätigte Änderungen die Verbindung sieht), wird die Abfrage direkt
+    ausgeführt. Siehe Abfragecache.abfragen.
+    """
+    if not ABFRAGE_CACHE_AKTIV or arbeitseinheit_offen():
+        with verwalten() as verbindung:
+            cursor = verbindung.cursor(dictionary=True)
+            cursor.execute(sql, parameter)
+            return cursor.fetchall()
+    return abfrage_cache.abfragen(sql, parameter, tabellen, verwalten)
+
+
+def tabellen_invalidieren(*tabellen):
+    """
+    Meldet Schreibvorgänge auf Tabellen an den Abfrage-Zwischenspeicher aller Worker-Prozesse.
+
+    Innerhalb einer Arbeitseinheit wird die Generation erst nach deren Commit
+    erhöht; sonst könnte eine gleichzeitige Abfrage den alten Stand unter der
+    neuen Generation ablegen.
+
+    @param {string} tabellen - Namen der geänderten Tabellen
+    """
+    tabellen = list(tabellen)
+    nach_commit(lambda: cache_backend.invalidieren('abfragen', tabellen=tabellen))
@@ -0,0 +1,400 @@
+"""
+@fileoverview Bild-Engine für Uploads (Rezeptbilder und Profilbilder)
+@module bilder
+
+Dieses Modul dekodiert jedes hochgeladene Bild genau einmal:
+- Formaterkennung anhand der Signatur im Dateikopf (nicht anhand der Endung)
+- Prüfung der Abmessungen vor dem Dekodieren (Schutz vor Dekompressionsbomben)
+- JPEG im Draft-Modus: der Decoder skaliert schon beim Dekodieren um 1/2, 1/4
+  oder 1/8, sofern die größte Rendition das zulässt
+- Alle Renditionen (voll, responsive Breiten, thumb) werden aus derselben Bitmap
+  abgeleitet, jeweils aus der kleinsten bereits erzeugten, die groß genug ist
+- Die responsiven Breiten (BILD_BREITEN, z.B. 320/640/1280 für srcset) werden als
+  WebP, AVIF (falls pillow_avif installiert ist) und JPEG als Rückfall gespeichert
+- Gespeicherte Bilder sind inhaltsadressiert: der Dateiname beginnt mit dem
+  SHA-256 des Inhalts, gleiche Bytes ergeben dieselbe Datei und jede Änderung
+  eine neue URL (siehe models/bilddatei.py für die Referenzzählung)
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import namedtuple
+
+from PIL import Image, ImageOps
+
+# AVIF-Unterstützung aktivieren, falls das Plugin installiert ist
+try:
+    from pillow_avif import AvifImagePlugin  # noqa: F401
+    AVIF_VERFUEGBAR = True
+    print("✅ AVIF support loaded successfully")
+except ImportError:
+    AVIF_VERFUEGBAR = False
+    print("⚠️ AVIF support not available")
+
+# Maximale Pixelanzahl eines Uploads (Breite x Höhe); größere Bilder werden vor dem Dekodieren abgelehnt
+BILD_MAX_PIXEL = int(os.getenv('BILD_MAX_PIXEL', 50_000_000))
+
+# Erkannte Formate: Name -> Pillow-Formatname
+ERLAUBTE_FORMATE = {'jpeg': 'JPEG', 'png': 'PNG', 'gif': 'GIF', 'webp': 'WEBP', 'avif': 'AVIF'}
+
+# Ausgabeformate: Pillow-Formatname -> Dateiendung
+DATEIENDUNGEN = {'JPEG': 'jpg', 'WEBP': 'webp', 'AVIF': 'avif'}
+
+# Qualität der modernen Formate; JPEG verwendet die Qualität der Rendition
+FORMAT_QUALITAET = {
+    'WEBP': int(os.getenv('BILD_WEBP_QUALITAET', 80)),
+    'AVIF': int(os.getenv('BILD_AVIF_QUALITAET', 60))
+}
+
+
+def _formate_lesen(wert):
+    # Reihenfolge bleibt erhalten (bevorzugtes Format zuerst); JPEG ist immer der Rückfall
+    formate = []
+    for name in wert.split(','):
+        format_name = name.strip().upper()
+        if format_name == 'AVIF' and not AVIF_VERFUEGBAR:
+            continue
+        if format_name in DATEIENDUNGEN and format_name not in formate:
+            formate.append(format_name)
+    if 'JPEG' not in formate:
+        formate.append('JPEG')
+    return tuple(formate)
+
+
+# Breiten der responsiven Renditionen (srcset) und ihre Formate
+BILD_BREITEN = tuple(sorted({int(breite) for breite in os.getenv('BILD_BREITEN', '320,640,1280').split(',')
+                             if breite.strip()}))
+BILD_FORMATE = _formate_lesen(os.getenv('BILD_FORMATE', 'avif,webp,jpeg'))
+
+# Renditionen: name, maximale Breite und Höhe, JPEG-Qualität, Dateinamenszusatz, Ausgabeformate
+Rendition = namedtuple('Rendition', ['name', 'breite', 'hoehe', 'qualitaet', 'zusatz', 'formate'],
+                       defaults=(('JPEG',),))
+
+# Hochformatige Bilder werden in den responsiven Breiten auf dieselbe Höhe begrenzt
+RESPONSIVE_RENDITIONEN = tuple(
+    Rendition(f'w{breite}', breite, breite, 85, f'_w{breite}', BILD_FORMATE) for breite in BILD_BREITEN
+)
+
+STANDARD_RENDITIONEN = (
+    Rendition('voll', 1920, 1080, 90, ''),
+    *RESPONSIVE_RENDITIONEN,
+    Rendition('thumb', 300, 200, 85, '_thumb')
+)
+
+# Fließt in den Inhalts-Hash gerenderter Uploads ein: geänderte Renditionen oder
+# Qualitäten ergeben neue Dateinamen statt veränderter Dateien hinter alten URLs
+RENDER_SIGNATUR = repr((STANDARD_RENDITIONEN, sorted(FORMAT_QUALITAET.items()))).encode()
+
+# Inhaltsadressierte Dateinamen: <sha256><zusatz>.<endung>
+_INHALT_NAME = re.compile(r'^([0-9a-f]{64})(?:_[a-z0-9]+)?\.[a-z]+$')
+
+# EXIF-Ausrichtungen, bei denen Breite und Höhe vertauscht dargestellt werden
+_GEDREHTE_AUSRICHTUNGEN = {5, 6, 7, 8}
+
+
+class UngueltigesBild(ValueError):
+    """Wird ausgelöst, wenn eine Datei kein unterstütztes oder ein zu großes Bild ist."""
+
+
+def format_erkennen(kopf):
+    """
+    Erkennt das Bildformat anhand der Dateisignatur.
+
+    @param {bytes} kopf - Die ersten Bytes der Datei (mindestens 16)
+    @return {string|None} 'jpeg', 'png', 'gif', 'webp', 'avif' oder None
+    """
+    if kopf[:3] == b'\xff\xd8\xff':
+        return 'jpeg'
+    if kopf[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'png'
+    if kopf[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if kopf[:4] == b'RIFF' and kopf[8:12] == b'WEBP':
+        return 'webp'
+    if kopf[4:8] == b'ftyp' and kopf[8:12] in (b'avif', b'avis'):
+        return 'avif'
+    return None
+
+
+def bild_oeffnen(quelle):
+    """
+    Öffnet ein Bild nach Prüfung von Format und Abmessungen, ohne es zu dekodieren.
+
+    @param {string|file} quelle - Pfad oder Datei-Objekt (z.B. FileStorage.stream)
+    @return {Tuple[Image, string]} Geöffnetes (noch nicht dekodiertes) Bild und Formatname
+
+    @throws {UngueltigesBild} Bei unbekanntem Format, beschädigtem Kopf oder zu vielen Pixeln
+    """
+    if isinstance(quelle, (str, os.PathLike)):
+        with open(quelle, 'rb') as datei:
+            kopf = datei.read(16)
+    else:
+        kopf = quelle.read(16)
+        quelle.seek(0)
+
+    format_name = format_erkennen(kopf)
+    if format_name is None:
+        raise UngueltigesBild("Unbekanntes Bildformat")
+    if format_name == 'avif' and not AVIF_VERFUEGBAR:
+        raise UngueltigesBild("AVIF wird nicht unterstützt")
+
+    try:
+        # Nur das erkannte Format zulassen: keine Zuordnung über andere Plugins
+        bild = Image.open(quelle, formats=[ERLAUBTE_FORMATE[format_name]])
+    except Exception as fehler:
+        raise UngueltigesBild(f"Bild kann nicht gelesen werden: {fehler}") from fehler
+
+    breite, hoehe = bild.size
+    if breite * hoehe > BILD_MAX_PIXEL:
+        _schliessen(bild, quelle)
+        raise UngueltigesBild(f"Bild zu groß: {breite}x{hoehe} Pixel")
+    return bild, format_name
+
+
+def _schliessen(bild, quelle):
+    # Image.close() schließt auch übergebene Streams; die gehören aber dem Aufrufer
+    if isinstance(quelle, (str, os.PathLike)):
+        bild.close()
+    else:
+        quelle.seek(0)
+
+
+def bild_pruefen(quelle):
+    """
+    Prüft, ob eine Datei ein unterstütztes Bild ist (nur Dateikopf, ohne Dekodieren).
+
+    @param {string|file} quelle - Pfad oder Datei-Objekt
+    @return {Tuple[string, Tuple[int, int]]} Formatname und (Breite, Höhe)
+
+    @throws {UngueltigesBild} Siehe bild_oeffnen()
+    """
+    bild, format_name = bild_oeffnen(quelle)
+    groesse = bild.size
+    _schliessen(bild, quelle)
+    return format_name, groesse
+
+
+def dekodieren(quelle, max_groesse=None):
+    """
+    Dekodiert ein Bild genau einmal, als RGB und richtig ausgerichtet.
+
+    @param {string|file} quelle - Pfad oder Datei-Objekt
+    @param {Tuple[int, int]} [max_groesse] - Größte benötigte Ausgabe (Breite, Höhe);
+        JPEGs werden dann nur so groß wie nötig dekodiert
+    @return {Image} Dekodierte Bitmap (mindestens so groß wie max_groesse, sofern das Original es ist)
+
+    @throws {UngueltigesBild} Bei ungültigen, zu großen oder beschädigten Bildern
+    """
+    bild, format_name = bild_oeffnen(quelle)
+    try:
+        if format_name == 'jpeg' and max_groesse:
+            ausrichtung = bild.getexif().get(0x0112)
+            breite, hoehe = max_groesse
+            if ausrichtung in _GEDREHTE_AUSRICHTUNGEN:
+                breite, hoehe = hoehe, breite
+            # Skaliert so, dass das Ergebnis die Box mit Seitenverhältnis noch ausfüllt
+            faktor = min(breite / bild.width, hoehe / bild.height)
+            if faktor < 1:
+                bild.draft('RGB', (max(1, int(bild.width * faktor)), max(1, int(bild.height * faktor))))
+        bild.load()
+        # Liefert eine eigene Bitmap (gedreht oder kopiert), die das Schließen überdauert
+        ausgerichtet = ImageOps.exif_transpose(bild)
+    except Exception as fehler:
+        raise UngueltigesBild(f"Bild kann nicht dekodiert werden: {fehler}") from fehler
+    finally:
+        _schliessen(bild, quelle)
+    return _nach_rgb(ausgerichtet)
+
+
+def _nach_rgb(bild):
+    if bild.mode == 'RGB':
+        return bild
+    if bild.mode in ('RGBA', 'LA', 'PA') or (bild.mode == 'P' and 'transparency' in bild.info):
+        # Transparente Bereiche auf Weiß legen statt auf Schwarz
+        rgba = bild.convert('RGBA')
+        hintergrund = Image.new('RGB', rgba.size, (255, 255, 255))
+        hintergrund.paste(rgba, mask=rgba.getchannel('A'))
+        return hintergrund
+    return bild.convert('RGB')
+
+
+def _zielgroesse(groesse, rendition):
+    breite, hoehe = groesse
+    faktor = min(rendition.breite / breite, rendition.hoehe / hoehe)
+    if faktor >= 1:
+        return groesse
+    return max(1, round(breite * faktor)), max(1, round(hoehe * faktor))
+
+
+def renditionen_erzeugen(quelle, renditionen=STANDARD_RENDITIONEN):
+    """
+    Erzeugt alle Renditionen aus einer einzigen Dekodierung.
+
+    @param {string|file} quelle - Pfad oder Datei-Objekt
+    @param {Array<Rendition>} [renditionen] - Gewünschte Renditionen
+    @return {Object} Bitmap je Renditionsname
+
+    @throws {UngueltigesBild} Bei ungültigen, zu großen oder beschädigten Bildern
+    """
+    nach_groesse = sorted(renditionen, key=lambda r: r.breite * r.hoehe, reverse=True)
+    box = (max(r.breite for r in renditionen), max(r.hoehe for r in renditionen))
+    dekodiert = dekodieren(quelle, box)
+
+    ergebnis = {}
+    erzeugt = []
+    for rendition in nach_groesse:
+        # Zielgröße immer aus der dekodierten Bitmap berechnen (keine Rundungsfehler je Stufe),
+        # verkleinert wird aber aus der kleinsten bisherigen Rendition, deren Box diese umfasst
+        groesse = _zielgroesse(dekodiert.size, rendition)
+        basis = dekodiert
+        for vorher, bitmap in reversed(erzeugt):
+            if vorher.breite >= rendition.breite and vorher.hoehe >= rendition.hoehe:
+                basis = bitmap
+                break
+        bild = basis if basis.size == groesse else basis.resize(groesse, Image.Resampling.LANCZOS,
+                                                                 reducing_gap=2.0)
+        ergebnis[rendition.name] = bild
+        erzeugt.append((rendition, bild))
+    return ergebnis
+
+
+def speichern(bild, pfad, format_name='JPEG', qualitaet=85):
+    """
+    Speichert eine Bitmap atomar (temporäre Datei, dann Umbenennen).
+
+    @param {Image} bild - Zu speichernde Bitmap
+    @param {string} pfad - Zielpfad
+    @param {string} [format_name='JPEG'] - Pillow-Formatname
+    @param {int} [qualitaet=85] - Qualität für verlustbehaftete Formate
+    """
+    # Eigener Zwischenname je Thread: inhaltsadressierte Dateien können gleichzeitig entstehen
+    zwischen = f"{pfad}.{os.getpid()}.{threading.get_ident()}.tmp"
+    bild.save(zwischen, format_name, **_speicheroptionen(format_name, qualitaet))
+    os.replace(zwischen, pfad)
+
+
+def _speicheroptionen(format_name, qualitaet):
+    optionen = {'quality': qualitaet}
+    if format_name == 'JPEG':
+        optionen.update(optimize=True, progressive=True)
+    return optionen
+
+
+def kodieren(bild, format_name='JPEG', qualitaet=85):
+    """
+    Kodiert eine Bitmap im Speicher (z.B. um den Inhalt vor dem Speichern zu hashen).
+
+    @param {Image} bild - Zu kodierende Bitmap
+    @param {string} [format_name='JPEG'] - Pillow-Formatname
+    @param {int} [qualitaet=85] - Qualität für verlustbehaftete Formate
+    @return {bytes} Kodierte Datei
+    """
+    puffer = io.BytesIO()
+    bild.save(puffer, format_name, **_speicheroptionen(format_name, qualitaet))
+    return puffer.getvalue()
+
+
+def inhalt_hash(quelle, zusatz=b''):
+    """
+    Berechnet den SHA-256 eines Inhalts (Basis der inhaltsadressierten Dateinamen).
+
+    @param {string|file|bytes} quelle - Pfad, Datei-Objekt oder Bytes
+    @param {bytes} [zusatz] - Wird vorangestellt, z.B. RENDER_SIGNATUR
+    @return {string} Hexadezimaler Hash (64 Zeichen)
+    """
+    pruefsumme = hashlib.sha256(zusatz)
+    if isinstance(quelle, bytes):
+        pruefsumme.update(quelle)
+        return pruefsumme.hexdigest()
+    if isinstance(quelle, (str, os.PathLike)):
+        with open(quelle, 'rb') as datei:
+            return inhalt_hash(datei, zusatz)
+    for block in iter(lambda: quelle.read(1024 * 1024), b''):
+        pruefsumme.update(block)
+    quelle.seek(0)
+    return pruefsumme.hexdigest()
+
+
+def inhalt_aus_name(name):
+    """
+    Liest den Inhalts-Hash aus einem inhaltsadressierten Dateinamen.
+
+    @param {string} name - Dateiname ohne Verzeichnis, z.B. '<hash>_w640.webp'
+    @return {string|None} Hash oder None bei anderen Namen (z.B. ältere Uploads)
+    """
+    treffer = _INHALT_NAME.match(name)
+    return treffer.group(1) if treffer else None
+
+
+def inhalt_speichern(daten, verzeichnis, endung):
+    """
+    Speichert kodierte Bytes unter ihrem Inhalts-Hash; gleiche Bytes werden nur einmal abgelegt.
+
+    @param {bytes} daten - Kodierte Datei
+    @param {string} verzeichnis - Zielverzeichnis
+    @param {string} endung - Dateiendung ohne Punkt
+    @return {string} Dateiname <hash>.<endung>
+    """
+    dateiname = f"{inhalt_hash(daten)}.{endung}"
+    pfad = os.path.join(verzeichnis, dateiname)
+    try:
+        # Vorhandene Datei nur auffrischen: das Aufräumen (models/bilddatei.py) entfernt
+        # nur Dateien, die seit der Karenzzeit unverändert sind
+        os.utime(pfad)
+        return dateiname
+    except FileNotFoundError:
+        pass
+    zwischen = f"{pfad}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(zwischen, 'wb') as datei:
+        datei.write(daten)
+    os.replace(zwischen, pfad)
+    return dateiname
+
+
+def renditionen_speichern(quelle, ziel_verzeichnis, basisname, renditionen=STANDARD_RENDITIONEN):
+    """
+    Erzeugt und speichert alle Renditionen eines Bildes in ihren Ausgabeformaten.
+
+    Dateinamen: <basisname><zusatz>.<endung>, z.B. abc.jpg, abc_w640.webp, abc_thumb.jpg.
+    Ist das Original kleiner als eine Rendition, verweist diese auf die Dateien der
+    gleich großen kleineren Rendition, statt sie erneut zu kodieren.
+
+    @param {string|file} quelle - Pfad oder Datei-Objekt
+    @param {string} ziel_verzeichnis - Zielverzeichnis
+    @param {string} basisname - Gemeinsamer Teil der Dateinamen
+    @param {Array<Rendition>} [renditionen] - Gewünschte Renditionen
+    @return {Object} Je Renditionsname: breite, hoehe und dateien (Format in Kleinbuchstaben -> Dateiname)
+
+    @throws {UngueltigesBild} Bei ungültigen, zu großen oder beschädigten Bildern
+    """
+    bitmaps = renditionen_erzeugen(quelle, renditionen)
+    ergebnis = {}
+    gespeichert = {}
+    for rendition in sorted(renditionen, key=lambda r: r.breite * r.hoehe):
+        bild = bitmaps[rendition.name]
+        dateien = {}
+        for format_name in rendition.formate:
+            qualitaet = FORMAT_QUALITAET.get(format_name, rendition.qualitaet)
+            schluessel = (bild.size, format_name, qualitaet)
+            if schluessel not in gespeichert:
+                datei = f"{basisname}{rendition.zusatz}.{DATEIENDUNGEN[format_name]}"
+                speichern(bild, os.path.join(ziel_verzeichnis, datei), format_name, qualitaet)
+                gespeichert[schluessel] = datei
+            dateien[format_name.lower()] = gespeichert[schluessel]
+        ergebnis[rendition.name] = {'breite': bild.width, 'hoehe': bild.height, 'dateien': dateien}
+    return ergebnis
+
+
+def ausgabe_dateien(basisname, renditionen=STANDARD_RENDITIONEN):
+    """
+    Listet alle Dateinamen, die renditionen_speichern() für einen Basisnamen erzeugen kann.
+
+    @param {string} basisname - Gemeinsamer Teil der Dateinamen
+    @param {Array<Rendition>} [renditionen] - Renditionen
+    @return {Array<string>} Dateinamen (ohne Verzeichnis)
+    """
+    return [f"{basisname}{rendition.zusatz}.{DATEIENDUNGEN[format_name]}"
+            for rendition in renditionen for format_name in rendition.formate]
@@ -0,0 +1,296 @@
+"""
+@fileoverview Bildvarianten auf Abruf mit begrenztem Platten-Cache
+@module bildvarianten
+
+Dieses Modul liefert Größenvarianten hochgeladener Bilder, ohne dass beim Upload
+jede denkbare Größe erzeugt werden muss:
+- /static/uploads/<name>?w=&h=&fmt= wählt Breite, Höhe und Format; erlaubt sind
+  nur die Größen aus BILD_VARIANTEN (z.B. "320,640,300x200") und die Ausgabeformate
+  der Bild-Engine (utils/bilder.py)
+- Eine Variante wird beim ersten Abruf erzeugt und im Cache-Verzeichnis abgelegt;
+  der Schlüssel enthält Name, Änderungszeit und Größe der Quelldatei
+- Der Cache ist in Bytes begrenzt: Treffer setzen die Änderungszeit der Datei neu,
+  beim Überschreiten werden die am längsten nicht genutzten Dateien entfernt (LRU,
+  auch über Prozessgrenzen hinweg, da der Zustand auf der Platte liegt)
+- Gleichzeitige Anfragen nach derselben fehlenden Variante werden zusammengefasst:
+  nur eine rechnet, die übrigen warten auf ihr Ergebnis (je Prozess); die Anzahl
+  gleichzeitiger Berechnungen ist begrenzt
+"""
+
+import hashlib
+import os
+import threading
+
+from utils.bilder import (
+    AVIF_VERFUEGBAR,
+    DATEIENDUNGEN,
+    FORMAT_QUALITAET,
+    Rendition,
+    renditionen_erzeugen,
+    speichern,
+)
+
+# Erlaubte Größen: "B" (nur Breite) oder "BxH" (Box), durch Kommas getrennt
+BILD_VARIANTEN = os.getenv('BILD_VARIANTEN', '320,640,960,1280,300x200,640x480')
+BILD_VARIANTEN_MAX_BYTES = int(os.getenv('BILD_VARIANTEN_MAX_BYTES', 512 * 1024 * 1024))
+BILD_VARIANTEN_PARALLEL = int(os.getenv('BILD_VARIANTEN_PARALLEL', 0)) or os.cpu_count() or 1
+
+# JPEG-Qualität der Varianten; WebP und AVIF wie in der Bild-Engine
+VARIANTEN_QUALITAET = 85
+
+# Beim Aufräumen wird bis auf diesen Anteil der Obergrenze geleert, damit nicht jede
+# neue Variante eine Verzeichnisdurchsicht auslöst
+NIEDRIGWASSER = 0.9
+
+# Ohne h ist nur die Breite begrenzt
+_UNBEGRENZT = 1 << 16
+
+MIME_TYPEN = {'jpeg': 'image/jpeg', 'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+class UngueltigeVariante(ValueError):
+    """Wird ausgelöst, wenn Größe oder Format einer Variante nicht erlaubt sind."""
+
+
+def groessen_lesen(wert):
+    """
+    Liest die erlaubten Größen aus der Konfiguration.
+
+    @param {string} wert - z.B. "320,640,300x200"
+    @return {Set<Tuple[int, int|None]>} Erlaubte (Breite, Höhe); Höhe None = nur Breite
+    """
+    groessen = set()
+    for eintrag in wert.split(','):
+        eintrag = eintrag.strip().lower()
+        if not eintrag:
+            continue
+        breite, _, hoehe = eintrag.partition('x')
+        groessen.add((int(breite), int(hoehe) if hoehe else None))
+    return groessen
+
+
+def erlaubte_formate():
+    """
+    @return {Set<string>} Formate, die als fmt angefragt werden können
+    """
+    return {'jpeg', 'webp'} | ({'avif'} if AVIF_VERFUEGBAR else set())
+
+
+class _Flug:
+    """Eine laufende Berechnung, auf deren Ergebnis weitere Anfragen warten"""
+
+    def __init__(self):
+        self.fertig = threading.Event()
+        self.pfad = None
+        self.fehler = None
+
+
+class Bildvarianten:
+    """
+    Erzeugt und speichert Bildvarianten in einem größenbegrenzten Platten-Cache.
+
+    @param {string} verzeichnis - Cache-Verzeichnis
+    @param {Set<Tuple[int, int|None]>} groessen - Erlaubte Größen (siehe groessen_lesen())
+    @param {int} [max_bytes] - Obergrenze des Caches in Bytes
+    @param {int} [parallel] - Maximale Anzahl gleichzeitiger Berechnungen
+    """
+
+    def __init__(self, verzeichnis, groessen, max_bytes=BILD_VARIANTEN_MAX_BYTES, parallel=BILD_VARIANTEN_PARALLEL):
+        self.verzeichnis = verzeichnis
+        self.groessen = set(groessen)
+        self.max_bytes = max_bytes
+        os.makedirs(verzeichnis, exist_ok=True)
+        self._sperre = threading.Lock()
+        self._aufraeumen_sperre = threading.Lock()
+        self._rechnen = threading.BoundedSemaphore(parallel)
+        self._fluege = {}
+        self._treffer = 0
+        self._erzeugt = 0
+        self._zusammengefasst = 0
+        self._verdraengt = 0
+        self._belegt = sum(groesse for _, _, groesse in self._dateien())
+
+    def parameter_lesen(self, argumente):
+        """
+        Prüft die Abfrageparameter einer Variante gegen die erlaubten Größen und Formate.
+
+        @param {Mapping} argumente - Abfrageparameter (w, h, fmt)
+        @return {Tuple[int, int|None, string]} Breite, Höhe und Format ('jpeg', 'webp', 'avif')
+
+        @throws {UngueltigeVariante} Bei fehlenden, ungültigen oder nicht erlaubten Werten
+        """
+        try:
+            breite = int(argumente.get('w', ''))
+            hoehe = int(argumente['h']) if argumente.get('h') else None
+        except ValueError:
+            raise UngueltigeVariante("w und h müssen ganze Zahlen sein")
+        if (breite, hoehe) not in self.groessen:
+            raise UngueltigeVariante(f"Größe {breite}x{hoehe or ''} ist nicht erlaubt")
+
+        format_name = argumente.get('fmt', 'jpeg').lower()
+        if format_name == 'jpg':
+            format_name = 'jpeg'
+        if format_name not in erlaubte_formate():
+            raise UngueltigeVariante(f"Format {format_name} wird nicht unterstützt")
+        return breite, hoehe, format_name
+
+    def variante(self, quelle, breite, hoehe, format_name):
+        """
+        Liefert den Pfad einer Variante; fehlt sie im Cache, wird sie erzeugt.
+
+        @param {string} quelle - Pfad der Quelldatei
+        @param {int} breite - Maximale Breite
+        @param {int|None} hoehe - Maximale Höhe (None = nur Breite begrenzt)
+        @param {string} format_name - 'jpeg', 'webp' oder 'avif'
+        @return {string} Pfad der Variante im Cache
+
+        @throws {FileNotFoundError} Wenn die Quelldatei fehlt
+        @throws {UngueltigesBild} Wenn die Quelldatei kein unterstütztes Bild ist
+        """
+        info = os.stat(quelle)
+        schluessel = hashlib.sha256(
+            f"{os.path.basename(quelle)}|{info.st_mtime_ns}|{info.st_size}|{breite}x{hoehe or ''}|{format_name}".encode()
+        ).hexdigest()
+        pfad = os.path.join(self.verzeichnis, f"{schluessel}.{DATEIENDUNGEN[format_name.upper()]}")
+        if self._benutzen(pfad):
+            return pfad
+
+        with self._sperre:
+            flug = self._fluege.get(schluessel)
+            anfuehrer = flug is None
+            if anfuehrer:
+                flug = self._fluege[schluessel] = _Flug()
+            else:
+                self._zusammengefasst += 1
+        if not anfuehrer:
+            flug.fertig.wait()
+            if flug.fehler is not None:
+                raise flug.fehler
+            return flug.pfad
+
+        try:
+            # Zwischen Prüfung und Sperre kann ein anderer Flug fertig geworden sein
+            if not self._benutzen(pfad):
+                self._erzeugen(quelle, breite, hoehe, format_name, pfad)
+            flug.pfad = pfad
+            return pfad
+        except Exception as fehler:
+            flug.fehler = fehler
+            raise
+        finally:
+            with self._sperre:
+                del self._fluege[schluessel]
+            flug.fertig.set()
+
+    def _benutzen(self, pfad):
+        # Die Änderungszeit dient als Zeitpunkt der letzten Nutzung (LRU)
+        try:
+            os.utime(pfad)
+        except FileNotFoundError:
+            return False
+        with self._sperre:
+            self._treffer += 1
+        return True
+
+    def _erzeugen(self, quelle, breite, hoehe, format_name, pfad):
+        pillow_format = format_name.upper()
+        with self._rechnen:
+            bild = renditionen_erzeugen(
+                quelle, [Rendition('variante', breite, hoehe or _UNBEGRENZT, VARIANTEN_QUALITAET, '')]
+            )['variante']
+            # speichern() schreibt über einen eigenen Zwischennamen: andere Worker-Prozesse
+            # können dieselbe Variante gleichzeitig erzeugen
+            speichern(bild, pfad, pillow_format, FORMAT_QUALITAET.get(pillow_format, VARIANTEN_QUALITAET))
+
+        with self._sperre:
+            self._erzeugt += 1
+            self._belegt += os.path.getsize(pfad)
+            voll = self._belegt > self.max_bytes
+        if voll:
+            self._aufraeumen(behalten=pfad)
+
+    def _dateien(self):
+        dateien = []
+        for eintrag in os.scandir(self.verzeichnis):
+            # Nur fertige Varianten (<schluessel>.<endung>), keine Zwischendateien
+            if eintrag.name.count('.') != 1:
+                continue
+            try:
+                info = eintrag.stat()
+            except FileNotFoundError:
+                continue
+            dateien.append((info.st_mtime, eintrag.path, info.st_size))
+        return dateien
+
+    def _aufraeumen(self, behalten=None):
+        # Räumt bereits ein anderer Thread auf, genügt dessen Durchgang
+        if not self._aufraeumen_sperre.acquire(blocking=False):
+            return
+        try:
+            # Das Verzeichnis ist maßgeblich: andere Prozesse schreiben in denselben Cache
+            dateien = sorted(self._dateien())
+            belegt = sum(groesse for _, _, groesse in dateien)
+            verdraengt = 0
+            for _, pfad, groesse in dateien:
+                if belegt <= self.max_bytes * NIEDRIGWASSER:
+                    break
+                if pfad == behalten:
+                    continue
+                try:
+                    os.remove(pfad)
+                except FileNotFoundError:
+                    pass
+                belegt -= groesse
+                verdraengt += 1
+            with self._sperre:
+                self._belegt = belegt
+                self._verdraengt += verdraengt
+        finally:
+            self._aufraeumen_sperre.release()
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen des Variantencaches für /api/metriken.
+
+        @return {Object} Belegung, Obergrenze, Treffer, erzeugte, zusammengefasste und verdrängte Varianten
+        """
+        with self._sperre:
+            abrufe = self._treffer + self._erzeugt
+            return {
+                'belegt_bytes': self._belegt,
+                'max_bytes': self.max_bytes,
+                'treffer': self._treffer,
+                'erzeugt': self._erzeugt,
+                'zusammengefasst': self._zusammengefasst,
+                'verdraengt': self._verdraengt,
+                'trefferquote': round(self._treffer / abrufe, 3) if abrufe else 0.0
+            }
+
+
+_bildvarianten = None
+
+
+def init_app(app):
+    """
+    Erstellt den Variantencache aus der App-Konfiguration.
+
+    @param {Flask} app - Die Flask-Anwendung
+    @return {Bildvarianten} Der Variantencache
+    """
+    global _bildvarianten
+    _bildvarianten = Bildvarianten(
+        app.config.get('BILD_VARIANTEN_VERZEICHNIS') or os.path.join(app.root_path, 'cache', 'bildvarianten'),
+        groessen_lesen(app.config.get('BILD_VARIANTEN', BILD_VARIANTEN)),
+        max_bytes=app.config.get('BILD_VARIANTEN_MAX_BYTES', BILD_VARIANTEN_MAX_BYTES),
+        parallel=app.config.get('BILD_VARIANTEN_PARALLEL', BILD_VARIANTEN_PARALLEL)
+    )
+    return _bildvarianten
+
+
+def bildvarianten_abrufen():
+    """
+    Liefert den Variantencache der Anwendung.
+
+    @return {Bildvarianten|None} Der Variantencache oder None vor init_app()
+    """
+    return _bildvarianten
@@ -0,0 +1,454 @@
+"""
+@fileoverview Asynchrone Bildverarbeitung für Rezept-Uploads
+@module bildverarbeitung
+
+Dieses Modul nimmt das Rendern hochgeladener Bilder aus der Anfrage heraus:
+- Der Upload wird unverändert als Rohdatei abgelegt, die Anfrage kehrt sofort zurück
+  (Rezept mit bild_status 'ausstehend')
+- Ein begrenzter Prozess-Pool erzeugt die Renditionen (utils/bilder.py); jeder
+  App-Prozess hat einen eigenen Pool, der Standard teilt die Kerne daher durch
+  APP_WORKER (Anzahl der App-Prozesse, z.B. Gunicorn-Worker)
+- Nach dem Rendern werden bild_pfad und die Beschreibung der Renditionen (bilder,
+  mit srcset je Format) über einen Rückruf gesetzt (Status 'fertig'),
+  fehlgeschlagene Aufträge werden mit wachsender Wartezeit wiederholt und danach
+  als 'fehlgeschlagen' gemeldet
+- Rohdateien bleiben bis zum Abschluss liegen; nach einem Neustart werden offene
+  Aufträge wieder aufgenommen
+- Vor dem Rendern beansprucht ein Prozess die Rohdatei durch Umbenennen in
+  <auftrag>.<endung>.<pid> (wie der Mail-Spool, utils/mailwarteschlange.py); so
+  rendert jeden Upload nur ein Prozess, auch wenn alle App-Prozesse beim Start
+  dasselbe Verzeichnis durchsuchen
+
+Jeder Upload erhält eine Auftrags-ID; sie benennt die Rohdatei und steht in
+rezepte.bild_auftrag, damit ein überholter Auftrag (neues Bild während der
+Verarbeitung) kein neueres Bild überschreibt. Die Ausgabedateien sind
+inhaltsadressiert (SHA-256 der Rohdatei samt RENDER_SIGNATUR) und können von
+mehreren Rezepten geteilt werden; entfernt werden sie deshalb nie hier, sondern
+über die Referenzzählung (models/bilddatei.py).
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.bilder import RENDER_SIGNATUR, RESPONSIVE_RENDITIONEN, UngueltigesBild, inhalt_hash, renditionen_speichern
+
+# Anzahl der App-Prozesse, die sich die Kerne teilen (jeder startet einen eigenen Pool)
+APP_WORKER = int(os.getenv('APP_WORKER', 0)) or int(os.getenv('WEB_CONCURRENCY', 0)) or 1
+BILD_WORKER = int(os.getenv('BILD_WORKER', 0)) or max(1, (os.cpu_count() or 1) // APP_WORKER)
+BILD_MAX_VERSUCHE = int(os.getenv('BILD_MAX_VERSUCHE', 3))
+BILD_WIEDERHOLUNG_WARTEZEIT = float(os.getenv('BILD_WIEDERHOLUNG_WARTEZEIT', 5))
+
+STATUS_AUSSTEHEND = 'ausstehend'
+STATUS_FERTIG = 'fertig'
+STATUS_FEHLGESCHLAGEN = 'fehlgeschlagen'
+
+
+def _entfernen(pfad):
+    # Ein anderer Worker-Prozess kann dieselbe Datei bereits entfernt haben
+    try:
+        os.remove(pfad)
+    except FileNotFoundError:
+        pass
+
+
+def _freigeben(beansprucht):
+    # Beanspruchte Rohdatei (<auftrag>.<endung>.<pid>) wieder für alle Prozesse freigeben
+    try:
+        os.replace(beansprucht, beansprucht.rpartition('.')[0])
+    except FileNotFoundError:
+        pass
+
+
+def _url(datei):
+    return f"static/uploads/{datei}"
+
+
+def bilder_beschreiben(renditionen):
+    """
+    Beschreibt gespeicherte Renditionen für die API (Feld bilder eines Rezepts).
+
+    @param {Object} renditionen - Ergebnis von renditionen_speichern()
+    @return {Object} voll und thumb (url, breite, hoehe), renditionen (aufsteigend nach
+        Breite, je Format eine URL) und srcset je Format, z.B.
+        {'webp': 'static/uploads/abc_w320.webp 320w, static/uploads/abc_w640.webp 640w'}
+    """
+    beschreibung = {}
+    for name in ('voll', 'thumb'):
+        rendition = renditionen[name]
+        beschreibung[name] = {
+            'url': _url(rendition['dateien']['jpeg']),
+            'breite': rendition['breite'],
+            'hoehe': rendition['hoehe']
+        }
+
+    eintraege = []
+    for rendition in sorted((renditionen[r.name] for r in RESPONSIVE_RENDITIONEN), key=lambda r: r['breite']):
+        # Ist das Original schmaler als eine Breite, teilen sich mehrere Renditionen dieselben Dateien
+        if eintraege and eintraege[-1]['breite'] == rendition['breite']:
+            continue
+        eintraege.append({
+            'breite': rendition['breite'],
+            'hoehe': rendition['hoehe'],
+            'formate': {format_name: _url(datei) for format_name, datei in rendition['dateien'].items()}
+        })
+    beschreibung['renditionen'] = eintraege
+    beschreibung['srcset'] = {
+        format_name: ', '.join(f"{eintrag['formate'][format_name]} {eintrag['breite']}w" for eintrag in eintraege)
+        for format_name in (eintraege[0]['formate'] if eintraege else {})
+    }
+    return beschreibung
+
+
+def bild_rendern(roh_pfad, upload_ordner, auftrag):
+    """
+    Erzeugt alle Renditionen aus einer Rohdatei (läuft im Worker-Prozess).
+
+    Die Rohdatei wird dabei nur einmal dekodiert (siehe utils/bilder.py).
+
+    @param {string} roh_pfad - Pfad der hochgeladenen Rohdatei
+    @param {string} upload_ordner - Zielverzeichnis (static/uploads)
+    @param {string} auftrag - Auftrags-ID
+    @return {Object} inhalt (Hash, Basis der Dateinamen), image_url und thumb_url
+        relativ zum Backend, bilder siehe bilder_beschreiben()
+
+    @throws {UngueltigesBild} Bei ungültigen, zu großen oder beschädigten Bildern
+    """
+    inhalt = inhalt_hash(roh_pfad, RENDER_SIGNATUR)
+    bilder = bilder_beschreiben(renditionen_speichern(roh_pfad, upload_ordner, inhalt))
+    return {
+        'inhalt': inhalt,
+        'image_url': bilder['voll']['url'],
+        'thumb_url': bilder['thumb']['url'],
+        'bilder': bilder
+    }
+
+
+class Bildverarbeitung:
+    """
+    Verteilt Render-Aufträge auf einen Prozess-Pool und meldet die Ergebnisse.
+
+    Höchstens worker Aufträge laufen gleichzeitig; weitere warten in einer
+    Warteschlange im Speicher (die Rohdateien liegen bereits auf der Platte).
+
+    @param {string} roh_verzeichnis - Ablage der hochgeladenen Rohdateien
+    @param {string} upload_ordner - Zielverzeichnis der gerenderten Bilder
+    @param {Function} ergebnis_melden - Rückruf (auftrag, status, bild_pfad, bilder=None) -> bool;
+        False bedeutet, dass der Auftrag überholt ist (seine Ausgaben entfernt das Aufräumen)
+    @param {int} [worker] - Anzahl der Worker-Prozesse (Standard: Kerne / APP_WORKER)
+    @param {int} [max_versuche=3] - Versuche je Auftrag
+    @param {float} [wartezeit=5] - Wartezeit vor der ersten Wiederholung in Sekunden
+    @param {Function} [ausfuehrer_erstellen] - Erzeugt den Executor (für Tests)
+    """
+
+    def __init__(self, roh_verzeichnis, upload_ordner, ergebnis_melden, worker=BILD_WORKER,
+                 max_versuche=BILD_MAX_VERSUCHE, wartezeit=BILD_WIEDERHOLUNG_WARTEZEIT,
+                 ausfuehrer_erstellen=None):
+        self.roh_verzeichnis = roh_verzeichnis
+        self.upload_ordner = upload_ordner
+        self.ergebnis_melden = ergebnis_melden
+        self.worker = worker
+        self.max_versuche = max_versuche
+        self.wartezeit = wartezeit
+        self._ausfuehrer_erstellen = ausfuehrer_erstellen or (lambda anzahl: ProcessPoolExecutor(
+            max_workers=anzahl,
+            # spawn statt fork: der Elternprozess hat Threads (DB-Pool, Cache-Backend)
+            mp_context=multiprocessing.get_context('spawn')
+        ))
+        os.makedirs(roh_verzeichnis, exist_ok=True)
+        os.makedirs(upload_ordner, exist_ok=True)
+        self._ausfuehrer = None
+        self._sperre = threading.Lock()
+        # Signalisiert anhalten(), dass keine Aufträge mehr laufen
+        self._leerlauf = threading.Condition(self._sperre)
+        self._wartend = deque()
+        self._bekannt = set()
+        self._laufend = 0
+        self._versuche = {}
+        self._fertig = 0
+        self._fehlgeschlagen = 0
+        self._ueberholt = 0
+        self._wiederholungen = 0
+        self._dauer_gesamt = 0.0
+        self._beendet = False
+
+    def roh_speichern(self, datei, erweiterung):
+        """
+        Legt einen Upload unverändert als Rohdatei ab.
+
+        @param {FileStorage} datei - Hochgeladene Datei
+        @param {string} erweiterung - Dateierweiterung (bereits geprüft)
+        @return {string} Auftrags-ID
+
+        @throws {OSError} Wenn die Datei nicht geschrieben werden kann
+        """
+        auftrag = uuid.uuid4().hex
+        ziel = os.path.join(self.roh_verzeichnis, f"{auftrag}.{erweiterung}")
+        datei.save(ziel + '.tmp')
+        os.replace(ziel + '.tmp', ziel)
+        return auftrag
+
+    def _roh_pfad(self, auftrag):
+        # Nur freie Rohdateien (<auftrag>.<endung>), keine Zwischen- oder beanspruchten Dateien
+        for name in os.listdir(self.roh_verzeichnis):
+            if name.startswith(auftrag + '.') and name.count('.') == 1:
+                return os.path.join(self.roh_verzeichnis, name)
+        return None
+
+    def _beanspruchen(self, auftrag):
+        roh_pfad = self._roh_pfad(auftrag)
+        if roh_pfad is None:
+            return None
+        beansprucht = f"{roh_pfad}.{os.getpid()}"
+        try:
+            os.rename(roh_pfad, beansprucht)
+        except FileNotFoundError:
+            # Ein anderer Prozess verarbeitet diesen Auftrag bereits
+            return None
+        return beansprucht
+
+    def _verwaiste_freigeben(self):
+        # Von beendeten Prozessen beanspruchte Rohdateien wieder freigeben
+        for name in os.listdir(self.roh_verzeichnis):
+            basis, _, pid = name.rpartition('.')
+            if basis.count('.') != 1 or not pid.isdigit():
+                continue
+            if int(pid) != os.getpid():
+                try:
+                    os.kill(int(pid), 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except OSError:
+                    continue
+            _freigeben(os.path.join(self.roh_verzeichnis, name))
+
+    def verwerfen(self, auftrag):
+        """
+        Entfernt die Rohdatei eines Auftrags, der nicht verarbeitet werden soll
+        (z.B. wenn das Rezept nicht gespeichert werden konnte).
+
+        @param {string} auftrag - Auftrags-ID
+        """
+        roh_pfad = self._roh_pfad(auftrag)
+        if roh_pfad:
+            _entfernen(roh_pfad)
+
+    def einreichen(self, auftrag):
+        """
+        Reiht einen Auftrag zum Rendern ein.
+
+        @param {string} auftrag - Auftrags-ID aus roh_speichern()
+        """
+        with self._sperre:
+            if self._beendet or auftrag in self._bekannt:
+                return
+            self._bekannt.add(auftrag)
+            self._wartend.append(auftrag)
+        self._verteilen()
+
+    def wiederaufnehmen(self):
+        """
+        Reiht alle liegengebliebenen Rohdateien (z.B. nach einem Neustart) erneut ein.
+
+        Rohdateien, die ein noch laufender Prozess beansprucht hat, bleiben diesem überlassen.
+
+        @return {int} Anzahl der eingereihten Aufträge
+        """
+        self._verwaiste_freigeben()
+        auftraege = [name.split('.', 1)[0] for name in sorted(os.listdir(self.roh_verzeichnis))
+                     if name.count('.') == 1]
+        for auftrag in auftraege:
+            self.einreichen(auftrag)
+        return len(auftraege)
+
+    def _verteilen(self):
+        while True:
+            with self._sperre:
+                if self._beendet or not self._wartend or self._laufend >= self.worker:
+                    return
+                auftrag = self._wartend.popleft()
+                self._laufend += 1
+                if self._ausfuehrer is None:
+                    self._ausfuehrer = self._ausfuehrer_erstellen(self.worker)
+                ausfuehrer = self._ausfuehrer
+
+            roh_pfad = self._beanspruchen(auftrag)
+            if roh_pfad is None:
+                # Bereits abgeschlossen, verworfen oder von einem anderen Prozess übernommen
+                self._abschliessen(auftrag)
+                continue
+            begonnen = time.monotonic()
+            try:
+                zukunft = ausfuehrer.submit(bild_rendern, roh_pfad, self.upload_ordner, auftrag)
+            except (BrokenProcessPool, RuntimeError) as fehler:
+                self._fehler_behandeln(auftrag, roh_pfad, fehler, ausfuehrer)
+                continue
+            # Ergebnis in eigenem Thread melden: der Rückruf schreibt in die Datenbank
+            # und soll den Verwaltungs-Thread des Pools nicht aufhalten
+            zukunft.add_done_callback(lambda z, a=auftrag, p=roh_pfad, b=begonnen, e=ausfuehrer: threading.Thread(
+                target=self._erledigt, args=(a, p, b, e, z), name='bild-ergebnis', daemon=True
+            ).start())
+
+    def _erledigt(self, auftrag, roh_pfad, begonnen, ausfuehrer, zukunft):
+        if zukunft.cancelled():
+            # Beim Anhalten verworfen; die Rohdatei wird beim nächsten Start verarbeitet
+            _freigeben(roh_pfad)
+            self._abschliessen(auftrag)
+            return
+        try:
+            ergebnis = zukunft.result()
+        except Exception as fehler:
+            self._fehler_behandeln(auftrag, roh_pfad, fehler, ausfuehrer)
+            return
+
+        with self._sperre:
+            self._dauer_gesamt += time.monotonic() - begonnen
+        try:
+            aktuell = self.ergebnis_melden(auftrag, STATUS_FERTIG, ergebnis['image_url'], ergebnis['bilder'])
+        except Exception as fehler:
+            # Rohdatei bleibt liegen und wird beim nächsten Start erneut verarbeitet
+            print(f"⚠️  Bildergebnis für Auftrag {auftrag} konnte nicht gespeichert werden: {fehler}")
+            _freigeben(roh_pfad)
+            self._abschliessen(auftrag)
+            return
+
+        _entfernen(roh_pfad)
+        with self._sperre:
+            self._fertig += 1
+            if aktuell is False:
+                self._ueberholt += 1
+        self._abschliessen(auftrag)
+
+    def _fehler_behandeln(self, auftrag, roh_pfad, fehler, ausfuehrer):
+        if isinstance(fehler, BrokenProcessPool):
+            # Ein Worker ist abgestürzt (z.B. Speicher); Pool beim nächsten Auftrag neu erzeugen
+            with self._sperre:
+                if self._ausfuehrer is ausfuehrer:
+                    self._ausfuehrer = None
+            ausfuehrer.shutdown(wait=False)
+
+        with self._sperre:
+            versuche = self._versuche[auftrag] = self._versuche.get(auftrag, 0) + 1
+            # Ungültige Bilder werden auch beim nächsten Versuch nicht gültig
+            wiederholen = (versuche < self.max_versuche and not self._beendet
+                           and not isinstance(fehler, UngueltigesBild))
+            if wiederholen:
+                self._wiederholungen += 1
+                self._laufend -= 1
+                if self._laufend == 0:
+                    self._leerlauf.notify_all()
+
+        if wiederholen:
+            # Freigeben, damit die Rohdatei auch einen Absturz während der Wartezeit übersteht
+            _freigeben(roh_pfad)
+            wartezeit = self.wartezeit * 2 ** (versuche - 1)
+            print(f"⚠️  Bildauftrag {auftrag} fehlgeschlagen, neuer Versuch in {wartezeit:.0f}s: {fehler}")
+            timer = threading.Timer(wartezeit, self._erneut_einreihen, args=(auftrag,))
+            timer.daemon = True
+            timer.start()
+            self._verteilen()
+            return
+
+        print(f"❌ Bildauftrag {auftrag} aufgegeben nach {versuche} Versuch(en): {fehler}")
+        try:
+            self.ergebnis_melden(auftrag, STATUS_FEHLGESCHLAGEN, None)
+        except Exception as meldefehler:
+            print(f"⚠️  Fehlerstatus für Auftrag {auftrag} konnte nicht gespeichert werden: {meldefehler}")
+            _freigeben(roh_pfad)
+            self._abschliessen(auftrag)
+            return
+        _entfernen(roh_pfad)
+        with self._sperre:
+            self._fehlgeschlagen += 1
+        self._abschliessen(auftrag)
+
+    def _erneut_einreihen(self, auftrag):
+        with self._sperre:
+            if self._beendet:
+                return
+            self._wartend.append(auftrag)
+        self._verteilen()
+
+    def _abschliessen(self, auftrag):
+        with self._sperre:
+            self._laufend -= 1
+            self._bekannt.discard(auftrag)
+            self._versuche.pop(auftrag, None)
+            if self._laufend == 0:
+                self._leerlauf.notify_all()
+        self._verteilen()
+
+    def anhalten(self, warten=True, timeout=30.0):
+        """
+        Beendet den Pool; noch nicht begonnene Aufträge bleiben als Rohdatei liegen.
+
+        @param {boolean} [warten=True] - Auf laufende Aufträge und ihre Ergebnismeldung warten
+        @param {float} [timeout=30.0] - Maximale Wartezeit in Sekunden
+        """
+        with self._sperre:
+            self._beendet = True
+            self._wartend.clear()
+            ausfuehrer, self._ausfuehrer = self._ausfuehrer, None
+        if ausfuehrer is not None:
+            ausfuehrer.shutdown(wait=warten, cancel_futures=True)
+        if warten:
+            with self._leerlauf:
+                self._leerlauf.wait_for(lambda: self._laufend == 0, timeout)
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen der Bildverarbeitung für /api/metriken.
+
+        @return {Object} Worker, laufende und wartende Aufträge, Zähler und mittlere Dauer
+        """
+        with self._sperre:
+            return {
+                'worker': self.worker,
+                'laufend': self._laufend,
+                'wartend': len(self._wartend),
+                'fertig': self._fertig,
+                'fehlgeschlagen': self._fehlgeschlagen,
+                'ueberholt': self._ueberholt,
+                'wiederholungen': self._wiederholungen,
+                'dauer_durchschnitt_ms': round(self._dauer_gesamt / self._fertig * 1000, 3) if self._fertig else 0.0
+            }
+
+
+_bildverarbeitung = None
+
+
+def init_app(app, ergebnis_melden):
+    """
+    Erstellt die Bildverarbeitung aus der App-Konfiguration und nimmt offene Aufträge wieder auf.
+
+    @param {Flask} app - Die Flask-Anwendung
+    @param {Function} ergebnis_melden - Rückruf (auftrag, status, bild_pfad, bilder=None) -> bool
+    @return {Bildverarbeitung} Die Bildverarbeitung
+    """
+    global _bildverarbeitung
+    verarbeitung = Bildverarbeitung(
+        app.config.get('BILD_ROH_VERZEICHNIS') or os.path.join(app.root_path, 'spool', 'bilder'),
+        app.config.get('UPLOAD_FOLDER') or os.path.join(app.static_folder, 'uploads'),
+        ergebnis_melden,
+        worker=app.config.get('BILD_WORKER', BILD_WORKER)
+    )
+    vorher, _bildverarbeitung = _bildverarbeitung, verarbeitung
+    if vorher is not None:
+        vorher.anhalten(warten=False)
+    verarbeitung.wiederaufnehmen()
+    return verarbeitung
+
+
+def bildverarbeitung_abrufen():
+    """
+    Liefert die Bildverarbeitung der Anwendung.
+
+    @return {Bildverarbeitung|None} Die Bildverarbeitung oder None vor init_app()
+    """
+    return _bildverarbeitung
@@ -0,0 +1,142 @@
+"""
+@fileoverview Zwischenspeicher-Utilitäten für das Intranet-Kochbuch
+@module cache
+
+Dieses Modul stellt einen einfachen prozesslokalen Zwischenspeicher bereit:
+- Begrenzte Anzahl von Einträgen mit LRU-Verdrängung
+- Optionale Obergrenze für den geschätzten Speicherbedarf in Bytes
+- Ablaufzeit (TTL) je Eintrag
+- Thread-sicherer Zugriff und Statistiken zu Treffern und Verdrängungen
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_FEHLT = object()
+
+
+class Zwischenspeicher:
+    """
+    LRU-Zwischenspeicher mit Ablaufzeit.
+
+    @param {int} [max_eintraege=256] - Maximale Anzahl gespeicherter Einträge
+    @param {float} [ttl=30] - Lebensdauer eines Eintrags in Sekunden
+    @param {int} [max_bytes] - Obergrenze für die Summe der Eintragsgrößen
+    @param {Function} [groesse] - Schätzt die Größe eines Werts in Bytes
+        (erforderlich, wenn max_bytes gesetzt ist)
+    """
+
+    def __init__(self, max_eintraege=256, ttl=30, max_bytes=None, groesse=None):
+        if max_bytes is not None and groesse is None:
+            raise ValueError("max_bytes erfordert eine Funktion zur Größenbestimmung")
+        self.max_eintraege = max_eintraege
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._groesse = groesse
+        self._eintraege = OrderedDict()
+        self._bytes = 0
+        self._sperre = threading.Lock()
+        self._treffer = 0
+        self._fehlschlaege = 0
+        self._verdraengungen = 0
+
+    def abrufen(self, schluessel, standard=None):
+        """
+        Liefert einen gespeicherten Wert, sofern er noch nicht abgelaufen ist.
+
+        @param {hashable} schluessel - Schlüssel des Eintrags
+        @param {any} [standard=None] - Rückgabewert, falls kein gültiger Eintrag existiert
+        @return {any} Gespeicherter Wert oder standard
+        """
+        with self._sperre:
+            eintrag = self._eintraege.get(schluessel, _FEHLT)
+            if eintrag is not _FEHLT:
+                wert, ablauf, _ = eintrag
+                if ablauf > time.monotonic():
+                    self._eintraege.move_to_end(schluessel)
+                    self._treffer += 1
+                    return wert
+                self._entfernen_ohne_sperre(schluessel)
+            self._fehlschlaege += 1
+            return standard
+
+    def setzen(self, schluessel, wert, ttl=None):
+        """
+        Speichert einen Wert und verdrängt bei Bedarf die am längsten nicht
+        genutzten Einträge. Werte, die allein max_bytes überschreiten, werden
+        nicht gespeichert.
+
+        @param {hashable} schluessel - Schlüssel des Eintrags
+        @param {any} wert - Zu speichernder Wert
+        @param {float} [ttl] - Abweichende Lebensdauer in Sekunden
+        """
+        ablauf = time.monotonic() + (self.ttl if ttl is None else ttl)
+        groesse = self._groesse(wert) if self._groesse is not None else 0
+        with self._sperre:
+            self._entfernen_ohne_sperre(schluessel)
+            if self.max_bytes is not None and groesse > self.max_bytes:
+                return
+            self._eintraege[schluessel] = (wert, ablauf, groesse)
+            self._bytes += groesse
+            while len(self._eintraege) > self.max_eintraege or (
+                    self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, _, verdraengt) = self._eintraege.popitem(last=False)
+                self._bytes -= verdraengt
+                self._verdraengungen += 1
+
+    def entfernen(self, schluessel):
+        """
+        Entfernt einen einzelnen Eintrag, falls vorhanden.
+
+        @param {hashable} schluessel - Schlüssel des Eintrags
+        """
+        with self._sperre:
+            self._entfernen_ohne_sperre(schluessel)
+
+    def _entfernen_ohne_sperre(self, schluessel):
+        eintrag = self._eintraege.pop(schluessel, None)
+        if eintrag is not None:
+            self._bytes -= eintrag[2]
+
+    def entfernen_wenn(self, bedingung):
+        """
+        Entfernt alle Einträge, deren Wert die Bedingung erfüllt.
+
+        @param {Function} bedingung - Erhält den gespeicherten Wert, liefert True zum Entfernen
+        @return {int} Anzahl der entfernten Einträge
+        """
+        with self._sperre:
+            treffer = [schluessel for schluessel, (wert, _, _) in self._eintraege.items() if bedingung(wert)]
+            for schluessel in treffer:
+                self._entfernen_ohne_sperre(schluessel)
+            return len(treffer)
+
+    def leeren(self):
+        """
+        Entfernt alle Einträge.
+        """
+        with self._sperre:
+            self._eintraege.clear()
+            self._bytes = 0
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zur Nutzung des Zwischenspeichers.
+
+        @return {Object} Anzahl der Einträge, Größe, Treffer, Fehlschläge und Verdrängungen
+        """
+        with self._sperre:
+            return {
+                'eintraege': len(self._eintraege),
+                'max_eintraege': self.max_eintraege,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'treffer': self._treffer,
+                'fehlschlaege': self._fehlschlaege,
+                'verdraengungen': self._verdraengungen
+            }
+
+    def __len__(self):
+        with self._sperre:
+            return len(self._eintraege)
@@ -0,0 +1,549 @@
+"""
+@fileoverview Austauschbares Cache-Backend für mehrere Worker-Prozesse
+@module cachebackend
+
+Dieses Modul bündelt alle Zwischenspeicher der Anwendung hinter einer Schnittstelle:
+- Gemeinsame Schlüssel-Wert-Ablage mit Ablaufzeit (z.B. gesperrte Tokens)
+- Atomare Token-Buckets für die Ratenbegrenzung
+- Prozesslokale Zwischenspeicher, die über das Backend erzeugt und gezählt werden
+- Invalidierungsnachrichten: Schreibvorgänge in einem Prozess verwerfen die
+  betroffenen Einträge in allen anderen Prozessen
+
+Implementierungen:
+- SpeicherBackend: alles im eigenen Prozess (Standard, Entwicklung, Tests)
+- NetzwerkBackend: Redis-kompatibler Server (RESP-Protokoll), z.B. Redis,
+  Valkey oder ein lokaler Ersatzserver; Nachrichten über PUBLISH/SUBSCRIBE
+
+Auswahl über CACHE_BACKEND_URL, z.B. "redis://:passwort@localhost:6379/0".
+Ohne Angabe wird das SpeicherBackend verwendet. Ist der Server nicht erreichbar,
+arbeitet das NetzwerkBackend für CACHE_BACKEND_PAUSE Sekunden prozesslokal weiter,
+ohne bei jedem Befehl auf das Zeitlimit zu warten. Der Empfang von Nachrichten
+startet erst im Worker-Prozess (init_app bzw. beim ersten Befehl), nicht beim Import.
+"""
+
+import abc
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from utils.cache import Zwischenspeicher
+
+# Kanal für Invalidierungsnachrichten und Präfix aller Schlüssel im Netzwerk-Backend
+NACHRICHTEN_KANAL = 'kochbuch:invalidierung'
+SCHLUESSEL_PRAEFIX = 'kochbuch:'
+# Wartezeit, bevor der Empfänger nach einem Verbindungsabbruch neu verbindet
+_NEU_VERBINDEN_NACH = 2.0
+# Rückgabe von _befehl, wenn der Server ausgefallen ist oder pausiert wird
+_NICHT_ERREICHBAR = object()
+
+# Token-Bucket als Lua-Skript, damit Lesen und Schreiben auf dem Server atomar sind
+_EIMER_SKRIPT = """
+local rate, kapazitaet, kosten = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local zeit = redis.call('TIME')
+local jetzt = tonumber(zeit[1]) + tonumber(zeit[2]) / 1000000
+local stand = redis.call('HMGET', KEYS[1], 'tokens', 'zeit')
+local tokens = tonumber(stand[1]) or kapazitaet
+local zuletzt = tonumber(stand[2]) or jetzt
+tokens = math.min(kapazitaet, tokens + (jetzt - zuletzt) * rate)
+local erlaubt, wartezeit = 0, 0
+if tokens >= kosten then
+  tokens = tokens - kosten
+  erlaubt = 1
+else
+  wartezeit = (kosten - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'zeit', tostring(jetzt))
+redis.call('PEXPIRE', KEYS[1], math.ceil((kapazitaet - tokens) / rate * 1000) + 1000)
+return {erlaubt, tostring(wartezeit)}
+"""
+
+
+class CacheBackend(abc.ABC):
+    """
+    Schnittstelle aller Cache-Backends.
+
+    Unterklassen implementieren die gemeinsame Ablage (abrufen, setzen,
+    entfernen) und den Versand von Nachrichten (_senden).
+    """
+
+    name = 'basis'
+
+    def __init__(self):
+        self.absender = uuid.uuid4().hex
+        self._abonnenten = defaultdict(list)
+        self._zwischenspeicher = {}
+        self._sperre = threading.Lock()
+        self._anzahl_gesendet = 0
+        self._anzahl_empfangen = 0
+
+    @abc.abstractmethod
+    def abrufen(self, schluessel, standard=None):
+        """
+        Liest einen Wert aus der gemeinsamen Ablage.
+
+        @param {string} schluessel - Schlüssel des Eintrags
+        @param {any} [standard=None] - Rückgabewert, falls kein Eintrag existiert
+        @return {any} Gespeicherter (JSON-kompatibler) Wert oder standard
+        """
+
+    @abc.abstractmethod
+    def setzen(self, schluessel, wert, ttl=None):
+        """
+        Speichert einen JSON-kompatiblen Wert in der gemeinsamen Ablage.
+
+        @param {string} schluessel - Schlüssel des Eintrags
+        @param {any} wert - Zu speichernder Wert
+        @param {float} [ttl] - Lebensdauer in Sekunden (ohne Angabe unbegrenzt)
+        """
+
+    @abc.abstractmethod
+    def entfernen(self, schluessel):
+        """
+        Entfernt einen Eintrag aus der gemeinsamen Ablage.
+
+        @param {string} schluessel - Schlüssel des Eintrags
+        """
+
+    @abc.abstractmethod
+    def eimer_entnehmen(self, schluessel, rate, kapazitaet, kosten=1):
+        """
+        Entnimmt atomar Tokens aus einem Token-Bucket.
+
+        Ein neuer Bucket ist voll; er füllt sich mit rate Tokens pro Sekunde
+        bis höchstens kapazitaet wieder auf.
+
+        @param {string} schluessel - Schlüssel des Buckets
+        @param {float} rate - Nachfüllrate in Tokens pro Sekunde
+        @param {float} kapazitaet - Maximale Anzahl Tokens (erlaubter Burst)
+        @param {float} [kosten=1] - Zu entnehmende Tokens
+        @return {tuple} (erlaubt, wartezeit): wartezeit in Sekunden, bis genug
+            Tokens vorhanden sind (0 bei Erfolg)
+        """
+
+    @abc.abstractmethod
+    def _senden(self, nachricht):
+        """
+        Übermittelt eine Invalidierungsnachricht an die anderen Prozesse.
+
+        @param {Object} nachricht - Absender, Bereich und Daten der Invalidierung
+        """
+
+    def zwischenspeicher(self, name, **optionen):
+        """
+        Erzeugt einen prozesslokalen Zwischenspeicher und meldet ihn beim Backend an.
+
+        Die Einträge bleiben im Prozess; andere Prozesse werden über
+        invalidieren() benachrichtigt.
+
+        @param {string} name - Eindeutiger Name, z.B. 'rezepte'
+        @param {Object} optionen - Parameter für Zwischenspeicher (max_eintraege, ttl, ...)
+        @return {Zwischenspeicher} Der neue Zwischenspeicher
+        """
+        speicher = Zwischenspeicher(**optionen)
+        with self._sperre:
+            self._zwischenspeicher[name] = speicher
+        return speicher
+
+    def init_app(self, app):
+        """
+        Startet den Nachrichtenempfang mit der ersten Anfrage des Worker-Prozesses.
+
+        @param {Flask} app - Die Flask-Anwendung
+        """
+        app.before_request(self.empfang_starten)
+
+    def empfang_starten(self):
+        """
+        Startet den Empfang von Invalidierungen anderer Prozesse (falls nötig).
+        """
+
+    def abonnieren(self, bereich, rueckruf):
+        """
+        Registriert eine Funktion für Invalidierungen eines Bereichs.
+
+        @param {string} bereich - Name des Bereichs, z.B. 'rezepte'
+        @param {Function} rueckruf - Erhält die Daten der Invalidierung; ein leeres
+            Objekt bedeutet "alles verwerfen"
+        """
+        with self._sperre:
+            self._abonnenten[bereich].append(rueckruf)
+
+    def invalidieren(self, bereich, **daten):
+        """
+        Verwirft Einträge im eigenen Prozess und benachrichtigt alle anderen Prozesse.
+
+        @param {string} bereich - Name des Bereichs
+        @param {Object} daten - JSON-kompatible Angaben, was verworfen werden soll
+        """
+        self._zustellen(bereich, daten)
+        self.nachricht_senden(bereich, **daten)
+
+    def nachricht_senden(self, bereich, **daten):
+        """
+        Benachrichtigt nur die anderen Prozesse (der eigene hat die Änderung bereits übernommen).
+
+        @param {string} bereich - Name des Bereichs
+        @param {Object} daten - JSON-kompatible Angaben zur Änderung
+        """
+        with self._sperre:
+            self._anzahl_gesendet += 1
+        self._senden({'absender': self.absender, 'bereich': bereich, 'daten': daten})
+
+    def _empfangen(self, nachricht):
+        if nachricht.get('absender') == self.absender:
+            return
+        with self._sperre:
+            self._anzahl_empfangen += 1
+        self._zustellen(nachricht.get('bereich'), nachricht.get('daten') or {})
+
+    def _alles_verwerfen(self):
+        """
+        Verwirft alle Bereiche, z.B. nachdem Nachrichten verloren gegangen sein können.
+        """
+        with self._sperre:
+            bereiche = list(self._abonnenten)
+        for bereich in bereiche:
+            self._zustellen(bereich, {})
+
+    def _zustellen(self, bereich, daten):
+        with self._sperre:
+            rueckrufe = list(self._abonnenten.get(bereich, ()))
+        for rueckruf in rueckrufe:
+            try:
+                rueckruf(daten)
+            except Exception as fehler:
+                print(f"⚠️  Invalidierung für '{bereich}' fehlgeschlagen: {fehler}")
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen des Backends und aller angemeldeten Zwischenspeicher.
+
+        @return {Object} Name des Backends, Nachrichtenzähler und je Zwischenspeicher
+            dessen Statistiken
+        """
+        with self._sperre:
+            speicher = dict(self._zwischenspeicher)
+            kennzahlen = {
+                'backend': self.name,
+                'nachrichten_gesendet': self._anzahl_gesendet,
+                'nachrichten_empfangen': self._anzahl_empfangen
+            }
+        kennzahlen['zwischenspeicher'] = {name: s.statistiken() for name, s in speicher.items()}
+        return kennzahlen
+
+
+class SpeicherBackend(CacheBackend):
+    """
+    Backend für einen einzelnen Prozess; Nachrichten erreichen nur diesen Prozess.
+    """
+
+    name = 'speicher'
+
+    def __init__(self):
+        super().__init__()
+        self._ablage = {}
+        self._ablage_sperre = threading.Lock()
+        self._schreibvorgaenge = 0
+        self._eimer = {}
+        self._eimer_sperre = threading.Lock()
+
+    def abrufen(self, schluessel, standard=None):
+        with self._ablage_sperre:
+            eintrag = self._ablage.get(schluessel)
+            if eintrag is None:
+                return standard
+            wert, ablauf = eintrag
+            if ablauf is not None and ablauf <= time.monotonic():
+                del self._ablage[schluessel]
+                return standard
+            return json.loads(wert)
+
+    def setzen(self, schluessel, wert, ttl=None):
+        ablauf = None if ttl is None else time.monotonic() + ttl
+        with self._ablage_sperre:
+            # Wie im Netzwerk-Backend nur JSON ablegen, damit sich beide gleich verhalten
+            self._ablage[schluessel] = (json.dumps(wert), ablauf)
+            self._schreibvorgaenge += 1
+            if self._schreibvorgaenge % 1000 == 0:
+                self._abgelaufene_entfernen()
+
+    def _abgelaufene_entfernen(self):
+        jetzt = time.monotonic()
+        for schluessel in [s for s, (_, ablauf) in self._ablage.items() if ablauf is not None and ablauf <= jetzt]:
+            del self._ablage[schluessel]
+
+    def entfernen(self, schluessel):
+        with self._ablage_sperre:
+            self._ablage.pop(schluessel, None)
+
+    def eimer_entnehmen(self, schluessel, rate, kapazitaet, kosten=1):
+        jetzt = time.monotonic()
+        with self._eimer_sperre:
+            tokens, zuletzt, voll_um = self._eimer.get(schluessel, (kapazitaet, jetzt, jetzt))
+            tokens = min(kapazitaet, tokens + (jetzt - zuletzt) * rate)
+            if tokens >= kosten:
+                tokens -= kosten
+                erlaubt, wartezeit = True, 0.0
+            else:
+                erlaubt, wartezeit = False, (kosten - tokens) / rate
+            self._eimer[schluessel] = (tokens, jetzt, jetzt + (kapazitaet - tokens) / rate)
+            # Wieder volle Buckets entsprechen fehlenden und werden gelegentlich verworfen
+            if len(self._eimer) > 10000:
+                for alt in [s for s, (_, _, voll) in self._eimer.items() if voll <= jetzt]:
+                    del self._eimer[alt]
+            return erlaubt, wartezeit
+
+    def _senden(self, nachricht):
+        pass
+
+    def statistiken(self):
+        kennzahlen = super().statistiken()
+        with self._ablage_sperre:
+            kennzahlen['gemeinsame_eintraege'] = len(self._ablage)
+        return kennzahlen
+
+
+class RespFehler(Exception):
+    """Fehlerantwort eines Redis-kompatiblen Servers"""
+
+
+class _RespVerbindung:
+    """
+    Minimale Verbindung zu einem Redis-kompatiblen Server (RESP2).
+    """
+
+    def __init__(self, host, port, passwort=None, datenbank=0, timeout=2.0):
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._datei = self._socket.makefile('rb')
+        if passwort:
+            self.befehl('AUTH', passwort)
+        if datenbank:
+            self.befehl('SELECT', datenbank)
+
+    def befehl(self, *teile):
+        self.senden(*teile)
+        return self.antwort_lesen()
+
+    def senden(self, *teile):
+        kodiert = [str(teil).encode('utf-8') if not isinstance(teil, bytes) else teil for teil in teile]
+        daten = b'*%d\r\n' % len(kodiert) + b''.join(b'$%d\r\n%s\r\n' % (len(teil), teil) for teil in kodiert)
+        self._socket.sendall(daten)
+
+    def antwort_lesen(self):
+        zeile = self._datei.readline()
+        if not zeile.endswith(b'\r\n'):
+            raise ConnectionError("Verbindung zum Cache-Server unterbrochen")
+        art, inhalt = zeile[:1], zeile[1:-2]
+        if art == b'+':
+            return inhalt.decode('utf-8')
+        if art == b'-':
+            raise RespFehler(inhalt.decode('utf-8'))
+        if art == b':':
+            return int(inhalt)
+        if art == b'$':
+            laenge = int(inhalt)
+            if laenge < 0:
+                return None
+            daten = self._datei.read(laenge + 2)
+            if len(daten) != laenge + 2:
+                raise ConnectionError("Verbindung zum Cache-Server unterbrochen")
+            return daten[:-2]
+        if art == b'*':
+            anzahl = int(inhalt)
+            return None if anzahl < 0 else [self.antwort_lesen() for _ in range(anzahl)]
+        raise RespFehler(f"Unbekannte Antwort: {zeile!r}")
+
+    def zeitlimit_setzen(self, sekunden):
+        self._socket.settimeout(sekunden)
+
+    def schliessen(self):
+        try:
+            self._datei.close()
+            self._socket.close()
+        except OSError:
+            pass
+
+
+class NetzwerkBackend(CacheBackend):
+    """
+    Backend auf einem Redis-kompatiblen Server, gemeinsam für alle Worker-Prozesse.
+
+    Fällt der Server aus, übernimmt für pause Sekunden ein prozesslokales
+    SpeicherBackend Ablage und Token-Buckets, ohne den Server erneut zu fragen;
+    erst danach versucht der nächste Befehl wieder eine Verbindung. Nach dem
+    Wiederverbinden verwirft jeder Prozess seine lokalen Zwischenspeicher, da
+    Nachrichten verloren sein können.
+
+    @param {string} url - z.B. "redis://:passwort@localhost:6379/0"
+    @param {float} [timeout=2.0] - Zeitlimit für Verbindungsaufbau und Befehle in Sekunden
+    @param {float} [pause=5.0] - Sekunden nach einem Fehler, in denen der Server nicht gefragt wird
+    """
+
+    name = 'netzwerk'
+
+    def __init__(self, url, timeout=2.0, pause=5.0):
+        super().__init__()
+        adresse = urlparse(url)
+        self._host = adresse.hostname or 'localhost'
+        self._port = adresse.port or 6379
+        self._passwort = adresse.password
+        self._datenbank = int(adresse.path.lstrip('/') or 0)
+        self._timeout = timeout
+        self._pause = pause
+        self._pause_bis = 0.0
+        self._ersatz = SpeicherBackend()
+        self._lokal = threading.local()
+        self._empfaenger = None
+        self._empfaenger_pid = None
+        self._fehler = 0
+        self._uebersprungen = 0
+        # Warnungen nur beim ersten Fehler und nach der Wiederherstellung
+        self._befehle_gestoert = False
+        self._kanal_gestoert = False
+
+    def _verbindung(self):
+        verbindung = getattr(self._lokal, 'verbindung', None)
+        if verbindung is None:
+            verbindung = _RespVerbindung(self._host, self._port, self._passwort, self._datenbank, self._timeout)
+            self._lokal.verbindung = verbindung
+        return verbindung
+
+    def _befehl(self, *teile):
+        self.empfang_starten()
+        if self._pause_bis > time.monotonic():
+            with self._sperre:
+                self._uebersprungen += 1
+            return _NICHT_ERREICHBAR
+        try:
+            antwort = self._verbindung().befehl(*teile)
+        except (OSError, ConnectionError, RespFehler) as fehler:
+            verbindung = getattr(self._lokal, 'verbindung', None)
+            if verbindung is not None:
+                verbindung.schliessen()
+                self._lokal.verbindung = None
+            with self._sperre:
+                self._fehler += 1
+                self._pause_bis = time.monotonic() + self._pause
+                melden, self._befehle_gestoert = not self._befehle_gestoert, True
+            if melden:
+                print(f"⚠️  Cache-Server nicht erreichbar ({self._host}:{self._port}): {fehler}")
+            return _NICHT_ERREICHBAR
+        if self._befehle_gestoert:
+            with self._sperre:
+                melden, self._befehle_gestoert = self._befehle_gestoert, False
+            if melden:
+                print(f"✅ Cache-Server wieder erreichbar ({self._host}:{self._port})")
+        return antwort
+
+    def abrufen(self, schluessel, standard=None):
+        wert = self._befehl('GET', SCHLUESSEL_PRAEFIX + schluessel)
+        if wert is _NICHT_ERREICHBAR:
+            return self._ersatz.abrufen(schluessel, standard)
+        return standard if wert is None else json.loads(wert)
+
+    def setzen(self, schluessel, wert, ttl=None):
+        teile = ['SET', SCHLUESSEL_PRAEFIX + schluessel, json.dumps(wert)]
+        if ttl is not None:
+            teile += ['PX', max(int(ttl * 1000), 1)]
+        if self._befehl(*teile) is _NICHT_ERREICHBAR:
+            self._ersatz.setzen(schluessel, wert, ttl)
+
+    def entfernen(self, schluessel):
+        if self._befehl('DEL', SCHLUESSEL_PRAEFIX + schluessel) is _NICHT_ERREICHBAR:
+            self._ersatz.entfernen(schluessel)
+
+    def eimer_entnehmen(self, schluessel, rate, kapazitaet, kosten=1):
+        antwort = self._befehl('EVAL', _EIMER_SKRIPT, 1, SCHLUESSEL_PRAEFIX + schluessel, rate, kapazitaet, kosten)
+        if antwort is _NICHT_ERREICHBAR:
+            # Ohne Server begrenzt jeder Prozess für sich, statt alle Anfragen abzulehnen
+            return self._ersatz.eimer_entnehmen(schluessel, rate, kapazitaet, kosten)
+        return bool(antwort[0]), float(antwort[1])
+
+    def _senden(self, nachricht):
+        self._befehl('PUBLISH', NACHRICHTEN_KANAL, json.dumps(nachricht))
+
+    def empfang_starten(self):
+        # Je Prozess ein Empfänger; Threads überleben kein fork() (z.B. Gunicorn mit --preload)
+        pid = os.getpid()
+        if self._empfaenger_pid == pid:
+            return
+        with self._sperre:
+            if self._empfaenger_pid == pid:
+                return
+            self._empfaenger_pid = pid
+            self._empfaenger = threading.Thread(target=self._empfangen_schleife, name='cache-invalidierung', daemon=True)
+        self._empfaenger.start()
+
+    def _empfangen_schleife(self):
+        erste_verbindung = True
+        while True:
+            verbindung = None
+            try:
+                verbindung = _RespVerbindung(self._host, self._port, self._passwort, self._datenbank, self._timeout)
+                verbindung.befehl('SUBSCRIBE', NACHRICHTEN_KANAL)
+                if not erste_verbindung:
+                    self._alles_verwerfen()
+                erste_verbindung = False
+                if self._kanal_gestoert:
+                    self._kanal_gestoert = False
+                    print("✅ Invalidierungskanal wieder verbunden")
+                verbindung.zeitlimit_setzen(None)
+                while True:
+                    antwort = verbindung.antwort_lesen()
+                    if isinstance(antwort, list) and len(antwort) == 3 and antwort[0] == b'message':
+                        try:
+                            self._empfangen(json.loads(antwort[2]))
+                        except ValueError:
+                            pass
+            except (OSError, ConnectionError, RespFehler) as fehler:
+                erste_verbindung = False
+                with self._sperre:
+                    self._fehler += 1
+                if not self._kanal_gestoert:
+                    self._kanal_gestoert = True
+                    print(f"⚠️  Invalidierungskanal unterbrochen, verbinde neu: {fehler}")
+            finally:
+                if verbindung is not None:
+                    verbindung.schliessen()
+            time.sleep(_NEU_VERBINDEN_NACH)
+
+    def statistiken(self):
+        kennzahlen = super().statistiken()
+        with self._sperre:
+            kennzahlen['server'] = f"{self._host}:{self._port}/{self._datenbank}"
+            kennzahlen['fehler'] = self._fehler
+            kennzahlen['uebersprungen'] = self._uebersprungen
+        return kennzahlen
+
+
+def backend_erstellen(url=None, timeout=2.0, pause=5.0):
+    """
+    Erzeugt das Cache-Backend zur angegebenen Adresse.
+
+    @param {string} [url] - "redis://..." für das Netzwerk-Backend; leer oder
+        "speicher://" für das prozesslokale Backend
+    @param {float} [timeout=2.0] - Zeitlimit des Netzwerk-Backends in Sekunden
+    @param {float} [pause=5.0] - Sekunden ohne Serverzugriff nach einem Fehler
+    @return {CacheBackend} Das Backend
+
+    @throws {ValueError} Bei unbekanntem Schema
+    """
+    if not url or url.startswith('speicher:'):
+        return SpeicherBackend()
+    if url.startswith('rediss://'):
+        raise ValueError("TLS-Verbindungen zum Cache-Server werden nicht unterstützt")
+    if url.startswith(('redis://', 'valkey://')):
+        return NetzwerkBackend(url, timeout=timeout, pause=pause)
+    raise ValueError(f"Unbekanntes Cache-Backend: {url}")
+
+
+cache_backend = backend_erstellen(
+    os.getenv('CACHE_BACKEND_URL', ''),
+    timeout=float(os.getenv('CACHE_BACKEND_TIMEOUT', 2.0)),
+    pause=float(os.getenv('CACHE_BACKEND_PAUSE', 5.0))
+)
@@ -1,28 +1,31 @@
 """
 @fileoverview E-Mail-Versand-Utilities für das Intranet-Kochbuch
 @module email_utils
+
+Nachrichten werden nicht direkt versendet, sondern in die Mailwarteschlange
+(utils/mailwarteschlange.py) eingereiht; ein Hintergrund-Thread stellt sie zu.
 """
 
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import current_app, url_for
+from email.utils import formatdate, make_msgid
+from flask import current_app
+from utils.mailwarteschlange import warteschlange_abrufen
 
 def email_senden(empfaenger, betreff, inhalt_html):
     """
-    Sendet eine E-Mail mit HTML-Inhalt.
+    Reiht eine E-Mail mit HTML-Inhalt zum Versand ein.
     
     @param {string} empfaenger - E-Mail-Adresse des Empfängers
     @param {string} betreff - Betreff der E-Mail
     @param {string} inhalt_html - HTML-Inhalt der E-Mail
-    @return {boolean} True bei Erfolg, False bei Fehler
+    @return {boolean} True, wenn die E-Mail im Spool liegt, False bei Fehler
     """
     try:
-        # E-Mail-Konfiguration aus der App-Konfiguration lesen
-        smtp_server = current_app.config.get('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = current_app.config.get('SMTP_PORT', 587)
-        smtp_user = current_app.config.get('SMTP_USER')
-        smtp_password = current_app.config.get('SMTP_PASSWORD')
+        warteschlange = warteschlange_abrufen()
+        if warteschlange is None:
+            print("Fehler beim Senden der E-Mail: Mailwarteschlange nicht initialisiert")
+            return False
         absender = current_app.config.get('MAIL_SENDER', 'noreply@intranet-kochbuch.de')
 
         # E-Mail erstellen
@@ -30,18 +33,15 @@ def email_senden(empfaenger, betreff, inhalt_html):
         msg['Subject'] = betreff
         msg['From'] = f"Intranet-Kochbuch <{absender}>"
         msg['To'] = empfaenger
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid(domain=absender.rpartition('@')[2] or None)
 
         # HTML-Inhalt hinzufügen
         html_part = MIMEText(inhalt_html, 'html')
         msg.attach(html_part)
 
-        # Verbindung zum SMTP-Server herstellen und E-Mail senden
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            if smtp_user and smtp_password:
-                server.login(smtp_user, smtp_password)
-            server.send_message(msg)
-
+        # Versand übernimmt der Hintergrund-Thread über eine wiederverwendete Verbindung
+        warteschlange.einreihen(absender, empfaenger, msg.as_string())
         return True
     except Exception as fehler:
         print(f"Fehler beim Senden der E-Mail: {fehler}")
@@ -53,7 +53,7 @@ def registrierungs_email_senden(empfaenger, name):
     
     @param {string} empfaenger - E-Mail-Adresse des neuen Benutzers
     @param {string} name - Name des Benutzers
-    @return {boolean} True bei Erfolg, False bei Fehler
+    @return {boolean} True, wenn die E-Mail eingereiht wurde, False bei Fehler
     """
     betreff = "Willkommen beim Intranet-Kochbuch!"
     inhalt_html = f"""
@@ -84,7 +84,7 @@ def passwort_reset_email_senden(empfaenger, name, reset_token):
     @param {string} empfaenger - E-Mail-Adresse des Benutzers
     @param {string} name - Name des Benutzers
     @param {string} reset_token - Token für das Zurücksetzen des Passworts
-    @return {boolean} True bei Erfolg, False bei Fehler
+    @return {boolean} True, wenn die E-Mail eingereiht wurde, False bei Fehler
     """
     betreff = "Passwort zurücksetzen - Intranet-Kochbuch"
     
@@ -0,0 +1,383 @@
+"""
+@fileoverview Ausgehende E-Mail-Warteschlange mit Spool-Verzeichnis
+@module mailwarteschlange
+
+Dieses Modul entkoppelt den E-Mail-Versand von den Anfragen:
+- Nachrichten werden als Datei im Spool-Verzeichnis abgelegt (übersteht Neustarts)
+- Ein Hintergrund-Thread versendet sie stapelweise über eine wiederverwendete
+  SMTP-Verbindung
+- Vorübergehende Fehler werden mit exponentiell wachsender Wartezeit wiederholt,
+  endgültige Fehler und zu viele Versuche landen im Ordner "fehlgeschlagen"
+
+Verzeichnisaufbau:
+    <spool>/wartend/        - zu sendende Nachrichten (JSON); während des Versands
+                              beansprucht ein Prozess die Datei durch Umbenennen in
+                              <id>.json.<pid>, so teilen sich mehrere Worker einen Spool
+    <spool>/fehlgeschlagen/ - aufgegebene Nachrichten zur manuellen Prüfung
+"""
+
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+
+# Standardwerte, überschreibbar über die App-Konfiguration
+STANDARD_STAPELGROESSE = 20
+STANDARD_MAX_VERSUCHE = 6
+STANDARD_BASIS_WARTEZEIT = 30.0
+STANDARD_MAX_WARTEZEIT = 3600.0
+# Ungenutzte SMTP-Verbindungen werden nach dieser Zeit geschlossen
+STANDARD_LEERLAUF = 60.0
+
+
+class _SmtpVerbindung:
+    """
+    Hält eine SMTP-Verbindung offen und baut sie bei Bedarf neu auf.
+
+    @param {Object} einstellungen - server, port, benutzer, passwort, starttls, timeout
+    @param {float} leerlauf - Sekunden ohne Versand, nach denen die Verbindung geschlossen wird
+    """
+
+    def __init__(self, einstellungen, leerlauf):
+        self.einstellungen = einstellungen
+        self.leerlauf = leerlauf
+        self._smtp = None
+        self._zuletzt_genutzt = 0.0
+        self.aufgebaut = 0
+
+    def abrufen(self):
+        """
+        Liefert eine verbundene SMTP-Sitzung.
+
+        @return {smtplib.SMTP} Verbundene und ggf. angemeldete Sitzung
+
+        @throws {smtplib.SMTPException|OSError} Wenn keine Verbindung möglich ist
+        """
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.schliessen()
+
+        e = self.einstellungen
+        smtp = smtplib.SMTP(e['server'], e['port'], timeout=e.get('timeout', 30))
+        try:
+            if e.get('starttls', True):
+                smtp.starttls()
+            if e.get('benutzer') and e.get('passwort'):
+                smtp.login(e['benutzer'], e['passwort'])
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.aufgebaut += 1
+        return smtp
+
+    def genutzt(self):
+        self._zuletzt_genutzt = time.monotonic()
+
+    def leerlauf_pruefen(self):
+        """
+        Schließt die Verbindung, wenn sie länger als erlaubt ungenutzt war.
+        """
+        if self._smtp is not None and time.monotonic() - self._zuletzt_genutzt > self.leerlauf:
+            self.schliessen()
+
+    def schliessen(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+
+def _endgueltig(fehler):
+    """
+    Prüft, ob ein SMTP-Fehler eine Wiederholung sinnlos macht (5xx, abgelehnte Empfänger).
+    """
+    if isinstance(fehler, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in fehler.recipients.values())
+    code = getattr(fehler, 'smtp_code', None)
+    return isinstance(code, int) and code >= 500 and not isinstance(fehler, smtplib.SMTPServerDisconnected)
+
+
+class Mailwarteschlange:
+    """
+    Persistente Warteschlange für ausgehende E-Mails.
+
+    @param {string} verzeichnis - Spool-Verzeichnis
+    @param {Object} smtp_einstellungen - server, port, benutzer, passwort, starttls, timeout
+    @param {int} [stapelgroesse=20] - Nachrichten je Durchlauf über dieselbe Verbindung
+    @param {int} [max_versuche=6] - Versuche, bevor eine Nachricht aufgegeben wird
+    @param {float} [basis_wartezeit=30] - Wartezeit vor dem ersten Wiederholungsversuch in Sekunden
+    @param {float} [max_wartezeit=3600] - Obergrenze der Wartezeit in Sekunden
+    @param {float} [leerlauf=60] - Sekunden, nach denen eine ungenutzte Verbindung geschlossen wird
+    """
+
+    def __init__(self, verzeichnis, smtp_einstellungen, stapelgroesse=STANDARD_STAPELGROESSE,
+                 max_versuche=STANDARD_MAX_VERSUCHE, basis_wartezeit=STANDARD_BASIS_WARTEZEIT,
+                 max_wartezeit=STANDARD_MAX_WARTEZEIT, leerlauf=STANDARD_LEERLAUF):
+        self.wartend_verzeichnis = os.path.join(verzeichnis, 'wartend')
+        self.fehlgeschlagen_verzeichnis = os.path.join(verzeichnis, 'fehlgeschlagen')
+        os.makedirs(self.wartend_verzeichnis, exist_ok=True)
+        os.makedirs(self.fehlgeschlagen_verzeichnis, exist_ok=True)
+        self._verwaiste_freigeben()
+        self.stapelgroesse = stapelgroesse
+        self.max_versuche = max_versuche
+        self.basis_wartezeit = basis_wartezeit
+        self.max_wartezeit = max_wartezeit
+        self._verbindung = _SmtpVerbindung(smtp_einstellungen, leerlauf)
+        self._bedingung = threading.Condition()
+        self._arbeiter = None
+        self._beenden = False
+        self._gesendet = 0
+        self._fehlversuche = 0
+        self._aufgegeben = 0
+
+    def einreihen(self, absender, empfaenger, nachricht):
+        """
+        Legt eine fertige Nachricht im Spool ab und weckt den Versand-Thread.
+
+        @param {string} absender - Absenderadresse für den SMTP-Umschlag
+        @param {string} empfaenger - Empfängeradresse
+        @param {string} nachricht - Vollständige Nachricht (z.B. MIMEMultipart.as_string())
+        @return {string} ID der Nachricht
+
+        @throws {OSError} Wenn die Datei nicht geschrieben werden kann
+        """
+        mail_id = f"{time.time():.6f}-{uuid.uuid4().hex}"
+        eintrag = {
+            'id': mail_id,
+            'absender': absender,
+            'empfaenger': empfaenger,
+            'nachricht': nachricht,
+            'versuche': 0,
+            'naechster_versuch': 0.0,
+            'letzter_fehler': None
+        }
+        self._schreiben(self.wartend_verzeichnis, eintrag)
+        with self._bedingung:
+            self._bedingung.notify()
+        self.starten()
+        return mail_id
+
+    @staticmethod
+    def _schreiben(verzeichnis, eintrag):
+        # Erst vollständig schreiben, dann atomar umbenennen: der Versand sieht nie halbe Dateien
+        ziel = os.path.join(verzeichnis, f"{eintrag['id']}.json")
+        temporaer = ziel + '.tmp'
+        with open(temporaer, 'w', encoding='utf-8') as datei:
+            json.dump(eintrag, datei)
+            datei.flush()
+            os.fsync(datei.fileno())
+        os.replace(temporaer, ziel)
+
+    def _verwaiste_freigeben(self):
+        # Von beendeten Prozessen beanspruchte Nachrichten wieder in die Warteschlange stellen
+        for name in os.listdir(self.wartend_verzeichnis):
+            basis, _, pid = name.rpartition('.')
+            if not basis.endswith('.json') or not pid.isdigit():
+                continue
+            if int(pid) != os.getpid():
+                try:
+                    os.kill(int(pid), 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except OSError:
+                    continue
+            try:
+                os.replace(os.path.join(self.wartend_verzeichnis, name),
+                           os.path.join(self.wartend_verzeichnis, basis))
+            except FileNotFoundError:
+                pass
+
+    def _faellige(self, jetzt):
+        faellig = []
+        naechster = None
+        for name in sorted(os.listdir(self.wartend_verzeichnis)):
+            if not name.endswith('.json'):
+                continue
+            pfad = os.path.join(self.wartend_verzeichnis, name)
+            try:
+                with open(pfad, encoding='utf-8') as datei:
+                    eintrag = json.load(datei)
+            except (OSError, ValueError) as fehler:
+                print(f"⚠️  Unlesbare Spool-Datei {name} wird verschoben: {fehler}")
+                os.replace(pfad, os.path.join(self.fehlgeschlagen_verzeichnis, name))
+                continue
+            if eintrag['naechster_versuch'] <= jetzt:
+                if len(faellig) < self.stapelgroesse:
+                    faellig.append((pfad, eintrag))
+            else:
+                naechster = min(naechster or eintrag['naechster_versuch'], eintrag['naechster_versuch'])
+        return faellig, naechster
+
+    def abarbeiten(self, jetzt=None):
+        """
+        Versendet einen Stapel fälliger Nachrichten über eine gemeinsame Verbindung.
+
+        @param {float} [jetzt] - Zeitpunkt (Unix-Zeit) für die Fälligkeit, Standard: aktuelle Zeit
+        @return {Object} gesendet, fehlgeschlagen und naechster_versuch (Unix-Zeit oder None)
+        """
+        jetzt = time.time() if jetzt is None else jetzt
+        faellig, naechster = self._faellige(jetzt)
+        gesendet = fehlgeschlagen = 0
+
+        for pfad, eintrag in faellig:
+            beansprucht = f"{pfad}.{os.getpid()}"
+            try:
+                os.rename(pfad, beansprucht)
+            except FileNotFoundError:
+                # Ein anderer Prozess versendet diese Nachricht bereits
+                continue
+            pfad = beansprucht
+            try:
+                smtp = self._verbindung.abrufen()
+                smtp.sendmail(eintrag['absender'], [eintrag['empfaenger']], eintrag['nachricht'].encode('utf-8'))
+                self._verbindung.genutzt()
+                os.remove(pfad)
+                gesendet += 1
+            except Exception as fehler:
+                fehlgeschlagen += 1
+                if not isinstance(fehler, smtplib.SMTPResponseException) or isinstance(
+                        fehler, smtplib.SMTPServerDisconnected):
+                    # Verbindung ist vermutlich unbrauchbar; beim nächsten Versuch neu aufbauen
+                    self._verbindung.schliessen()
+                wiederholung = self._fehler_behandeln(pfad, eintrag, fehler, jetzt)
+                if wiederholung is not None:
+                    naechster = min(naechster or wiederholung, wiederholung)
+
+        with self._bedingung:
+            self._gesendet += gesendet
+            self._fehlversuche += fehlgeschlagen
+        return {'gesendet': gesendet, 'fehlgeschlagen': fehlgeschlagen, 'naechster_versuch': naechster}
+
+    def _fehler_behandeln(self, pfad, eintrag, fehler, jetzt):
+        eintrag['versuche'] += 1
+        eintrag['letzter_fehler'] = str(fehler)
+        if _endgueltig(fehler) or eintrag['versuche'] >= self.max_versuche:
+            print(f"❌ E-Mail an {eintrag['empfaenger']} aufgegeben nach {eintrag['versuche']} Versuch(en): {fehler}")
+            self._schreiben(self.fehlgeschlagen_verzeichnis, eintrag)
+            os.remove(pfad)
+            with self._bedingung:
+                self._aufgegeben += 1
+            return None
+        wartezeit = min(self.basis_wartezeit * 2 ** (eintrag['versuche'] - 1), self.max_wartezeit)
+        eintrag['naechster_versuch'] = jetzt + wartezeit
+        print(f"⚠️  E-Mail an {eintrag['empfaenger']} fehlgeschlagen, neuer Versuch in {wartezeit:.0f}s: {fehler}")
+        self._schreiben(self.wartend_verzeichnis, eintrag)
+        os.remove(pfad)
+        return eintrag['naechster_versuch']
+
+    def starten(self):
+        """
+        Startet den Versand-Thread, falls er noch nicht läuft.
+        """
+        with self._bedingung:
+            if self._arbeiter is not None and self._arbeiter.is_alive():
+                return
+            self._beenden = False
+            self._arbeiter = threading.Thread(target=self._schleife, name='mail-versand', daemon=True)
+            self._arbeiter.start()
+
+    def anhalten(self, timeout=5.0):
+        """
+        Beendet den Versand-Thread nach dem laufenden Stapel.
+
+        @param {float} [timeout=5.0] - Maximale Wartezeit in Sekunden
+        """
+        with self._bedingung:
+            self._beenden = True
+            self._bedingung.notify()
+            arbeiter = self._arbeiter
+        if arbeiter is not None:
+            arbeiter.join(timeout)
+        self._verbindung.schliessen()
+
+    def _schleife(self):
+        while True:
+            with self._bedingung:
+                if self._beenden:
+                    return
+            try:
+                ergebnis = self.abarbeiten()
+            except Exception as fehler:
+                print(f"⚠️  Fehler im E-Mail-Versand: {fehler}")
+                ergebnis = {'gesendet': 0, 'naechster_versuch': time.time() + self.basis_wartezeit}
+            if ergebnis['gesendet'] >= self.stapelgroesse:
+                continue
+            self._verbindung.leerlauf_pruefen()
+            naechster = ergebnis['naechster_versuch']
+            wartezeit = self._verbindung.leerlauf if naechster is None else max(naechster - time.time(), 0.05)
+            with self._bedingung:
+                if not self._beenden:
+                    self._bedingung.wait(min(wartezeit, self._verbindung.leerlauf))
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen der Warteschlange.
+
+        @return {Object} Wartende und aufgegebene Nachrichten, Zähler und aufgebaute Verbindungen
+        """
+        wartend = sum(1 for name in os.listdir(self.wartend_verzeichnis) if name.endswith('.json'))
+        fehlgeschlagen = sum(1 for name in os.listdir(self.fehlgeschlagen_verzeichnis) if name.endswith('.json'))
+        with self._bedingung:
+            return {
+                'wartend': wartend,
+                'fehlgeschlagen': fehlgeschlagen,
+                'gesendet': self._gesendet,
+                'fehlversuche': self._fehlversuche,
+                'aufgegeben': self._aufgegeben,
+                'smtp_verbindungen': self._verbindung.aufgebaut
+            }
+
+
+_warteschlange = None
+_sperre = threading.Lock()
+
+
+def init_app(app):
+    """
+    Erstellt die Warteschlange aus der App-Konfiguration und versendet liegengebliebene Nachrichten.
+
+    @param {Flask} app - Die Flask-Anwendung
+    @return {Mailwarteschlange} Die Warteschlange
+    """
+    global _warteschlange
+    konfiguration = app.config
+    warteschlange = Mailwarteschlange(
+        konfiguration.get('MAIL_SPOOL_VERZEICHNIS') or os.path.join(app.root_path, 'spool', 'mail'),
+        {
+            'server': konfiguration.get('SMTP_SERVER', 'smtp.gmail.com'),
+            'port': konfiguration.get('SMTP_PORT', 587),
+            'benutzer': konfiguration.get('SMTP_USER'),
+            'passwort': konfiguration.get('SMTP_PASSWORD'),
+            'starttls': konfiguration.get('SMTP_STARTTLS', True),
+            'timeout': konfiguration.get('SMTP_TIMEOUT', 30)
+        },
+        stapelgroesse=konfiguration.get('MAIL_STAPELGROESSE', STANDARD_STAPELGROESSE),
+        max_versuche=konfiguration.get('MAIL_MAX_VERSUCHE', STANDARD_MAX_VERSUCHE),
+        basis_wartezeit=konfiguration.get('MAIL_BASIS_WARTEZEIT', STANDARD_BASIS_WARTEZEIT)
+    )
+    with _sperre:
+        vorher, _warteschlange = _warteschlange, warteschlange
+    if vorher is not None:
+        vorher.anhalten()
+    if warteschlange.statistiken()['wartend']:
+        warteschlange.starten()
+    return warteschlange
+
+
+def warteschlange_abrufen():
+    """
+    Liefert die Warteschlange der Anwendung.
+
+    @return {Mailwarteschlange|None} Die Warteschlange oder None vor init_app()
+    """
+    return _warteschlange
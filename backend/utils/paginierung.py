@@ -0,0 +1,184 @@
+"""
+@fileoverview Paginierungs-Utilitäten für das Intranet-Kochbuch
+@module paginierung
+
+Dieses Modul stellt Hilfsfunktionen für die Seitenaufteilung bereit:
+- Begrenzung des limit-Parameters auf einen serverseitigen Höchstwert
+- Opake Cursor-Token für Keyset-Paginierung (Sortierschlüssel + ID)
+- SQL-Bausteine für Sortierung und Seek-Bedingung
+- Dieselbe Sortierung und Seek-Bedingung in Python für bereits geladene Zeilen
+  (z.B. Treffer aus dem Suchindex)
+"""
+
+import base64
+import datetime
+import json
+import os
+
+# Serverseitige Obergrenze für Seitengrößen
+MAX_SEITENGROESSE = int(os.getenv('MAX_SEITENGROESSE', 100))
+
+# Sortierung -> (Spalte, absteigend); die ID dient jeweils als Tiebreaker
+SORTIERUNGEN = {
+    'newest': ('r.erstellungsdatum', True),
+    'oldest': ('r.erstellungsdatum', False),
+    'name_asc': ('r.titel', False),
+    'name_desc': ('r.titel', True),
+    'rating': ('r.bewertung_durchschnitt', True),
+}
+
+_DATUMSSPALTEN = {'r.erstellungsdatum'}
+_ZAHLENSPALTEN = {'r.bewertung_durchschnitt'}
+
+
+class UngueltigerCursor(ValueError):
+    """Wird ausgelöst, wenn ein Cursor-Token nicht dekodiert werden kann."""
+
+
+def limit_begrenzen(limit, standard=10, maximum=None):
+    """
+    Begrenzt eine vom Client angeforderte Seitengröße.
+
+    @param {int|None} limit - Angefordertes Limit
+    @param {int} [standard=10] - Wert, falls kein Limit angegeben ist
+    @param {int} [maximum=MAX_SEITENGROESSE] - Obergrenze
+    @return {int} Limit zwischen 1 und maximum
+    """
+    if maximum is None:
+        maximum = MAX_SEITENGROESSE
+    if limit is None:
+        limit = standard
+    return max(1, min(int(limit), maximum))
+
+
+def sortierung_normalisieren(sortierung):
+    """
+    Bildet unbekannte Sortierungen auf die Standardsortierung ab.
+
+    @param {string} sortierung - Angeforderte Sortierung
+    @return {string} Gültiger Schlüssel aus SORTIERUNGEN
+    """
+    return sortierung if sortierung in SORTIERUNGEN else 'newest'
+
+
+def sortierung_sql(sortierung):
+    """
+    Liefert die ORDER-BY-Klausel für eine Sortierung inklusive ID-Tiebreaker.
+
+    @param {string} sortierung - Sortierungsoption
+    @return {string} SQL-Fragment, z.B. " ORDER BY r.erstellungsdatum DESC, r.id DESC"
+    """
+    spalte, absteigend = SORTIERUNGEN[sortierung_normalisieren(sortierung)]
+    richtung = "DESC" if absteigend else "ASC"
+    return f" ORDER BY {spalte} {richtung}, r.id {richtung}"
+
+
+def seek_bedingung(sortierung, nach):
+    """
+    Erzeugt die WHERE-Bedingung, die direkt hinter die letzte Zeile springt.
+
+    @param {string} sortierung - Sortierungsoption
+    @param {Object} nach - Dekodierter Cursor mit 'wert' und 'id'
+    @return {tuple} (SQL-Fragment, Parameterliste)
+    """
+    spalte, absteigend = SORTIERUNGEN[sortierung_normalisieren(sortierung)]
+    vergleich = "<" if absteigend else ">"
+    sql = f"({spalte} {vergleich} %s OR ({spalte} = %s AND r.id {vergleich} %s))"
+    return sql, [nach['wert'], nach['wert'], nach['id']]
+
+
+def _sortierwert(spalte, wert):
+    # Wie in der Datenbank: Texte ohne Groß-/Kleinschreibung, fehlende Werte zuerst
+    if spalte in _DATUMSSPALTEN:
+        return wert or datetime.datetime.min
+    if spalte in _ZAHLENSPALTEN:
+        return float(wert or 0)
+    return (wert or '').casefold()
+
+
+def zeilen_sortieren(zeilen, sortierung, nach=None):
+    """
+    Sortiert Zeilen wie sortierung_sql() und wendet optional die Seek-Bedingung an.
+
+    @param {Array<Object>} zeilen - Zeilen mit 'id' und der Sortierspalte (ohne Präfix "r.")
+    @param {string} sortierung - Sortierungsoption
+    @param {Object} [nach] - Dekodierter Cursor; nur Zeilen hinter dieser Position
+    @return {Array<Object>} Sortierte Zeilen
+    """
+    spalte, absteigend = SORTIERUNGEN[sortierung_normalisieren(sortierung)]
+    feld = spalte.split('.', 1)[1]
+
+    def schluessel(zeile):
+        return (_sortierwert(spalte, zeile.get(feld)), zeile['id'])
+
+    if nach is not None:
+        grenze = (_sortierwert(spalte, nach['wert']), nach['id'])
+        zeilen = [
+            zeile for zeile in zeilen
+            if (schluessel(zeile) < grenze if absteigend else schluessel(zeile) > grenze)
+        ]
+    return sorted(zeilen, key=schluessel, reverse=absteigend)
+
+
+def cursor_kodieren(sortierung, zeile):
+    """
+    Erzeugt ein opakes Cursor-Token aus der letzten Zeile einer Seite.
+
+    @param {string} sortierung - Sortierungsoption der Seite
+    @param {Object} zeile - Letztes Rezept der Seite
+    @return {string} URL-sicheres Token
+    """
+    sortierung = sortierung_normalisieren(sortierung)
+    spalte, _ = SORTIERUNGEN[sortierung]
+    wert = zeile[spalte.split('.', 1)[1]]
+    if isinstance(wert, datetime.datetime):
+        wert = wert.isoformat()
+    daten = json.dumps({'s': sortierung, 'w': wert, 'id': zeile['id']}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(daten.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def cursor_dekodieren(token, sortierung):
+    """
+    Dekodiert ein Cursor-Token und prüft, ob es zur Sortierung passt.
+
+    @param {string} token - Vom Client übergebenes Token
+    @param {string} sortierung - Aktuelle Sortierungsoption
+    @return {Object} Cursor mit 'wert' und 'id'
+
+    @throws {UngueltigerCursor} Bei beschädigtem oder unpassendem Token
+    """
+    sortierung = sortierung_normalisieren(sortierung)
+    try:
+        auffuellung = '=' * (-len(token) % 4)
+        daten = json.loads(base64.urlsafe_b64decode(token + auffuellung).decode('utf-8'))
+        wert, rezept_id = daten['w'], int(daten['id'])
+        if daten['s'] != sortierung:
+            raise UngueltigerCursor("Cursor gehört zu einer anderen Sortierung")
+        spalte = SORTIERUNGEN[sortierung][0]
+        if spalte in _DATUMSSPALTEN:
+            wert = datetime.datetime.fromisoformat(wert)
+        elif spalte in _ZAHLENSPALTEN:
+            if isinstance(wert, bool) or not isinstance(wert, (int, float)):
+                raise UngueltigerCursor("Ungültiger Sortierwert")
+        elif not isinstance(wert, str):
+            raise UngueltigerCursor("Ungültiger Sortierwert")
+    except UngueltigerCursor:
+        raise
+    except Exception as fehler:
+        raise UngueltigerCursor(f"Ungültiger Cursor: {fehler}") from fehler
+    return {'wert': wert, 'id': rezept_id}
+
+
+def seite_abschliessen(zeilen, limit, sortierung):
+    """
+    Schneidet eine mit limit + 1 abgefragte Ergebnisliste zu und bildet den nächsten Cursor.
+
+    @param {Array<Object>} zeilen - Ergebnis der Abfrage mit bis zu limit + 1 Zeilen
+    @param {int} limit - Gewünschte Seitengröße
+    @param {string} sortierung - Sortierungsoption
+    @return {tuple} (Zeilen der Seite, nächster Cursor oder None)
+    """
+    if len(zeilen) <= limit:
+        return zeilen, None
+    seite = zeilen[:limit]
+    return seite, cursor_kodieren(sortierung, seite[-1])
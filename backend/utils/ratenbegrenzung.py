@@ -0,0 +1,212 @@
+"""
+@fileoverview Ratenbegrenzung für teure und missbrauchsanfällige Endpunkte
+@module ratenbegrenzung
+
+Dieses Modul begrenzt Anfragen mit Token-Buckets:
+- Benannte Regeln (z.B. 'anmeldung', 'suche'), je Regel über Umgebungsvariablen
+  einstellbar: RATENLIMIT_<REGEL>="anzahl/sekunden", z.B. RATENLIMIT_SUCHE="60/60"
+- Schlüssel je IP-Adresse oder je angemeldetem Benutzer; die IP ist request.remote_addr.
+  Hinter einem Reverse-Proxy muss PROXY_ANZAHL gesetzt sein (ProxyFix in app.py),
+  sonst teilen sich alle Clients den Bucket der Proxy-Adresse
+- Dekorator für einzelne Routen und Begrenzung ganzer Blueprints
+- Buckets im Cache-Backend: prozesslokal oder gemeinsam für alle Worker-Prozesse
+- Antwort 429 mit Retry-After-Header und Zählern für /api/metriken
+"""
+
+import math
+import os
+import threading
+from functools import wraps
+
+from flask import jsonify, request
+
+from utils.cachebackend import cache_backend
+from utils.token import betrachter_id_ermitteln
+
+RATENBEGRENZUNG_AKTIV = os.getenv('RATENBEGRENZUNG_AKTIV', 'true').lower() in ('1', 'true', 'ja')
+
+# Standardregeln: (Anzahl, Zeitraum in Sekunden, Schlüsselart)
+STANDARD_REGELN = {
+    'anmeldung': (10, 60, 'ip'),
+    'registrierung': (5, 3600, 'ip'),
+    'passwort_reset': (5, 3600, 'ip'),
+    'suche': (60, 60, 'benutzer'),
+    'schreiben': (30, 60, 'benutzer')
+}
+
+
+class Regel:
+    """
+    Token-Bucket-Regel: anzahl Anfragen je zeitraum, als Burst sofort verfügbar.
+
+    @param {string} name - Name der Regel
+    @param {int} anzahl - Erlaubte Anfragen je Zeitraum (Kapazität des Buckets)
+    @param {float} zeitraum - Zeitraum in Sekunden, in dem sich der Bucket füllt
+    @param {string} schluesselart - 'ip' oder 'benutzer' (anonym: IP-Adresse)
+    """
+
+    def __init__(self, name, anzahl, zeitraum, schluesselart='ip'):
+        if schluesselart not in ('ip', 'benutzer'):
+            raise ValueError(f"Unbekannte Schlüsselart: {schluesselart}")
+        self.name = name
+        self.anzahl = anzahl
+        self.zeitraum = zeitraum
+        self.schluesselart = schluesselart
+
+    @property
+    def rate(self):
+        return self.anzahl / self.zeitraum
+
+
+def _regel_lesen(name, anzahl, zeitraum, schluesselart):
+    """
+    Überschreibt eine Standardregel mit RATENLIMIT_<NAME>="anzahl/sekunden".
+    """
+    wert = os.getenv(f"RATENLIMIT_{name.upper()}")
+    if wert:
+        try:
+            anzahl_text, zeitraum_text = wert.split('/', 1)
+            anzahl, zeitraum = int(anzahl_text), float(zeitraum_text)
+        except ValueError:
+            print(f"⚠️  Ungültiges Ratenlimit RATENLIMIT_{name.upper()}={wert!r}, nutze Standard")
+    return Regel(name, anzahl, zeitraum, schluesselart)
+
+
+class Ratenbegrenzer:
+    """
+    Prüft Anfragen gegen benannte Regeln und zählt Entscheidungen.
+
+    @param {CacheBackend} backend - Ablage der Token-Buckets
+    @param {Object} regeln - Regeln nach Name
+    """
+
+    def __init__(self, backend, regeln):
+        self.backend = backend
+        self.regeln = dict(regeln)
+        self._sperre = threading.Lock()
+        self._zaehler = {}
+
+    def _schluessel(self, regel):
+        if regel.schluesselart == 'benutzer':
+            benutzer_id = betrachter_id_ermitteln()
+            if benutzer_id is not None:
+                return f"ratenlimit:{regel.name}:benutzer:{benutzer_id}"
+        return f"ratenlimit:{regel.name}:ip:{request.remote_addr}"
+
+    def pruefen(self, regel_name, kosten=1):
+        """
+        Entnimmt Tokens für die aktuelle Anfrage.
+
+        @param {string} regel_name - Name der Regel
+        @param {float} [kosten=1] - Gewicht der Anfrage
+        @return {float|None} None, wenn die Anfrage erlaubt ist, sonst Sekunden bis zum nächsten Versuch
+
+        @throws {KeyError} Bei unbekannter Regel
+        """
+        regel = self.regeln[regel_name]
+        erlaubt, wartezeit = self.backend.eimer_entnehmen(
+            self._schluessel(regel), regel.rate, regel.anzahl, kosten
+        )
+        with self._sperre:
+            zaehler = self._zaehler.setdefault(regel_name, {'erlaubt': 0, 'abgelehnt': 0})
+            zaehler['erlaubt' if erlaubt else 'abgelehnt'] += 1
+        return None if erlaubt else wartezeit
+
+    def antwort_bei_ueberschreitung(self, regel_name, kosten=1):
+        """
+        Liefert eine 429-Antwort, wenn die aktuelle Anfrage das Limit überschreitet.
+
+        @param {string} regel_name - Name der Regel
+        @param {float} [kosten=1] - Gewicht der Anfrage
+        @return {tuple|None} (Antwort, 429) mit Retry-After-Header oder None
+        """
+        if not RATENBEGRENZUNG_AKTIV:
+            return None
+        wartezeit = self.pruefen(regel_name, kosten)
+        if wartezeit is None:
+            return None
+        antwort = jsonify({
+            'fehler': 'Zu viele Anfragen',
+            'message': 'Bitte warten Sie einen Moment und versuchen Sie es erneut.'
+        })
+        antwort.headers['Retry-After'] = str(max(1, math.ceil(wartezeit)))
+        return antwort, 429
+
+    def zuruecksetzen(self):
+        """
+        Setzt die Zähler zurück (für Tests); Buckets laufen von selbst ab.
+        """
+        with self._sperre:
+            self._zaehler.clear()
+
+    def statistiken(self):
+        """
+        Liefert erlaubte und abgelehnte Anfragen je Regel.
+
+        @return {Object} Je Regel Limit, Zeitraum, erlaubt und abgelehnt
+        """
+        with self._sperre:
+            return {
+                name: {
+                    'anzahl': regel.anzahl,
+                    'zeitraum_s': regel.zeitraum,
+                    **self._zaehler.get(name, {'erlaubt': 0, 'abgelehnt': 0})
+                }
+                for name, regel in self.regeln.items()
+            }
+
+
+ratenbegrenzer = Ratenbegrenzer(cache_backend, {
+    name: _regel_lesen(name, *werte) for name, werte in STANDARD_REGELN.items()
+})
+
+
+def ratenbegrenzt(regel_name, kosten=1):
+    """
+    Dekorator, der eine Route mit einer benannten Regel begrenzt.
+
+    @decorator
+    @param {string} regel_name - Name der Regel, z.B. 'anmeldung'
+    @param {float} [kosten=1] - Gewicht jeder Anfrage
+
+    @throws {429} Wenn das Limit überschritten ist (mit Retry-After)
+    """
+    if regel_name not in ratenbegrenzer.regeln:
+        raise KeyError(f"Unbekannte Ratenlimit-Regel: {regel_name}")
+
+    def dekorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            abgelehnt = ratenbegrenzer.antwort_bei_ueberschreitung(regel_name, kosten)
+            if abgelehnt is not None:
+                return abgelehnt
+            return f(*args, **kwargs)
+        return decorated
+    return dekorator
+
+
+def blueprint_begrenzen(blueprint, regel_name, methoden=('POST', 'PUT', 'PATCH', 'DELETE')):
+    """
+    Begrenzt alle Routen eines Blueprints mit den angegebenen HTTP-Methoden.
+
+    @param {Blueprint} blueprint - Zu begrenzender Blueprint
+    @param {string} regel_name - Name der Regel, z.B. 'schreiben'
+    @param {Array<string>} [methoden] - Betroffene HTTP-Methoden (Standard: schreibende)
+    """
+    if regel_name not in ratenbegrenzer.regeln:
+        raise KeyError(f"Unbekannte Ratenlimit-Regel: {regel_name}")
+
+    @blueprint.before_request
+    def ratenlimit_pruefen():
+        if request.method in methoden:
+            return ratenbegrenzer.antwort_bei_ueberschreitung(regel_name)
+        return None
+
+
+def ratenbegrenzung_statistiken():
+    """
+    Liefert die Zähler der Ratenbegrenzung für /api/metriken.
+
+    @return {Object} Siehe Ratenbegrenzer.statistiken()
+    """
+    return ratenbegrenzer.statistiken()
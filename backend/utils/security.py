@@ -5,21 +5,174 @@
 Dieses Modul stellt Funktionen für die Passwortsicherheit bereit:
 - Passwort-Hashing mit bcrypt
 - Passwort-Verifizierung
+- Begrenzter Thread-Pool für bcrypt mit schneller Ablehnung bei Überlast
+- Erkennung veralteter Kostenfaktoren für die Neuberechnung bei der Anmeldung
 """
 
 import bcrypt
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Kostenfaktor für neue Hashes; ältere Hashes werden bei der Anmeldung angepasst
+BCRYPT_KOSTEN = int(os.getenv('BCRYPT_KOSTEN', 12))
+# Gleichzeitige bcrypt-Berechnungen und zusätzlich wartende Aufträge
+PASSWORT_POOL_GROESSE = int(os.getenv('PASSWORT_POOL_GROESSE', 2))
+PASSWORT_MAX_WARTESCHLANGE = int(os.getenv('PASSWORT_MAX_WARTESCHLANGE', 8))
+# Maximale Wartezeit einer Anfrage auf das Ergebnis in Sekunden
+PASSWORT_TIMEOUT = float(os.getenv('PASSWORT_TIMEOUT', 5))
+# Empfohlene Wartezeit für Clients bei Überlast (Retry-After) in Sekunden
+PASSWORT_RETRY_AFTER = int(os.getenv('PASSWORT_RETRY_AFTER', 2))
+
+_KOSTEN_MUSTER = re.compile(r'^\$2[aby]?\$(\d{2})\$')
+
+
+class PasswortDienstUeberlastet(Exception):
+    """Wird ausgelöst, wenn die Warteschlange für Passwortberechnungen voll ist
+    oder ein Auftrag nicht rechtzeitig bearbeitet wurde."""
+
+
+class _PasswortDienst:
+    """
+    Führt bcrypt-Berechnungen in einem eigenen, begrenzten Thread-Pool aus.
+
+    bcrypt gibt während der Berechnung den GIL frei; die Poolgröße begrenzt
+    daher die CPU-Last durch Anmeldungen, ohne andere Anfragen zu blockieren.
+    Ist die Warteschlange voll, wird sofort PasswortDienstUeberlastet ausgelöst.
+
+    @param {int} groesse - Anzahl gleichzeitiger Berechnungen
+    @param {int} max_warteschlange - Zusätzlich erlaubte wartende Aufträge
+    @param {float} timeout - Maximale Wartezeit auf ein Ergebnis in Sekunden
+    """
+
+    def __init__(self, groesse, max_warteschlange, timeout):
+        self.groesse = groesse
+        self.max_warteschlange = max_warteschlange
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=groesse, thread_name_prefix='bcrypt')
+        self._plaetze = threading.BoundedSemaphore(groesse + max_warteschlange)
+        self._sperre = threading.Lock()
+        self._kennzahlen = {}
+        self._abgelehnt = 0
+        self._zeitueberschreitungen = 0
+
+    def ausfuehren(self, name, funktion, *argumente):
+        """
+        Führt eine Berechnung im Pool aus und wartet auf das Ergebnis.
+
+        @param {string} name - Name der Operation für die Kennzahlen
+        @param {Function} funktion - Auszuführende Funktion
+        @return {any} Ergebnis der Funktion
+
+        @throws {PasswortDienstUeberlastet} Bei voller Warteschlange oder Zeitüberschreitung
+        """
+        if not self._plaetze.acquire(blocking=False):
+            with self._sperre:
+                self._abgelehnt += 1
+            raise PasswortDienstUeberlastet("Zu viele gleichzeitige Anmeldungen")
+
+        eingereiht = time.monotonic()
+
+        def messen():
+            begonnen = time.monotonic()
+            try:
+                return funktion(*argumente)
+            finally:
+                self._messung_erfassen(name, begonnen - eingereiht, time.monotonic() - begonnen)
+                self._plaetze.release()
+
+        zukunft = self._pool.submit(messen)
+        try:
+            return zukunft.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Noch wartende Aufträge werden verworfen; laufende geben ihren Platz danach selbst frei
+            if zukunft.cancel():
+                self._plaetze.release()
+            with self._sperre:
+                self._zeitueberschreitungen += 1
+            raise PasswortDienstUeberlastet("Passwortprüfung hat zu lange gedauert")
+
+    def _messung_erfassen(self, name, wartezeit, dauer):
+        with self._sperre:
+            kennzahl = self._kennzahlen.setdefault(name, {
+                'anzahl': 0, 'dauer_gesamt': 0.0, 'dauer_max': 0.0, 'wartezeit_gesamt': 0.0, 'wartezeit_max': 0.0
+            })
+            kennzahl['anzahl'] += 1
+            kennzahl['dauer_gesamt'] += dauer
+            kennzahl['dauer_max'] = max(kennzahl['dauer_max'], dauer)
+            kennzahl['wartezeit_gesamt'] += wartezeit
+            kennzahl['wartezeit_max'] = max(kennzahl['wartezeit_max'], wartezeit)
+
+    def statistiken(self):
+        """
+        Liefert Kennzahlen zu Auslastung und Latenz der Passwortberechnungen.
+
+        @return {Object} Poolgröße, abgelehnte Aufträge und je Operation Anzahl,
+            mittlere und maximale Dauer bzw. Wartezeit in Millisekunden
+        """
+        with self._sperre:
+            operationen = {
+                name: {
+                    'anzahl': k['anzahl'],
+                    'dauer_durchschnitt_ms': round(k['dauer_gesamt'] / k['anzahl'] * 1000, 3),
+                    'dauer_max_ms': round(k['dauer_max'] * 1000, 3),
+                    'wartezeit_durchschnitt_ms': round(k['wartezeit_gesamt'] / k['anzahl'] * 1000, 3),
+                    'wartezeit_max_ms': round(k['wartezeit_max'] * 1000, 3)
+                }
+                for name, k in self._kennzahlen.items()
+            }
+            return {
+                'groesse': self.groesse,
+                'max_warteschlange': self.max_warteschlange,
+                'kosten': BCRYPT_KOSTEN,
+                'abgelehnt': self._abgelehnt,
+                'zeitueberschreitungen': self._zeitueberschreitungen,
+                'operationen': operationen
+            }
+
+
+passwort_dienst = _PasswortDienst(PASSWORT_POOL_GROESSE, PASSWORT_MAX_WARTESCHLANGE, PASSWORT_TIMEOUT)
+
+
+def passwort_statistiken():
+    """
+    Liefert die Kennzahlen des Passwortdienstes für /api/metriken.
+
+    @return {Object} Siehe _PasswortDienst.statistiken()
+    """
+    return passwort_dienst.statistiken()
+
 
 def passwort_hashen(passwort):
     """
     Generiert einen sicheren Hash für ein Passwort.
     
+    Die Berechnung läuft im begrenzten Passwort-Pool.
+    
     @param {string} passwort - Das zu hashende Passwort im Klartext
     @return {string} Der generierte Passwort-Hash (inklusive Salt)
     
     @throws {UnicodeEncodeError} Bei ungültigen Zeichen im Passwort
+    @throws {PasswortDienstUeberlastet} Wenn der Pool ausgelastet ist
     """
     # Gera um hash da senha, incluindo um salt aleatório
-    return bcrypt.hashpw(passwort.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    passwort_bytes = passwort.encode('utf-8')
+    return passwort_dienst.ausfuehren(
+        'hashen', lambda: bcrypt.hashpw(passwort_bytes, bcrypt.gensalt(BCRYPT_KOSTEN)).decode('utf-8')
+    )
+
+def neuberechnung_erforderlich(hash_gespeichert):
+    """
+    Prüft, ob ein gespeicherter Hash mit einem anderen Kostenfaktor erzeugt wurde.
+    
+    @param {string} hash_gespeichert - Der gespeicherte bcrypt-Hash
+    @return {boolean} True, wenn der Hash mit BCRYPT_KOSTEN neu berechnet werden sollte
+    """
+    treffer = _KOSTEN_MUSTER.match(hash_gespeichert or '')
+    return bool(treffer) and int(treffer.group(1)) != BCRYPT_KOSTEN
 
 def passwort_verifizieren(passwort, hash_gespeichert):
     """
@@ -30,8 +183,7 @@ def passwort_verifizieren(passwort, hash_gespeichert):
     
     @return {boolean} True wenn das Passwort korrekt ist, sonst False
     
-    @throws {ValueError} Bei ungültigem Hash-Format
-    @throws {Exception} Bei unerwarteten Fehlern
+    @throws {PasswortDienstUeberlastet} Wenn der Pool ausgelastet ist
     """
     """
     Verifica se a senha fornecida corresponde ao hash armazenado.
@@ -42,7 +194,10 @@ def passwort_verifizieren(passwort, hash_gespeichert):
         # bcrypt.checkpw espera bytes, então precisamos codificar ambos.
         # Certifique-se de que hash_gespeichert também está decodificado do DB como string
         # e então re-codificado para bytes para a comparação.
-        return bcrypt.checkpw(passwort.encode('utf-8'), hash_gespeichert.encode('utf-8'))
+        passwort_bytes, hash_bytes = passwort.encode('utf-8'), hash_gespeichert.encode('utf-8')
+        return passwort_dienst.ausfuehren('verifizieren', bcrypt.checkpw, passwort_bytes, hash_bytes)
+    except PasswortDienstUeberlastet:
+        raise
     except ValueError:
         # Lida com casos onde o hash armazenado pode estar mal formatado ou não é um hash bcrypt válido
         print(f"Erro ao verificar senha: Hash armazenado inválido ou formato incorreto.")
@@ -5,24 +5,90 @@
 Dieses Modul stellt Funktionen für die JWT-Token-Verwaltung bereit:
 - Token-Generierung (Access und Refresh)
 - Token-Verifizierung
-- Token-Blacklisting
-- Geschützte Routen mit Token-Authentifizierung
+- Token-Widerruf über die jti (Token-ID) mit Ablauf im Cache-Backend
+- Zwischenspeicher für verifizierte Claims bis zum Ablauf des Tokens
+- Geschützte Routen (token_erforderlich) und optionale Anmeldung (token_optional),
+  der Bearer-Token wird höchstens einmal je Anfrage geprüft
 """
 
 import jwt
 import datetime
+import hashlib
+import time
+import uuid
 from functools import wraps
 from flask import request, jsonify
 import os
 from typing import Dict, Tuple, Optional
+from utils.cachebackend import CacheBackend, cache_backend
 
 # Configurações
 SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'mein_geheimer_schluessel')
 ACCESS_TOKEN_EXPIRE = datetime.timedelta(minutes=30)
 REFRESH_TOKEN_EXPIRE = datetime.timedelta(days=7)
 
-# Blacklist para tokens revogados (em produção, use Redis ou banco de dados)
-token_blacklist = set()
+class Widerrufsliste:
+    """
+    Widerrufene Token-IDs (jti), jeweils nur bis zum Ablauf des Tokens gespeichert.
+    
+    Prüfen und Widerrufen sind einzelne Schlüsselzugriffe im Backend (O(1));
+    abgelaufene Einträge verwirft das Backend selbst.
+    
+    @param {CacheBackend} backend - Ablage, z.B. SpeicherBackend für einen
+        einzelnen Prozess oder NetzwerkBackend für alle Worker-Prozesse
+    """
+    
+    PRAEFIX = 'token_widerruf:'
+    
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+    
+    def widerrufen(self, jti: str, ablauf: float) -> None:
+        """
+        Widerruft eine Token-ID bis zu ihrem Ablauf.
+        
+        @param {string} jti - ID des Tokens
+        @param {float} ablauf - Ablaufzeitpunkt des Tokens als Unix-Zeitstempel
+        """
+        restlaufzeit = ablauf - time.time()
+        if restlaufzeit > 0:
+            self.backend.setzen(self.PRAEFIX + jti, True, ttl=restlaufzeit)
+    
+    def ist_widerrufen(self, jti: str) -> bool:
+        """
+        Prüft, ob eine Token-ID widerrufen wurde.
+        
+        @param {string} jti - ID des Tokens
+        
+        @return {bool} True, wenn der Token nicht mehr akzeptiert werden darf
+        """
+        return bool(self.backend.abrufen(self.PRAEFIX + jti))
+
+widerrufsliste = Widerrufsliste(cache_backend)
+
+# Verifizierte Claims je Token-Hash; Einträge laufen mit dem Token ab
+_token_cache = cache_backend.zwischenspeicher(
+    'tokens',
+    max_eintraege=int(os.getenv('TOKEN_CACHE_MAX_EINTRAEGE', 10000)),
+    ttl=REFRESH_TOKEN_EXPIRE.total_seconds()
+)
+
+def _token_cache_invalidieren(daten: Dict) -> None:
+    if daten.get('schluessel'):
+        _token_cache.entfernen(daten['schluessel'])
+    else:
+        _token_cache.leeren()
+
+cache_backend.abonnieren('tokens', _token_cache_invalidieren)
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _token_id(payload: Dict, token_hash: str) -> str:
+    """
+    Liefert die jti eines Tokens; ältere Tokens ohne jti werden über ihren Hash erkannt.
+    """
+    return payload.get('jti') or token_hash
 
 def generate_tokens(benutzer_id: int, email: str) -> Tuple[str, str]:
     """
@@ -38,7 +104,8 @@ def generate_tokens(benutzer_id: int, email: str) -> Tuple[str, str]:
         'benutzer_id': benutzer_id,
         'email': email,
         'exp': datetime.datetime.utcnow() + ACCESS_TOKEN_EXPIRE,
-        'type': 'access'
+        'type': 'access',
+        'jti': uuid.uuid4().hex
     }
     access_token = jwt.encode(access_payload, SECRET_KEY, algorithm='HS256')
     
@@ -47,7 +114,8 @@ def generate_tokens(benutzer_id: int, email: str) -> Tuple[str, str]:
         'benutzer_id': benutzer_id,
         'email': email,
         'exp': datetime.datetime.utcnow() + REFRESH_TOKEN_EXPIRE,
-        'type': 'refresh'
+        'type': 'refresh',
+        'jti': uuid.uuid4().hex
     }
     refresh_token = jwt.encode(refresh_payload, SECRET_KEY, algorithm='HS256')
     
@@ -57,44 +125,87 @@ def token_verifizieren(token: str) -> Optional[Dict]:
     """
     Verifiziert und dekodiert einen JWT-Token.
     
+    Verifizierte Claims werden bis zum Ablauf des Tokens zwischengespeichert
+    (Schlüssel ist der SHA-256-Hash des Tokens); wiederholte Anfragen mit
+    demselben Token sparen so die Signaturprüfung.
+    
     @param {string} token - Der zu verifizierende JWT-Token
     
-    @return {Optional[Dict]} Die dekodierten Token-Daten oder None bei ungültigem Token
+    @return {Optional[Dict]} Die dekodierten Token-Daten oder None bei ungültigem,
+        abgelaufenem oder widerrufenem Token
     @return {int} return.benutzer_id - ID des Benutzers
     @return {string} return.email - E-Mail-Adresse des Benutzers
     @return {datetime} return.exp - Ablaufzeitpunkt
     @return {string} return.type - Token-Typ ('access' oder 'refresh')
-    
-    @throws {jwt.ExpiredSignatureError} Bei abgelaufenem Token
-    @throws {jwt.InvalidTokenError} Bei ungültigem Token
+    @return {string} return.jti - Eindeutige ID des Tokens
     """
+    schluessel = _token_hash(token)
+    payload = _token_cache.abrufen(schluessel)
+    if payload is not None:
+        if payload['exp'] > time.time():
+            return dict(payload)
+        _token_cache.entfernen(schluessel)
+        return None
+    
     try:
-        print(f"🔍 Token validation debug:")
-        print(f"   Secret Key: {SECRET_KEY[:10]}...")
-        print(f"   Token (first 50): {token[:50]}...")
-        print(f"   Token in blacklist: {token in token_blacklist}")
-        
-        if token in token_blacklist:
-            print("❌ Token está na blacklist")
-            return None
-            
-        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
-        print(f"✅ Token decodificado com sucesso: {payload}")
-        return payload
-    except jwt.ExpiredSignatureError as e:
-        print(f"❌ Token expirado: {e}")
+        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'require': ['exp']})
+    except jwt.InvalidTokenError:
         return None
-    except jwt.InvalidTokenError as e:
-        print(f"❌ Token inválido: {e}")
+    
+    # Erst ablegen, dann auf Widerruf prüfen: ein gleichzeitiger Widerruf wird
+    # entweder hier gesehen oder entfernt den Eintrag über seine Invalidierung
+    _token_cache.setzen(schluessel, dict(payload), ttl=payload['exp'] - time.time())
+    if widerrufsliste.ist_widerrufen(_token_id(payload, schluessel)):
+        _token_cache.entfernen(schluessel)
         return None
+    return payload
 
 def token_blacklisten(token: str) -> None:
     """
-    Fügt einen Token zur Blacklist hinzu.
+    Widerruft einen Token (z.B. beim Logout).
+    
+    Gespeichert wird nur die jti bis zum Ablauf des Tokens; der Widerruf gilt
+    für alle Worker-Prozesse, die dasselbe Cache-Backend nutzen. Ungültige
+    oder abgelaufene Tokens werden ignoriert.
+    
+    @param {string} token - Der zu widerrufende Token
+    """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'], options={'verify_exp': False})
+    except jwt.InvalidTokenError:
+        return
+    schluessel = _token_hash(token)
+    ablauf = payload.get('exp') or time.time() + REFRESH_TOKEN_EXPIRE.total_seconds()
+    widerrufsliste.widerrufen(_token_id(payload, schluessel), ablauf)
+    cache_backend.invalidieren('tokens', schluessel=schluessel)
+
+def _anfrage_token_daten() -> Tuple[bool, Optional[Dict]]:
+    """
+    Prüft den Bearer-Token der aktuellen Anfrage höchstens einmal je Anfrage.
     
-    @param {string} token - Der zu sperrende Token
+    @return {Tuple[bool, Optional[Dict]]} (Token vorhanden, Token-Daten oder None)
     """
-    token_blacklist.add(token)
+    # Am Request-Objekt statt an g ablegen: g gehört zum App-Kontext, der mehrere Anfragen umfassen kann
+    pruefung = getattr(request, '_token_pruefung', None)
+    if pruefung is None:
+        bearer = request.headers.get('Authorization', '')
+        token = bearer[len('Bearer '):] if bearer.startswith('Bearer ') else ''
+        pruefung = request._token_pruefung = (bool(token), token_verifizieren(token) if token else None)
+    return pruefung
+
+def betrachter_id_ermitteln() -> Optional[int]:
+    """
+    Ermittelt den angemeldeten Benutzer einer Anfrage, ohne eine Anmeldung zu erzwingen.
+
+    Für öffentliche Routen, die angemeldeten Benutzern zusätzliche Angaben
+    (z.B. Favoritenstatus) liefern.
+
+    @return {Optional[int]} ID des Benutzers oder None bei fehlendem/ungültigem Token
+    """
+    _, daten = _anfrage_token_daten()
+    if not daten or daten.get('type') != 'access':
+        return None
+    return daten.get('benutzer_id')
 
 def token_erforderlich(f):
     """
@@ -110,16 +221,10 @@ def token_erforderlich(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            bearer = request.headers['Authorization']
-            if bearer.startswith('Bearer '):
-                token = bearer.replace('Bearer ', '', 1)
-
-        if not token:
+        vorhanden, daten = _anfrage_token_daten()
+        if not vorhanden:
             return jsonify({'nachricht': 'Token erforderlich'}), 403
 
-        daten = token_verifizieren(token)
         if daten is None:
             return jsonify({'nachricht': 'Ungültiger oder abgelaufener Token'}), 401
             
@@ -131,5 +236,24 @@ def token_erforderlich(f):
         return f(*args, **kwargs)
     return decorated
 
+def token_optional(f):
+    """
+    Dekorator für öffentliche Routen, die angemeldeten Benutzern mehr liefern.
+    
+    Die Route erhält token_daten mit den Claims eines gültigen Access Tokens
+    oder None; fehlende oder ungültige Tokens führen nicht zu einem Fehler.
+    
+    @decorator
+    @param {function} f - Die Route
+    
+    @return {function} Die Route mit optionaler Authentifizierung
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        _, daten = _anfrage_token_daten()
+        kwargs['token_daten'] = daten if daten and daten.get('type') == 'access' else None
+        return f(*args, **kwargs)
+    return decorated
+
 # Alias para compatibilidade com código existente
 token_generieren = generate_tokens